@@ -0,0 +1,463 @@
+"""
+Détection automatique du flood sur le chemin des messages
+
+Trois règles par serveur: trop de messages d'un même utilisateur sur une
+fenêtre glissante, le même message répété (dans un ou plusieurs salons) et
+trop de mentions. Pour que le coût par message reste de quelques
+microsecondes, la plupart des utilisateurs n'ont aucun état propre:
+
+- chaque message incrémente deux count-min sketches (messages par
+  utilisateur, messages identiques par utilisateur) sur deux fenêtres
+  tournantes, dont la taille suit le trafic du serveur entre deux bornes;
+- un utilisateur dont l'estimation atteint un seuil de suivi (ou qui
+  mentionne plusieurs personnes) passe en suivi exact: seaux à jetons
+  (messages, mentions) et anneau de ses derniers messages;
+- les utilisateurs suivis inactifs depuis IDLE_TTL sont oubliés (leurs seaux
+  seraient de nouveau pleins) et leur nombre est borné par serveur (LRU).
+
+Le sketch ne fait que surestimer: une collision peut déclencher un suivi
+exact inutile, jamais une sanction. Activé par BOT_ANTISPAM=1; action
+configurable par BOT_ANTISPAM_ACTION (mute, kick, ban ou log).
+"""
+
+import logging
+import os
+import random
+import time
+from array import array
+from collections import OrderedDict
+
+import discord
+
+from utils.guild_settings import guild_settings
+from utils.hierarchy import hierarchy_cache
+from utils.logger import log_moderation_action
+from utils.moderation import execute_batch
+from utils.mutes import ROLE, mute_member, mute_roles
+from utils.scheduler import sanction_scheduler
+
+logger = logging.getLogger(__name__)
+
+# Règles: plus de LIMIT événements sur WINDOW secondes
+MESSAGE_LIMIT = 6
+MESSAGE_WINDOW = 5.0
+DUPLICATE_LIMIT = 3
+DUPLICATE_WINDOW = 30.0
+# Les messages plus courts ("ok", "mdr") ne comptent pas comme doublons
+DUPLICATE_MIN_LENGTH = 10
+MENTION_LIMIT = 8
+MENTION_WINDOW = 10.0
+
+# Passage en suivi exact: messages estimés sur MESSAGE_WINDOW, copies d'un même message, mentions d'un message
+PROMOTE_MESSAGES = 3
+PROMOTE_DUPLICATES = 2
+PROMOTE_MENTIONS = 2
+
+# Derniers messages gardés par utilisateur suivi (règle des doublons)
+HISTORY_SIZE = 8
+# Utilisateurs suivis par serveur, et durée d'inactivité avant oubli
+TRACKED_USERS = 2000
+IDLE_TTL = max(MESSAGE_WINDOW, DUPLICATE_WINDOW, MENTION_WINDOW)
+# Cases par ligne des count-min sketches (puissance de 2, adaptée au trafic entre ces bornes),
+# nombre de lignes et incréments par case et par fenêtre au-delà desquels la largeur double
+SKETCH_MIN_WIDTH = 64
+SKETCH_MAX_WIDTH = 65536
+SKETCH_DEPTH = 4
+SKETCH_LOAD = 0.25
+
+# Pas de nouvelle sanction pour un même utilisateur pendant ce délai
+ACTION_COOLDOWN = 60.0
+# Durée d'un mute anti-spam (rôle "Muted", ou exclusion temporaire de Discord
+# quand le serveur n'a pas ce rôle)
+MUTE_TIMEOUT = 600.0
+ACTIONS = ("mute", "kick", "ban", "log")
+# Les membres ayant une de ces permissions ne sont ni comptés ni sanctionnés
+EXEMPT_PERMISSIONS = ("administrator", "manage_messages", "kick_members", "ban_members", "manage_roles")
+_EXEMPT_BITS = discord.Permissions(**{permission: True for permission in EXEMPT_PERMISSIONS}).value
+
+def is_exempt(member):
+    """True si le membre a une des EXEMPT_PERMISSIONS (un seul test sur l'instantané de hiérarchie)"""
+    return isinstance(member, discord.Member) and bool(
+        hierarchy_cache.get(member.guild).member_info(member)[1] & _EXEMPT_BITS)
+
+FLOOD = "flood"
+DUPLICATE = "duplicate"
+MENTIONS = "mentions"
+
+_MASK64 = (1 << 64) - 1
+
+class CountMinSketch:
+    """
+    Compteurs approximatifs par clé entière sur une fenêtre glissante
+
+    La fenêtre est approchée par deux fenêtres fixes (courante et
+    précédente, pondérée par la part encore couverte). Les cases d'une clé
+    sont calculées une fois par ajout, par double hachage (h1 + i * h2) à
+    partir d'une seule multiplication, et servent aux deux tables. Les
+    comptes ne sont jamais sous-estimés; ils tiennent sur un octet et
+    saturent à 255 (les seuils de suivi sont bien plus bas).
+
+    La surestimation dépend du nombre d'incréments par case: la largeur
+    double dès que la fenêtre courante dépasse load incréments par case
+    (les comptes repartent alors de zéro) et diminue à la rotation si le
+    trafic a baissé, entre min_width et max_width.
+    """
+
+    def __init__(self, window, min_width=SKETCH_MIN_WIDTH, max_width=SKETCH_MAX_WIDTH,
+                 depth=SKETCH_DEPTH, load=SKETCH_LOAD, seed=None):
+        if min_width & (min_width - 1) or max_width & (max_width - 1):
+            raise ValueError("min_width et max_width doivent être des puissances de 2")
+        self.window = window
+        self.min_width = min_width
+        self.max_width = max_width
+        self.depth = depth
+        self.load = load
+        self._multiplier = random.Random(seed).getrandbits(64) | 1
+        self._resize(min_width)
+        self._started = None
+
+    def _table(self):
+        return [array('B', bytes(self.width)) for _ in range(self.depth)]
+
+    def _resize(self, width):
+        self.width = width
+        self._mask = width - 1
+        self._limit = width * self.load if width < self.max_width else float('inf')
+        self._current = self._table()
+        self._previous = self._table()
+        self._added = 0
+
+    def _rotate(self, now):
+        elapsed = now - self._started
+        windows = int(elapsed // self.window)
+        self._started += windows * self.window
+
+        # Trafic en baisse: une largeur deux fois plus petite resterait sous la limite
+        width = self.width
+        while width > self.min_width and self._added < width * self.load / 4:
+            width //= 2
+        if width != self.width:
+            self._resize(width)
+            return
+        self._previous = self._current if windows == 1 else self._table()
+        self._current = self._table()
+        self._added = 0
+
+    def add(self, key, now, count=1):
+        """
+        Ajoute count à une clé et retourne son estimation sur la fenêtre glissante
+
+        Args:
+            key: Clé entière (ID, hash)
+            now: Horloge monotone (secondes)
+            count: Incrément
+
+        Returns:
+            float: Estimation (>= valeur exacte)
+        """
+
+        if self._started is None:
+            self._started = now
+        elif now - self._started >= self.window:
+            self._rotate(now)
+        self._added += count
+        if self._added > self._limit:
+            self._resize(self.width * 2)
+            self._added = count
+
+        mixed = ((key & _MASK64) * self._multiplier) & _MASK64
+        position = mixed >> 40
+        step = (mixed & 0xFFFFFF) | 1
+        mask = self._mask
+        current = previous = None
+        for row, old in zip(self._current, self._previous):
+            index = position & mask
+            value = row[index] + count
+            row[index] = value if value < 255 else 255
+            if current is None or value < current:
+                current = value
+            if previous is None or old[index] < previous:
+                previous = old[index]
+            position += step
+        if previous:
+            return current + previous * (1.0 - (now - self._started) / self.window)
+        return current
+
+    def memory(self):
+        """Octets occupés par les tables"""
+        return 2 * self.depth * self.width
+
+class SpamDetection:
+    """Détection d'une règle anti-spam"""
+
+    def __init__(self, rule, message, detail):
+        self.rule = rule
+        self.message = message
+        self.member = message.author
+        self.guild = message.guild
+        self.detail = detail
+
+    def describe(self):
+        return f"{self.rule} ({self.detail})"
+
+class _TrackedUser:
+    """État exact d'un utilisateur suivi: seaux à jetons et anneau des derniers messages"""
+
+    __slots__ = ('seen', 'tokens', 'mention_tokens', 'history', 'position', 'sanctioned_until')
+
+    def __init__(self, now, message_limit, mention_limit):
+        self.seen = now
+        self.tokens = float(message_limit)
+        self.mention_tokens = float(mention_limit)
+        self.history = [None] * HISTORY_SIZE   # (empreinte, salon, horloge)
+        self.position = 0
+        self.sanctioned_until = 0.0
+
+class GuildSpamDetector:
+    """
+    Détecteur d'un serveur
+
+    Un message coûte deux ajouts dans les sketches; seuls les utilisateurs
+    suivis ont des seaux à jetons exacts. Les messages d'avant le passage en
+    suivi ne sont pas comptés: une détection peut arriver quelques messages
+    après la limite exacte (au plus PROMOTE_MESSAGES - 1), jamais avant.
+    """
+
+    def __init__(self, message_limit=MESSAGE_LIMIT, message_window=MESSAGE_WINDOW,
+                 duplicate_limit=DUPLICATE_LIMIT, duplicate_window=DUPLICATE_WINDOW,
+                 mention_limit=MENTION_LIMIT, mention_window=MENTION_WINDOW,
+                 max_users=TRACKED_USERS, idle_ttl=IDLE_TTL):
+        self.message_limit = message_limit
+        self.message_rate = message_limit / message_window
+        self.duplicate_limit = duplicate_limit
+        self.duplicate_window = duplicate_window
+        self.mention_limit = mention_limit
+        self.mention_rate = mention_limit / mention_window
+        self.max_users = max_users
+        self.idle_ttl = idle_ttl
+
+        self.messages = CountMinSketch(message_window)
+        self.duplicates = CountMinSketch(duplicate_window)
+        self._users = OrderedDict()     # user_id -> _TrackedUser, du moins au plus récemment actif
+
+        # Compteurs exposés via AntiSpam.stats()
+        self.checked = 0
+        self.promoted = 0
+        self.expired = 0
+
+    def __len__(self):
+        return len(self._users)
+
+    def _track(self, user_id, now):
+        users = self._users
+        # Les plus inactifs sont en tête: oublier les expirés, puis les plus anciens au-delà de max_users
+        while users:
+            oldest = next(iter(users.values()))
+            if now - oldest.seen < self.idle_ttl and len(users) < self.max_users:
+                break
+            users.popitem(last=False)
+            self.expired += 1
+        user = users[user_id] = _TrackedUser(now, self.message_limit, self.mention_limit)
+        self.promoted += 1
+        return user
+
+    def check(self, message, now):
+        """
+        Applique les règles à un message
+
+        Args:
+            message: Message d'un membre du serveur
+            now: Horloge monotone (secondes)
+
+        Returns:
+            SpamDetection: Règle enfreinte, ou None
+        """
+
+        self.checked += 1
+        user_id = message.author.id
+        content = message.content
+        digest = hash(content.strip().lower()) if len(content) >= DUPLICATE_MIN_LENGTH else 0
+        mentions = len(message.mentions) + len(message.role_mentions) + message.mention_everyone
+
+        user = self._users.get(user_id)
+        if user is None:
+            if (self.messages.add(user_id, now) < PROMOTE_MESSAGES and mentions < PROMOTE_MENTIONS
+                    and (not digest or self.duplicates.add(user_id ^ digest, now) < PROMOTE_DUPLICATES)):
+                return None
+            user = self._track(user_id, now)
+        else:
+            self._users.move_to_end(user_id)
+
+        # Seaux à jetons: remplissage depuis le dernier message, puis consommation
+        elapsed = now - user.seen
+        user.seen = now
+        user.tokens = min(self.message_limit, user.tokens + elapsed * self.message_rate) - 1
+        user.mention_tokens = min(self.mention_limit, user.mention_tokens + elapsed * self.mention_rate) - mentions
+
+        # Copies récentes du message dans l'anneau, puis ajout du message
+        copies = 0
+        if digest:
+            horizon = now - self.duplicate_window
+            for entry in user.history:
+                if entry is not None and entry[0] == digest and entry[2] >= horizon:
+                    copies += 1
+            user.history[user.position] = (digest, message.channel.id, now)
+            user.position = (user.position + 1) % HISTORY_SIZE
+
+        if now < user.sanctioned_until:
+            return None
+        if user.tokens < 0:
+            detection = SpamDetection(FLOOD, message, f"plus de {self.message_limit} messages en {self.message_limit / self.message_rate:.0f} s")
+        elif copies + 1 >= self.duplicate_limit:
+            horizon = now - self.duplicate_window
+            channels = {entry[1] for entry in user.history if entry is not None and entry[0] == digest and entry[2] >= horizon}
+            detection = SpamDetection(DUPLICATE, message, f"{copies + 1} messages identiques dans {len(channels)} salon(s)")
+        elif user.mention_tokens < 0:
+            detection = SpamDetection(MENTIONS, message, f"plus de {self.mention_limit} mentions en {self.mention_limit / self.mention_rate:.0f} s")
+        else:
+            return None
+
+        user.sanctioned_until = now + ACTION_COOLDOWN
+        return detection
+
+    def memory(self):
+        """Octets occupés, approximativement (sketches et utilisateurs suivis)"""
+        return self.messages.memory() + self.duplicates.memory() + len(self._users) * (200 + 8 * HISTORY_SIZE)
+
+class AntiSpam:
+    """
+    Détecteurs anti-spam par serveur et application de la sanction
+
+    Args:
+        enabled: Activer la détection (par défaut: variable BOT_ANTISPAM=1)
+        action: "mute", "kick", "ban" ou "log" (par défaut: BOT_ANTISPAM_ACTION ou "mute")
+        limits: Limites passées aux GuildSpamDetector
+    """
+
+    def __init__(self, enabled=None, action=None, **limits):
+        if enabled is None:
+            enabled = os.getenv("BOT_ANTISPAM", "0") == "1"
+        action = (action or os.getenv("BOT_ANTISPAM_ACTION", "mute")).lower()
+        if action not in ACTIONS:
+            logger.warning(f"⚠️ Action anti-spam inconnue: {action}, les détections seront seulement journalisées")
+            action = "log"
+
+        self.enabled = enabled
+        self.action = action
+        self.limits = limits
+        self._guilds = {}
+        self.clock = time.monotonic
+
+        # Compteurs exposés via stats()
+        self.detections = {FLOOD: 0, DUPLICATE: 0, MENTIONS: 0}
+        self.actions = 0
+        self.skipped = 0
+        self.errors = 0
+
+    def detector(self, guild_id):
+        """Détecteur d'un serveur (créé au premier message)"""
+        detector = self._guilds.get(guild_id)
+        if detector is None:
+            # Seuils du serveur (+config seuil) par-dessus les limites globales
+            detector = self._guilds[guild_id] = GuildSpamDetector(
+                **{**self.limits, **guild_settings.limits(guild_id, "antispam")})
+        return detector
+
+    def discard_guild(self, guild_id):
+        self._guilds.pop(guild_id, None)
+
+    def check(self, message):
+        """
+        Applique les règles à un message (à appeler depuis on_message)
+
+        Les modérateurs (EXEMPT_PERMISSIONS) ne sont pas comptés: un +ban
+        visant plus de MENTION_LIMIT membres n'est pas une détection.
+
+        Returns:
+            SpamDetection: Règle enfreinte, ou None (messages privés, bots et modérateurs ignorés)
+        """
+
+        if not self.enabled or message.guild is None or message.author.bot or is_exempt(message.author):
+            return None
+        detection = self.detector(message.guild.id).check(message, self.clock())
+        if detection is not None:
+            self.detections[detection.rule] += 1
+        return detection
+
+    async def enforce(self, detection, executor, mute_store=None):
+        """
+        Applique l'action configurée à l'auteur d'un message détecté
+
+        Les modérateurs (EXEMPT_PERMISSIONS), et les membres que le bot ne
+        peut pas modérer (hiérarchie, propriétaire), ne sont pas sanctionnés.
+
+        Args:
+            detection: SpamDetection retournée par check()
+            executor: BulkExecutor du bot (kick/ban via execute_batch)
+            mute_store: MuteRoleStore où sauvegarder les rôles au mute (sans: exclusion temporaire)
+        """
+
+        member = detection.member
+        guild = detection.guild
+        reason = f"Anti-spam: {detection.describe()}"
+
+        if not isinstance(member, discord.Member) or is_exempt(member):
+            self.skipped += 1
+            return
+        refusal = hierarchy_cache.check(guild, guild.me, member, guild.me.id, require_member=True)
+        if refusal is not None:
+            self.skipped += 1
+            logger.warning(f"⚠️ Anti-spam: {member} non sanctionné ({refusal}) - {detection.describe()}")
+            return
+
+        logger.warning(f"🚨 Anti-spam: {member} dans {guild} - {detection.describe()} - action: {self.action}")
+        if self.action == "log":
+            return
+
+        try:
+            if self.action == "mute":
+                await self._mute(member, reason, mute_store)
+            else:
+                await execute_batch(guild, guild.me, self.action.upper(), [member], reason, executor)
+            self.actions += 1
+        except discord.HTTPException as e:
+            self.errors += 1
+            logger.error(f"ERREUR ANTI-SPAM: {e}")
+
+    async def _mute(self, member, reason, mute_store):
+        guild = member.guild
+        muted_role, _ = mute_roles(guild)
+        result = await mute_member(member, muted_role, mute_store, reason, timeout=MUTE_TIMEOUT)
+        if result is None:
+            return
+        if result == ROLE:
+            # Levé par le planificateur, comme l'exclusion temporaire l'est par Discord
+            sanction_scheduler.schedule("UNMUTE", guild.id, member.id, time.time() + MUTE_TIMEOUT)
+        log_moderation_action("MUTE", guild.me, member, reason, guild)
+
+    def stats(self):
+        """
+        Statistiques de l'anti-spam
+
+        Returns:
+            dict: Serveurs, messages vérifiés, utilisateurs suivis, détections par règle et sanctions
+        """
+
+        detectors = self._guilds.values()
+        return {
+            "guilds": len(self._guilds),
+            "checked": sum(detector.checked for detector in detectors),
+            "tracked_users": sum(len(detector) for detector in detectors),
+            "promoted": sum(detector.promoted for detector in detectors),
+            "expired": sum(detector.expired for detector in detectors),
+            "memory_bytes": sum(detector.memory() for detector in detectors),
+            **{f"detections_{rule}": count for rule, count in self.detections.items()},
+            "actions": self.actions,
+            "skipped": self.skipped,
+            "errors": self.errors,
+        }
+
+# Anti-spam partagé par les deux bots
+antispam = AntiSpam()
+# Seuils modifiés par +config: le détecteur est recréé au message suivant
+guild_settings.add_threshold_listener(antispam.discard_guild)
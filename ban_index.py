@@ -0,0 +1,219 @@
+"""
+Index en mémoire des bannissements par serveur
+"""
+
+import asyncio
+import bisect
+import logging
+
+logger = logging.getLogger(__name__)
+
+class BanIndex:
+    """
+    Index des utilisateurs bannis d'un serveur
+
+    La liste est chargée une seule fois via l'API puis tenue à jour par les
+    events on_member_ban / on_member_unban. La recherche par ID est en O(1),
+    la recherche par nom passe par un index secondaire (noms en minuscules
+    triés) qui permet aussi la recherche par préfixe.
+    """
+
+    def __init__(self):
+        self._by_id = {}        # user_id -> discord.User
+        self._by_name = {}      # nom en minuscules -> set(user_id)
+        self._names = []        # noms en minuscules triés (recherche par préfixe)
+        self._lock = asyncio.Lock()
+        self._loaded = False
+        self._loading = False
+        self._removed_while_loading = set()
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __contains__(self, user_id):
+        return user_id in self._by_id
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    async def ensure_loaded(self, guild):
+        """
+        Charge la liste des bannissements du serveur si ce n'est pas déjà fait
+
+        Args:
+            guild: Serveur dont il faut charger les bannissements
+        """
+
+        if self._loaded:
+            return
+
+        async with self._lock:
+            if self._loaded:
+                return
+
+            self._loading = True
+            self._removed_while_loading.clear()
+            try:
+                async for ban_entry in guild.bans(limit=None):
+                    # Un débannissement reçu pendant le chargement est prioritaire
+                    if ban_entry.user.id not in self._removed_while_loading:
+                        self.add(ban_entry.user)
+            finally:
+                self._loading = False
+                self._removed_while_loading.clear()
+
+            self._loaded = True
+            logger.info(f"Index des bannissements chargé pour {guild}: {len(self)} entrée(s)")
+
+    def add(self, user):
+        """
+        Ajoute (ou met à jour) un utilisateur banni
+
+        Args:
+            user: Utilisateur banni
+        """
+
+        previous = self._by_id.get(user.id)
+        if previous is not None and previous.name.lower() != user.name.lower():
+            self._unlink_name(previous.name.lower(), user.id)
+
+        self._by_id[user.id] = user
+
+        key = user.name.lower()
+        ids = self._by_name.get(key)
+        if ids is None:
+            self._by_name[key] = {user.id}
+            bisect.insort(self._names, key)
+        else:
+            ids.add(user.id)
+
+    def remove(self, user_id):
+        """
+        Retire un utilisateur de l'index
+
+        Args:
+            user_id: ID de l'utilisateur débanni
+
+        Returns:
+            discord.User: L'utilisateur retiré, ou None s'il n'était pas indexé
+        """
+
+        if self._loading:
+            self._removed_while_loading.add(user_id)
+
+        user = self._by_id.pop(user_id, None)
+        if user is not None:
+            self._unlink_name(user.name.lower(), user_id)
+        return user
+
+    def get(self, user_id):
+        """Retourne l'utilisateur banni ayant cet ID, ou None"""
+        return self._by_id.get(user_id)
+
+    def find(self, query):
+        """
+        Recherche un utilisateur banni
+
+        Args:
+            query: ID, mention, nom#discriminator, nom ou début de nom
+
+        Returns:
+            discord.User: L'utilisateur trouvé, ou None si aucun (ou plusieurs) ne correspond
+        """
+
+        query = query.strip()
+
+        # Recherche par ID (ou mention <@ID>)
+        user_id = query.strip('<@!>')
+        if user_id.isdigit():
+            return self._by_id.get(int(user_id))
+
+        # Recherche par nom#discriminator
+        if '#' in query:
+            name, _, discriminator = query.rpartition('#')
+            for candidate_id in self._by_name.get(name.lower(), ()):
+                user = self._by_id[candidate_id]
+                if user.discriminator == discriminator:
+                    return user
+            return None
+
+        # Recherche par nom exact (insensible à la casse)
+        key = query.lower()
+        ids = self._by_name.get(key)
+        if ids:
+            return self._by_id[next(iter(ids))]
+
+        # Recherche par préfixe: uniquement si elle est sans ambiguïté
+        candidates = self._prefix_ids(key, limit=2)
+        if len(candidates) == 1:
+            return self._by_id[candidates[0]]
+
+        return None
+
+    def suggestions(self, query, limit=10):
+        """
+        Liste d'utilisateurs bannis à proposer quand la recherche échoue
+
+        Args:
+            query: Texte recherché
+            limit: Nombre maximum de suggestions
+
+        Returns:
+            list: Utilisateurs dont le nom commence par la recherche, sinon les premiers de l'index
+        """
+
+        key = query.strip().lower().partition('#')[0]
+        if key:
+            ids = self._prefix_ids(key, limit=limit)
+            if ids:
+                return [self._by_id[user_id] for user_id in ids]
+
+        users = []
+        for user in self._by_id.values():
+            if len(users) >= limit:
+                break
+            users.append(user)
+        return users
+
+    def _prefix_ids(self, prefix, limit):
+        ids = []
+        index = bisect.bisect_left(self._names, prefix)
+        while index < len(self._names) and len(ids) < limit:
+            name = self._names[index]
+            if not name.startswith(prefix):
+                break
+            for user_id in self._by_name[name]:
+                ids.append(user_id)
+                if len(ids) >= limit:
+                    break
+            index += 1
+        return ids
+
+    def _unlink_name(self, key, user_id):
+        ids = self._by_name.get(key)
+        if ids is None:
+            return
+        ids.discard(user_id)
+        if not ids:
+            del self._by_name[key]
+            index = bisect.bisect_left(self._names, key)
+            if index < len(self._names) and self._names[index] == key:
+                del self._names[index]
+
+class BanIndexRegistry:
+    """Ensemble des index de bannissements, un par serveur"""
+
+    def __init__(self):
+        self._indexes = {}
+
+    def get(self, guild_id):
+        """Retourne l'index du serveur, en le créant si besoin (non chargé)"""
+        index = self._indexes.get(guild_id)
+        if index is None:
+            index = self._indexes[guild_id] = BanIndex()
+        return index
+
+    def discard(self, guild_id):
+        """Oublie l'index d'un serveur (ex: le bot a quitté le serveur)"""
+        self._indexes.pop(guild_id, None)
@@ -0,0 +1,3 @@
+"""
+Benchmarks hors ligne du bot de modération
+"""
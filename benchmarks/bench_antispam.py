@@ -0,0 +1,160 @@
+"""
+Benchmark: coût par message de l'anti-spam (utils.antispam)
+
+Rejoue un trafic de chat réaliste (horloge simulée) sur un détecteur de
+serveur: chat normal seul, chat avec des spammeurs (flood, messages répétés
+dans plusieurs salons, mentions de masse), puis une longue traîne
+d'utilisateurs distincts. Affiche le coût par message, les détections (et
+les faux positifs) et la mémoire du détecteur.
+
+Usage: python -m benchmarks.bench_antispam [--messages 200000] [--members 50000] [--rate 500]
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from benchmarks.fakes import BASE_ID, FakeMessage, make_guild
+from utils.antispam import AntiSpam, GuildSpamDetector
+
+# Intervalle moyen entre deux messages d'un membre actif (secondes)
+ACTIVE_INTERVAL = 15.0
+
+CHAT = (
+    "salut ça va tu as vu le match hier soir c'est vraiment incroyable je pense que "
+    "on devrait lancer une partie ce soir quelqu'un est chaud pour jouer mdr lol ok").split()
+
+def chat_traffic(guild, count, rate, seed=7, spammers=0):
+    """
+    Messages horodatés (horloge simulée) d'un groupe de membres actifs (un
+    message toutes les ACTIVE_INTERVAL secondes en moyenne chacun, parfois
+    deux ou trois à la suite), et éventuellement des spammeurs répartis dans
+    le trafic
+
+    Returns:
+        tuple: (liste de (horloge, message), IDs des spammeurs)
+    """
+
+    rng = random.Random(seed)
+    members = guild.members[3:]
+    channels = guild.channels
+    active = members[:min(len(members) - spammers, int(rate * ACTIVE_INTERVAL))]
+
+    traffic = []
+    now = 0.0
+    index = 0
+    while index < count:
+        now += rng.expovariate(rate)
+        author = rng.choice(active)
+        channel = rng.choice(channels)
+        # Une phrase découpée en plusieurs messages de temps en temps
+        for line in range(rng.choice((1, 1, 1, 1, 2, 3))):
+            content = ' '.join(rng.choice(CHAT) for _ in range(int(rng.expovariate(1 / 10)) + 1))
+            message = FakeMessage.create(BASE_ID + 10 ** 11 + index, author, channel, content)
+            traffic.append((now + line * 1.5, message))
+            index += 1
+
+    spam_ids = set()
+    kinds = ("flood", "duplicate", "mentions")
+    for number in range(spammers):
+        spammer = members[-1 - number]
+        spam_ids.add(spammer.id)
+        kind = kinds[number % len(kinds)]
+        start = rng.uniform(0, now * 0.9)
+        for burst in range(12):
+            at = start + burst * (0.3 if kind == "flood" else 2.0)
+            if kind == "flood":
+                content = ' '.join(rng.choice(CHAT) for _ in range(3))
+                mentions = ()
+            elif kind == "duplicate":
+                content = "🎁 Nitro gratuit ici: discord-gift.example/abc"
+                mentions = ()
+            else:
+                content = f"regardez ça {burst}"
+                mentions = rng.sample(members, 4)
+            message = FakeMessage.create(BASE_ID + 10 ** 12 + number * 100 + burst, spammer,
+                                         rng.choice(channels), content, mentions=mentions)
+            traffic.append((at, message))
+    traffic.sort(key=lambda item: item[0])
+    return traffic, spam_ids
+
+def run_detector(traffic, repeat):
+    """Meilleur temps par message (µs) et détections du dernier passage"""
+    best = float('inf')
+    for _ in range(repeat):
+        detector = GuildSpamDetector()
+        check = detector.check
+        detections = []
+        start = time.perf_counter()
+        for now, message in traffic:
+            detection = check(message, now)
+            if detection is not None:
+                detections.append(detection)
+        best = min(best, (time.perf_counter() - start) / len(traffic))
+    return best * 1e6, detections, detector
+
+def report(name, micros, detector, detections=None, spam_ids=None):
+    line = (f"{name:<34} {micros:>7.2f} µs/message   suivis: {len(detector):>5}   "
+            f"mémoire: {detector.memory() / 1024:>6.1f} Kio")
+    print(line)
+    if detections is not None:
+        detected = {detection.member.id for detection in detections}
+        false_positives = len(detected - spam_ids)
+        rules = {}
+        for detection in detections:
+            rules[detection.rule] = rules.get(detection.rule, 0) + 1
+        print(f"{'':<34} spammeurs détectés: {len(detected & spam_ids)}/{len(spam_ids)}   "
+              f"faux positifs: {false_positives}   règles: {rules}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=200000)
+    parser.add_argument("--members", type=int, default=50000)
+    parser.add_argument("--rate", type=float, default=500.0, help="messages par seconde (horloge simulée)")
+    parser.add_argument("--spammers", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    guild = make_guild(members=args.members, bans=0)
+    for index in range(9):
+        guild.add_channel(f"salon-{index}")
+
+    print(f"--- {args.members} membres, {args.messages} messages à {args.rate:.0f} msg/s")
+
+    # Référence pour comparer les machines: incrément d'un compteur dans un dict
+    counts = {}
+    keys = [member.id for member in guild.members]
+    start = time.perf_counter()
+    for index in range(args.messages):
+        key = keys[index % len(keys)]
+        counts[key] = counts.get(key, 0) + 1
+    print(f"{'référence: incrément dict':<34} {(time.perf_counter() - start) / args.messages * 1e6:>7.2f} µs")
+
+    # Coût du point d'entrée quand l'anti-spam est désactivé
+    disabled = AntiSpam(enabled=False)
+    message = FakeMessage.create(BASE_ID + 10 ** 11, guild.members[10], guild.channels[0], "salut")
+    start = time.perf_counter()
+    for _ in range(args.messages):
+        disabled.check(message)
+    print(f"{'AntiSpam désactivé':<34} {(time.perf_counter() - start) / args.messages * 1e6:>7.2f} µs/message")
+
+    traffic, _ = chat_traffic(guild, args.messages, args.rate)
+    micros, detections, detector = run_detector(traffic, args.repeat)
+    report("chat normal", micros, detector, detections, set())
+
+    traffic, spam_ids = chat_traffic(guild, args.messages, args.rate, spammers=args.spammers)
+    micros, detections, detector = run_detector(traffic, args.repeat)
+    report(f"chat + {args.spammers} spammeurs", micros, detector, detections, spam_ids)
+
+    # Longue traîne: chaque message d'un auteur différent (mémoire bornée malgré des milliers d'auteurs)
+    rng = random.Random(3)
+    members = guild.members[3:]
+    tail = [(index / args.rate, FakeMessage.create(BASE_ID + 10 ** 11 + index, members[index % len(members)],
+                                                  rng.choice(guild.channels), rng.choice(CHAT)))
+            for index in range(args.messages)]
+    micros, detections, detector = run_detector(tail, args.repeat)
+    report("longue traîne (auteurs distincts)", micros, detector, detections, set())
+
+if __name__ == "__main__":
+    sys.exit(main())
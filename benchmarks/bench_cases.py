@@ -0,0 +1,112 @@
+"""
+Benchmark: casier de modération SQLite (utils.cases)
+
+Remplit une base temporaire via CaseStore.record() (coût côté boucle, débit
+du thread d'écriture), puis mesure les pages d'historique servies par les
+index: membres au hasard, cible la plus sanctionnée (pages profondes) et
+modérateur le plus actif. Affiche aussi le plan de requête de SQLite.
+
+Usage: python -m benchmarks.bench_cases [--cases 1000000] [--guilds 50] [--queries 2000]
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from utils.cases import CaseStore
+
+ACTIONS = ("BAN", "KICK", "UNMUTE", "UNBAN", "MUTE")
+REASONS = ("Spam", "Insultes", "Publicité", "Raid", "Anti-spam: flood (8 messages en 5s)", "Aucune raison spécifiée")
+
+class User(SimpleNamespace):
+    def __str__(self):
+        return self.name
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+def timed_queries(store, queries):
+    durations = []
+    for guild_id, user_id, by, page in queries:
+        start = time.perf_counter()
+        store.history(guild_id, user_id, by, page)
+        durations.append(time.perf_counter() - start)
+    return durations
+
+def report(name, durations):
+    print(f"{name:<36} p50 {percentile(durations, 0.5) * 1000:>6.2f} ms   p99 {percentile(durations, 0.99) * 1000:>6.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cases", type=int, default=1000000)
+    parser.add_argument("--guilds", type=int, default=50)
+    parser.add_argument("--users", type=int, default=200000, help="utilisateurs distincts par serveur")
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    guilds = [SimpleNamespace(id=10 ** 17 + index) for index in range(args.guilds)]
+    moderators = [User(id=2 * 10 ** 17 + index, name=f"moderateur{index}") for index in range(20)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = CaseStore(Path(directory) / "cases.sqlite3")
+
+        # Cibles: loi de puissance (quelques récidivistes, beaucoup de cas uniques)
+        targets = [User(id=3 * 10 ** 17 + int(rng.paretovariate(1.2) * 10) % args.users,
+                        name="membre") for _ in range(min(args.cases, 100000))]
+        at = time.time() - 365 * 86400
+        step = 365 * 86400 / args.cases
+
+        record_time = 0.0
+        start = time.perf_counter()
+        recorded = 0
+        while recorded < args.cases:
+            # Actions isolées et lots (raids, unmute all)
+            size = 1 if rng.random() < 0.95 else rng.randint(20, 400)
+            size = min(size, args.cases - recorded)
+            batch = [targets[rng.randrange(len(targets))] for _ in range(size)]
+            moderator = moderators[min(int(rng.expovariate(0.3)), len(moderators) - 1)]
+            guild = guilds[min(int(rng.expovariate(0.1)), len(guilds) - 1)]
+            begin = time.perf_counter()
+            store.record(rng.choice(ACTIONS), guild, moderator, batch, rng.choice(REASONS), at=at)
+            record_time += time.perf_counter() - begin
+            recorded += size
+            at += step * size
+        queued = time.perf_counter() - start
+        while store.stats()["pending"]:
+            time.sleep(0.05)
+        written = time.perf_counter() - start
+        print(f"--- {args.cases} cas sur {args.guilds} serveurs")
+        print(f"{'record() (côté boucle)':<36} {record_time / args.cases * 1e6:>6.2f} µs/cas")
+        writer = "thread d'écriture"
+        print(f"{writer:<36} {args.cases / written:>9.0f} cas/s "
+              f"({written:.1f} s, dont {queued:.1f} s de mise en file)")
+        size = sum(path.stat().st_size for path in Path(directory).iterdir())
+        print(f"{'taille de la base (avec WAL)':<36} {size / 1024 / 1024:>6.1f} Mio")
+
+        plan = store._read("EXPLAIN QUERY PLAN SELECT * FROM cases WHERE guild_id = ? AND target_id = ? "
+                           "ORDER BY time DESC, id DESC LIMIT 10", (0, 0))
+        print(f"{'plan':<36} {' / '.join(row[-1] for row in plan)}")
+
+        busiest_guild = guilds[0].id
+        counts = store._read("SELECT target_id, COUNT(*) FROM cases WHERE guild_id = ? GROUP BY target_id "
+                             "ORDER BY 2 DESC LIMIT 1", (busiest_guild,))
+        top_target, top_count = counts[0]
+
+        queries = [(guilds[min(int(rng.expovariate(0.1)), len(guilds) - 1)].id,
+                    targets[rng.randrange(len(targets))].id, "target", 1) for _ in range(args.queries)]
+        report("historique d'un membre (page 1)", timed_queries(store, queries))
+        deep = [(busiest_guild, top_target, "target", rng.randint(1, max(top_count // 10, 1)))
+                for _ in range(args.queries // 10)]
+        report(f"récidiviste ({top_count} cas, page au hasard)", timed_queries(store, deep))
+        moderator = [(busiest_guild, moderators[0].id, "moderator", 1) for _ in range(args.queries // 10)]
+        report("modérateur le plus actif (page 1)", timed_queries(store, moderator))
+        store.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
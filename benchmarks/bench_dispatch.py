@@ -0,0 +1,86 @@
+"""
+Benchmark: filtrage des messages de commande sur un trafic de chat réaliste
+
+Usage: python -m benchmarks.bench_dispatch [--messages 200000]
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from utils.dispatch import CommandDispatcher
+
+COMMANDS = ['ping', 'test', 'ban', 'unban', 'kick', 'unmute', 'commandes']
+WORDS = (
+    "salut ça va tu as vu le match hier soir c'est vraiment incroyable je pense que "
+    "on devrait lancer une partie ce soir quelqu'un est chaud pour jouer mdr lol ok "
+    "merci beaucoup à demain les gars bonne nuit").split()
+
+def make_traffic(count, seed=42):
+    """
+    Trafic de chat: ~95% de messages normaux de longueur variable, ~3% de
+    commandes du bot, ~2% de commandes d'autres bots (dont des "+" seuls)
+    """
+
+    rng = random.Random(seed)
+    messages = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.03:
+            command = rng.choice(COMMANDS)
+            messages.append(f"+{command} <@{rng.randrange(10**17, 10**18)}> spam dans le salon général")
+        elif roll < 0.045:
+            messages.append(f"+{rng.choice(['play', 'skip', 'rank', 'daily'])} {rng.choice(WORDS)}")
+        elif roll < 0.05:
+            messages.append("+")
+        else:
+            length = int(rng.expovariate(1 / 12)) + 1
+            messages.append(' '.join(rng.choice(WORDS) for _ in range(length)))
+    return messages
+
+def legacy_filter(content):
+    """Ancien filtre de simple_bot.on_message (liste reconstruite à chaque message)"""
+    valid_commands = ['ping', 'test', 'ban', 'unban', 'kick', 'unmute', 'commandes']
+    if content.startswith('+'):
+        command_name = content[1:].split()[0].lower()
+        if command_name in valid_commands:
+            return command_name
+        return None
+    # Les messages sans + partaient aussi dans bot.process_commands
+    return None
+
+def bench(name, func, messages, repeat):
+    best = float('inf')
+    matched = errors = 0
+    for _ in range(repeat):
+        matched = errors = 0
+        start = time.perf_counter()
+        for content in messages:
+            try:
+                if func(content) is not None:
+                    matched += 1
+            except IndexError:
+                errors += 1
+        best = min(best, time.perf_counter() - start)
+    rate = len(messages) / best
+    print(f"{name:<22} {rate:>12,.0f} msg/s {best / len(messages) * 1e9:>8.0f} ns/msg  "
+          f"commandes: {matched}  erreurs: {errors}")
+    return rate
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    messages = make_traffic(args.messages)
+    dispatcher = CommandDispatcher('+')
+    dispatcher.update(COMMANDS)
+
+    legacy = bench("ancien filtre", legacy_filter, messages, args.repeat)
+    current = bench("CommandDispatcher", dispatcher.match, messages, args.repeat)
+    print(f"accélération: x{current / legacy:.2f}")
+
+if __name__ == "__main__":
+    sys.exit(main())
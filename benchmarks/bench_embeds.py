@@ -0,0 +1,130 @@
+"""
+Benchmark: construction et sérialisation des embeds d'aide et de modération
+
+Compare, par commande, le temps CPU et la mémoire allouée entre les embeds
+reconstruits champ par champ (ancien code) et les modèles de utils.embeds.
+Chaque opération inclut to_dict(), appelé par discord.py à chaque envoi.
+
+Usage: python -m benchmarks.bench_embeds [--iterations 20000]
+"""
+
+import argparse
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import discord
+
+from utils.embeds import BAN_CONFIRMATION, BAN_DM, help_embed
+
+ICON_URL = "https://cdn.discordapp.com/avatars/1/abc.png"
+REASON = "Spam dans le salon général - Par Modo#0001"
+MODERATOR = "<@123456789012345678>"
+TARGET = "Spammeur#4242"
+GUILD = "Serveur de test"
+
+def legacy_help():
+    """Ancien help_cmd de bot.py"""
+    embed = discord.Embed(
+        title="🛡️ Bot de Modération - Aide",
+        description="Liste des commandes disponibles",
+        color=discord.Color.blue(),
+        timestamp=datetime.now()
+    )
+    embed.add_field(
+        name="🔨 +ban",
+        value="Bannir un ou plusieurs utilisateurs\n**Usage:** `+ban @utilisateur [@autre ...] [raison]`\n**Ou:** Répondre à un message avec `+ban [raison]`\n**Ou:** Joindre un fichier .txt d'IDs",
+        inline=False
+    )
+    embed.add_field(
+        name="🔓 +unban",
+        value="Débannir un utilisateur\n**Usage:** `+unban @utilisateur`\n**Ou:** `+unban nom_utilisateur#discriminator`",
+        inline=False
+    )
+    embed.add_field(
+        name="👢 +kick",
+        value="Expulser un ou plusieurs utilisateurs\n**Usage:** `+kick @utilisateur [@autre ...] [raison]`\n**Ou:** Répondre à un message avec `+kick [raison]`",
+        inline=False
+    )
+    embed.add_field(
+        name="ℹ️ Permissions requises",
+        value="• **Ban/Unban:** Permission `Bannir des membres`\n• **Kick:** Permission `Expulser des membres`",
+        inline=False
+    )
+    embed.set_footer(text="Bot de Modération", icon_url=ICON_URL)
+    return embed.to_dict()
+
+def legacy_ban():
+    """Ancien MP + confirmation de +ban dans bot.py"""
+    dm = discord.Embed(
+        title="🔨 Vous avez été banni",
+        description=f"Vous avez été banni du serveur **{GUILD}**",
+        color=discord.Color.red()
+    )
+    dm.add_field(name="Raison", value=REASON, inline=False)
+    dm.add_field(name="Modérateur", value=MODERATOR, inline=True)
+
+    confirmation = discord.Embed(
+        title="🔨 Utilisateur banni",
+        description=f"**{TARGET}** a été banni du serveur",
+        color=discord.Color.red(),
+        timestamp=datetime.now()
+    )
+    confirmation.add_field(name="Raison", value=REASON, inline=False)
+    confirmation.add_field(name="Modérateur", value=MODERATOR, inline=True)
+    return dm.to_dict(), confirmation.to_dict()
+
+def template_help():
+    return help_embed("moderation", footer_icon=ICON_URL).to_dict()
+
+def template_ban():
+    dm = BAN_DM.render(guild=GUILD, reason=REASON, moderator=MODERATOR)
+    confirmation = BAN_CONFIRMATION.render(target=TARGET, reason=REASON, moderator=MODERATOR)
+    return dm.to_dict(), confirmation.to_dict()
+
+def measure_cpu(func, iterations, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        best = min(best, time.perf_counter() - start)
+    return best / iterations
+
+def measure_alloc(func, samples=2000):
+    """Pic moyen de mémoire allouée pendant une commande (octets)"""
+    func()  # remplit les caches éventuels
+    tracemalloc.start()
+    total = 0
+    try:
+        for _ in range(samples):
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            func()
+            total += tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+    return total / samples
+
+def bench(name, legacy, current, iterations, repeat):
+    legacy_cpu = measure_cpu(legacy, iterations, repeat)
+    current_cpu = measure_cpu(current, iterations, repeat)
+    legacy_alloc = measure_alloc(legacy)
+    current_alloc = measure_alloc(current)
+    print(f"{name}")
+    print(f"  {'avant':<8} {legacy_cpu * 1e6:>8.2f} µs/cmd {legacy_alloc:>10,.0f} o alloués/cmd")
+    print(f"  {'après':<8} {current_cpu * 1e6:>8.2f} µs/cmd {current_alloc:>10,.0f} o alloués/cmd")
+    print(f"  accélération: x{legacy_cpu / current_cpu:.2f}  mémoire: x{legacy_alloc / max(current_alloc, 1):.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    bench("+help", legacy_help, template_help, args.iterations, args.repeat)
+    bench("+ban (MP + confirmation)", legacy_ban, template_ban, args.iterations, args.repeat)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""
+Benchmark: latence de la boucle asyncio avec et sans le pipeline de logs en file
+
+Usage: python -m benchmarks.bench_logging [--rate 2000] [--duration 5]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from utils.logger import setup_logging, shutdown_logging, get_logging_stats
+
+PROBE_INTERVAL = 0.001
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(len(values) * pct / 100))
+    return values[index]
+
+async def measure(rate, duration):
+    """Mesure le retard de la boucle pendant qu'une tâche logge `rate` messages/s"""
+
+    loop = asyncio.get_running_loop()
+    logger = logging.getLogger("bench.on_message")
+    lags = []
+    sent = 0
+    deadline = loop.time() + duration
+
+    async def probe():
+        while loop.time() < deadline:
+            start = loop.time()
+            await asyncio.sleep(PROBE_INTERVAL)
+            lags.append(loop.time() - start - PROBE_INTERVAL)
+
+    async def producer():
+        nonlocal sent
+        # Rafales toutes les 10 ms, comme des messages arrivant par paquets du gateway
+        per_tick = max(1, rate // 100)
+        while loop.time() < deadline:
+            for _ in range(per_tick):
+                sent += 1
+                logger.info(f"MESSAGE REÇU: '+ban @troll{sent} spam' de moderateur#0001 dans #general")
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(probe(), producer())
+    return lags, sent
+
+def run_mode(queued, rate, duration):
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, 'w') as devnull:
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            with contextlib.redirect_stderr(devnull):
+                setup_logging(queued=queued)
+                start = time.perf_counter()
+                lags, sent = asyncio.run(measure(rate, duration))
+                elapsed = time.perf_counter() - start
+                stats = get_logging_stats()
+                shutdown_logging()
+                for handler in logging.getLogger().handlers + logging.getLogger('moderation').handlers:
+                    handler.close()
+                logging.getLogger('moderation').handlers.clear()
+        finally:
+            os.chdir(cwd)
+
+    return {
+        "mode": "file (thread)" if queued else "synchrone",
+        "rate": sent / elapsed,
+        "p50": percentile(lags, 50) * 1000,
+        "p99": percentile(lags, 99) * 1000,
+        "max": max(lags) * 1000 if lags else 0.0,
+        "mean": statistics.fmean(lags) * 1000 if lags else 0.0,
+        "dropped": stats.get("dropped", 0),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rate", type=int, default=2000, help="messages logués par seconde")
+    parser.add_argument("--duration", type=float, default=5.0, help="durée de chaque mesure (s)")
+    args = parser.parse_args()
+
+    results = [run_mode(False, args.rate, args.duration), run_mode(True, args.rate, args.duration)]
+
+    print(f"{'mode':<15} {'msg/s':>8} {'lag p50':>9} {'lag p99':>9} {'lag max':>9} {'perdus':>7}")
+    for r in results:
+        print(
+            f"{r['mode']:<15} {r['rate']:>8.0f} {r['p50']:>7.3f}ms {r['p99']:>7.3f}ms "
+            f"{r['max']:>7.3f}ms {r['dropped']:>7}"
+        )
+
+if __name__ == "__main__":
+    sys.exit(main())
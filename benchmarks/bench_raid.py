@@ -0,0 +1,167 @@
+"""
+Benchmark: rejeu d'un raid sur on_member_join (utils.raid)
+
+Rejoue dans une vraie boucle asyncio des arrivées organiques (comptes
+anciens, avatars, noms variés) puis un raid de --rate arrivées par minute
+(comptes récents, avatars par défaut, noms générés). Chaque arrivée est
+dispatchée comme le fait discord.py (une tâche par événement). Affiche le
+retard de la boucle (tâche témoin), le retard du dispatch, les lots de
+sanctions envoyés, et les comptes sanctionnés à tort ou oubliés.
+
+Usage: python -m benchmarks.bench_raid [--rate 10000] [--duration 30] [--speed 1] [--latency 0.05]
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+
+from benchmarks.fakes import FakeHTTP, make_guild
+from utils.bulk import BulkExecutor
+from utils.raid import DISCORD_EPOCH, AntiRaid, GuildRaidDetector
+
+RAID_NAMES = ("raider", "spammer", "freenitro", "xx_raid_xx", "bot")
+NAMES = ("camille", "lucas", "emma", "hugo", "lea", "nathan", "chloe", "louis", "manon", "jules",
+         "ines", "gabriel", "sarah", "arthur", "jade", "raphael", "lina", "adam", "zoe", "tom")
+
+def snowflake(unix, sequence):
+    """ID créé à l'heure Unix donnée"""
+    return (int(unix * 1000) - DISCORD_EPOCH) << 22 | (sequence & 0x3FFFFF)
+
+def make_joins(rate, duration, organic_rate, start, seed=5):
+    """
+    Arrivées horodatées: (décalage en secondes, ID, nom, avatar, raider)
+
+    Les comptes organiques ont de 1 mois à 5 ans et 70% ont un avatar; les
+    raiders ont moins d'une heure, rarement un avatar, et un nom tiré d'une
+    petite liste suivi de chiffres (un sur quatre a un nom aléatoire).
+    """
+
+    rng = random.Random(seed)
+    now = time.time()
+    joins = []
+    sequence = 0
+    at = 0.0
+    total = start + duration + start
+    while at < total:
+        at += rng.expovariate(organic_rate)
+        sequence += 1
+        name = f"{rng.choice(NAMES)}{rng.choice(('', '_', '.'))}{rng.choice(NAMES)}"
+        created = now - rng.uniform(30 * 86400, 5 * 365 * 86400)
+        joins.append((at, snowflake(created, sequence), name, "a" if rng.random() < 0.7 else None, False))
+
+    at = start
+    while at < start + duration:
+        at += rng.expovariate(rate / 60)
+        sequence += 1
+        if rng.random() < 0.25:
+            name = ''.join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(5, 12)))
+        else:
+            name = f"{rng.choice(RAID_NAMES)}{rng.randint(0, 99999)}"
+        created = now - rng.uniform(60, 3600)
+        joins.append((at, snowflake(created, sequence), name, "a" if rng.random() < 0.1 else None, True))
+    joins.sort()
+    return joins
+
+async def replay(args, joins):
+    http = FakeHTTP(latency=args.latency)
+    guild = make_guild(members=args.members, bans=0, http=http)
+    executor = BulkExecutor()
+    antiraid = AntiRaid(enabled=True, action=args.action, batch_delay=2.0 / args.speed)
+    loop = asyncio.get_running_loop()
+    origin = loop.time()
+    # Horloge simulée: le temps du rejeu accéléré par --speed
+    antiraid.clock = lambda: (loop.time() - origin) * args.speed
+
+    lags = []
+    running = True
+
+    async def ticker():
+        # Tâche témoin: retard de réveil par rapport à l'échéance prévue
+        interval = 0.01
+        expected = loop.time() + interval
+        while running:
+            await asyncio.sleep(interval)
+            now = loop.time()
+            lags.append(now - expected)
+            expected = now + interval
+
+    handler_time = 0.0
+    raiders = set()
+
+    async def on_member_join(member):
+        nonlocal handler_time
+        start = time.perf_counter()
+        antiraid.member_joined(member, executor)
+        handler_time += time.perf_counter() - start
+
+    witness = asyncio.create_task(ticker())
+    dispatch_delays = []
+    for at, member_id, name, avatar, raider in joins:
+        due = origin + at / args.speed
+        delay = due - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        dispatch_delays.append(loop.time() - due)
+        # discord.py ajoute le membre au cache puis crée une tâche par handler
+        member = guild.add_member(member_id, name, avatar=avatar)
+        if raider:
+            raiders.add(member_id)
+        asyncio.create_task(on_member_join(member))
+
+    # Laisser partir le dernier lot et les sanctions en cours
+    while antiraid._flushes or any(detector.cohort for detector in antiraid._guilds.values()):
+        await asyncio.sleep(0.1)
+    await asyncio.sleep(args.latency * 4 + 0.5)
+    running = False
+    await witness
+
+    sanctioned = {user_id for user_id in guild._bans} if args.action == "ban" else \
+        {member_id for _, member_id, _, _, _ in joins if guild.get_member(member_id) is None}
+    return antiraid, http, handler_time, lags, dispatch_delays, raiders, sanctioned
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)] if values else 0.0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rate", type=float, default=10000.0, help="arrivées du raid par minute")
+    parser.add_argument("--duration", type=float, default=30.0, help="durée du raid (secondes simulées)")
+    parser.add_argument("--organic", type=float, default=0.5, help="arrivées organiques par seconde")
+    parser.add_argument("--speed", type=float, default=1.0, help="accélération du rejeu")
+    parser.add_argument("--members", type=int, default=20000)
+    parser.add_argument("--latency", type=float, default=0.05, help="latence simulée des requêtes REST")
+    parser.add_argument("--action", choices=("ban", "kick"), default="ban")
+    args = parser.parse_args()
+
+    joins = make_joins(args.rate, args.duration, args.organic, start=5.0)
+    raid_joins = sum(1 for join in joins if join[4])
+
+    # Coût brut du détecteur, hors boucle
+    guild = make_guild(members=10, bans=0)
+    members = [guild.add_member(member_id, name, avatar=avatar) for _, member_id, name, avatar, _ in joins]
+    detector = GuildRaidDetector()
+    now = time.time()
+    start = time.perf_counter()
+    for (at, *_), member in zip(joins, members):
+        detector.join(member, at, now)
+    print(f"--- {len(joins)} arrivées dont {raid_joins} du raid ({args.rate:.0f}/min pendant {args.duration:.0f}s)")
+    print(f"{'détecteur seul':<26} {(time.perf_counter() - start) / len(joins) * 1e6:>8.2f} µs/arrivée")
+
+    antiraid, http, handler_time, lags, dispatch_delays, raiders, sanctioned = asyncio.run(replay(args, joins))
+    stats = antiraid.stats()
+    route = "POST /guilds/{guild_id}/bulk-ban" if args.action == "ban" else "DELETE /guilds/{guild_id}/members/{user_id}"
+    print(f"{'handler on_member_join':<26} {handler_time / len(joins) * 1e6:>8.2f} µs/arrivée")
+    print(f"{'retard de la boucle':<26} p50 {percentile(lags, 0.5) * 1000:.2f} ms, p99 {percentile(lags, 0.99) * 1000:.2f} ms, "
+          f"max {max(lags) * 1000:.2f} ms")
+    print(f"{'retard du dispatch':<26} p99 {percentile(dispatch_delays, 0.99) * 1000:.2f} ms, "
+          f"max {max(dispatch_delays) * 1000:.2f} ms")
+    print(f"{'raids / lots':<26} {stats['raids']} raid(s), {stats['batches']} lot(s), "
+          f"{http.calls[route]} requête(s) {route.split()[0]}")
+    print(f"{'sanctions':<26} {len(sanctioned & raiders)}/{len(raiders)} raiders, "
+          f"{len(sanctioned - raiders)} compte(s) organique(s) sanctionné(s) à tort")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+"""
+Benchmark: planificateur des sanctions temporaires (utils.scheduler)
+
+Planifie --sanctions levées sur --guilds serveurs (une partie tombant à la
+même seconde, comme après un raid banni pour 7 jours), écrit le journal,
+puis simule un redémarrage: nouveau planificateur chargé depuis le disque,
+dont une partie des échéances est déjà passée (à rattraper) et le reste
+tombe pendant le rejeu. Affiche le coût de schedule(), le temps de
+chargement, les lots envoyés aux handlers, le retard des levées et celui de
+la boucle. Compare avec l'approche naïve d'une tâche asyncio.sleep par
+sanction (mémoire et temps de création).
+
+Usage: python -m benchmarks.bench_scheduler [--sanctions 100000] [--guilds 200] [--spread 5]
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+
+from utils.scheduler import SanctionScheduler
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)] if values else 0.0
+
+def make_sanctions(count, guilds, spread, overdue, now, seed=3):
+    """(action, guild_id, user_id, échéance): un tiers groupé sur une seule seconde"""
+    rng = random.Random(seed)
+    burst = now + spread / 2
+    sanctions = []
+    for index in range(count):
+        action = "UNBAN" if rng.random() < 0.7 else "UNMUTE"
+        guild_id = 10 ** 17 + min(int(rng.expovariate(0.05)), guilds - 1)
+        if rng.random() < overdue:
+            # Échéance passée pendant l'arrêt du bot
+            expires_at = now - rng.uniform(1, 86400)
+        elif rng.random() < 0.33:
+            expires_at = burst + rng.random()
+        else:
+            expires_at = now + rng.uniform(0, spread)
+        sanctions.append((action, guild_id, 3 * 10 ** 17 + index, expires_at))
+    return sanctions
+
+async def replay(path, spread):
+    scheduler = SanctionScheduler(path)
+    start = time.perf_counter()
+    scheduler.load()
+    load_time = time.perf_counter() - start
+
+    batches = []
+    delays = []
+
+    async def handler(guild_id, user_ids):
+        now = scheduler.clock()
+        batches.append(len(user_ids))
+        # Retard de la levée par rapport à l'échéance (hors échéances passées avant le rejeu)
+        delays.extend(now - expected[(guild_id, user_id)] for user_id in user_ids
+                      if expected[(guild_id, user_id)] >= started)
+        await asyncio.sleep(0)
+
+    started = time.time()
+    expected = {(guild_id, user_id): expires_at
+                for (_, guild_id, user_id), expires_at in scheduler._entries.items()}
+    scheduler.register("UNBAN", handler)
+    scheduler.register("UNMUTE", handler)
+
+    loop = asyncio.get_running_loop()
+    lags = []
+    running = True
+
+    async def ticker():
+        # Tâche témoin: retard de réveil par rapport à l'échéance prévue
+        interval = 0.01
+        expected_at = loop.time() + interval
+        while running:
+            await asyncio.sleep(interval)
+            now = loop.time()
+            lags.append(now - expected_at)
+            expected_at = now + interval
+
+    witness = asyncio.create_task(ticker())
+    scheduler.start()
+    while len(scheduler):
+        await asyncio.sleep(0.05)
+    await asyncio.sleep(0.1)
+    running = False
+    await witness
+    scheduler.close()
+    return scheduler, load_time, batches, delays, lags, time.time() - started
+
+async def naive(sanctions, now):
+    # Une tâche par sanction, chacune levée seule à son échéance
+    done = 0
+
+    async def expire(delay):
+        nonlocal done
+        await asyncio.sleep(delay)
+        done += 1
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    tasks = [asyncio.create_task(expire(max(expires_at - now, 0.0) + 3600)) for *_, expires_at in sanctions]
+    created = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return created, memory
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sanctions", type=int, default=100000)
+    parser.add_argument("--guilds", type=int, default=200)
+    parser.add_argument("--spread", type=float, default=5.0, help="échéances réparties sur N secondes")
+    parser.add_argument("--overdue", type=float, default=0.2, help="part des échéances manquées pendant l'arrêt")
+    args = parser.parse_args()
+
+    now = time.time()
+    # Le rejeu commence après l'écriture et le rechargement du journal (quelques secondes)
+    sanctions = make_sanctions(args.sanctions, args.guilds, args.spread, args.overdue, now + 5)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "sanctions.journal"
+        # Mémoire mesurée à part (tracemalloc ralentit les allocations)
+        tracemalloc.start()
+        scheduler = SanctionScheduler(path)
+        for action, guild_id, user_id, expires_at in sanctions:
+            scheduler.schedule(action, guild_id, user_id, expires_at)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        scheduler = SanctionScheduler(path)
+        start = time.perf_counter()
+        for action, guild_id, user_id, expires_at in sanctions:
+            scheduler.schedule(action, guild_id, user_id, expires_at)
+        schedule_time = time.perf_counter() - start
+        scheduler.close()
+
+        print(f"--- {args.sanctions} sanctions sur {args.guilds} serveurs, {args.overdue:.0%} déjà échues au redémarrage")
+        print(f"{'schedule()':<26} {schedule_time / args.sanctions * 1e6:>8.2f} µs/sanction")
+        print(f"{'mémoire (tas + index)':<26} {memory / 1024 / 1024:>8.1f} Mio")
+        print(f"{'journal':<26} {path.stat().st_size / 1024 / 1024:>8.1f} Mio")
+
+        scheduler, load_time, batches, delays, lags, elapsed = asyncio.run(replay(path, args.spread))
+        stats = scheduler.stats()
+        sizes = Counter(1 if size == 1 else 10 if size < 10 else 100 if size < 100 else 1000 for size in batches)
+        print(f"{'chargement du journal':<26} {load_time * 1000:>8.1f} ms")
+        print(f"{'levées':<26} {stats['expired']} en {elapsed:.1f}s, dont {stats['late']} rattrapée(s) "
+              f"(manquées pendant l'arrêt)")
+        print(f"{'appels aux handlers':<26} {len(batches)} lot(s), taille moyenne {sum(batches) / len(batches):.1f} "
+              f"(1: {sizes[1]}, <10: {sizes[10]}, <100: {sizes[100]}, plus: {sizes[1000]})")
+        print(f"{'retard des levées':<26} p50 {percentile(delays, 0.5) * 1000:.1f} ms, "
+              f"p99 {percentile(delays, 0.99) * 1000:.1f} ms, min {min(delays) * 1000:.1f} ms")
+        print(f"{'retard de la boucle':<26} p50 {percentile(lags, 0.5) * 1000:.2f} ms, "
+              f"p99 {percentile(lags, 0.99) * 1000:.2f} ms, max {max(lags) * 1000:.2f} ms")
+
+    created, naive_memory = asyncio.run(naive(sanctions, now))
+    print(f"{'naïf: une tâche/sanction':<26} {created / args.sanctions * 1e6:>8.2f} µs/sanction, "
+          f"{naive_memory / 1024 / 1024:.1f} Mio, perdues au redémarrage")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""
+Benchmark: filtre de termes interdits (utils.wordfilter)
+
+Compile des listes de 1k, 10k et 100k termes (mots, préfixes, expressions)
+puis mesure le coût par message sur des messages de longueurs réalistes,
+dont une partie contient des termes déguisés (casse, accents, leetspeak,
+caractères invisibles). Pour comparaison, une expression régulière par terme
+est mesurée sur la plus petite liste.
+
+Usage: python -m benchmarks.bench_wordfilter [--sizes 1000 10000 100000] [--messages 20000]
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+import tracemalloc
+
+from utils.wordfilter import GuildWordFilter, TermAutomaton, normalize
+
+SYLLABLES = ("ba be bi bo bu da de di do du fa fe fi fo ga go la le li lo lu ma me mi mo mu "
+             "na ne ni no pa pe pi po ra re ri ro sa se si so ta te ti to va ve vi vo za zo "
+             "ch on an in ou ar er ir or ur al el il ol").split()
+
+CHAT = (
+    "salut ça va tu as vu le match hier soir c'est vraiment incroyable je pense que "
+    "on devrait lancer une partie ce soir quelqu'un est chaud pour jouer mdr lol ok "
+    "franchement le nouveau patch a cassé l'équilibrage des personnages préférés").split()
+
+# Déguisements appliqués aux termes glissés dans les messages
+DISGUISES = (
+    lambda term: term.upper(),
+    lambda term: term.replace('o', '0').replace('e', '3'),
+    lambda term: term.replace('a', 'à').replace('e', 'é'),
+    lambda term: '​'.join(term),
+    lambda term: term,
+)
+
+def make_terms(count, seed=1):
+    """Termes synthétiques: mots de 2 à 4 syllabes, quelques préfixes et expressions"""
+    rng = random.Random(seed)
+    chat = {normalize(word) for word in CHAT}
+    terms = set()
+    while len(terms) < count:
+        word = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        if normalize(word) in chat:
+            continue
+        kind = rng.random()
+        if kind < 0.1:
+            if any(chat_word.startswith(word) for chat_word in chat):
+                continue
+            word += '*'
+        elif kind < 0.15:
+            word += ' ' + ''.join(rng.choice(SYLLABLES) for _ in range(2))
+        terms.add(word)
+    return sorted(terms)
+
+def make_messages(count, terms, ratio, seed=2):
+    """Messages de 1 à ~60 mots (longueur médiane ~40 caractères); une fraction contient un terme"""
+    rng = random.Random(seed)
+    messages = []
+    for _ in range(count):
+        words = [rng.choice(CHAT) for _ in range(min(int(rng.expovariate(1 / 8)) + 1, 60))]
+        if rng.random() < ratio:
+            term = rng.choice(terms).rstrip('*')
+            words.insert(rng.randrange(len(words) + 1), rng.choice(DISGUISES)(term))
+        messages.append(' '.join(words))
+    return messages
+
+def measure(function, messages, repeat):
+    """Meilleur temps par message (µs) et nombre de messages avec au moins un terme"""
+    best = float('inf')
+    hits = 0
+    for _ in range(repeat):
+        hits = 0
+        start = time.perf_counter()
+        for content in messages:
+            if function(content):
+                hits += 1
+        best = min(best, (time.perf_counter() - start) / len(messages))
+    return best * 1e6, hits
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--ratio", type=float, default=0.02, help="part des messages contenant un terme")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    lengths = None
+    for size in args.sizes:
+        terms = make_terms(size)
+        messages = make_messages(args.messages, terms, args.ratio)
+        if lengths is None:
+            lengths = sorted(len(content) for content in messages)
+            print(f"--- {args.messages} messages, longueur médiane {lengths[len(lengths) // 2]} "
+                  f"caractères, p99 {lengths[len(lengths) * 99 // 100]}, {args.ratio:.0%} avec un terme")
+            start = time.perf_counter()
+            for content in messages:
+                normalize(content)
+            print(f"{'normalisation seule':<28} {(time.perf_counter() - start) / len(messages) * 1e6:>8.2f} µs/message")
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        guild_filter = GuildWordFilter(terms)
+        build = time.perf_counter() - start
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        micros, hits = measure(guild_filter.find, messages, args.repeat)
+        print(f"{size:>7} termes: compilation {build * 1000:>7.0f} ms, {len(guild_filter._main):>7} noeuds, "
+              f"{memory / 1024 / 1024:>6.1f} Mio | {micros:>7.2f} µs/message, {hits} message(s) filtré(s)")
+
+        # Modification incrémentale: automate d'appoint puis reconstruction complète
+        added = make_terms(50, seed=9)
+        start = time.perf_counter()
+        guild_filter.update(add=added, remove=terms[:50])
+        incremental = time.perf_counter() - start
+        micros_delta, _ = measure(guild_filter.find, messages, 1)
+        start = time.perf_counter()
+        snapshot = guild_filter.snapshot()
+        guild_filter.install(TermAutomaton(snapshot), snapshot)
+        rebuild = time.perf_counter() - start
+        print(f"{'':>7}  +50/-50 termes: appoint {incremental * 1000:>6.1f} ms ({micros_delta:.2f} µs/message), "
+              f"reconstruction {rebuild * 1000:>7.0f} ms")
+
+        if size == min(args.sizes):
+            # Comparaison: une expression régulière par terme (sur le texte normalisé)
+            patterns = [re.compile(r'\b' + re.escape(normalize(term.rstrip('*'))) + ('' if term.endswith('*') else r'\b'))
+                        for term in terms]
+
+            def naive(content):
+                text = normalize(content)
+                return any(pattern.search(text) for pattern in patterns)
+
+            micros, hits = measure(naive, messages[:max(len(messages) // 20, 100)], 1)
+            print(f"{'':>7}  référence: une regex par terme {micros:>9.2f} µs/message, {hits} filtré(s)")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,464 @@
+"""
+Objets Discord factices pour les benchmarks hors ligne
+
+Les membres et messages héritent de discord.Member / discord.Message (sans
+passer par leur constructeur) pour que les isinstance() du code du bot se
+comportent comme en production. Toutes les requêtes REST passent par une
+couche HTTP en mémoire (FakeHTTP) qui compte les appels par route et peut
+simuler une latence ou des 429.
+"""
+
+import asyncio
+import random
+from collections import Counter
+from types import SimpleNamespace
+
+import discord
+from discord.guild import BanEntry, BulkBanResult
+
+BASE_ID = 10 ** 17
+
+class FakeResponse:
+    """Réponse minimale attendue par discord.HTTPException"""
+
+    def __init__(self, status, reason=""):
+        self.status = status
+        self.reason = reason
+
+class FakeHTTP:
+    """
+    Couche REST en mémoire
+
+    Args:
+        latency: Latence simulée de chaque requête (secondes, 0 = simple passage dans la boucle)
+        rate_limit_every: Répond 429 toutes les N requêtes (0 = jamais)
+    """
+
+    def __init__(self, latency=0.0, rate_limit_every=0):
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.calls = Counter()
+        self.total = 0
+
+    async def request(self, route, status=200):
+        """Simule une requête; lève l'exception discord.py correspondant au statut"""
+
+        self.calls[route] += 1
+        self.total += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        else:
+            await asyncio.sleep(0)
+
+        if self.rate_limit_every and self.total % self.rate_limit_every == 0:
+            raise discord.HTTPException(FakeResponse(429, "Too Many Requests"), "You are being rate limited.")
+        if status == 404:
+            raise discord.NotFound(FakeResponse(404, "Not Found"), "Unknown")
+        if status == 403:
+            raise discord.Forbidden(FakeResponse(403, "Forbidden"), "Missing Permissions")
+
+    def reset(self):
+        self.calls.clear()
+        self.total = 0
+
+class FakeUser:
+    """Utilisateur hors du serveur (ex: compte banni)"""
+
+    def __init__(self, user_id, name, discriminator="0", bot=False):
+        self.id = user_id
+        self.name = name
+        self.discriminator = discriminator
+        self.bot = bot
+
+    @property
+    def mention(self):
+        return f"<@{self.id}>"
+
+    def __str__(self):
+        return self.name if self.discriminator == "0" else f"{self.name}#{self.discriminator}"
+
+class FakeRole:
+    def __init__(self, guild, role_id, name, position, permissions=0):
+        self.guild = guild
+        self.id = role_id
+        self.name = name
+        self.position = position
+        self.permissions = discord.Permissions(permissions)
+        self.managed = False
+
+    @property
+    def members(self):
+        return [member for member in self.guild.members if member.get_role(self.id) is not None]
+
+    @property
+    def mention(self):
+        return f"<@&{self.id}>"
+
+    def is_default(self):
+        return self.id == self.guild.id
+
+    def __str__(self):
+        return self.name
+
+    def __repr__(self):
+        return f"<FakeRole id={self.id} name={self.name!r} position={self.position}>"
+
+class FakeMember(discord.Member):
+    """discord.Member sans état de connexion; les rôles sont un tuple (rôle par défaut en tête)"""
+
+    __slots__ = ('_fake_id', '_fake_name', '_fake_roles', '_fake_bot', '_fake_avatar')
+
+    @classmethod
+    def create(cls, guild, member_id, name, roles, bot=False, avatar=None):
+        member = cls.__new__(cls)
+        member.guild = guild
+        member._fake_id = member_id
+        member._fake_name = name
+        member._fake_roles = roles
+        member._fake_bot = bot
+        member._fake_avatar = avatar
+        return member
+
+    @property
+    def id(self):
+        return self._fake_id
+
+    @property
+    def name(self):
+        return self._fake_name
+
+    @property
+    def display_name(self):
+        return self._fake_name
+
+    @property
+    def discriminator(self):
+        return "0"
+
+    @property
+    def bot(self):
+        return self._fake_bot
+
+    @property
+    def avatar(self):
+        # None: avatar par défaut
+        return self._fake_avatar
+
+    @property
+    def mention(self):
+        return f"<@{self._fake_id}>"
+
+    @property
+    def roles(self):
+        return list(self._fake_roles)
+
+    @property
+    def top_role(self):
+        return max(self._fake_roles, key=lambda role: (role.position, -role.id))
+
+    def get_role(self, role_id):
+        for role in self._fake_roles:
+            if role.id == role_id:
+                return role
+        return None
+
+    def set_roles(self, roles):
+        """Remplace les rôles sans requête (préparation des benchmarks)"""
+        default_role = self.guild.default_role
+        self._fake_roles = (default_role,) + tuple(role for role in roles if role is not default_role)
+
+    async def edit(self, *, roles=None, reason=None, **fields):
+        await self.guild.http.request("PATCH /guilds/{guild_id}/members/{user_id}")
+        if roles is not None:
+            self.set_roles(roles)
+
+    async def add_roles(self, *roles, reason=None, atomic=True):
+        for role in roles:
+            await self.guild.http.request("PUT /guilds/{guild_id}/members/{user_id}/roles/{role_id}")
+        self.set_roles(self._fake_roles[1:] + roles)
+
+    async def remove_roles(self, *roles, reason=None, atomic=True):
+        for role in roles:
+            await self.guild.http.request("DELETE /guilds/{guild_id}/members/{user_id}/roles/{role_id}")
+        self.set_roles([role for role in self._fake_roles[1:] if role not in roles])
+
+    async def ban(self, *, reason=None, delete_message_days=None, delete_message_seconds=None):
+        await self.guild.ban(self, reason=reason)
+
+    async def kick(self, *, reason=None):
+        await self.guild.kick(self, reason=reason)
+
+    async def send(self, content=None, *, embed=None, **kwargs):
+        await self.guild.http.request("POST /users/@me/channels")
+        await self.guild.http.request("POST /channels/{channel_id}/messages")
+
+    def __hash__(self):
+        return self._fake_id >> 22
+
+    def __str__(self):
+        return self._fake_name
+
+    def __repr__(self):
+        return f"<FakeMember id={self._fake_id} name={self._fake_name!r}>"
+
+class FakeSentMessage:
+    """Message envoyé par le bot (progression éditée par BulkExecutor)"""
+
+    def __init__(self, channel, message_id, content=None, embed=None):
+        self.channel = channel
+        self.id = message_id
+        self.content = content
+        self.embed = embed
+
+    async def edit(self, content=None, embed=None, **kwargs):
+        await self.channel.guild.http.request("PATCH /channels/{channel_id}/messages/{message_id}")
+        self.content = content
+        self.embed = embed
+
+class FakeChannel:
+    def __init__(self, guild, channel_id, name="general"):
+        self.guild = guild
+        self.id = channel_id
+        self.name = name
+        self.messages = {}   # messages récupérables via fetch_message
+        self.sent = 0
+        self._next_id = channel_id
+
+    async def send(self, content=None, *, embed=None, **kwargs):
+        await self.guild.http.request("POST /channels/{channel_id}/messages")
+        self.sent += 1
+        self._next_id += 1
+        return FakeSentMessage(self, self._next_id, content, embed)
+
+    async def fetch_message(self, message_id):
+        message = self.messages.get(message_id)
+        await self.guild.http.request("GET /channels/{channel_id}/messages/{message_id}", 200 if message else 404)
+        return message
+
+    def __str__(self):
+        return self.name
+
+class FakeReference:
+    def __init__(self, message_id, resolved=None):
+        self.message_id = message_id
+        self.resolved = resolved
+
+class FakeMessage(discord.Message):
+    """discord.Message sans état de connexion"""
+
+    __slots__ = ()
+
+    @classmethod
+    def create(cls, message_id, author, channel, content, reference=None, mentions=(), role_mentions=(),
+               mention_everyone=False):
+        message = cls.__new__(cls)
+        message.id = message_id
+        message.author = author
+        message.channel = channel
+        message.guild = channel.guild
+        message.content = content
+        message.reference = reference
+        message.mentions = list(mentions)
+        message.role_mentions = list(role_mentions)
+        message.mention_everyone = mention_everyone
+        message.attachments = []
+        return message
+
+    def __repr__(self):
+        return f"<FakeMessage id={self.id} author={self.author!r}>"
+
+class FakeGuild:
+    """
+    Serveur factice
+
+    Les membres reçoivent une combinaison de rôles tirée d'un petit ensemble
+    de tuples partagés, ce qui garde un serveur de 500k membres en mémoire
+    à un coût raisonnable.
+    """
+
+    def __init__(self, guild_id, name, http):
+        self.id = guild_id
+        self.name = name
+        self.http = http
+        self.owner_id = None
+        self.me = None
+        self.roles = []
+        self._roles = {}
+        self._members = {}
+        self._bans = {}
+        self.channels = []
+        # Tous les membres sont en cache, comme après le découpage au démarrage
+        self.chunked = True
+        self._state = SimpleNamespace(member_cache_flags=discord.MemberCacheFlags.all())
+
+    # --- Construction ----------------------------------------------------------
+
+    def add_role(self, name, permissions=0):
+        position = len(self.roles)
+        role_id = self.id if position == 0 else self.id + 1000 + position
+        role = FakeRole(self, role_id, name, position, permissions)
+        self.roles.append(role)
+        self._roles[role.id] = role
+        return role
+
+    def add_member(self, member_id, name, roles=(), bot=False, avatar=None):
+        roles = (self.default_role,) + tuple(roles)
+        member = self._members[member_id] = FakeMember.create(self, member_id, name, roles, bot, avatar)
+        return member
+
+    def add_channel(self, name="general"):
+        channel = FakeChannel(self, self.id + 500 + len(self.channels), name)
+        self.channels.append(channel)
+        return channel
+
+    # --- API utilisée par le bot ---------------------------------------------------
+
+    @property
+    def default_role(self):
+        return self.roles[0]
+
+    @property
+    def members(self):
+        return list(self._members.values())
+
+    @property
+    def member_count(self):
+        return len(self._members)
+
+    def get_member(self, member_id):
+        return self._members.get(member_id)
+
+    def get_role(self, role_id):
+        return self._roles.get(role_id)
+
+    async def fetch_member(self, member_id):
+        member = self._members.get(member_id)
+        await self.http.request("GET /guilds/{guild_id}/members/{user_id}", 200 if member else 404)
+        return member
+
+    async def bans(self, limit=1000, before=None, after=None):
+        """Parcourt les bannissements par pages de 1000, comme l'API"""
+        entries = list(self._bans.values())
+        for start in range(0, len(entries), 1000):
+            await self.http.request("GET /guilds/{guild_id}/bans")
+            for entry in entries[start:start + 1000]:
+                yield entry
+
+    async def ban(self, user, *, reason=None, delete_message_days=None, delete_message_seconds=None):
+        await self.http.request("PUT /guilds/{guild_id}/bans/{user_id}")
+        self._bans[user.id] = BanEntry(reason, user)
+        self._members.pop(user.id, None)
+
+    async def bulk_ban(self, users, *, reason=None, delete_message_seconds=86400):
+        await self.http.request("POST /guilds/{guild_id}/bulk-ban")
+        for user in users:
+            self._bans[user.id] = BanEntry(reason, user)
+            self._members.pop(user.id, None)
+        return BulkBanResult(banned=[discord.Object(id=user.id) for user in users], failed=[])
+
+    async def unban(self, user, *, reason=None):
+        await self.http.request("DELETE /guilds/{guild_id}/bans/{user_id}", 200 if user.id in self._bans else 404)
+        del self._bans[user.id]
+
+    async def kick(self, user, *, reason=None):
+        await self.http.request("DELETE /guilds/{guild_id}/members/{user_id}")
+        self._members.pop(user.id, None)
+
+    def __str__(self):
+        return self.name
+
+class FakeBot:
+    """Partie du bot utilisée via ctx.bot"""
+
+    def __init__(self, user):
+        self.user = user
+
+class FakeContext:
+    """Contexte de commande minimal"""
+
+    def __init__(self, bot, message):
+        self.bot = bot
+        self.message = message
+        self.author = message.author
+        self.channel = message.channel
+        self.guild = message.guild
+
+    async def send(self, content=None, **kwargs):
+        return await self.channel.send(content, **kwargs)
+
+# Permissions du rôle de modération
+MODERATOR_PERMISSIONS = discord.Permissions(ban_members=True, kick_members=True, manage_roles=True).value
+
+def make_guild(members=1000, bans=10000, muted_ratio=0.01, extra_roles=40, seed=42, http=None):
+    """
+    Construit un serveur réaliste
+
+    Hiérarchie (du bas vers le haut): @everyone, Muted, Membre, rôles
+    décoratifs, Modérateur, rôle du bot. ~90% des membres ont "Membre",
+    `muted_ratio` ont "Muted" (avec leurs rôles sauvegardés dans
+    guild.saved_roles), les autres rôles sont répartis au hasard.
+
+    Args:
+        members: Nombre de membres
+        bans: Nombre de bannissements
+        muted_ratio: Proportion de membres mutés
+        extra_roles: Nombre de rôles décoratifs
+        seed: Graine du générateur
+
+    Returns:
+        FakeGuild: Serveur avec .moderator, .bot_member, .owner, .muted_members
+        et .saved_roles (member_id -> IDs des rôles d'avant le mute)
+    """
+
+    rng = random.Random(seed)
+    guild = FakeGuild(BASE_ID, f"Serveur de test ({members} membres)", http or FakeHTTP())
+
+    guild.add_role("@everyone", discord.Permissions(send_messages=True, read_messages=True).value)
+    muted_role = guild.add_role("Muted")
+    member_role = guild.add_role("Membre")
+    decorative = [guild.add_role(f"Rôle {index}") for index in range(extra_roles)]
+    moderator_role = guild.add_role("Modérateur", MODERATOR_PERMISSIONS)
+    bot_role = guild.add_role("Bot", MODERATOR_PERMISSIONS)
+    guild.muted_role = muted_role
+    guild.member_role = member_role
+
+    # Combinaisons de rôles partagées entre membres
+    combos = []
+    for _ in range(256):
+        roles = [member_role] if rng.random() < 0.9 else []
+        roles += rng.sample(decorative, rng.randint(0, min(3, len(decorative))))
+        combos.append(tuple(roles))
+
+    guild.owner = guild.add_member(BASE_ID + 1, "proprietaire", [moderator_role])
+    guild.owner_id = guild.owner.id
+    guild.moderator = guild.add_member(BASE_ID + 2, "moderateur", [moderator_role])
+    guild.bot_member = guild.me = guild.add_member(BASE_ID + 3, "bot-moderation", [bot_role], bot=True)
+
+    guild.muted_members = []
+    guild.saved_roles = {}
+    first_id = BASE_ID + 1000
+    for index in range(members):
+        member_id = first_id + index
+        roles = combos[rng.randrange(len(combos))]
+        if rng.random() < muted_ratio:
+            guild.saved_roles[member_id] = [role.id for role in roles]
+            roles = (muted_role,)
+        member = guild.add_member(member_id, f"membre{index}", roles)
+        if roles == (muted_role,):
+            guild.muted_members.append(member)
+
+    first_ban = BASE_ID + 10 ** 9
+    for index in range(bans):
+        user = FakeUser(first_ban + index, f"banni{index}")
+        guild._bans[user.id] = BanEntry("Spam", user)
+
+    guild.add_channel("general")
+    return guild
+
+def make_context(guild, content, author=None, reference=None, mentions=(), message_id=None):
+    """Contexte d'une commande envoyée dans le premier salon du serveur"""
+
+    channel = guild.channels[0]
+    author = author or guild.moderator
+    message = FakeMessage.create(message_id or BASE_ID + 10 ** 12, author, channel, content, reference, mentions)
+    return FakeContext(FakeBot(FakeUser(guild.bot_member.id, guild.bot_member.name, bot=True)), message)
@@ -0,0 +1,342 @@
+"""
+Benchmark hors ligne des chemins critiques des commandes
+
+Exécute on_message, get_target_user, check_moderation_permissions,
+log_moderation_action, la boucle de +unmute all et l'index des bannissements
+sur des serveurs factices de différentes tailles, sans token Discord.
+Chaque chemin rapporte ops/s, latences p50/p99, pic mémoire (tracemalloc) et
+requêtes REST par opération. Les résultats sont écrits en JSON pour comparer
+deux commits (--compare).
+
+Usage: python -m benchmarks.hot_paths [--members 1000,10000,100000] [--bans 10000]
+                                      [--paths on_message,unmute_all] [--output FICHIER]
+                                      [--compare ANCIEN.json]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import inspect
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+import discord
+
+from benchmarks.fakes import BASE_ID, FakeMessage, FakeReference, make_context, make_guild
+from utils.ban_index import BanIndex
+from utils.hierarchy import hierarchy_cache
+from utils.logger import log_moderation_action, setup_logging, shutdown_logging
+from utils.message_cache import message_cache
+from utils.mute_store import MuteRoleStore
+from utils.permissions import check_moderation_permissions, get_target_user
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = REPO_DIR / "benchmarks" / "results"
+
+# Nombre d'itérations sous tracemalloc (beaucoup plus lent) pour le pic mémoire
+MEMORY_ITERATIONS = 200
+
+CHAT = (
+    "salut ça va tu as vu le match hier soir c'est vraiment incroyable je pense que "
+    "on devrait lancer une partie ce soir quelqu'un est chaud pour jouer mdr lol ok").split()
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+class HotPath:
+    """
+    Un chemin à mesurer
+
+    Args:
+        name: Nom du chemin dans les résultats
+        op: Fonction (ou coroutine) appelée avec le numéro d'itération
+        iterations: Nombre d'itérations mesurées
+        setup: Préparation non chronométrée avant chaque itération (optionnelle)
+        items: Éléments traités par opération (ex: membres démutés)
+    """
+
+    def __init__(self, name, op, iterations, setup=None, items=1):
+        self.name = name
+        self.op = op
+        self.iterations = max(1, iterations)
+        self.setup = setup
+        self.items = items
+
+    async def _call(self, func, index):
+        result = func(index)
+        if inspect.isawaitable(result):
+            await result
+
+    async def run(self, http):
+        """Mesure le chemin; retourne le dictionnaire de résultats"""
+
+        latencies = []
+        calls_before = http.total
+        for index in range(self.iterations):
+            if self.setup is not None:
+                await self._call(self.setup, index)
+            start = time.perf_counter_ns()
+            await self._call(self.op, index)
+            latencies.append(time.perf_counter_ns() - start)
+        http_calls = http.total - calls_before
+
+        # Pic mémoire sur un échantillon, hors préparation
+        samples = min(self.iterations, MEMORY_ITERATIONS)
+        peak = 0
+        tracemalloc.start()
+        try:
+            for index in range(samples):
+                if self.setup is not None:
+                    await self._call(self.setup, index)
+                baseline = tracemalloc.get_traced_memory()[0]
+                tracemalloc.reset_peak()
+                await self._call(self.op, index)
+                peak = max(peak, tracemalloc.get_traced_memory()[1] - baseline)
+        finally:
+            tracemalloc.stop()
+
+        total = sum(latencies) / 1e9
+        return {
+            "path": self.name,
+            "iterations": self.iterations,
+            "ops_per_sec": self.iterations / total if total else 0.0,
+            "items_per_sec": self.iterations * self.items / total if total else 0.0,
+            "p50_us": percentile(latencies, 50) / 1000,
+            "p99_us": percentile(latencies, 99) / 1000,
+            "peak_kib": peak / 1024,
+            "http_calls_per_op": http_calls / self.iterations,
+        }
+
+def make_chat(guild, count, seed=7):
+    """Messages du salon: ~95% de discussion, ~3% de commandes du bot, ~2% d'autres bots"""
+
+    rng = random.Random(seed)
+    members = guild.members
+    channel = guild.channels[0]
+    messages = []
+    for index in range(count):
+        roll = rng.random()
+        if roll < 0.03:
+            content = f"+{rng.choice(['ping', 'ban', 'kick', 'unmute'])} <@{rng.choice(members).id}> spam"
+        elif roll < 0.05:
+            content = f"+{rng.choice(['play', 'rank', 'daily'])}"
+        else:
+            content = ' '.join(rng.choice(CHAT) for _ in range(int(rng.expovariate(1 / 12)) + 1))
+        messages.append(FakeMessage.create(BASE_ID + 10 ** 11 + index, rng.choice(members), channel, content))
+    return messages
+
+def build_paths(guild, simple_bot, store, args):
+    """Chemins à mesurer pour un serveur"""
+
+    rng = random.Random(11)
+    members = guild.members
+    targets = [rng.choice(members) for _ in range(1024)]
+    iterations = args.iterations
+    paths = []
+
+    # --- on_message (simple_bot), traitement des commandes exclu ----------------------
+    chat = make_chat(guild, min(iterations * 10, 50000))
+    paths.append(HotPath("on_message", lambda i: simple_bot.on_message(chat[i % len(chat)]), len(chat)))
+
+    # --- get_target_user -----------------------------------------------------------
+    target = targets[0]
+    channel = guild.channels[0]
+    referenced = FakeMessage.create(BASE_ID + 10 ** 10, target, channel, "message signalé")
+    channel.messages[referenced.id] = referenced
+
+    ctx = make_context(guild, f"+ban {target.mention}", mentions=[target])
+    paths.append(HotPath("get_target_user.mention", lambda i: get_target_user(ctx, target), iterations))
+
+    resolved_ctx = make_context(guild, "+ban spam", reference=FakeReference(referenced.id, referenced))
+    paths.append(HotPath("get_target_user.reply_resolved", lambda i: get_target_user(resolved_ctx, None), iterations))
+
+    reply_ctx = make_context(guild, "+ban spam", reference=FakeReference(referenced.id))
+    paths.append(HotPath(
+        "get_target_user.reply_cached", lambda i: get_target_user(reply_ctx, None), iterations,
+        setup=lambda i: message_cache.add(referenced)
+    ))
+    paths.append(HotPath(
+        "get_target_user.reply_fetch", lambda i: get_target_user(reply_ctx, None), iterations,
+        setup=lambda i: message_cache._entries.pop(referenced.id, None)
+    ))
+
+    # --- check_moderation_permissions ----------------------------------------------------
+    mod_ctx = make_context(guild, "+ban")
+    paths.append(HotPath(
+        "check_moderation_permissions.warm",
+        lambda i: check_moderation_permissions(mod_ctx, targets[i % len(targets)], "ban"), iterations
+    ))
+    paths.append(HotPath(
+        "check_moderation_permissions.cold",
+        lambda i: check_moderation_permissions(mod_ctx, targets[i % len(targets)], "ban"), iterations,
+        setup=lambda i: hierarchy_cache.invalidate_guild(guild.id)
+    ))
+
+    # --- log_moderation_action -----------------------------------------------------------
+    paths.append(HotPath(
+        "log_moderation_action",
+        lambda i: log_moderation_action("BAN", guild.moderator, targets[i % len(targets)], "Spam - Par moderateur", guild),
+        iterations
+    ))
+
+    # --- +unmute all ---------------------------------------------------------------------
+    def remute(i):
+        for member in guild.muted_members:
+            member.set_roles([guild.muted_role])
+            store.set(guild.id, member.id, guild.saved_roles[member.id])
+
+    unmute_ctx = make_context(guild, "+unmute all")
+    paths.append(HotPath(
+        "unmute_all", lambda i: simple_bot.unmute.callback(unmute_ctx, "all", reason="Benchmark"),
+        args.unmute_iterations, setup=remute, items=len(guild.muted_members)
+    ))
+
+    # --- Index des bannissements (+unban) --------------------------------------------------
+    bans = len(guild._bans)
+    paths.append(HotPath(
+        "ban_index.load", lambda i: BanIndex().ensure_loaded(guild), args.unmute_iterations, items=bans
+    ))
+    ban_index = BanIndex()
+    names = [f"banni{rng.randrange(max(bans, 1))}" for _ in range(1024)]
+    paths.append(HotPath("ban_index.find", lambda i: ban_index.find(names[i % len(names)]), iterations))
+
+    selected = set(args.paths) if args.paths else None
+    return ban_index, [path for path in paths if selected is None or path.name.split('.')[0] in selected or path.name in selected]
+
+async def bench_size(members, args, simple_bot, tmp):
+    """Construit un serveur de `members` membres et mesure tous les chemins"""
+
+    start = time.perf_counter()
+    guild = make_guild(members=members, bans=args.bans, seed=args.seed)
+    build_seconds = time.perf_counter() - start
+
+    # État partagé remis à zéro: tous les serveurs factices ont le même ID
+    hierarchy_cache.invalidate_guild(guild.id)
+    message_cache._entries.clear()
+    simple_bot.role_index.discard_guild(guild.id)
+    simple_bot.role_index.build(guild)
+
+    store = MuteRoleStore(Path(tmp) / f"muted_{members}.journal")
+    store.load()
+    simple_bot.muted_users_roles = store
+
+    ban_index, paths = build_paths(guild, simple_bot, store, args)
+    await ban_index.ensure_loaded(guild)
+
+    results = []
+    for path in paths:
+        result = await path.run(guild.http)
+        result.update(members=members, bans=args.bans)
+        results.append(result)
+        print(
+            f"{members:>8} {result['path']:<36} {result['ops_per_sec']:>12,.0f} ops/s "
+            f"p50 {result['p50_us']:>9.1f}µs p99 {result['p99_us']:>9.1f}µs "
+            f"pic {result['peak_kib']:>9.1f} Kio  http/op {result['http_calls_per_op']:.2f}",
+            file=sys.__stdout__, flush=True
+        )
+
+    store.close()
+    return {"members": members, "build_seconds": build_seconds}, results
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "inconnu"
+
+def compare(previous_path, results):
+    """Affiche l'évolution des ops/s par rapport à un fichier de résultats précédent"""
+
+    with open(previous_path, encoding='utf-8') as f:
+        previous = json.load(f)
+    before = {(r["path"], r["members"]): r for r in previous["results"]}
+
+    print(f"\nComparaison avec {previous.get('commit', '?')} ({previous_path})")
+    for result in results:
+        old = before.get((result["path"], result["members"]))
+        if old is None or not old["ops_per_sec"]:
+            continue
+        change = (result["ops_per_sec"] / old["ops_per_sec"] - 1) * 100
+        flag = "⚠️ " if change < -10 else "   "
+        print(f"{flag}{result['members']:>8} {result['path']:<36} {change:>+7.1f}% ops/s  "
+              f"p99 {old['p99_us']:.1f} -> {result['p99_us']:.1f}µs")
+
+async def run(args, simple_bot, tmp):
+    # Seule la partie avant discord.ext.commands est mesurée dans on_message
+    async def process_commands(message):
+        return None
+    simple_bot.bot.process_commands = process_commands
+
+    sizes, results = [], []
+    for members in args.members:
+        size, size_results = await bench_size(members, args, simple_bot, tmp)
+        sizes.append(size)
+        results += size_results
+    return sizes, results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--members", type=lambda s: [int(v) for v in s.split(',')], default=[1000, 10000, 100000],
+                        help="tailles de serveur, ex: 1000,10000,100000,500000")
+    parser.add_argument("--bans", type=int, default=10000)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--unmute-iterations", type=int, default=3, help="itérations des chemins en masse")
+    parser.add_argument("--paths", type=lambda s: s.split(','), default=None, help="chemins à mesurer (tous par défaut)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=Path, default=None, help="fichier JSON (défaut: benchmarks/results/hot_paths_<commit>.json)")
+    parser.add_argument("--compare", type=Path, default=None, help="résultats précédents à comparer")
+    args = parser.parse_args()
+
+    # Importé avant de quitter le dossier courant (sys.path peut en dépendre)
+    import simple_bot
+
+    commit = git_commit()
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, 'w') as devnull:
+        # Logs réels (fichiers dans le dossier temporaire), console vers /dev/null
+        os.chdir(tmp)
+        try:
+            with contextlib.redirect_stderr(devnull), contextlib.redirect_stdout(devnull):
+                setup_logging()
+                sizes, results = asyncio.run(run(args, simple_bot, tmp))
+                shutdown_logging()
+        finally:
+            os.chdir(cwd)
+
+    report = {
+        "commit": commit,
+        "date": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "discord.py": discord.__version__,
+        "platform": platform.platform(),
+        "bans": args.bans,
+        "sizes": sizes,
+        "results": results,
+    }
+
+    output = args.output or RESULTS_DIR / f"hot_paths_{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Résultats écrits dans {output}")
+
+    if args.compare:
+        compare(args.compare, results)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,10 +4,28 @@ Bot Discord de modération avec commandes ban/unban/kick
 
 import discord
 from discord.ext import commands
+import asyncio
 import logging
-from datetime import datetime
 from utils.permissions import check_moderation_permissions, get_target_user
 from utils.logger import log_moderation_action
+from utils.ban_index import BanIndexRegistry
+from utils.dispatch import CommandDispatcher
+from utils.message_cache import message_cache
+from utils.hierarchy import hierarchy_cache
+from utils.bulk import BulkExecutor
+from utils.moderation import parse_command_targets, read_attachment_ids, run_batch_command, unban_many
+from utils.notifier import DMNotifier
+from utils.metrics import bot_metrics
+from utils.profiler import bot_profiler, PROFILE_SECONDS
+from utils.member_resolver import member_resolver, configure_member_cache
+from utils.antispam import antispam
+from utils.wordfilter import wordfilter, run_filter_command
+from utils.raid import antiraid
+from utils.cases import run_case_command
+from utils.singleflight import moderation_flights
+from utils.scheduler import sanction_scheduler, parse_duration, format_duration
+from utils.guild_settings import guild_settings, run_config_command
+from utils.embeds import DM_TEMPLATES, BAN_DM, KICK_DM, BAN_CONFIRMATION, KICK_CONFIRMATION, UNBAN_CONFIRMATION, help_embed
 
 class ModerationBot(commands.Bot):
     """Bot de modération Discord"""
@@ -19,15 +37,60 @@ class ModerationBot(commands.Bot):
         intents.members = True
         intents.guilds = True
         
-        # Initialisation du bot avec préfixe "+"
+        # Initialisation du bot avec le préfixe de chaque serveur ("+" par défaut)
         super().__init__(
-            command_prefix='+',
+            command_prefix=guild_settings.command_prefix,
             intents=intents,
-            help_command=None  # On va créer notre propre commande help
+            help_command=None,  # On va créer notre propre commande help
+            http_trace=bot_metrics.http_trace(),  # Requêtes REST comptées par route pour /metrics
+            **configure_member_cache()  # Membres à la demande si BOT_LAZY_MEMBERS=1
         )
         
         self.logger = logging.getLogger(__name__)
         
+        # Index des bannissements par serveur (chargé à la première utilisation de +unban)
+        self.ban_indexes = BanIndexRegistry()
+        
+        # Filtre des messages de commande (compilé dans setup_hook)
+        self.dispatcher = CommandDispatcher('+')
+        
+        # Exécuteur des actions en lot (ban/kick de plusieurs cibles)
+        self.bulk_executor = BulkExecutor()
+        
+        # Envoi des MPs de modération en arrière-plan
+        self.notifier = DMNotifier()
+        
+    async def setup_hook(self):
+        """Initialisation avant la connexion au gateway"""
+        # Paramètres des serveurs (préfixe, rôles du mute, salon de logs, seuils)
+        await asyncio.to_thread(guild_settings.load)
+        self.dispatcher.sync(self)
+        self.notifier.start()
+        
+        # Listes de termes interdits, compilées hors de la boucle
+        await wordfilter.load()
+        
+        # Bannissements temporaires: échéances rechargées, celles manquées pendant l'arrêt levées une fois prêt
+        await asyncio.to_thread(sanction_scheduler.load)
+        sanction_scheduler.register("UNBAN", self._expire_bans)
+        sanction_scheduler.start(ready=self.wait_until_ready)
+        
+        # Chronométrer handlers et commandes, puis exposer /metrics
+        bot_metrics.instrument(self)
+        bot_metrics.registry.add_stats("bot_dm", self.notifier.stats)
+        await bot_metrics.start()
+        
+        # Profilage (blocages de la boucle, handlers lents) si activé, profil à la demande sinon
+        bot_profiler.install(self)
+    
+    async def close(self):
+        """Arrêt du bot: envoyer les MPs encore en file avant de se déconnecter"""
+        await self.notifier.close()
+        sanction_scheduler.close()
+        await bot_profiler.close()
+        await bot_metrics.close()
+        await super().close()
+        
     async def on_ready(self):
         """Event déclenché quand le bot est connecté"""
         self.logger.info(f"✅ {self.user} est maintenant connecté!")
@@ -40,6 +103,84 @@ class ModerationBot(commands.Bot):
         )
         await self.change_presence(activity=activity)
     
+    async def _notify_batch(self, ctx, targets, action, reason):
+        """Envoie le MP de sanction aux membres d'un lot, attendu au plus DM_DEADLINE au total"""
+        # Un seul embed pour tout le lot
+        embed = DM_TEMPLATES[action].render(guild=ctx.guild.name, reason=reason, moderator=ctx.author.mention)
+        
+        # Les comptes qui ne sont plus membres ne partagent plus de serveur avec le bot
+        deliveries = [
+            self.notifier.notify(target, embed)
+            for target in targets if isinstance(target, discord.Member)
+        ]
+        await self.notifier.wait(deliveries)
+    
+    async def _expire_bans(self, guild_id, user_ids):
+        """Lève en un seul lot les bannissements temporaires arrivés à échéance (renvoie les IDs à réessayer)"""
+        guild = self.get_guild(guild_id)
+        if guild is None:
+            self.logger.warning(f"Bannissements temporaires ignorés: serveur {guild_id} introuvable ({len(user_ids)})")
+            return None
+        outcome = await unban_many(guild, guild.me, user_ids, "Fin du bannissement temporaire", self.bulk_executor)
+        return outcome.retryable
+    
+    async def on_member_ban(self, guild, user):
+        """Event déclenché quand un utilisateur est banni"""
+        self.ban_indexes.get(guild.id).add(user)
+    
+    async def on_member_unban(self, guild, user):
+        """Event déclenché quand un utilisateur est débanni"""
+        self.ban_indexes.get(guild.id).remove(user.id)
+        # Débanni avant l'échéance (commande ou interface de Discord)
+        sanction_scheduler.cancel("UNBAN", guild.id, user.id)
+    
+    async def on_guild_remove(self, guild):
+        """Event déclenché quand le bot quitte un serveur"""
+        self.ban_indexes.discard(guild.id)
+        hierarchy_cache.invalidate_guild(guild.id)
+        member_resolver.discard_guild(guild.id)
+        antispam.discard_guild(guild.id)
+        antiraid.discard_guild(guild.id)
+        guild_settings.discard_guild(guild.id)
+    
+    async def on_guild_update(self, before, after):
+        """Event déclenché quand un serveur est modifié (ex: changement de propriétaire)"""
+        hierarchy_cache.invalidate_guild(after.id)
+    
+    async def on_guild_role_create(self, role):
+        """Event déclenché quand un rôle est créé"""
+        hierarchy_cache.invalidate_guild(role.guild.id)
+        guild_settings.invalidate(role.guild.id)
+    
+    async def on_guild_role_update(self, before, after):
+        """Event déclenché quand un rôle est modifié (position, permissions...)"""
+        hierarchy_cache.invalidate_guild(after.guild.id)
+        # Les rôles par défaut sont trouvés par leur nom: seul un renommage change la résolution
+        if before.name != after.name:
+            guild_settings.invalidate(after.guild.id)
+    
+    async def on_guild_role_delete(self, role):
+        """Event déclenché quand un rôle est supprimé"""
+        hierarchy_cache.invalidate_guild(role.guild.id)
+        guild_settings.invalidate(role.guild.id)
+    
+    async def on_member_join(self, member):
+        """Event déclenché quand un membre rejoint le serveur"""
+        # Anti-raid: les arrivées suspectes d'un raid sont sanctionnées par lots
+        antiraid.member_joined(member, self.bulk_executor)
+    
+    async def on_member_update(self, before, after):
+        """Event déclenché quand un membre est modifié (rôles...)"""
+        hierarchy_cache.invalidate_member(after.guild.id, after.id)
+    
+    async def on_member_remove(self, member):
+        """Event déclenché quand un membre quitte le serveur"""
+        hierarchy_cache.invalidate_member(member.guild.id, member.id)
+    
+    async def on_raw_member_remove(self, payload):
+        """Event déclenché quand un membre quitte le serveur, même hors du cache"""
+        member_resolver.discard(payload.guild_id, payload.user.id)
+    
     async def on_command_error(self, ctx, error):
         """Gestion globale des erreurs de commandes"""
         if isinstance(error, commands.MissingPermissions):
@@ -64,11 +205,30 @@ class ModerationBot(commands.Bot):
         if message.author == self.user:
             return
         
-        # Log des messages commençant par le préfixe pour debug
-        if message.content.startswith('+'):
+        # Mémoriser l'auteur pour les commandes en réponse à ce message
+        message_cache.add(message)
+        
+        # Anti-spam (flood, messages répétés, mentions); sans rôles sauvegardés, le mute est une exclusion temporaire
+        detection = antispam.check(message)
+        if detection is not None:
+            await antispam.enforce(detection, self.bulk_executor)
+            return
+        
+        # Termes interdits du serveur (automate compilé une fois par liste)
+        matches = wordfilter.check(message)
+        if matches and await wordfilter.enforce(message, matches):
+            return
+        
+        # Rejet immédiat des messages sans le préfixe du serveur, sans parsing par discord.py
+        prefix = guild_settings.prefix(message.guild)
+        if not self.dispatcher.is_prefixed(message.content, prefix):
+            return
+        
+        # Log des commandes reconnues pour debug
+        if self.dispatcher.match(message.content, prefix) is not None:
             self.logger.info(f"Commande reçue: '{message.content}' de {message.author} dans {message.guild}")
         
-        # Traiter les commandes
+        # Traiter les commandes (les commandes inconnues reçoivent le message d'aide)
         await self.process_commands(message)
 
     @commands.command(name='test')
@@ -81,50 +241,72 @@ class ModerationBot(commands.Bot):
     async def help_cmd(self, ctx):
         """Affiche la liste des commandes disponibles"""
         self.logger.info(f"Commande help exécutée par {ctx.author} dans {ctx.guild}")
-        embed = discord.Embed(
-            title="🛡️ Bot de Modération - Aide",
-            description="Liste des commandes disponibles",
-            color=discord.Color.blue(),
-            timestamp=datetime.now()
-        )
-        
-        embed.add_field(
-            name="🔨 +ban",
-            value="Bannir un utilisateur\n**Usage:** `+ban @utilisateur [raison]`\n**Ou:** Répondre à un message avec `+ban [raison]`",
-            inline=False
-        )
-        
-        embed.add_field(
-            name="🔓 +unban", 
-            value="Débannir un utilisateur\n**Usage:** `+unban @utilisateur`\n**Ou:** `+unban nom_utilisateur#discriminator`",
-            inline=False
-        )
-        
-        embed.add_field(
-            name="👢 +kick",
-            value="Expulser un utilisateur\n**Usage:** `+kick @utilisateur [raison]`\n**Ou:** Répondre à un message avec `+kick [raison]`",
-            inline=False
-        )
-        
-        embed.add_field(
-            name="ℹ️ Permissions requises",
-            value="• **Ban/Unban:** Permission `Bannir des membres`\n• **Kick:** Permission `Expulser des membres`",
-            inline=False
-        )
-        
-        embed.set_footer(text="Bot de Modération", icon_url=self.user.avatar.url if self.user and self.user.avatar else None)
+        # Embed construit une seule fois puis réutilisé
+        icon_url = self.user.avatar.url if self.user and self.user.avatar else None
+        embed = help_embed("moderation", footer_icon=icon_url)
         
         await ctx.send(embed=embed)
 
+    @commands.command(name='filtre')
+    @commands.has_permissions(manage_messages=True)
+    async def filter_cmd(self, ctx, action=None, *, text=None):
+        """Gérer les termes interdits du serveur (ajouter, retirer, liste, test)"""
+        self.logger.info(f"Commande filtre exécutée par {ctx.author} dans {ctx.guild} - action: {action}")
+        await run_filter_command(ctx, action, text)
+
+    @commands.command(name='config')
+    @commands.has_permissions(manage_guild=True)
+    async def config_cmd(self, ctx, key=None, *, value=None):
+        """Paramètres du serveur (préfixe, rôles du mute, salon de logs, seuils)"""
+        self.logger.info(f"Commande config exécutée par {ctx.author} dans {ctx.guild}: {key} {value or ''}")
+        await run_config_command(ctx, key, value)
+
+    @commands.command(name='casier')
+    @commands.has_permissions(kick_members=True)
+    async def case_cmd(self, ctx, *, args=None):
+        """Historique des sanctions d'un utilisateur (ou données par un modérateur)"""
+        self.logger.info(f"Commande casier exécutée par {ctx.author} dans {ctx.guild}: {args}")
+        await run_case_command(ctx, args)
+    
+    @commands.command(name='profile')
+    @commands.is_owner()
+    async def profile_cmd(self, ctx, seconds: float = PROFILE_SECONDS):
+        """Enregistre un profil par échantillonnage et l'envoie (propriétaire du bot uniquement)"""
+        self.logger.info(f"Commande profile exécutée par {ctx.author} dans {ctx.guild} ({seconds:.0f} s)")
+        seconds = min(max(seconds, 1.0), 300.0)
+        await ctx.send(f"🔥 Profilage pendant {seconds:.0f} secondes...")
+        path = await bot_profiler.sample(seconds)
+        await ctx.send("🔥 Flame graph (piles repliées, à ouvrir avec speedscope ou flamegraph.pl)", file=discord.File(path))
+
     @commands.command(name='ban')
     @commands.has_permissions(ban_members=True)
     @commands.bot_has_permissions(ban_members=True)
-    async def ban_user(self, ctx, member: discord.Member = None, *, reason=None):
+    async def ban_user(self, ctx, *, args=None):
         """
-        Bannir un utilisateur du serveur
-        Peut être utilisé en mentionnant un utilisateur ou en répondant à un message
+        Bannir un ou plusieurs utilisateurs du serveur
+        Peut être utilisé en mentionnant des utilisateurs (ou leurs IDs, ou un nom), avec une
+        pièce jointe contenant une liste d'IDs, ou en répondant à un message.
+        Une durée après les cibles rend le bannissement temporaire (ex: +ban @user 7d spam)
         """
-        self.logger.info(f"Commande ban exécutée par {ctx.author} dans {ctx.guild} - membre: {member} - raison: {reason}")
+        # Cibles en tête de commande (mentions/IDs, ou nom d'un membre) et en pièce jointe, puis la durée et la raison
+        ids, reason = await parse_command_targets(ctx, args)
+        duration, reason = parse_duration(reason)
+        ids += [user_id for user_id in await read_attachment_ids(ctx.message) if user_id not in ids]
+        member = await member_resolver.resolve(ctx.guild, ids[0]) if len(ids) == 1 else None
+        self.logger.info(f"Commande ban exécutée par {ctx.author} dans {ctx.guild} - cibles: {len(ids)} - raison: {reason}")
+        
+        # Plusieurs cibles (ou un compte qui n'est plus membre): bannissement en lot
+        if len(ids) > 1 or (ids and member is None):
+            reason = f"{reason} - Par {ctx.author}" if reason else f"Banni par {ctx.author}"
+            if duration:
+                reason = f"{reason} - Durée: {format_duration(duration)}"
+            outcome = await run_batch_command(
+                ctx, "BAN", ids, reason, self.bulk_executor,
+                before_action=lambda targets: self._notify_batch(ctx, targets, "BAN", reason)
+            )
+            if outcome is not None:
+                sanction_scheduler.plan("UNBAN", ctx.guild.id, [target.id for target in outcome.succeeded], duration)
+            return
         
         # Déterminer l'utilisateur cible
         target_user = await get_target_user(ctx, member)
@@ -141,43 +323,36 @@ class ModerationBot(commands.Bot):
             reason = f"Banni par {ctx.author}"
         else:
             reason = f"{reason} - Par {ctx.author}"
+        if duration:
+            reason = f"{reason} - Durée: {format_duration(duration)}"
         
-        try:
-            # Tentative d'envoi d'un MP à l'utilisateur
+        async def ban():
             try:
-                embed = discord.Embed(
-                    title="🔨 Vous avez été banni",
-                    description=f"Vous avez été banni du serveur **{ctx.guild.name}**",
-                    color=discord.Color.red()
-                )
-                embed.add_field(name="Raison", value=reason, inline=False)
-                embed.add_field(name="Modérateur", value=ctx.author.mention, inline=True)
-                await target_user.send(embed=embed)
+                # MP à l'utilisateur via la file de notifications, attendu au plus DM_DEADLINE secondes
+                embed = BAN_DM.render(guild=ctx.guild.name, reason=reason, moderator=ctx.author.mention)
+                await self.notifier.wait(self.notifier.notify(target_user, embed))
+                
+                # Bannissement
+                await target_user.ban(reason=reason, delete_message_days=0)
+                sanction_scheduler.plan("UNBAN", ctx.guild.id, [target_user.id], duration)
+                
+                # Message de confirmation
+                embed = BAN_CONFIRMATION.render(target=target_user, reason=reason, moderator=ctx.author.mention)
+                await ctx.send(embed=embed)
+                
+                # Log de l'action
+                log_moderation_action("BAN", ctx.author, target_user, reason, ctx.guild)
+                
             except discord.Forbidden:
-                pass  # L'utilisateur n'accepte pas les MPs
-            
-            # Bannissement
-            await target_user.ban(reason=reason, delete_message_days=0)
-            
-            # Message de confirmation
-            embed = discord.Embed(
-                title="🔨 Utilisateur banni",
-                description=f"**{target_user}** a été banni du serveur",
-                color=discord.Color.red(),
-                timestamp=datetime.now()
-            )
-            embed.add_field(name="Raison", value=reason, inline=False)
-            embed.add_field(name="Modérateur", value=ctx.author.mention, inline=True)
-            
-            await ctx.send(embed=embed)
-            
-            # Log de l'action
-            log_moderation_action("BAN", ctx.author, target_user, reason, ctx.guild)
-            
-        except discord.Forbidden:
-            await ctx.send("❌ Je n'ai pas les permissions pour bannir cet utilisateur!")
-        except Exception as e:
-            await ctx.send(f"❌ Erreur lors du bannissement: {e}")
+                await ctx.send("❌ Je n'ai pas les permissions pour bannir cet utilisateur!")
+            except Exception as e:
+                await ctx.send(f"❌ Erreur lors du bannissement: {e}")
+        
+        # Un seul bannissement par cible: les commandes simultanées attendent le premier
+        await moderation_flights.run(
+            (ctx.guild.id, target_user.id, "BAN"), ban,
+            on_duplicate=lambda: ctx.send(f"⏳ Le bannissement de {target_user} est déjà en cours.")
+        )
 
     @commands.command(name='unban')
     @commands.has_permissions(ban_members=True)
@@ -191,36 +366,26 @@ class ModerationBot(commands.Bot):
             await ctx.send("❌ Veuillez spécifier l'utilisateur à débannir!\n**Usage:** `+unban nom#discriminator` ou `+unban ID_utilisateur`")
             return
         
+        # Index des bannissements (chargé une seule fois, puis tenu à jour par les events)
+        ban_index = self.ban_indexes.get(ctx.guild.id)
+        target_user = None
+        
         try:
-            # Récupération de la liste des utilisateurs bannis
-            banned_users = []
-            async for ban_entry in ctx.guild.bans():
-                banned_users.append(ban_entry.user)
+            await ban_index.ensure_loaded(ctx.guild)
             
-            if not banned_users:
+            if not ban_index:
                 await ctx.send("❌ Aucun utilisateur banni trouvé sur ce serveur!")
                 return
             
-            target_user = None
-            
-            # Recherche par ID
-            if user_info.isdigit():
-                user_id = int(user_info)
-                target_user = discord.utils.get(banned_users, id=user_id)
-            else:
-                # Recherche par nom#discriminator ou nom
-                if '#' in user_info:
-                    name, discriminator = user_info.split('#')
-                    target_user = discord.utils.get(banned_users, name=name, discriminator=discriminator)
-                else:
-                    # Recherche par nom seulement
-                    target_user = discord.utils.find(lambda u: u.name.lower() == user_info.lower(), banned_users)
+            # Recherche par ID, nom#discriminator, nom ou début de nom
+            target_user = ban_index.find(user_info)
             
             if not target_user:
                 # Afficher les utilisateurs bannis disponibles
-                banned_list = '\n'.join([f"• {user.name}#{user.discriminator} (ID: {user.id})" for user in banned_users[:10]])
-                if len(banned_users) > 10:
-                    banned_list += f"\n... et {len(banned_users) - 10} autre(s)"
+                suggestions = ban_index.suggestions(user_info)
+                banned_list = '\n'.join([f"• {user.name}#{user.discriminator} (ID: {user.id})" for user in suggestions])
+                if len(ban_index) > len(suggestions):
+                    banned_list += f"\n... et {len(ban_index) - len(suggestions)} autre(s)"
                 
                 embed = discord.Embed(
                     title="❌ Utilisateur non trouvé",
@@ -235,24 +400,28 @@ class ModerationBot(commands.Bot):
                 await ctx.send(embed=embed)
                 return
             
-            # Débannissement
-            await ctx.guild.unban(target_user, reason=f"Débanni par {ctx.author}")
+            async def unban():
+                # Débannissement
+                await ctx.guild.unban(target_user, reason=f"Débanni par {ctx.author}")
+                ban_index.remove(target_user.id)
+                
+                # Message de confirmation
+                embed = UNBAN_CONFIRMATION.render(target=target_user, moderator=ctx.author.mention)
+                await ctx.send(embed=embed)
+                
+                # Log de l'action
+                log_moderation_action("UNBAN", ctx.author, target_user, f"Débanni par {ctx.author}", ctx.guild)
             
-            # Message de confirmation
-            embed = discord.Embed(
-                title="🔓 Utilisateur débanni",
-                description=f"**{target_user}** a été débanni du serveur",
-                color=discord.Color.green(),
-                timestamp=datetime.now()
+            # Un seul débannissement par cible (les erreurs sont signalées par la première commande)
+            await moderation_flights.run(
+                (ctx.guild.id, target_user.id, "UNBAN"), unban,
+                on_duplicate=lambda: ctx.send(f"⏳ Le débannissement de {target_user} est déjà en cours.")
             )
-            embed.add_field(name="Modérateur", value=ctx.author.mention, inline=True)
-            
-            await ctx.send(embed=embed)
-            
-            # Log de l'action
-            log_moderation_action("UNBAN", ctx.author, target_user, f"Débanni par {ctx.author}", ctx.guild)
             
         except discord.NotFound:
+            # L'index était périmé: l'utilisateur n'est plus banni
+            if target_user:
+                ban_index.remove(target_user.id)
             await ctx.send("❌ Utilisateur non trouvé dans les bannissements!")
         except discord.Forbidden:
             await ctx.send("❌ Je n'ai pas les permissions pour débannir cet utilisateur!")
@@ -262,11 +431,26 @@ class ModerationBot(commands.Bot):
     @commands.command(name='kick')
     @commands.has_permissions(kick_members=True)
     @commands.bot_has_permissions(kick_members=True)
-    async def kick_user(self, ctx, member: discord.Member = None, *, reason=None):
+    async def kick_user(self, ctx, *, args=None):
         """
-        Expulser un utilisateur du serveur
-        Peut être utilisé en mentionnant un utilisateur ou en répondant à un message
+        Expulser un ou plusieurs utilisateurs du serveur
+        Peut être utilisé en mentionnant des utilisateurs (ou leurs IDs, ou un nom), avec une
+        pièce jointe contenant une liste d'IDs, ou en répondant à un message
         """
+        # Cibles en tête de commande (mentions/IDs, ou nom d'un membre) et en pièce jointe, puis la raison
+        ids, reason = await parse_command_targets(ctx, args)
+        ids += [user_id for user_id in await read_attachment_ids(ctx.message) if user_id not in ids]
+        member = await member_resolver.resolve(ctx.guild, ids[0]) if len(ids) == 1 else None
+        
+        # Plusieurs cibles: expulsion en lot
+        if len(ids) > 1 or (ids and member is None):
+            reason = f"{reason} - Par {ctx.author}" if reason else f"Expulsé par {ctx.author}"
+            await run_batch_command(
+                ctx, "KICK", ids, reason, self.bulk_executor,
+                before_action=lambda targets: self._notify_batch(ctx, targets, "KICK", reason)
+            )
+            return
+        
         # Déterminer l'utilisateur cible
         target_user = await get_target_user(ctx, member)
         if not target_user:
@@ -283,40 +467,29 @@ class ModerationBot(commands.Bot):
         else:
             reason = f"{reason} - Par {ctx.author}"
         
-        try:
-            # Tentative d'envoi d'un MP à l'utilisateur
+        async def kick():
             try:
-                embed = discord.Embed(
-                    title="👢 Vous avez été expulsé",
-                    description=f"Vous avez été expulsé du serveur **{ctx.guild.name}**",
-                    color=discord.Color.orange()
-                )
-                embed.add_field(name="Raison", value=reason, inline=False)
-                embed.add_field(name="Modérateur", value=ctx.author.mention, inline=True)
-                embed.add_field(name="Note", value="Vous pouvez rejoindre le serveur avec un nouveau lien d'invitation", inline=False)
-                await target_user.send(embed=embed)
+                # MP à l'utilisateur via la file de notifications, attendu au plus DM_DEADLINE secondes
+                embed = KICK_DM.render(guild=ctx.guild.name, reason=reason, moderator=ctx.author.mention)
+                await self.notifier.wait(self.notifier.notify(target_user, embed))
+                
+                # Expulsion
+                await target_user.kick(reason=reason)
+                
+                # Message de confirmation
+                embed = KICK_CONFIRMATION.render(target=target_user, reason=reason, moderator=ctx.author.mention)
+                await ctx.send(embed=embed)
+                
+                # Log de l'action
+                log_moderation_action("KICK", ctx.author, target_user, reason, ctx.guild)
+                
             except discord.Forbidden:
-                pass  # L'utilisateur n'accepte pas les MPs
-            
-            # Expulsion
-            await target_user.kick(reason=reason)
-            
-            # Message de confirmation
-            embed = discord.Embed(
-                title="👢 Utilisateur expulsé",
-                description=f"**{target_user}** a été expulsé du serveur",
-                color=discord.Color.orange(),
-                timestamp=datetime.now()
-            )
-            embed.add_field(name="Raison", value=reason, inline=False)
-            embed.add_field(name="Modérateur", value=ctx.author.mention, inline=True)
-            
-            await ctx.send(embed=embed)
-            
-            # Log de l'action
-            log_moderation_action("KICK", ctx.author, target_user, reason, ctx.guild)
-            
-        except discord.Forbidden:
-            await ctx.send("❌ Je n'ai pas les permissions pour expulser cet utilisateur!")
-        except Exception as e:
-            await ctx.send(f"❌ Erreur lors de l'expulsion: {e}")
\ No newline at end of file
+                await ctx.send("❌ Je n'ai pas les permissions pour expulser cet utilisateur!")
+            except Exception as e:
+                await ctx.send(f"❌ Erreur lors de l'expulsion: {e}")
+        
+        # Une seule expulsion par cible: les commandes simultanées attendent la première
+        await moderation_flights.run(
+            (ctx.guild.id, target_user.id, "KICK"), kick,
+            on_duplicate=lambda: ctx.send(f"⏳ L'expulsion de {target_user} est déjà en cours.")
+        )
\ No newline at end of file
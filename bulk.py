@@ -0,0 +1,201 @@
+"""
+Exécution concurrente des actions de modération en masse
+"""
+
+import asyncio
+import logging
+import random
+import time
+from collections import Counter
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+# Les routes de modification de membres (PATCH /guilds/{id}/members/{id},
+# ban, kick...) partagent un bucket de rate limit par serveur: au-delà de
+# quelques requêtes simultanées, discord.py ne fait que les mettre en attente.
+DEFAULT_CONCURRENCY = 5
+
+# Nombre de membres à partir duquel un message de progression est affiché
+PROGRESS_THRESHOLD = 10
+
+class BulkResult:
+    """Bilan d'une exécution en masse"""
+
+    def __init__(self, label, total):
+        self.label = label
+        self.total = total
+        self.succeeded = 0
+        self.failed = 0
+        self.retries = 0
+        self.errors = Counter()     # type d'erreur -> nombre
+        self.failed_items = []
+        self.failures = []          # (élément, exception) pour chaque échec
+        self.resume_at = 0.0        # fin de la pause des workers de cette exécution (rate limit)
+        self.started_at = time.perf_counter()
+        self.elapsed = 0.0
+
+    @property
+    def done(self):
+        return self.succeeded + self.failed
+
+    @property
+    def throughput(self):
+        """Actions traitées par seconde"""
+        elapsed = self.elapsed or (time.perf_counter() - self.started_at)
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    def progress_text(self):
+        return f"⏳ {self.label}: {self.done}/{self.total} traité(s) ({self.failed} échec(s))"
+
+    def summary_text(self):
+        text = (
+            f"✅ {self.label}: {self.succeeded}/{self.total} réussi(s), {self.failed} échec(s) "
+            f"en {self.elapsed:.1f}s ({self.throughput:.1f}/s)"
+        )
+        if self.errors:
+            text += "\n" + ", ".join(f"{name}: {count}" for name, count in self.errors.most_common())
+        return text
+
+def retryable_items(result):
+    """
+    Éléments en échec qui peuvent être réessayés plus tard
+
+    Tous les échecs le sont (rate limit épuisé, 5xx, délai dépassé, 403),
+    sauf les cibles qui n'existent plus (404: membre parti, ban déjà levé).
+    """
+    return [item for item, error in result.failures if not isinstance(error, discord.NotFound)]
+
+class BulkExecutor:
+    """
+    Exécute une action sur une liste d'éléments avec une concurrence bornée
+
+    Les 429 sont réessayés avec un backoff exponentiel; pendant un rate limit
+    tous les workers de l'exécution se mettent en pause pour ne pas aggraver
+    la situation. La pause est propre à chaque appel de run(): un exécuteur
+    partagé entre serveurs ne bloque pas les autres serveurs (les rate limits
+    des routes de modération sont par serveur). Réutilisable pour les unmute,
+    ban, kick et unban en masse.
+    """
+
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY, max_retries=3, base_delay=1.0,
+                 progress_interval=3.0, progress_threshold=PROGRESS_THRESHOLD):
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.progress_interval = progress_interval
+        self.progress_threshold = progress_threshold
+
+    async def run(self, items, action, channel=None, label="Action en masse"):
+        """
+        Exécute l'action sur tous les éléments
+
+        Args:
+            items: Liste des éléments à traiter (membres, utilisateurs...)
+            action: Fonction async appelée avec chaque élément
+            channel: Salon où afficher la progression (optionnel)
+            label: Nom de l'action pour les messages et les logs
+
+        Returns:
+            BulkResult: Bilan de l'exécution
+        """
+
+        items = list(items)
+        result = BulkResult(label, len(items))
+        if not items:
+            return result
+
+        progress_message = None
+        if channel is not None and len(items) >= self.progress_threshold:
+            try:
+                progress_message = await channel.send(result.progress_text())
+            except discord.HTTPException as e:
+                logger.warning(f"Impossible d'afficher la progression de {label}: {e}")
+
+        iterator = iter(items)
+        workers = [
+            asyncio.create_task(self._worker(iterator, action, result))
+            for _ in range(min(self.concurrency, len(items)))
+        ]
+        updater = None
+        if progress_message is not None:
+            updater = asyncio.create_task(self._update_progress(progress_message, result))
+
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            if updater is not None:
+                updater.cancel()
+
+        result.elapsed = time.perf_counter() - result.started_at
+
+        if progress_message is not None:
+            try:
+                await progress_message.edit(content=result.summary_text())
+            except discord.HTTPException:
+                pass
+
+        logger.info(
+            f"{label}: {result.succeeded} réussi(s), {result.failed} échec(s), {result.retries} réessai(s) "
+            f"en {result.elapsed:.2f}s ({result.throughput:.1f}/s)"
+        )
+        return result
+
+    async def _worker(self, iterator, action, result):
+        for item in iterator:
+            try:
+                await self._run_with_retry(action, item, result)
+                result.succeeded += 1
+            except Exception as e:
+                result.failed += 1
+                result.errors[type(e).__name__] += 1
+                result.failed_items.append(item)
+                result.failures.append((item, e))
+                logger.warning(f"{result.label}: échec pour {item}: {e}")
+
+    async def _run_with_retry(self, action, item, result):
+        attempt = 0
+        while True:
+            await self._wait_for_rate_limit(result)
+            try:
+                return await action(item)
+            except discord.RateLimited as e:
+                error, retry_after = e, e.retry_after
+            except discord.HTTPException as e:
+                if e.status != 429 and e.status < 500:
+                    raise
+                error, retry_after = e, None
+
+            if attempt >= self.max_retries:
+                raise error
+
+            # Backoff exponentiel avec jitter, ou délai imposé par Discord
+            delay = retry_after if retry_after else self.base_delay * (2 ** attempt)
+            delay += random.uniform(0, self.base_delay / 2)
+            self._pause(result, delay)
+            attempt += 1
+            result.retries += 1
+
+    def _pause(self, result, delay):
+        loop = asyncio.get_running_loop()
+        result.resume_at = max(result.resume_at, loop.time() + delay)
+
+    async def _wait_for_rate_limit(self, result):
+        delay = result.resume_at - asyncio.get_running_loop().time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def _update_progress(self, message, result):
+        last_done = -1
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            if result.done == last_done:
+                continue
+            last_done = result.done
+            try:
+                await message.edit(content=result.progress_text())
+            except discord.HTTPException:
+                pass
@@ -0,0 +1,293 @@
+"""
+Casier de modération: chaque sanction enregistrée comme un cas dans SQLite
+
+Les cas sont écrits par log_moderation_action et log_moderation_batch. La
+boucle asyncio ne fait que déposer les lignes dans une file; un thread
+d'écriture les insère par lots (une transaction par lot) dans une base en
+mode WAL, ce qui laisse les lectures de +casier se faire en parallèle.
+L'historique d'un membre (ou d'un modérateur) est servi par les index
+(guild_id, target_id, time) et (guild_id, moderator_id, time): le coût d'une
+page ne dépend pas du nombre total de cas.
+"""
+
+import asyncio
+import atexit
+import logging
+import queue
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+CASES_PATH = Path("data") / "cases.sqlite3"
+# Insertion tous les N cas ou toutes les N secondes
+CASE_BATCH_SIZE = 500
+CASE_FLUSH_INTERVAL = 0.5
+# Cas par page de +casier
+CASES_PER_PAGE = 10
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS cases (
+        id INTEGER PRIMARY KEY,
+        guild_id INTEGER NOT NULL,
+        action TEXT NOT NULL,
+        target_id INTEGER NOT NULL,
+        target_name TEXT,
+        moderator_id INTEGER NOT NULL,
+        moderator_name TEXT,
+        reason TEXT,
+        time REAL NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS cases_target ON cases (guild_id, target_id, time)",
+    "CREATE INDEX IF NOT EXISTS cases_moderator ON cases (guild_id, moderator_id, time)",
+)
+
+_INSERT = ("INSERT INTO cases (guild_id, action, target_id, target_name, moderator_id, moderator_name, reason, time) "
+           "VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+
+_COLUMNS = {"target": "target_id", "moderator": "moderator_id"}
+
+# Mention ou ID d'utilisateur, et numéro de page
+_USER = re.compile(r'^(?:<@!?)?(\d{15,21})>?$')
+_PAGE = re.compile(r'^\d{1,6}$')
+
+ACTION_EMOJIS = {"BAN": "🔨", "UNBAN": "🔓", "KICK": "👢", "MUTE": "🔇", "UNMUTE": "🔊", "FILTRE": "🚫"}
+
+class Case:
+    """Cas lu depuis la base"""
+
+    __slots__ = ('id', 'guild_id', 'action', 'target_id', 'target_name', 'moderator_id', 'moderator_name',
+                 'reason', 'time')
+
+    def __init__(self, row):
+        (self.id, self.guild_id, self.action, self.target_id, self.target_name,
+         self.moderator_id, self.moderator_name, self.reason, self.time) = row
+
+    def __repr__(self):
+        return f"<Case #{self.id} {self.action} {self.target_id} par {self.moderator_id}>"
+
+class CaseStore:
+    """
+    Base des cas de modération
+
+    record() ne fait que mettre les lignes en file (sans attente, même quand
+    le disque est lent); le thread "case-writer" est démarré au premier cas.
+    Les lectures passent par une connexion séparée, à appeler hors de la
+    boucle (asyncio.to_thread).
+
+    Args:
+        path: Fichier SQLite
+        batch_size: Nombre maximal de cas par transaction
+        flush_interval: Délai maximal avant l'insertion d'un cas (secondes)
+    """
+
+    _sentinel = None
+
+    def __init__(self, path=CASES_PATH, batch_size=CASE_BATCH_SIZE, flush_interval=CASE_FLUSH_INTERVAL):
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._reader = None
+        self._read_lock = threading.Lock()
+
+        # Compteurs exposés via stats()
+        self.queued = 0
+        self.written = 0
+        self.errors = 0
+
+    def _connect(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        # En WAL, NORMAL ne perd au pire que les dernières transactions en cas de coupure
+        connection.execute("PRAGMA synchronous=NORMAL")
+        for statement in _SCHEMA:
+            connection.execute(statement)
+        connection.commit()
+        return connection
+
+    # --- Écriture ---------------------------------------------------------------
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="case-writer", daemon=True)
+                self._thread.start()
+                # Les cas encore en file sont écrits à l'arrêt du processus
+                atexit.register(self.close)
+
+    def record(self, action, guild, moderator, targets, reason, at=None):
+        """
+        Enregistre un cas par cible (sans attendre l'écriture)
+
+        Args:
+            action: Type d'action (BAN, UNBAN, KICK, UNMUTE...)
+            guild: Serveur
+            moderator: Auteur de l'action
+            targets: Utilisateurs cibles
+            reason: Raison
+            at: Heure Unix (par défaut: maintenant)
+        """
+
+        if self._thread is None:
+            self.start()
+        at = at if at is not None else time.time()
+        moderator_name = str(moderator)
+        rows = [
+            (guild.id, action, target.id, str(target), moderator.id, moderator_name, reason, at)
+            for target in targets
+        ]
+        self.queued += len(rows)
+        self._queue.put(rows)
+
+    def _run(self):
+        try:
+            connection = self._connect()
+        except sqlite3.Error as e:
+            logger.error(f"❌ Casier: impossible d'ouvrir {self.path}: {e}")
+            return
+
+        running = True
+        while running:
+            rows = []
+            try:
+                batch = self._queue.get(timeout=self.flush_interval)
+                if batch is self._sentinel:
+                    running = False
+                else:
+                    rows.extend(batch)
+                    # Récupérer ce qui est déjà en attente, sans bloquer
+                    while len(rows) < self.batch_size:
+                        batch = self._queue.get_nowait()
+                        if batch is self._sentinel:
+                            running = False
+                            break
+                        rows.extend(batch)
+            except queue.Empty:
+                pass
+
+            if rows:
+                try:
+                    with connection:
+                        connection.executemany(_INSERT, rows)
+                    self.written += len(rows)
+                except sqlite3.Error as e:
+                    self.errors += len(rows)
+                    logger.error(f"ERREUR CASIER: {len(rows)} cas non enregistré(s): {e}")
+        connection.close()
+
+    def close(self):
+        """Écrit les cas en attente et arrête le thread d'écriture"""
+        if self._thread is not None:
+            self._queue.put(self._sentinel)
+            self._thread.join()
+            self._thread = None
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+    # --- Lecture (hors de la boucle) ---------------------------------------------
+
+    def _read(self, query, parameters):
+        with self._read_lock:
+            if self._reader is None:
+                self._reader = self._connect()
+            return self._reader.execute(query, parameters).fetchall()
+
+    def history(self, guild_id, user_id, by="target", page=1, per_page=CASES_PER_PAGE):
+        """
+        Une page de l'historique d'un utilisateur, du plus récent au plus ancien
+
+        Args:
+            guild_id: ID du serveur
+            user_id: ID de l'utilisateur
+            by: "target" (sanctions reçues) ou "moderator" (sanctions données)
+            page: Numéro de page (à partir de 1)
+            per_page: Cas par page
+
+        Returns:
+            tuple: (liste de Case, nombre total de cas)
+        """
+
+        column = _COLUMNS[by]
+        total = self._read(f"SELECT COUNT(*) FROM cases WHERE guild_id = ? AND {column} = ?",
+                           (guild_id, user_id))[0][0]
+        rows = self._read(
+            f"SELECT * FROM cases WHERE guild_id = ? AND {column} = ? "
+            f"ORDER BY time DESC, id DESC LIMIT ? OFFSET ?",
+            (guild_id, user_id, per_page, (max(page, 1) - 1) * per_page))
+        return [Case(row) for row in rows], total
+
+    def stats(self):
+        """
+        Statistiques du casier
+
+        Returns:
+            dict: Cas mis en file, écrits, en attente et en erreur
+        """
+
+        return {
+            "queued": self.queued,
+            "written": self.written,
+            "pending": self.queued - self.written - self.errors,
+            "errors": self.errors,
+        }
+
+# Casier partagé par les deux bots (alimenté par utils.logger)
+case_store = CaseStore()
+
+def history_embed(user_id, cases, total, by, page, per_page=CASES_PER_PAGE):
+    """Embed d'une page d'historique"""
+    pages = max((total + per_page - 1) // per_page, 1)
+    title = "📁 Casier" if by == "target" else "📁 Sanctions données"
+    embed = discord.Embed(title=title, description=f"<@{user_id}> ({user_id}) - {total} cas", color=0x5865F2)
+    for case in cases:
+        emoji = ACTION_EMOJIS.get(case.action, "🔧")
+        who = f"Par <@{case.moderator_id}>" if by == "target" else f"Cible: <@{case.target_id}>"
+        reason = case.reason if len(case.reason or '') <= 200 else case.reason[:197] + "..."
+        embed.add_field(
+            name=f"{emoji} #{case.id} · {case.action} · <t:{int(case.time)}:f>",
+            value=f"{who}\n{reason or 'Aucune raison'}",
+            inline=False,
+        )
+    embed.set_footer(text=f"Page {min(page, pages)}/{pages}")
+    return embed
+
+async def run_case_command(ctx, args):
+    """
+    Traite la commande +casier
+
+    Usage: `+casier @utilisateur [page]` (sanctions reçues) ou
+    `+casier par @modérateur [page]` (sanctions données)
+    """
+
+    tokens = (args or '').split()
+    by = "target"
+    if tokens and tokens[0].lower() == "par":
+        by = "moderator"
+        tokens = tokens[1:]
+    match = _USER.match(tokens[0]) if tokens else None
+    if match is None:
+        await ctx.send("❌ Usage: `+casier @utilisateur [page]` ou `+casier par @modérateur [page]`")
+        return
+    user_id = int(match.group(1))
+    page = int(tokens[1]) if len(tokens) > 1 and _PAGE.match(tokens[1]) else 1
+
+    start = time.perf_counter()
+    cases, total = await asyncio.to_thread(case_store.history, ctx.guild.id, user_id, by, page)
+    logger.info(f"CASIER {user_id} ({by}) page {page}: {len(cases)}/{total} cas en "
+                f"{(time.perf_counter() - start) * 1000:.1f} ms")
+    if not total:
+        await ctx.send(f"📁 Aucun cas pour <@{user_id}>.")
+        return
+    await ctx.send(embed=history_embed(user_id, cases, total, by, page))
@@ -0,0 +1,69 @@
+"""
+Filtre rapide des messages de commande, partagé par les deux bots
+"""
+
+import re
+
+class CommandDispatcher:
+    """
+    Reconnaît les messages qui invoquent une commande du bot
+
+    Construit une fois à partir des commandes enregistrées: les noms (et
+    alias) sont compilés en une seule expression ancrée juste après le
+    préfixe, ce qui évite de découper le message entier. Les messages sans
+    préfixe sont rejetés en temps constant, avant tout parsing de discord.py.
+    Le préfixe par défaut peut être remplacé à chaque appel (préfixe propre à
+    un serveur) sans recompiler l'expression.
+    """
+
+    def __init__(self, prefix='+'):
+        self.prefix = prefix
+        self.names = frozenset()
+        self._pattern = None
+
+    def update(self, names):
+        """
+        (Re)compile le filtre à partir des noms de commandes
+
+        Args:
+            names: Noms et alias des commandes valides
+        """
+
+        self.names = frozenset(name.lower() for name in names)
+        if not self.names:
+            self._pattern = None
+            return
+
+        # Les noms les plus longs d'abord pour que "+unbanall" ne s'arrête pas à "unban"
+        alternation = '|'.join(re.escape(name) for name in sorted(self.names, key=len, reverse=True))
+        self._pattern = re.compile(rf'({alternation})(?=\s|$)', re.IGNORECASE)
+
+    def sync(self, bot):
+        """Recompile le filtre à partir des commandes enregistrées sur le bot"""
+        self.update(bot.all_commands)
+
+    def is_prefixed(self, content, prefix=None):
+        """True si le message commence par le préfixe"""
+        return content.startswith(prefix or self.prefix)
+
+    def match(self, content, prefix=None):
+        """
+        Extrait le nom de la commande invoquée
+
+        Args:
+            content: Contenu du message
+            prefix: Préfixe du serveur (par défaut: celui du dispatcher)
+
+        Returns:
+            str: Nom de la commande (en minuscules), ou None si le message
+            n'invoque pas une commande du bot (y compris un "+" seul)
+        """
+
+        prefix = prefix or self.prefix
+        if self._pattern is None or not content.startswith(prefix):
+            return None
+
+        match = self._pattern.match(content, len(prefix))
+        if match is None:
+            return None
+        return match.group(1).lower()
@@ -0,0 +1,270 @@
+"""
+Embeds pré-construits: aide mise en cache et modèles des messages de modération
+"""
+
+import logging
+from string import Formatter
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOCALE = "fr"
+
+class FrozenEmbed(discord.Embed):
+    """
+    Embed dont le payload JSON est calculé une seule fois
+
+    discord.py appelle to_dict() à chaque envoi; pour un embed construit à
+    partir d'un payload connu, ce payload est réutilisé tel quel. Toute
+    réaffectation d'attribut (set_footer, title = ...) invalide le payload.
+    """
+
+    __slots__ = ('_payload',)
+
+    def __setattr__(self, name, value):
+        if name != '_payload':
+            object.__setattr__(self, '_payload', None)
+        object.__setattr__(self, name, value)
+
+    @classmethod
+    def from_payload(cls, payload, timestamp=None):
+        """
+        Construit l'embed à partir d'un payload au format de l'API
+
+        Évite from_dict(): les attributs sont posés directement, sans repasser
+        par __setattr__ ni recréer la couleur.
+
+        Args:
+            payload: Dictionnaire de l'embed (sans horodatage)
+            timestamp: datetime aware à ajouter (optionnel)
+        """
+
+        embed = cls.__new__(cls)
+        setattr_ = object.__setattr__
+        setattr_(embed, 'title', payload.get('title'))
+        setattr_(embed, 'type', payload.get('type'))
+        setattr_(embed, 'description', payload.get('description'))
+        setattr_(embed, 'url', payload.get('url'))
+        setattr_(embed, '_flags', 0)
+        color = payload.get('color')
+        if color is not None:
+            setattr_(embed, '_colour', _colour(color))
+        for attr in ('fields', 'footer'):
+            value = payload.get(attr)
+            if value is not None:
+                setattr_(embed, '_' + attr, value)
+        if timestamp is not None:
+            setattr_(embed, '_timestamp', timestamp)
+            payload['timestamp'] = timestamp.isoformat()
+        setattr_(embed, '_payload', payload)
+        return embed
+
+    def to_dict(self):
+        payload = getattr(self, '_payload', None)
+        if payload is None:
+            payload = self._payload = super().to_dict()
+        return payload
+
+_colours = {}
+
+def _colour(value):
+    """discord.Colour partagé par valeur (les couleurs des modèles sont en nombre fini)"""
+    colour = _colours.get(value)
+    if colour is None:
+        colour = _colours[value] = discord.Colour(value)
+    return colour
+
+def _compile(text):
+    """
+    Précompile un texte à trous ("... **{guild}**") en une fonction values -> str
+
+    Les textes sans variable sont rendus tels quels et un texte réduit à une
+    seule variable est lu directement dans le dictionnaire, sans str.format.
+    """
+
+    parsed = list(Formatter().parse(text))
+    if all(field is None for _, field, _, _ in parsed):
+        static = ''.join(literal for literal, _, _, _ in parsed)
+        return lambda values: static
+    if len(parsed) == 1:
+        literal, field, spec, conversion = parsed[0]
+        if not literal and field and not spec and not conversion:
+            return lambda values: str(values[field])
+    return lambda values: text.format_map(values)
+
+class EmbedTemplate:
+    """
+    Modèle d'embed dont seuls les champs dynamiques sont remplis à l'envoi
+
+    Le titre, la description et la valeur des champs sont des textes à trous
+    au format str.format; les couleurs, noms de champs et options inline sont
+    résolus une fois à la création du modèle.
+    """
+
+    def __init__(self, title, description=None, color=None, fields=(), footer=None, timestamp=False):
+        """
+        Args:
+            title: Titre (texte à trous)
+            description: Description (texte à trous, optionnelle)
+            color: discord.Color ou entier
+            fields: Liste de (nom, valeur, inline); la valeur est un texte à trous
+            footer: Texte du pied de page (texte à trous, optionnel)
+            timestamp: Ajouter l'heure d'envoi
+        """
+
+        self._title = _compile(title)
+        self._description = _compile(description) if description else None
+        self._color = color.value if isinstance(color, discord.Colour) else color
+        self._fields = [(name, _compile(value), inline) for name, value, inline in fields]
+        self._footer = _compile(footer) if footer else None
+        self.timestamp = timestamp
+
+    def payload(self, **values):
+        """Payload de l'embed au format de l'API, sans horodatage"""
+
+        payload = {'type': 'rich', 'title': self._title(values)}
+        if self._description is not None:
+            payload['description'] = self._description(values)
+        if self._color is not None:
+            payload['color'] = self._color
+        if self._fields:
+            # Dictionnaires neufs à chaque rendu: un embed ne doit pas partager ses champs
+            payload['fields'] = [
+                {'name': name, 'value': value(values), 'inline': inline}
+                for name, value, inline in self._fields
+            ]
+        if self._footer is not None:
+            payload['footer'] = {'text': self._footer(values)}
+        return payload
+
+    def render(self, **values):
+        """
+        Construit l'embed avec les valeurs données
+
+        Returns:
+            FrozenEmbed: Embed prêt à être envoyé
+        """
+
+        timestamp = discord.utils.utcnow() if self.timestamp else None
+        return FrozenEmbed.from_payload(self.payload(**values), timestamp)
+
+# --- Messages de modération --------------------------------------------------
+
+KICK_NOTE = "Vous pouvez rejoindre le serveur avec un nouveau lien d'invitation"
+
+BAN_DM = EmbedTemplate(
+    title="🔨 Vous avez été banni",
+    description="Vous avez été banni du serveur **{guild}**",
+    color=discord.Color.red(),
+    fields=[("Raison", "{reason}", False), ("Modérateur", "{moderator}", True)],
+)
+
+KICK_DM = EmbedTemplate(
+    title="👢 Vous avez été expulsé",
+    description="Vous avez été expulsé du serveur **{guild}**",
+    color=discord.Color.orange(),
+    fields=[("Raison", "{reason}", False), ("Modérateur", "{moderator}", True), ("Note", KICK_NOTE, False)],
+)
+
+BAN_CONFIRMATION = EmbedTemplate(
+    title="🔨 Utilisateur banni",
+    description="**{target}** a été banni du serveur",
+    color=discord.Color.red(),
+    fields=[("Raison", "{reason}", False), ("Modérateur", "{moderator}", True)],
+    timestamp=True,
+)
+
+KICK_CONFIRMATION = EmbedTemplate(
+    title="👢 Utilisateur expulsé",
+    description="**{target}** a été expulsé du serveur",
+    color=discord.Color.orange(),
+    fields=[("Raison", "{reason}", False), ("Modérateur", "{moderator}", True)],
+    timestamp=True,
+)
+
+UNBAN_CONFIRMATION = EmbedTemplate(
+    title="🔓 Utilisateur débanni",
+    description="**{target}** a été débanni du serveur",
+    color=discord.Color.green(),
+    fields=[("Modérateur", "{moderator}", True)],
+    timestamp=True,
+)
+
+# Modèles par action, pour les MPs et les confirmations
+DM_TEMPLATES = {"BAN": BAN_DM, "KICK": KICK_DM}
+CONFIRMATION_TEMPLATES = {"BAN": BAN_CONFIRMATION, "KICK": KICK_CONFIRMATION, "UNBAN": UNBAN_CONFIRMATION}
+
+# --- Aide ---------------------------------------------------------------------
+
+# Contenu des embeds d'aide, par langue puis par bot
+HELP_PAGES = {
+    "fr": {
+        "moderation": {
+            "title": "🛡️ Bot de Modération - Aide",
+            "description": "Liste des commandes disponibles",
+            "color": discord.Color.blue().value,
+            "fields": [
+                ("🔨 +ban", "Bannir un ou plusieurs utilisateurs\n**Usage:** `+ban @utilisateur [@autre ...] [durée] [raison]`\n**Ou:** Répondre à un message avec `+ban [durée] [raison]`\n**Ou:** Joindre un fichier .txt d'IDs\n**Durée:** ex. `7d`, `12h`, `1j12h` (ban temporaire)"),
+                ("🔓 +unban", "Débannir un utilisateur\n**Usage:** `+unban @utilisateur`\n**Ou:** `+unban nom_utilisateur#discriminator`"),
+                ("👢 +kick", "Expulser un ou plusieurs utilisateurs\n**Usage:** `+kick @utilisateur [@autre ...] [raison]`\n**Ou:** Répondre à un message avec `+kick [raison]`"),
+                ("📁 +casier", "Historique des sanctions d'un utilisateur\n**Usage:** `+casier @utilisateur [page]`\n**Ou:** `+casier par @modérateur [page]` (sanctions données)"),
+                ("🚫 +filtre", "Gérer les termes interdits du serveur\n**Usage:** `+filtre ajouter mot, *expression*, préfixe*`\n**Ou:** `+filtre retirer <termes>`, `+filtre liste`, `+filtre test <message>`"),
+                ("⚙️ +config", "Paramètres du serveur (sans argument: affichage)\n**Usage:** `+config prefixe <préfixe>`, `+config muted|base <@rôle>`, `+config logs <#salon>`\n**Ou:** `+config seuil <nom> <valeur>`; `défaut` rétablit la valeur par défaut"),
+                ("ℹ️ Permissions requises", "• **Ban/Unban:** Permission `Bannir des membres`\n• **Kick:** Permission `Expulser des membres`\n• **Filtre:** Permission `Gérer les messages`\n• **Config:** Permission `Gérer le serveur`"),
+            ],
+            "footer": "Bot de Modération",
+        },
+        "simple": {
+            "title": "🛡️ Commandes de Modération",
+            "color": 0x00ff00,
+            "fields": [
+                ("+ping", "Teste la connexion"),
+                ("+test", "Test général du bot"),
+                ("+ban @utilisateur [@autre ...] [durée] [raison]", "Bannir un ou plusieurs utilisateurs (mentions, IDs, nom, fichier d'IDs ou réponse), temporairement avec une durée (ex: `7d`)"),
+                ("+unban <ID_utilisateur> [raison]", "Débannir un utilisateur avec son ID"),
+                ("+kick @utilisateur [@autre ...] [raison]", "Expulser un ou plusieurs utilisateurs (mentions, IDs, nom, fichier d'IDs ou réponse)"),
+                ("+mute @utilisateur [durée] [raison]", "Mute avec le rôle Muted (rôles sauvegardés), levé automatiquement après la durée (ex: `30min`)"),
+                ("+unmute @utilisateur [raison]", "Démute et restaure rôles ou attribue rôle de base"),
+                ("+casier @utilisateur [page]", "Historique des sanctions (ou `+casier par @modérateur`)"),
+                ("+filtre ajouter|retirer <termes> | liste | test <message>", "Gérer les termes interdits (mot, préfixe*, *partout*)"),
+                ("+config [prefixe|muted|base|logs|seuil] [valeur]", "Paramètres du serveur: préfixe, rôles du mute, salon de logs, seuils anti-spam/anti-raid"),
+                ("+commandes", "Affiche cette liste de commandes"),
+            ],
+        },
+    },
+}
+
+_help_cache = {}
+
+def help_embed(kind, locale=DEFAULT_LOCALE, footer_icon=None):
+    """
+    Embed d'aide, construit une seule fois par processus, langue et icône
+
+    Args:
+        kind: "moderation" (bot.py) ou "simple" (simple_bot.py)
+        locale: Langue (repli sur DEFAULT_LOCALE si elle n'est pas traduite)
+        footer_icon: URL de l'icône du pied de page (avatar du bot)
+
+    Returns:
+        FrozenEmbed: Embed partagé, à ne pas modifier
+    """
+
+    key = (kind, locale, footer_icon)
+    embed = _help_cache.get(key)
+    if embed is not None:
+        return embed
+
+    page = HELP_PAGES.get(locale, HELP_PAGES[DEFAULT_LOCALE])[kind]
+    payload = {'type': 'rich', 'title': page["title"], 'color': page["color"]}
+    if "description" in page:
+        payload['description'] = page["description"]
+    payload['fields'] = [{'name': name, 'value': value, 'inline': False} for name, value in page["fields"]]
+    if "footer" in page:
+        payload['footer'] = {'text': page["footer"]}
+        if footer_icon:
+            payload['footer']['icon_url'] = footer_icon
+
+    embed = _help_cache[key] = FrozenEmbed.from_payload(payload)
+    logger.debug(f"Embed d'aide construit: {kind} ({locale})")
+    return embed
@@ -0,0 +1,359 @@
+"""
+Paramètres par serveur: préfixe, rôles du mute, salon de logs et seuils
+
+Les valeurs modifiées avec +config sont gardées dans un seul fichier JSON
+(data/guild_settings.json), chargé au démarrage. Pour chaque serveur, une
+vue résolue est gardée en cache: les rôles "Muted" et de base y sont des
+IDs, configurés ou trouvés une seule fois par leur nom par défaut. Le chemin
+chaud (préfixe des commandes, mute, unmute) ne fait que des lectures de dict
+et des guild.get_role(); la vue est recalculée après une création,
+modification ou suppression de rôle, et après chaque +config.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+from pathlib import Path
+
+import discord
+
+from utils.hierarchy import role_rank
+
+logger = logging.getLogger(__name__)
+
+SETTINGS_PATH = Path("data") / "guild_settings.json"
+DEFAULT_PREFIX = '+'
+MAX_PREFIX_LENGTH = 5
+# Rôles cherchés par nom quand le serveur n'en a pas configuré (ou que le rôle configuré a été supprimé)
+DEFAULT_MUTED_ROLE = "Muted"
+DEFAULT_BASE_ROLE = "Membre"
+
+# Seuils réglables par serveur: nom -> (détecteur, paramètre, description)
+THRESHOLDS = {
+    "spam_messages": ("antispam", "message_limit", "Messages sur 5 s avant sanction anti-spam"),
+    "spam_doublons": ("antispam", "duplicate_limit", "Messages identiques avant sanction anti-spam"),
+    "spam_mentions": ("antispam", "mention_limit", "Mentions avant sanction anti-spam"),
+    "raid_arrivees": ("antiraid", "join_limit", "Arrivées en 10 s déclenchant l'anti-raid"),
+    "raid_suspects": ("antiraid", "suspicious_limit", "Arrivées suspectes en 10 s déclenchant l'anti-raid"),
+}
+MAX_THRESHOLD = 1000
+
+# Mention ou ID de rôle / de salon
+_ROLE = re.compile(r'^(?:<@&)?(\d{15,21})>?$')
+_CHANNEL = re.compile(r'^(?:<#)?(\d{15,21})>?$')
+_RESET = ("défaut", "defaut", "aucun", "none")
+
+class ResolvedSettings:
+    """Paramètres effectifs d'un serveur, rôles et salon par ID"""
+
+    __slots__ = ('prefix', 'muted_role_id', 'base_role_id', 'log_channel_id')
+
+    def __init__(self, prefix, muted_role_id, base_role_id, log_channel_id):
+        self.prefix = prefix
+        self.muted_role_id = muted_role_id
+        self.base_role_id = base_role_id
+        self.log_channel_id = log_channel_id
+
+    def muted_role(self, guild):
+        return guild.get_role(self.muted_role_id) if self.muted_role_id else None
+
+    def base_role(self, guild):
+        return guild.get_role(self.base_role_id) if self.base_role_id else None
+
+    def log_channel(self, guild):
+        return guild.get_channel(self.log_channel_id) if self.log_channel_id else None
+
+class GuildSettingsStore:
+    """
+    Paramètres configurés par serveur et cache des paramètres résolus
+
+    Seules les valeurs modifiées sont persistées; un serveur sans
+    configuration utilise les valeurs par défaut.
+
+    Args:
+        path: Fichier JSON des paramètres
+    """
+
+    def __init__(self, path=SETTINGS_PATH):
+        self.path = Path(path)
+        self._configured = {}       # guild_id -> valeurs configurées (persistées)
+        self._prefixes = {}         # guild_id -> préfixe, pour les serveurs qui l'ont changé
+        self._resolved = {}         # guild_id -> ResolvedSettings
+        self._threshold_listeners = []
+        self._save_lock = asyncio.Lock()
+
+        # Compteurs exposés via stats()
+        self.hits = 0
+        self.resolutions = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._configured)
+
+    # --- Persistance ------------------------------------------------------------
+
+    def load(self):
+        """Charge les paramètres depuis le disque (à appeler hors de la boucle)"""
+
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"❌ Paramètres des serveurs illisibles ({self.path}): {e}")
+            return
+
+        self._configured = {int(guild_id): values for guild_id, values in data.items()}
+        self._prefixes = {guild_id: values["prefix"] for guild_id, values in self._configured.items()
+                          if "prefix" in values}
+        self._resolved.clear()
+        logger.info(f"Paramètres chargés pour {len(self._configured)} serveur(s)")
+
+    def _save(self, snapshot):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self.path.with_suffix('.tmp')
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(temporary, self.path)
+
+    async def save(self):
+        """Écrit tous les paramètres (hors de la boucle)"""
+        async with self._save_lock:
+            snapshot = {str(guild_id): dict(values) for guild_id, values in self._configured.items()}
+            await asyncio.to_thread(self._save, snapshot)
+
+    # --- Lecture (chemin chaud) ---------------------------------------------------
+
+    def prefix(self, guild):
+        """Préfixe des commandes d'un serveur (le préfixe par défaut en message privé)"""
+        if guild is None:
+            return DEFAULT_PREFIX
+        return self._prefixes.get(guild.id, DEFAULT_PREFIX)
+
+    def command_prefix(self, bot, message):
+        """À passer comme command_prefix à commands.Bot"""
+        return self.prefix(message.guild)
+
+    def get(self, guild):
+        """
+        Paramètres résolus d'un serveur (calculés une fois, puis gardés jusqu'à l'invalidation)
+
+        Returns:
+            ResolvedSettings: Préfixe, IDs des rôles du mute et du salon de logs
+        """
+
+        settings = self._resolved.get(guild.id)
+        if settings is not None:
+            self.hits += 1
+            return settings
+
+        self.resolutions += 1
+        configured = self._configured.get(guild.id, {})
+        settings = self._resolved[guild.id] = ResolvedSettings(
+            configured.get("prefix", DEFAULT_PREFIX),
+            self._resolve_role(guild, configured.get("muted_role_id"), DEFAULT_MUTED_ROLE),
+            self._resolve_role(guild, configured.get("base_role_id"), DEFAULT_BASE_ROLE),
+            configured.get("log_channel_id"),
+        )
+        return settings
+
+    @staticmethod
+    def _resolve_role(guild, role_id, default_name):
+        if role_id is not None and guild.get_role(role_id) is not None:
+            return role_id
+        # Une seule recherche par nom par résolution (pas à chaque commande)
+        role = discord.utils.get(guild.roles, name=default_name)
+        return role.id if role is not None else None
+
+    def log_channel_id(self, guild_id):
+        """Salon de logs configuré, sans résolution des rôles"""
+        return self._configured.get(guild_id, {}).get("log_channel_id")
+
+    def limits(self, guild_id, detector):
+        """
+        Seuils configurés pour un détecteur ("antispam" ou "antiraid")
+
+        Returns:
+            dict: Paramètre du détecteur -> valeur (vide sans configuration)
+        """
+
+        thresholds = self._configured.get(guild_id, {}).get("thresholds")
+        if not thresholds:
+            return {}
+        return {THRESHOLDS[name][1]: value for name, value in thresholds.items()
+                if name in THRESHOLDS and THRESHOLDS[name][0] == detector}
+
+    # --- Invalidation et modifications -----------------------------------------
+
+    def invalidate(self, guild_id):
+        """Oublie les paramètres résolus d'un serveur (rôles créés, modifiés ou supprimés)"""
+        if self._resolved.pop(guild_id, None) is not None:
+            self.invalidations += 1
+
+    def discard_guild(self, guild_id):
+        self._resolved.pop(guild_id, None)
+
+    def add_threshold_listener(self, listener):
+        """Fonction appelée avec l'ID du serveur quand un de ses seuils change"""
+        self._threshold_listeners.append(listener)
+
+    async def update(self, guild_id, key, value):
+        """
+        Modifie un paramètre d'un serveur et l'écrit sur disque
+
+        Args:
+            guild_id: ID du serveur
+            key: "prefix", "muted_role_id", "base_role_id", "log_channel_id" ou un nom de THRESHOLDS
+            value: Nouvelle valeur, ou None pour revenir à la valeur par défaut
+        """
+
+        configured = self._configured.setdefault(guild_id, {})
+        if key in THRESHOLDS:
+            thresholds = configured.setdefault("thresholds", {})
+            if value is None:
+                thresholds.pop(key, None)
+            else:
+                thresholds[key] = value
+            if not thresholds:
+                del configured["thresholds"]
+        elif value is None:
+            configured.pop(key, None)
+        else:
+            configured[key] = value
+
+        if key == "prefix":
+            if value is None:
+                self._prefixes.pop(guild_id, None)
+            else:
+                self._prefixes[guild_id] = value
+        if not configured:
+            del self._configured[guild_id]
+
+        self.invalidate(guild_id)
+        if key in THRESHOLDS:
+            for listener in self._threshold_listeners:
+                listener(guild_id)
+        await self.save()
+
+    def configured(self, guild_id):
+        """Valeurs configurées d'un serveur (ne pas modifier)"""
+        return self._configured.get(guild_id, {})
+
+    def stats(self):
+        """
+        Statistiques des paramètres
+
+        Returns:
+            dict: Serveurs configurés, en cache, lectures servies par le cache et résolutions
+        """
+
+        return {
+            "configured": len(self._configured),
+            "cached": len(self._resolved),
+            "hits": self.hits,
+            "resolutions": self.resolutions,
+            "invalidations": self.invalidations,
+        }
+
+# Paramètres partagés par les deux bots
+guild_settings = GuildSettingsStore()
+
+def settings_embed(guild):
+    """Embed des paramètres effectifs d'un serveur"""
+    settings = guild_settings.get(guild)
+    configured = guild_settings.configured(guild.id)
+    muted_role = settings.muted_role(guild)
+    base_role = settings.base_role(guild)
+    channel = settings.log_channel(guild)
+
+    def origin(key):
+        return "" if key in configured else " (défaut)"
+
+    embed = discord.Embed(title="⚙️ Configuration du serveur", color=0x5865F2)
+    embed.add_field(name="Préfixe", value=f"`{settings.prefix}`{origin('prefix')}", inline=True)
+    embed.add_field(name="Rôle Muted", value=f"{muted_role.mention if muted_role else 'Aucun'}{origin('muted_role_id')}",
+                    inline=True)
+    embed.add_field(name="Rôle de base", value=f"{base_role.mention if base_role else 'Aucun'}{origin('base_role_id')}",
+                    inline=True)
+    embed.add_field(name="Salon de logs", value=channel.mention if channel else "Aucun", inline=True)
+    thresholds = configured.get("thresholds", {})
+    lines = [f"`{name}`: {thresholds.get(name, 'défaut')} - {description}"
+             for name, (_, _, description) in THRESHOLDS.items()]
+    embed.add_field(name="Seuils", value='\n'.join(lines), inline=False)
+    embed.set_footer(text=f"{settings.prefix}config <prefixe|muted|base|logs|seuil> <valeur|défaut>")
+    return embed
+
+async def run_config_command(ctx, key, value):
+    """
+    Traite la commande +config
+
+    Usage: `+config` (affichage), `+config prefixe <préfixe>`,
+    `+config muted <@rôle|ID>`, `+config base <@rôle|ID>`,
+    `+config logs <#salon|ID>`, `+config seuil <nom> <valeur>`;
+    `défaut` (ou `aucun`) remet la valeur par défaut.
+    """
+
+    guild = ctx.guild
+    if key is None:
+        await ctx.send(embed=settings_embed(guild))
+        return
+
+    key = key.lower()
+    value = (value or '').strip()
+    reset = value.lower() in _RESET
+
+    if key in ("prefixe", "préfixe", "prefix"):
+        if not value or (not reset and (len(value) > MAX_PREFIX_LENGTH or any(c.isspace() for c in value))):
+            await ctx.send(f"❌ Préfixe invalide (au plus {MAX_PREFIX_LENGTH} caractères, sans espace).")
+            return
+        new = None if reset or value == DEFAULT_PREFIX else value
+        await guild_settings.update(guild.id, "prefix", new)
+        await ctx.send(f"✅ Préfixe des commandes: `{new or DEFAULT_PREFIX}`")
+
+    elif key in ("muted", "base"):
+        setting = "muted_role_id" if key == "muted" else "base_role_id"
+        match = _ROLE.match(value)
+        role = guild.get_role(int(match.group(1))) if match else None
+        if not reset and role is None:
+            await ctx.send(f"❌ Usage: `+config {key} <@rôle|ID|défaut>`")
+            return
+        if role is not None and role_rank(role) >= role_rank(guild.me.top_role):
+            await ctx.send("❌ Ce rôle est au-dessus du mien: je ne pourrais pas l'attribuer.")
+            return
+        await guild_settings.update(guild.id, setting, None if reset else role.id)
+        default = DEFAULT_MUTED_ROLE if key == "muted" else DEFAULT_BASE_ROLE
+        await ctx.send(f"✅ Rôle {key}: {role.mention if role else f'rôle nommé {default} (défaut)'}")
+
+    elif key in ("logs", "log"):
+        match = _CHANNEL.match(value)
+        channel = guild.get_channel(int(match.group(1))) if match else None
+        if not reset and not isinstance(channel, discord.TextChannel):
+            await ctx.send("❌ Usage: `+config logs <#salon|ID|aucun>`")
+            return
+        await guild_settings.update(guild.id, "log_channel_id", None if reset else channel.id)
+        await ctx.send(f"✅ Salon de logs: {channel.mention if channel else 'aucun'}")
+
+    elif key == "seuil":
+        parts = value.split()
+        name = parts[0].lower() if parts else None
+        if name not in THRESHOLDS or len(parts) != 2:
+            await ctx.send(f"❌ Usage: `+config seuil <nom> <valeur|défaut>` - seuils: {', '.join(THRESHOLDS)}")
+            return
+        if parts[1].lower() in _RESET:
+            threshold = None
+        elif parts[1].isdigit() and 1 <= int(parts[1]) <= MAX_THRESHOLD:
+            threshold = int(parts[1])
+        else:
+            await ctx.send(f"❌ Le seuil doit être un entier entre 1 et {MAX_THRESHOLD}.")
+            return
+        await guild_settings.update(guild.id, name, threshold)
+        await ctx.send(f"✅ Seuil `{name}`: {threshold if threshold is not None else 'défaut'}")
+
+    else:
+        await ctx.send("❌ Paramètre inconnu. Paramètres: `prefixe`, `muted`, `base`, `logs`, `seuil`")
+        return
+
+    logger.info(f"CONFIG {guild}: {key} = {value} par {ctx.author}")
@@ -0,0 +1,192 @@
+"""
+Instantané par serveur de la hiérarchie des rôles et des permissions
+"""
+
+import logging
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+# Raisons de refus d'une action de modération
+NOT_MEMBER = "not_member"
+SELF = "self"
+BOT = "bot"
+AUTHOR_RANK = "author_rank"
+BOT_RANK = "bot_rank"
+OWNER = "owner"
+
+ALL_PERMISSIONS = discord.Permissions.all().value
+ADMINISTRATOR = discord.Permissions(administrator=True).value
+
+def role_rank(role):
+    """
+    Rang entier d'un rôle, dans le même ordre que les comparaisons de discord.Role
+
+    À position égale, le rôle le plus ancien (ID le plus petit) est au-dessus.
+    """
+    return (role.position << 64) - role.id
+
+class GuildHierarchy:
+    """
+    Rangs et permissions d'un serveur sous forme d'entiers
+
+    Les rôles sont lus une seule fois; le rang du rôle le plus haut et le
+    champ de bits des permissions de chaque membre sont calculés à la première
+    demande puis gardés jusqu'à l'invalidation du membre ou du serveur.
+    """
+
+    def __init__(self, guild, cache_members=True):
+        self.guild_id = guild.id
+        self.cache_members = cache_members
+        self.owner_id = guild.owner_id
+        self.role_ranks = {}
+        self.role_permissions = {}
+        for role in guild.roles:
+            self.role_ranks[role.id] = role_rank(role)
+            self.role_permissions[role.id] = role.permissions.value
+
+        default_role = guild.default_role
+        self.default_rank = self.role_ranks.get(default_role.id, 0)
+        self.default_permissions = self.role_permissions.get(default_role.id, 0)
+        self._members = {}  # member_id -> (rang du rôle le plus haut, permissions)
+
+    def member_info(self, member):
+        """
+        Rang et permissions d'un membre
+
+        Returns:
+            tuple: (rang du rôle le plus haut, champ de bits des permissions)
+        """
+
+        info = self._members.get(member.id)
+        if info is not None:
+            return info
+
+        top_rank = self.default_rank
+        permissions = self.default_permissions
+        ranks = self.role_ranks
+        role_permissions = self.role_permissions
+        for role in member.roles:
+            rank = ranks.get(role.id)
+            if rank is None:
+                continue
+            if rank > top_rank:
+                top_rank = rank
+            permissions |= role_permissions[role.id]
+
+        if member.id == self.owner_id or permissions & ADMINISTRATOR:
+            permissions = ALL_PERMISSIONS
+
+        info = (top_rank, permissions)
+        if self.cache_members:
+            self._members[member.id] = info
+        return info
+
+    def forget_member(self, member_id):
+        self._members.pop(member_id, None)
+
+class HierarchyCache:
+    """Instantanés de hiérarchie par serveur, invalidés par les events de rôles et de membres"""
+
+    def __init__(self):
+        self._guilds = {}
+        # Mémoriser les rangs des membres (désactivé quand discord.py ne garde pas
+        # les membres en cache: leurs changements de rôles ne sont pas signalés)
+        self.cache_members = True
+
+    def get(self, guild):
+        """Retourne l'instantané du serveur, en le construisant si besoin"""
+        snapshot = self._guilds.get(guild.id)
+        if snapshot is None:
+            snapshot = self._guilds[guild.id] = GuildHierarchy(guild, self.cache_members)
+        return snapshot
+
+    def invalidate_guild(self, guild_id):
+        """À appeler quand un rôle est créé/modifié/supprimé ou que le propriétaire change"""
+        self._guilds.pop(guild_id, None)
+
+    def invalidate_member(self, guild_id, member_id):
+        """À appeler quand les rôles d'un membre changent ou qu'il quitte le serveur"""
+        snapshot = self._guilds.get(guild_id)
+        if snapshot is not None:
+            snapshot.forget_member(member_id)
+
+    def has_permission(self, member, permission):
+        """
+        Vérifie si un membre a une permission
+
+        Args:
+            member: Membre à vérifier
+            permission: Nom de la permission ("ban_members", "kick_members"...)
+
+        Returns:
+            bool: True si le membre a la permission
+        """
+
+        bit = discord.Permissions.VALID_FLAGS.get(permission)
+        if bit is None:
+            return False
+        return bool(self.get(member.guild).member_info(member)[1] & bit)
+
+    def check(self, guild, actor, target, bot_id, require_member=False):
+        """
+        Vérifie si `actor` peut modérer `target`
+
+        Args:
+            guild: Serveur de l'action
+            actor: Membre qui effectue l'action
+            target: Utilisateur ou membre cible
+            bot_id: ID du bot
+            require_member: Refuser les cibles qui ne sont pas membres du serveur
+
+        Returns:
+            str: Raison du refus (constante du module), ou None si l'action est autorisée
+        """
+
+        allowed, rejected = self.filter_targets(guild, actor, (target,), bot_id, require_member)
+        return rejected[0][1] if rejected else None
+
+    def filter_targets(self, guild, actor, targets, bot_id, require_member=False):
+        """
+        Filtre une liste de cibles en une seule passe
+
+        Les rangs de l'auteur et du bot ne sont calculés qu'une fois, puis
+        chaque cible ne coûte que des comparaisons d'entiers.
+
+        Returns:
+            tuple: (cibles autorisées, liste de (cible, raison du refus))
+        """
+
+        snapshot = self.get(guild)
+        actor_rank = snapshot.member_info(actor)[0]
+        bot_rank = snapshot.member_info(guild.me)[0]
+        owner_id = snapshot.owner_id
+
+        allowed = []
+        rejected = []
+        for target in targets:
+            is_member = isinstance(target, discord.Member)
+            if require_member and not is_member:
+                rejected.append((target, NOT_MEMBER))
+            elif target.id == actor.id:
+                rejected.append((target, SELF))
+            elif target.id == bot_id:
+                rejected.append((target, BOT))
+            elif is_member:
+                target_rank = snapshot.member_info(target)[0]
+                if target_rank >= actor_rank:
+                    rejected.append((target, AUTHOR_RANK))
+                elif target_rank >= bot_rank:
+                    rejected.append((target, BOT_RANK))
+                elif target.id == owner_id:
+                    rejected.append((target, OWNER))
+                else:
+                    allowed.append(target)
+            else:
+                allowed.append(target)
+
+        return allowed, rejected
+
+# Cache partagé par les deux bots
+hierarchy_cache = HierarchyCache()
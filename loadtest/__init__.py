@@ -0,0 +1,3 @@
+"""
+Tests de charge de bout en bout contre un faux serveur Discord local
+"""
@@ -0,0 +1,429 @@
+"""
+Driver des tests de charge de bout en bout
+
+Démarre le faux serveur Discord, lance le vrai bot dans un sous-processus
+(loadtest.launcher), attend qu'il réponde, puis rejoue un flux de messages à
+débit fixe (ou par paliers croissants pour trouver le débit maximal).
+Mesure la latence commande -> réponse, le retard de la boucle du bot et le
+débit, puis écrit un rapport JSON.
+
+Usage:
+    python -m loadtest run --target main|simple [--members 10000] [--bans 10000]
+                           [--rate 50 | --ramp 50,100,200,400] [--duration 20]
+                           [--stream flux.jsonl] [--lazy-members] [--output rapport.json]
+    python -m loadtest generate --out flux.jsonl [--count 10000]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, deque
+from datetime import datetime, timezone
+from pathlib import Path
+
+import aiohttp
+
+from loadtest.fake_discord import FakeDiscord, RateLimiter, build_guild, snowflake, user_payload
+from loadtest.traffic import Placeholders, expects_response, load_stream, synthetic_stream, write_stream
+
+logger = logging.getLogger("loadtest")
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = REPO_DIR / "benchmarks" / "results"
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+def summarize(values):
+    """p50/p95/p99/max/moyenne d'une liste de valeurs (ms)"""
+    if not values:
+        return {"count": 0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0, "mean": 0.0}
+    return {
+        "count": len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values),
+        "mean": sum(values) / len(values),
+    }
+
+class LatencyTracker:
+    """
+    Associe chaque réponse du bot à la plus ancienne commande en attente du salon
+
+    Les commandes sont réparties sur plusieurs salons; le bot répond dans le
+    salon de la commande, dans l'ordre de traitement. Une commande sans
+    réponse après `timeout` secondes est comptée comme perdue.
+    """
+
+    def __init__(self, timeout=10.0):
+        self.timeout = timeout
+        self._pending = {}   # channel_id -> deque d'horodatages perf_counter
+        self.reset()
+
+    def reset(self):
+        self.latencies = []
+        self.sent = 0
+        self.timeouts = 0
+        self.unmatched = 0
+        self.first_response = None
+
+    @property
+    def pending(self):
+        return sum(len(queue) for queue in self._pending.values())
+
+    def command_sent(self, channel_id):
+        self._pending.setdefault(channel_id, deque()).append(time.perf_counter())
+        self.sent += 1
+
+    def response(self, channel_id, payload):
+        now = time.perf_counter()
+        if self.first_response is None:
+            self.first_response = time.time()
+        queue = self._pending.get(channel_id)
+        while queue and now - queue[0] > self.timeout:
+            queue.popleft()
+            self.timeouts += 1
+        if not queue:
+            self.unmatched += 1  # message supplémentaire (progression, avertissement)
+            return
+        self.latencies.append((now - queue.popleft()) * 1000)
+
+    def expire(self):
+        """Compte comme perdues les commandes encore en attente"""
+        for queue in self._pending.values():
+            self.timeouts += len(queue)
+            queue.clear()
+
+def free_port():
+    """Port TCP libre sur l'interface locale"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def process_rss(pid):
+    """Mémoire résidente d'un processus en Mio (Linux uniquement, None ailleurs)"""
+    try:
+        with open(f"/proc/{pid}/status", encoding='ascii') as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+def read_lag(path, start, end):
+    """Retards de boucle (ms) mesurés par le launcher entre deux horodatages"""
+    lags = []
+    try:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 2 and start <= float(parts[0]) <= end:
+                    lags.append(float(parts[1]))
+    except FileNotFoundError:
+        pass
+    return lags
+
+class LoadTest:
+    def __init__(self, args):
+        self.args = args
+        self.bot_user = user_payload(snowflake(), "bot-moderation", bot=True)
+        self.guild = build_guild(
+            self.bot_user, members=args.members, bans=args.bans,
+            channels=args.channels, seed=args.seed
+        )
+        self.server = FakeDiscord(
+            self.guild, self.bot_user,
+            rate_limiter=RateLimiter(args.rest_limit, args.rest_window, args.chaos_429),
+            rest_latency=args.rest_latency / 1000
+        )
+        self.tracker = LatencyTracker(timeout=args.timeout)
+        self.server.on_bot_message = self.tracker.response
+        self.channels = list(self.guild.channels)
+        excluded = {int(self.bot_user["id"]), self.guild.owner_id, *self.guild.moderators}
+        self.placeholders = Placeholders(self.guild, excluded)
+        self.stream = load_stream(args.stream) if args.stream else synthetic_stream(args.command_ratio, args.seed)
+        self.workdir = Path(args.workdir or tempfile.mkdtemp(prefix="loadtest-"))
+        self.workdir.mkdir(parents=True, exist_ok=True)
+        self.lag_path = self.workdir / "loop_lag.txt"
+        self.metrics_port = free_port()
+        self.process = None
+
+    # --- Processus du bot ------------------------------------------------------------
+
+    async def start_bot(self):
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(REPO_DIR), env.get("PYTHONPATH")]))
+        env["DISCORD_TOKEN"] = "loadtest.token"
+        env["PYTHONUNBUFFERED"] = "1"
+        env["BOT_METRICS_PORT"] = str(self.metrics_port)
+        env["BOT_LAZY_MEMBERS"] = "1" if self.args.lazy_members else "0"
+        self.bot_output = open(self.workdir / "bot.out", 'w', encoding='utf-8')
+        self.started_at = time.time()
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "loadtest.launcher", "--target", self.args.target,
+             "--base-url", self.server.url, "--lag-output", str(self.lag_path)],
+            cwd=self.workdir, env=env, stdout=self.bot_output, stderr=subprocess.STDOUT
+        )
+
+    def _connected(self):
+        # Sans découpage au démarrage, le bot est prêt dès GUILD_CREATE
+        if self.args.lazy_members:
+            return "guild_create" in self.server.timeline
+        return self.server.ready.is_set()
+
+    async def wait_until_responsive(self, timeout):
+        """Attend la fin du chargement des membres puis une réponse à +ping"""
+
+        deadline = time.monotonic() + timeout
+        while not self._connected():
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Le bot s'est arrêté (code {self.process.returncode}), voir {self.workdir / 'bot.out'}")
+            if time.monotonic() > deadline:
+                raise TimeoutError("Le bot ne s'est pas connecté au faux gateway")
+            await asyncio.sleep(0.05)
+
+        channel = self.channels[0]
+        moderator = self.guild.moderators[0]
+        while self.tracker.first_response is None:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Le bot s'est arrêté (code {self.process.returncode}), voir {self.workdir / 'bot.out'}")
+            if time.monotonic() > deadline:
+                raise TimeoutError("Le bot ne répond pas à +ping")
+            self.tracker.command_sent(channel)
+            await self.server.send_message(channel, moderator, "+ping")
+            await asyncio.sleep(0.1)
+
+        responsive_at = self.tracker.first_response
+        timeline = {name: at - self.started_at for name, at in self.server.timeline.items()}
+        timeline["first_response"] = responsive_at - self.started_at
+        self.tracker.reset()
+        self.tracker.expire()
+        self.tracker.timeouts = 0
+        return timeline
+
+    async def scrape_metrics(self):
+        """Dernier état de l'endpoint /metrics du bot, enregistré dans le dossier de travail"""
+        url = f"http://127.0.0.1:{self.metrics_port}/metrics"
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(url, timeout=aiohttp.ClientTimeout(total=5)) as response:
+                    text = await response.text()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"⚠️ Métriques du bot indisponibles: {e}", flush=True)
+            return None
+        path = self.workdir / "metrics.txt"
+        path.write_text(text, encoding='utf-8')
+        return str(path)
+
+    def stop_bot(self):
+        if self.process is None or self.process.poll() is not None:
+            return
+        self.process.send_signal(signal.SIGINT)
+        try:
+            self.process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self.bot_output.close()
+
+    # --- Phases ------------------------------------------------------------------
+
+    async def run_phase(self, rate, duration):
+        """Rejoue le flux à `rate` messages/s pendant `duration` secondes"""
+
+        loop = asyncio.get_running_loop()
+        self.tracker.reset()
+        routes_before = Counter(self.server.routes)
+        limited_before = self.server.stats["rate_limited"]
+        moderators = self.guild.moderators
+
+        sent = behind = 0
+        wall_start = time.time()
+        start = loop.time()
+        end = start + duration
+        index = 0
+        while True:
+            at = start + index / rate
+            if at >= end:
+                break
+            delay = at - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            elif delay < -0.05:
+                behind += 1  # le driver lui-même n'arrive pas à suivre
+
+            item = next(self.stream)
+            content = self.placeholders.resolve(item["content"])
+            channel = self.channels[index % len(self.channels)]
+            author = moderators[index % len(moderators)] if item["author"] == "moderator" else self.placeholders.member_id()
+            if expects_response(content):
+                self.tracker.command_sent(channel)
+            await self.server.send_message(channel, author, content)
+            sent += 1
+            index += 1
+        send_elapsed = loop.time() - start
+
+        # Laisser le bot vider sa file
+        drain_deadline = loop.time() + self.args.drain
+        while self.tracker.pending and loop.time() < drain_deadline:
+            await asyncio.sleep(0.05)
+        self.tracker.expire()
+        elapsed = loop.time() - start
+        wall_end = time.time()
+
+        routes = Counter(self.server.routes)
+        routes.subtract(routes_before)
+        lags = read_lag(self.lag_path, wall_start, wall_end)
+        responded = len(self.tracker.latencies)
+        return {
+            "rate": rate,
+            "duration": duration,
+            "messages_sent": sent,
+            "achieved_rate": sent / send_elapsed if send_elapsed else 0.0,
+            "driver_behind": behind,
+            "commands": self.tracker.sent,
+            "responses": responded,
+            "timeouts": self.tracker.timeouts,
+            "extra_messages": self.tracker.unmatched,
+            "completion": responded / self.tracker.sent if self.tracker.sent else 1.0,
+            "responses_per_sec": responded / elapsed if elapsed else 0.0,
+            "latency_ms": summarize(self.tracker.latencies),
+            "loop_lag_ms": summarize(lags),
+            "rest_calls": {route: count for route, count in routes.items() if count > 0},
+            "rate_limited": self.server.stats["rate_limited"] - limited_before,
+        }
+
+    def passed(self, phase):
+        return (
+            phase["completion"] >= self.args.min_completion
+            and phase["latency_ms"]["p99"] <= self.args.max_p99
+            and phase["achieved_rate"] >= phase["rate"] * 0.95
+        )
+
+    async def run(self):
+        await self.server.start()
+        await self.start_bot()
+        report = {
+            "target": self.args.target,
+            "date": datetime.now(timezone.utc).isoformat(),
+            "members": self.args.members,
+            "bans": self.args.bans,
+            "stream": str(self.args.stream) if self.args.stream else "synthétique",
+            "lazy_members": self.args.lazy_members,
+            "workdir": str(self.workdir),
+            "phases": [],
+        }
+        try:
+            report["startup_seconds"] = await self.wait_until_responsive(self.args.startup_timeout)
+            report["rss_mib"] = {"startup": process_rss(self.process.pid)}
+            rss = report["rss_mib"]["startup"]
+            print(f"🚀 Bot prêt en {report['startup_seconds']['first_response']:.2f}s"
+                  + (f", RSS {rss:.0f} Mio" if rss is not None else ""), flush=True)
+
+            rates = self.args.ramp or [self.args.rate]
+            ceiling = None
+            for rate in rates:
+                phase = await self.run_phase(rate, self.args.duration)
+                phase["passed"] = self.passed(phase)
+                report["phases"].append(phase)
+                print_phase(phase)
+                if not phase["passed"]:
+                    if self.args.ramp:
+                        break
+                else:
+                    ceiling = rate
+            report["ceiling_rate"] = ceiling
+        finally:
+            if self.process is not None and self.process.poll() is None:
+                report.setdefault("rss_mib", {})["end"] = process_rss(self.process.pid)
+                report["metrics"] = await self.scrape_metrics()
+            self.stop_bot()
+            report["gateway"] = {key: value for key, value in self.server.stats.items()}
+            await self.server.stop()
+        return report
+
+def print_phase(phase):
+    latency = phase["latency_ms"]
+    lag = phase["loop_lag_ms"]
+    status = "✅" if phase["passed"] else "❌"
+    print(
+        f"{status} {phase['rate']:>6} msg/s (atteint {phase['achieved_rate']:.0f}) | "
+        f"commandes {phase['responses']}/{phase['commands']} | "
+        f"latence p50 {latency['p50']:.1f} p99 {latency['p99']:.1f} max {latency['max']:.1f} ms | "
+        f"lag boucle p99 {lag['p99']:.1f} max {lag['max']:.1f} ms | 429: {phase['rate_limited']}",
+        flush=True
+    )
+
+def run_command(args):
+    loadtest = LoadTest(args)
+    report = asyncio.run(loadtest.run())
+
+    output = args.output or RESULTS_DIR / f"loadtest_{args.target}_{datetime.now():%Y%m%d_%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    if report.get("ceiling_rate") is not None and args.ramp:
+        print(f"Débit maximal tenu: {report['ceiling_rate']} msg/s")
+    print(f"Rapport écrit dans {output} (sortie du bot: {loadtest.workdir / 'bot.out'})")
+
+def generate_command(args):
+    write_stream(args.out, synthetic_stream(args.command_ratio, args.seed), args.count)
+    print(f"{args.count} messages écrits dans {args.out}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m loadtest", description="Tests de charge contre un faux Discord local")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="lancer le bot et rejouer un flux")
+    run.add_argument("--target", choices=["main", "simple"], default="main", help="main.py ou simple_bot.py seul")
+    run.add_argument("--members", type=int, default=10000)
+    run.add_argument("--bans", type=int, default=10000)
+    run.add_argument("--channels", type=int, default=20)
+    run.add_argument("--rate", type=float, default=50, help="messages par seconde")
+    run.add_argument("--ramp", type=lambda s: [float(v) for v in s.split(',')], default=None,
+                     help="paliers de débit, ex: 50,100,200,400 (s'arrête au premier palier non tenu)")
+    run.add_argument("--duration", type=float, default=20, help="durée de chaque palier (s)")
+    run.add_argument("--drain", type=float, default=10, help="attente des réponses après un palier (s)")
+    run.add_argument("--stream", type=Path, default=None, help="flux enregistré (JSONL) au lieu du flux synthétique")
+    run.add_argument("--command-ratio", type=float, default=0.08)
+    run.add_argument("--rest-limit", type=int, default=50, help="requêtes par fenêtre et par route")
+    run.add_argument("--rest-window", type=float, default=1.0)
+    run.add_argument("--rest-latency", type=float, default=0.0, help="latence REST simulée (ms)")
+    run.add_argument("--chaos-429", type=float, default=0.0, help="probabilité de 429 sous la limite")
+    run.add_argument("--timeout", type=float, default=10.0, help="délai max d'une réponse (s)")
+    run.add_argument("--max-p99", type=float, default=1000.0, help="latence p99 max d'un palier tenu (ms)")
+    run.add_argument("--min-completion", type=float, default=0.95)
+    run.add_argument("--startup-timeout", type=float, default=120.0)
+    run.add_argument("--lazy-members", action="store_true",
+                     help="bot en mode membres à la demande (BOT_LAZY_MEMBERS=1)")
+    run.add_argument("--seed", type=int, default=42)
+    run.add_argument("--workdir", default=None, help="dossier de travail du bot (logs, data)")
+    run.add_argument("--output", type=Path, default=None)
+    run.set_defaults(func=run_command)
+
+    generate = sub.add_parser("generate", help="enregistrer un flux synthétique")
+    generate.add_argument("--out", type=Path, required=True)
+    generate.add_argument("--count", type=int, default=10000)
+    generate.add_argument("--command-ratio", type=float, default=0.08)
+    generate.add_argument("--seed", type=int, default=42)
+    generate.set_defaults(func=generate_command)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(name)s: %(message)s")
+    args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,774 @@
+"""
+Faux serveur Discord local (REST + gateway) pour les tests de charge
+
+Implémente juste assez de l'API v10 pour faire tourner le vrai bot:
+- gateway: HELLO, IDENTIFY, READY, GUILD_CREATE, heartbeats, demandes de
+  membres (op 8 -> GUILD_MEMBERS_CHUNK), MESSAGE_CREATE injectés par le
+  driver, compression zlib-stream (ou zstd-stream si disponible);
+- REST: utilisateurs, messages, bannissements (dont bulk-ban), membres et
+  rôles, avec en-têtes X-RateLimit-* et réponses 429.
+
+Les modifications faites par le bot (ban, kick, rôles) sont répercutées
+comme sur Discord: l'état du serveur change et les events correspondants
+(GUILD_BAN_ADD, GUILD_MEMBER_REMOVE, GUILD_MEMBER_UPDATE...) sont envoyés
+sur le gateway.
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import random
+import time
+import zlib
+from collections import Counter
+from datetime import datetime, timezone
+
+from aiohttp import WSMsgType, web
+
+try:
+    import zstandard
+    _ZSTD = 'zstandard'
+except ImportError:
+    try:
+        from compression import zstd
+        _ZSTD = 'compression.zstd'
+    except ImportError:
+        _ZSTD = None
+
+logger = logging.getLogger(__name__)
+
+API_PREFIX = "/api/v10"
+DISCORD_EPOCH = 1420070400000
+
+# Permissions utilisées pour les rôles synthétiques
+PERM_BAN_MEMBERS = 1 << 2
+PERM_KICK_MEMBERS = 1 << 1
+PERM_MANAGE_ROLES = 1 << 28
+PERM_VIEW_CHANNEL = 1 << 10
+PERM_SEND_MESSAGES = 1 << 11
+PERM_EMBED_LINKS = 1 << 14
+PERM_READ_HISTORY = 1 << 16
+MODERATOR_PERMISSIONS = PERM_BAN_MEMBERS | PERM_KICK_MEMBERS | PERM_MANAGE_ROLES
+EVERYONE_PERMISSIONS = PERM_VIEW_CHANNEL | PERM_SEND_MESSAGES | PERM_EMBED_LINKS | PERM_READ_HISTORY
+
+_counter = itertools.count()
+
+def snowflake(at=None):
+    """Snowflake croissant (l'horodatage est lu par discord.py pour created_at)"""
+    millis = int((at or time.time()) * 1000) - DISCORD_EPOCH
+    return (millis << 22) | (next(_counter) & 0x3FFFFF)
+
+def iso_now():
+    return datetime.now(timezone.utc).isoformat()
+
+def user_payload(user_id, name, bot=False):
+    return {
+        "id": str(user_id),
+        "username": name,
+        "discriminator": "0",
+        "global_name": name,
+        "avatar": None,
+        "bot": bot,
+    }
+
+def json_response(data, status=200, headers=None):
+    """Réponse JSON avec exactement `Content-Type: application/json` (sans charset), comme attendu par discord.py"""
+    body = json.dumps(data, separators=(',', ':')).encode()
+    return web.Response(body=body, status=status, headers=headers, content_type="application/json")
+
+class GuildState:
+    """État d'un serveur factice (payloads au format de l'API)"""
+
+    def __init__(self, guild_id, name, owner_id):
+        self.id = guild_id
+        self.name = name
+        self.owner_id = owner_id
+        self.roles = {}      # role_id -> payload
+        self.members = {}    # user_id -> {"user", "roles", "joined_at"}
+        self.bans = {}       # user_id -> {"user", "reason"}
+        self.channels = {}   # channel_id -> payload
+        self.moderators = []
+        self.member_ids = []  # ordre d'insertion, pour les tirages aléatoires
+
+    def add_role(self, name, permissions=0, role_id=None):
+        role_id = role_id or snowflake()
+        self.roles[role_id] = {
+            "id": str(role_id), "name": name, "color": 0, "hoist": False, "icon": None,
+            "unicode_emoji": None, "position": len(self.roles), "permissions": str(permissions),
+            "managed": False, "mentionable": False, "flags": 0,
+        }
+        return role_id
+
+    def role_id(self, name):
+        for role_id, role in self.roles.items():
+            if role["name"] == name:
+                return role_id
+        return None
+
+    def add_member(self, user, roles=()):
+        user_id = int(user["id"])
+        self.members[user_id] = {"user": user, "roles": [str(role_id) for role_id in roles], "joined_at": iso_now()}
+        self.member_ids.append(user_id)
+        return user_id
+
+    def add_channel(self, name):
+        channel_id = snowflake()
+        self.channels[channel_id] = {
+            "id": str(channel_id), "type": 0, "guild_id": str(self.id), "name": name,
+            "position": len(self.channels), "permission_overwrites": [], "nsfw": False,
+            "parent_id": None, "topic": None, "rate_limit_per_user": 0, "last_message_id": None,
+        }
+        return channel_id
+
+    def member_payload(self, user_id, with_user=True):
+        member = self.members[user_id]
+        payload = {
+            "roles": member["roles"], "joined_at": member["joined_at"], "deaf": False, "mute": False,
+            "flags": 0, "nick": None, "avatar": None, "pending": False, "communication_disabled_until": None,
+        }
+        if with_user:
+            payload["user"] = member["user"]
+        return payload
+
+    def guild_payload(self, members):
+        """Payload GUILD_CREATE; `members`: IDs des membres inclus"""
+        return {
+            "id": str(self.id), "name": self.name, "icon": None, "splash": None, "discovery_splash": None,
+            "owner_id": str(self.owner_id), "afk_channel_id": None, "afk_timeout": 300,
+            "verification_level": 0, "default_message_notifications": 1, "explicit_content_filter": 0,
+            "roles": list(self.roles.values()), "emojis": [], "stickers": [], "features": [],
+            "mfa_level": 0, "application_id": None, "system_channel_id": None, "system_channel_flags": 0,
+            "rules_channel_id": None, "vanity_url_code": None, "description": None, "banner": None,
+            "premium_tier": 0, "premium_subscription_count": 0, "preferred_locale": "fr",
+            "public_updates_channel_id": None, "nsfw_level": 0, "premium_progress_bar_enabled": False,
+            "joined_at": iso_now(), "large": len(members) < len(self.members),
+            "unavailable": False, "member_count": len(self.members),
+            "voice_states": [], "members": [self.member_payload(user_id) for user_id in members],
+            "channels": list(self.channels.values()), "threads": [], "presences": [],
+            "stage_instances": [], "guild_scheduled_events": [],
+        }
+
+def build_guild(bot_user, members=1000, bans=10000, moderators=5, channels=20, muted_ratio=0.01, seed=42):
+    """
+    Serveur synthétique: hiérarchie @everyone < Muted < Membre < rôles
+    décoratifs < Modérateur < Bot, ~90% des membres avec "Membre"
+    """
+
+    rng = random.Random(seed)
+    guild_id = snowflake()
+    owner = user_payload(snowflake(), "proprietaire")
+    guild = GuildState(guild_id, f"Serveur de charge ({members} membres)", int(owner["id"]))
+
+    guild.add_role("@everyone", EVERYONE_PERMISSIONS, role_id=guild_id)
+    muted = guild.add_role("Muted")
+    member_role = guild.add_role("Membre")
+    decorative = [guild.add_role(f"Rôle {index}") for index in range(20)]
+    moderator_role = guild.add_role("Modérateur", MODERATOR_PERMISSIONS)
+    bot_role = guild.add_role("Bot", MODERATOR_PERMISSIONS)
+
+    guild.add_member(owner, [moderator_role])
+    guild.add_member(bot_user, [bot_role])
+    for index in range(moderators):
+        user_id = guild.add_member(user_payload(snowflake(), f"moderateur{index}"), [moderator_role])
+        guild.moderators.append(user_id)
+
+    for index in range(members):
+        roles = [member_role] if rng.random() < 0.9 else []
+        roles += rng.sample(decorative, rng.randint(0, 2))
+        if rng.random() < muted_ratio:
+            roles = [muted]
+        guild.add_member(user_payload(snowflake(), f"membre{index}"), roles)
+
+    for index in range(bans):
+        user = user_payload(snowflake(), f"banni{index}")
+        guild.bans[int(user["id"])] = {"user": user, "reason": "Spam"}
+
+    for index in range(channels):
+        guild.add_channel(f"salon-{index}")
+    return guild
+
+class RateLimiter:
+    """
+    Seaux de limitation par (méthode, route, paramètre majeur), comme Discord
+
+    Args:
+        limit: Requêtes autorisées par fenêtre
+        window: Durée de la fenêtre (secondes)
+        chaos: Probabilité de répondre 429 même sous la limite (sous-limite)
+    """
+
+    def __init__(self, limit=50, window=1.0, chaos=0.0, seed=1):
+        self.limit = limit
+        self.window = window
+        self.chaos = chaos
+        self._rng = random.Random(seed)
+        self._buckets = {}  # clé -> [début de fenêtre, requêtes]
+
+    def hit(self, key):
+        """
+        Compte une requête
+
+        Returns:
+            tuple: (autorisée, restantes, secondes avant réinitialisation)
+        """
+
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None or now - bucket[0] >= self.window:
+            bucket = self._buckets[key] = [now, 0]
+        reset_after = max(0.0, self.window - (now - bucket[0]))
+
+        if bucket[1] >= self.limit or (self.chaos and self._rng.random() < self.chaos):
+            return False, max(0, self.limit - bucket[1]), reset_after
+        bucket[1] += 1
+        return True, self.limit - bucket[1], reset_after
+
+class GatewaySession:
+    """Connexion gateway d'un client"""
+
+    def __init__(self, server, ws, compress):
+        self.server = server
+        self.ws = ws
+        self.sequence = 0
+        self.identified = False
+        self.session_id = f"session-{snowflake()}"
+        self._compressor = None
+        self._zstd = False
+        if compress == 'zlib-stream':
+            self._compressor = zlib.compressobj()
+        elif compress == 'zstd-stream' and _ZSTD == 'zstandard':
+            self._compressor = zstandard.ZstdCompressor().compressobj()
+            self._zstd = True
+        elif compress == 'zstd-stream' and _ZSTD == 'compression.zstd':
+            self._compressor = zstd.ZstdCompressor()
+            self._zstd = True
+        elif compress:
+            raise web.HTTPBadRequest(text=f"compression non supportée: {compress}")
+
+    async def send(self, op, data, event=None):
+        payload = {"op": op, "d": data, "s": None, "t": event}
+        if op == 0:
+            self.sequence += 1
+            payload["s"] = self.sequence
+        text = json.dumps(payload, separators=(',', ':'))
+        self.server.stats["gateway_sent"] += 1
+
+        if self.ws.closed:
+            return
+        if self._compressor is None:
+            await self.ws.send_str(text)
+        elif self._zstd:
+            if _ZSTD == 'zstandard':
+                data = self._compressor.compress(text.encode()) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+            else:
+                data = self._compressor.compress(text.encode(), zstd.ZstdCompressor.FLUSH_BLOCK)
+            await self.ws.send_bytes(data)
+        else:
+            # Chaque message se termine par Z_SYNC_FLUSH (00 00 ff ff), comme Discord
+            data = self._compressor.compress(text.encode()) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+            await self.ws.send_bytes(data)
+
+    async def dispatch(self, event, data):
+        await self.send(0, data, event)
+
+class FakeDiscord:
+    """
+    Serveur REST + gateway
+
+    Args:
+        guild: GuildState servi au bot
+        bot_user: Payload utilisateur du bot
+        rate_limiter: RateLimiter appliqué aux routes REST
+        rest_latency: Latence ajoutée à chaque réponse REST (secondes)
+        heartbeat_interval: Intervalle demandé dans HELLO (ms)
+    """
+
+    def __init__(self, guild, bot_user, rate_limiter=None, rest_latency=0.0, heartbeat_interval=41250):
+        self.guild = guild
+        self.bot_user = bot_user
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.rest_latency = rest_latency
+        self.heartbeat_interval = heartbeat_interval
+        self.application_id = snowflake()
+        self.sessions = set()
+        self.messages = {}       # message_id -> payload (derniers messages, bornés)
+        self.dm_channels = {}    # channel_id -> user_id
+        self.stats = Counter()
+        self.routes = Counter()
+        self.limited_routes = Counter()
+        self.timeline = {}       # étapes du démarrage (horodatages time.time())
+        self.ready = asyncio.Event()
+        self.chunks_pending = 0
+        self.on_bot_message = None   # rappel (channel_id, payload) des messages envoyés par le bot
+        self.url = None
+        self._runner = None
+
+    # --- Cycle de vie --------------------------------------------------------------
+
+    def make_app(self):
+        app = web.Application(middlewares=[self._rest_middleware], client_max_size=64 * 1024 * 1024)
+        r = app.router
+        p = API_PREFIX
+        r.add_get("/gateway", self._gateway)
+        r.add_get(p + "/gateway", self._get_gateway)
+        r.add_get(p + "/gateway/bot", self._get_gateway_bot)
+        r.add_get(p + "/users/@me", self._get_me)
+        r.add_get(p + "/oauth2/applications/@me", self._get_application)
+        r.add_post(p + "/users/@me/channels", self._create_dm)
+        r.add_get(p + "/users/{user_id}", self._get_user)
+        r.add_post(p + "/channels/{channel_id}/messages", self._post_message)
+        r.add_get(p + "/channels/{channel_id}/messages/{message_id}", self._get_message)
+        r.add_patch(p + "/channels/{channel_id}/messages/{message_id}", self._edit_message)
+        r.add_post(p + "/channels/{channel_id}/typing", self._no_content)
+        r.add_get(p + "/guilds/{guild_id}/bans", self._get_bans)
+        r.add_get(p + "/guilds/{guild_id}/bans/{user_id}", self._get_ban)
+        r.add_put(p + "/guilds/{guild_id}/bans/{user_id}", self._put_ban)
+        r.add_delete(p + "/guilds/{guild_id}/bans/{user_id}", self._delete_ban)
+        r.add_post(p + "/guilds/{guild_id}/bulk-ban", self._bulk_ban)
+        r.add_get(p + "/guilds/{guild_id}/members/search", self._search_members)
+        r.add_get(p + "/guilds/{guild_id}/members", self._list_members)
+        r.add_get(p + "/guilds/{guild_id}/members/{user_id}", self._get_member)
+        r.add_patch(p + "/guilds/{guild_id}/members/{user_id}", self._edit_member)
+        r.add_delete(p + "/guilds/{guild_id}/members/{user_id}", self._kick)
+        r.add_put(p + "/guilds/{guild_id}/members/{user_id}/roles/{role_id}", self._add_role)
+        r.add_delete(p + "/guilds/{guild_id}/members/{user_id}/roles/{role_id}", self._remove_role)
+        return app
+
+    async def start(self, host="127.0.0.1", port=0):
+        self._runner = web.AppRunner(self.make_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://{host}:{port}"
+        logger.info(f"Faux Discord en écoute sur {self.url}")
+        return self.url
+
+    async def stop(self):
+        for session in list(self.sessions):
+            await session.ws.close()
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    # --- Gateway -----------------------------------------------------------------------
+
+    async def dispatch(self, event, data):
+        """Envoie un event à toutes les sessions identifiées"""
+        for session in list(self.sessions):
+            if session.identified:
+                await session.dispatch(event, data)
+
+    async def _gateway(self, request):
+        ws = web.WebSocketResponse(max_msg_size=0, compress=True)
+        await ws.prepare(request)
+        session = GatewaySession(self, ws, request.query.get('compress'))
+        self.sessions.add(session)
+        self.timeline.setdefault("gateway_connected", time.time())
+        try:
+            await session.send(10, {"heartbeat_interval": self.heartbeat_interval})
+            async for message in ws:
+                if message.type == WSMsgType.TEXT:
+                    await self._handle_op(session, json.loads(message.data))
+                elif message.type == WSMsgType.BINARY:
+                    await self._handle_op(session, json.loads(message.data.decode()))
+                elif message.type == WSMsgType.ERROR:
+                    break
+        finally:
+            self.sessions.discard(session)
+        return ws
+
+    async def _handle_op(self, session, payload):
+        op = payload.get("op")
+        data = payload.get("d")
+        self.stats[f"gateway_op_{op}"] += 1
+
+        if op == 1:  # HEARTBEAT
+            await session.send(11, None)
+        elif op == 2:  # IDENTIFY
+            await self._identify(session, data)
+        elif op == 6:  # RESUME: pas de reprise, nouvelle session
+            await session.send(9, False)
+        elif op == 8:  # REQUEST_GUILD_MEMBERS
+            asyncio.create_task(self._send_member_chunks(session, data))
+
+    async def _identify(self, session, data):
+        self.timeline["identify"] = time.time()
+        session.identified = True
+        session.large_threshold = data.get("large_threshold", 250)
+        await session.dispatch("READY", {
+            "v": 10, "user": self.bot_user, "guilds": [{"id": str(self.guild.id), "unavailable": True}],
+            "session_id": session.session_id, "resume_gateway_url": self.url.replace("http", "ws") + "/gateway",
+            "shard": [0, 1], "application": {"id": str(self.application_id), "flags": 0},
+            "private_channels": [], "relationships": [], "presences": [], "user_settings": {},
+            "geo_ordered_rtc_regions": [], "guild_join_requests": [],
+        })
+
+        # Au-delà du seuil, seuls le bot et le propriétaire sont envoyés: le client demande le reste (op 8)
+        if len(self.guild.members) > session.large_threshold:
+            members = [int(self.bot_user["id"]), self.guild.owner_id]
+        else:
+            members = list(self.guild.members)
+        await session.dispatch("GUILD_CREATE", self.guild.guild_payload(members))
+        self.timeline["guild_create"] = time.time()
+        if len(members) == len(self.guild.members):
+            self.ready.set()
+
+    async def _send_member_chunks(self, session, data, chunk_size=1000):
+        self.chunks_pending += 1
+        try:
+            guild = self.guild
+            user_ids = data.get("user_ids")
+            not_found = []
+            if user_ids:
+                if not isinstance(user_ids, list):
+                    user_ids = [user_ids]
+                ids = [int(user_id) for user_id in user_ids if int(user_id) in guild.members]
+                not_found = [user_id for user_id in user_ids if int(user_id) not in guild.members]
+            else:
+                query = (data.get("query") or "").lower()
+                ids = [user_id for user_id, member in guild.members.items()
+                       if not query or member["user"]["username"].lower().startswith(query)]
+                if data.get("limit"):
+                    ids = ids[:data["limit"]]
+
+            count = max(1, (len(ids) + chunk_size - 1) // chunk_size)
+            for index in range(count):
+                chunk = ids[index * chunk_size:(index + 1) * chunk_size]
+                payload = {
+                    "guild_id": str(guild.id), "members": [guild.member_payload(user_id) for user_id in chunk],
+                    "chunk_index": index, "chunk_count": count,
+                }
+                if data.get("nonce"):
+                    payload["nonce"] = data["nonce"]
+                if not_found and index == count - 1:
+                    payload["not_found"] = not_found
+                await session.dispatch("GUILD_MEMBERS_CHUNK", payload)
+                self.stats["member_chunks"] += 1
+                await asyncio.sleep(0)
+            self.timeline.setdefault("chunks_done", time.time())
+        finally:
+            self.chunks_pending -= 1
+            if self.chunks_pending == 0:
+                self.ready.set()
+
+    # --- Messages injectés par le driver ---------------------------------------------------
+
+    def message_payload(self, channel_id, author_id, content, reference=None):
+        """Payload d'un message d'un membre du serveur"""
+
+        guild = self.guild
+        message_id = snowflake()
+        member = guild.members.get(author_id)
+        payload = {
+            "id": str(message_id), "channel_id": str(channel_id), "guild_id": str(guild.id),
+            "author": member["user"] if member else user_payload(author_id, f"inconnu{author_id}"),
+            "content": content, "timestamp": iso_now(), "edited_timestamp": None, "tts": False,
+            "mention_everyone": False, "mentions": [], "mention_roles": [], "attachments": [],
+            "embeds": [], "pinned": False, "type": 0, "flags": 0,
+        }
+        if member:
+            payload["member"] = guild.member_payload(author_id, with_user=False)
+        for user_id in _mentioned_ids(content):
+            mentioned = guild.members.get(user_id)
+            if mentioned:
+                user = dict(mentioned["user"])
+                user["member"] = guild.member_payload(user_id, with_user=False)
+                payload["mentions"].append(user)
+        if reference is not None:
+            payload["message_reference"] = {"message_id": str(reference), "channel_id": str(channel_id), "guild_id": str(guild.id)}
+            payload["type"] = 19
+        return payload
+
+    async def send_message(self, channel_id, author_id, content, reference=None):
+        """Injecte un MESSAGE_CREATE comme si un membre avait écrit dans le salon"""
+
+        payload = self.message_payload(channel_id, author_id, content, reference)
+        self._remember(payload)
+        self.stats["messages_injected"] += 1
+        await self.dispatch("MESSAGE_CREATE", payload)
+        return payload
+
+    def _remember(self, payload, limit=100000):
+        self.messages[int(payload["id"])] = payload
+        if len(self.messages) > limit:
+            self.messages.pop(next(iter(self.messages)))
+
+    # --- REST --------------------------------------------------------------------------
+
+    @web.middleware
+    async def _rest_middleware(self, request, handler):
+        if not request.path.startswith(API_PREFIX):
+            return await handler(request)
+
+        resource = request.match_info.route.resource
+        route = f"{request.method} {resource.canonical[len(API_PREFIX):] if resource else request.path}"
+        major = request.match_info.get("channel_id") or request.match_info.get("guild_id") or ""
+        self.routes[route] += 1
+
+        allowed, remaining, reset_after = self.rate_limiter.hit((route, major))
+        headers = {
+            "X-RateLimit-Limit": str(self.rate_limiter.limit),
+            "X-RateLimit-Remaining": str(remaining),
+            "X-RateLimit-Reset": f"{time.time() + reset_after:.3f}",
+            "X-RateLimit-Reset-After": f"{reset_after:.3f}",
+            "X-RateLimit-Bucket": f"{abs(hash(route)):x}",
+        }
+        if self.rest_latency:
+            await asyncio.sleep(self.rest_latency)
+
+        if not allowed:
+            self.stats["rate_limited"] += 1
+            self.limited_routes[route] += 1
+            # discord.py considère un 429 sans en-tête Via comme un blocage Cloudflare
+            headers.update({"Via": "1.1 google", "Retry-After": f"{max(reset_after, 0.001):.3f}", "X-RateLimit-Scope": "user"})
+            return json_response(
+                {"message": "You are being rate limited.", "retry_after": max(reset_after, 0.001), "global": False},
+                status=429, headers=headers
+            )
+
+        try:
+            response = await handler(request)
+        except web.HTTPException as e:
+            if e.status == 404 and resource is None:
+                self.stats["unknown_routes"] += 1
+                logger.warning(f"Route non simulée: {request.method} {request.path}")
+            response = json_response({"message": e.reason, "code": e.status * 100}, status=e.status)
+        response.headers.update(headers)
+        return response
+
+    def _not_found(self, message="Unknown"):
+        return json_response({"message": message, "code": 10000}, status=404)
+
+    async def _no_content(self, request):
+        return web.Response(status=204)
+
+    async def _get_gateway(self, request):
+        return json_response({"url": self.url.replace("http", "ws") + "/gateway"})
+
+    async def _get_gateway_bot(self, request):
+        return json_response({
+            "url": self.url.replace("http", "ws") + "/gateway", "shards": 1,
+            "session_start_limit": {"total": 1000, "remaining": 1000, "reset_after": 0, "max_concurrency": 1},
+        })
+
+    async def _get_me(self, request):
+        self.timeline.setdefault("login", time.time())
+        return json_response(self.bot_user)
+
+    async def _get_application(self, request):
+        owner = self.guild.members[self.guild.owner_id]["user"]
+        return json_response({
+            "id": str(self.application_id), "name": self.bot_user["username"], "icon": None,
+            "description": "", "bot_public": True, "bot_require_code_grant": False,
+            "owner": owner, "verify_key": "0" * 64, "flags": 0, "team": None,
+        })
+
+    async def _get_user(self, request):
+        user_id = int(request.match_info["user_id"])
+        member = self.guild.members.get(user_id)
+        if member:
+            return json_response(member["user"])
+        ban = self.guild.bans.get(user_id)
+        if ban:
+            return json_response(ban["user"])
+        return self._not_found("Unknown User")
+
+    async def _create_dm(self, request):
+        data = await request.json()
+        user_id = int(data["recipient_id"])
+        member = self.guild.members.get(user_id)
+        user = member["user"] if member else user_payload(user_id, f"utilisateur{user_id}")
+        channel_id = snowflake()
+        self.dm_channels[channel_id] = user_id
+        return json_response({"id": str(channel_id), "type": 1, "recipients": [user], "last_message_id": None})
+
+    async def _post_message(self, request):
+        channel_id = int(request.match_info["channel_id"])
+        if request.content_type.startswith("multipart/"):
+            data = {}
+            async for part in await request.multipart():
+                if part.name == "payload_json":
+                    data = json.loads(await part.text())
+        else:
+            data = await request.json()
+
+        is_dm = channel_id in self.dm_channels
+        if not is_dm and channel_id not in self.guild.channels:
+            return self._not_found("Unknown Channel")
+
+        payload = {
+            "id": str(snowflake()), "channel_id": str(channel_id), "author": self.bot_user,
+            "content": data.get("content") or "", "timestamp": iso_now(), "edited_timestamp": None,
+            "tts": False, "mention_everyone": False, "mentions": [], "mention_roles": [],
+            "attachments": [], "embeds": data.get("embeds") or [], "pinned": False, "type": 0, "flags": 0,
+        }
+        if is_dm:
+            self.stats["dm_sent"] += 1
+            return json_response(payload)
+
+        payload["guild_id"] = str(self.guild.id)
+        payload["member"] = self.guild.member_payload(int(self.bot_user["id"]), with_user=False)
+        self._remember(payload)
+        self.stats["bot_messages"] += 1
+        if self.on_bot_message is not None:
+            self.on_bot_message(channel_id, payload)
+        # Discord renvoie aussi le message du bot sur le gateway
+        asyncio.create_task(self.dispatch("MESSAGE_CREATE", payload))
+        return json_response(payload)
+
+    async def _get_message(self, request):
+        payload = self.messages.get(int(request.match_info["message_id"]))
+        if payload is None or payload["channel_id"] != request.match_info["channel_id"]:
+            return self._not_found("Unknown Message")
+        return json_response(payload)
+
+    async def _edit_message(self, request):
+        payload = self.messages.get(int(request.match_info["message_id"]))
+        if payload is None:
+            return self._not_found("Unknown Message")
+        data = await request.json()
+        payload.update({key: value for key, value in data.items() if key in ("content", "embeds")})
+        payload["edited_timestamp"] = iso_now()
+        return json_response(payload)
+
+    def _check_guild(self, request):
+        if int(request.match_info["guild_id"]) != self.guild.id:
+            raise web.HTTPNotFound(reason="Unknown Guild")
+
+    async def _get_bans(self, request):
+        self._check_guild(request)
+        limit = min(int(request.query.get("limit", 1000)), 1000)
+        ids = sorted(self.guild.bans)
+        if "after" in request.query:
+            after = int(request.query["after"])
+            ids = [user_id for user_id in ids if user_id > after][:limit]
+        elif "before" in request.query:
+            before = int(request.query["before"])
+            ids = [user_id for user_id in ids if user_id < before][-limit:]
+        else:
+            ids = ids[:limit]
+        return json_response([self.guild.bans[user_id] for user_id in ids])
+
+    async def _get_ban(self, request):
+        self._check_guild(request)
+        ban = self.guild.bans.get(int(request.match_info["user_id"]))
+        return json_response(ban) if ban else self._not_found("Unknown Ban")
+
+    async def _ban_user(self, user_id, reason):
+        guild = self.guild
+        member = guild.members.pop(user_id, None)
+        user = member["user"] if member else user_payload(user_id, f"utilisateur{user_id}")
+        guild.bans[user_id] = {"user": user, "reason": reason}
+        self.stats["bans"] += 1
+        await self.dispatch("GUILD_BAN_ADD", {"guild_id": str(guild.id), "user": user})
+        if member:
+            await self.dispatch("GUILD_MEMBER_REMOVE", {"guild_id": str(guild.id), "user": user})
+
+    async def _put_ban(self, request):
+        self._check_guild(request)
+        await self._ban_user(int(request.match_info["user_id"]), request.headers.get("X-Audit-Log-Reason"))
+        return web.Response(status=204)
+
+    async def _bulk_ban(self, request):
+        self._check_guild(request)
+        data = await request.json()
+        banned = []
+        for user_id in data.get("user_ids", [])[:200]:
+            await self._ban_user(int(user_id), request.headers.get("X-Audit-Log-Reason"))
+            banned.append(str(user_id))
+        return json_response({"banned_users": banned, "failed_users": []})
+
+    async def _delete_ban(self, request):
+        self._check_guild(request)
+        ban = self.guild.bans.pop(int(request.match_info["user_id"]), None)
+        if ban is None:
+            return self._not_found("Unknown Ban")
+        self.stats["unbans"] += 1
+        await self.dispatch("GUILD_BAN_REMOVE", {"guild_id": str(self.guild.id), "user": ban["user"]})
+        return web.Response(status=204)
+
+    async def _get_member(self, request):
+        self._check_guild(request)
+        user_id = int(request.match_info["user_id"])
+        if user_id not in self.guild.members:
+            return self._not_found("Unknown Member")
+        return json_response(self.guild.member_payload(user_id))
+
+    async def _list_members(self, request):
+        self._check_guild(request)
+        limit = min(int(request.query.get("limit", 1)), 1000)
+        after = int(request.query.get("after", 0))
+        ids = sorted(user_id for user_id in self.guild.members if user_id > after)[:limit]
+        return json_response([self.guild.member_payload(user_id) for user_id in ids])
+
+    async def _search_members(self, request):
+        self._check_guild(request)
+        query = request.query.get("query", "").lower()
+        limit = min(int(request.query.get("limit", 1)), 1000)
+        ids = [user_id for user_id, member in self.guild.members.items()
+               if member["user"]["username"].lower().startswith(query)][:limit]
+        return json_response([self.guild.member_payload(user_id) for user_id in ids])
+
+    async def _member_updated(self, user_id):
+        payload = self.guild.member_payload(user_id)
+        payload["guild_id"] = str(self.guild.id)
+        await self.dispatch("GUILD_MEMBER_UPDATE", payload)
+
+    async def _edit_member(self, request):
+        self._check_guild(request)
+        user_id = int(request.match_info["user_id"])
+        member = self.guild.members.get(user_id)
+        if member is None:
+            return self._not_found("Unknown Member")
+        data = await request.json()
+        if "roles" in data:
+            member["roles"] = [str(role_id) for role_id in data["roles"] if int(role_id) in self.guild.roles]
+        await self._member_updated(user_id)
+        return json_response(self.guild.member_payload(user_id))
+
+    async def _kick(self, request):
+        self._check_guild(request)
+        member = self.guild.members.pop(int(request.match_info["user_id"]), None)
+        if member is None:
+            return self._not_found("Unknown Member")
+        self.stats["kicks"] += 1
+        await self.dispatch("GUILD_MEMBER_REMOVE", {"guild_id": str(self.guild.id), "user": member["user"]})
+        return web.Response(status=204)
+
+    async def _add_role(self, request):
+        self._check_guild(request)
+        user_id = int(request.match_info["user_id"])
+        member = self.guild.members.get(user_id)
+        if member is None:
+            return self._not_found("Unknown Member")
+        role_id = request.match_info["role_id"]
+        if role_id not in member["roles"]:
+            member["roles"].append(role_id)
+        await self._member_updated(user_id)
+        return web.Response(status=204)
+
+    async def _remove_role(self, request):
+        self._check_guild(request)
+        user_id = int(request.match_info["user_id"])
+        member = self.guild.members.get(user_id)
+        if member is None:
+            return self._not_found("Unknown Member")
+        role_id = request.match_info["role_id"]
+        if role_id in member["roles"]:
+            member["roles"].remove(role_id)
+        await self._member_updated(user_id)
+        return web.Response(status=204)
+
+def _mentioned_ids(content):
+    ids = []
+    start = content.find("<@")
+    while start != -1:
+        end = content.find(">", start)
+        if end == -1:
+            break
+        token = content[start + 2:end].lstrip("!")
+        if token.isdigit():
+            ids.append(int(token))
+        start = content.find("<@", end)
+    return ids
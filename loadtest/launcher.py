@@ -0,0 +1,98 @@
+"""
+Lance le vrai bot contre le faux serveur Discord
+
+Redirige discord.py vers le faux serveur (Route.BASE, DEFAULT_GATEWAY), démarre une sonde de
+latence de la boucle asyncio dans le processus du bot, puis exécute le point
+d'entrée demandé tel qu'en production.
+
+Usage: python -m loadtest.launcher --target main|simple --base-url http://127.0.0.1:PORT
+                                   [--lag-output lag.txt]
+"""
+
+import argparse
+import asyncio
+import os
+import runpy
+import sys
+import time
+
+import discord
+import yarl
+from discord.gateway import DiscordWebSocket
+from discord.http import Route
+
+# Intervalle de la sonde de latence de la boucle
+PROBE_INTERVAL = 0.01
+
+TARGETS = {
+    "main": "main",              # main.py: setup_logging() puis le bot de simple_bot
+    "simple": "simple_bot",      # simple_bot.py lancé seul
+}
+
+class LoopLagProbe:
+    """
+    Mesure le retard de réveil de la boucle asyncio
+
+    Les échantillons (horodatage time.time(), retard en ms) sont ajoutés au
+    fichier chaque seconde pour que le driver puisse les découper par phase.
+    """
+
+    def __init__(self, path, interval=PROBE_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run(), name="loadtest-lag-probe")
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        samples = []
+        last_flush = loop.time()
+        with open(self.path, 'a', encoding='utf-8') as f:
+            while True:
+                start = loop.time()
+                await asyncio.sleep(self.interval)
+                lag = loop.time() - start - self.interval
+                samples.append(f"{time.time():.4f} {lag * 1000:.3f}\n")
+                if loop.time() - last_flush >= 1.0:
+                    f.writelines(samples)
+                    f.flush()
+                    samples.clear()
+                    last_flush = loop.time()
+
+def patch_discord(base_url, probe):
+    """Redirige l'API REST et le gateway, et démarre la sonde dès la connexion du client"""
+
+    base_url = base_url.rstrip('/')
+    Route.BASE = f"{base_url}/api/v10"
+    # Client non shardé: discord.py se connecte directement à DEFAULT_GATEWAY
+    DiscordWebSocket.DEFAULT_GATEWAY = yarl.URL(base_url.replace("http", "ws", 1) + "/gateway")
+
+    original_login = discord.Client.login
+
+    async def login(self, token):
+        if probe is not None:
+            probe.start()
+        return await original_login(self, token)
+
+    discord.Client.login = login
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--target", choices=sorted(TARGETS), default="main")
+    parser.add_argument("--base-url", required=True)
+    parser.add_argument("--lag-output", default=None)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DISCORD_TOKEN", "loadtest.token")
+    probe = LoopLagProbe(args.lag_output) if args.lag_output else None
+    patch_discord(args.base_url, probe)
+
+    # Exécute le module comme `python main.py` / `python simple_bot.py`
+    sys.argv = [TARGETS[args.target] + ".py"]
+    runpy.run_module(TARGETS[args.target], run_name="__main__", alter_sys=True)
+
+if __name__ == "__main__":
+    sys.exit(main())
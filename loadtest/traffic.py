@@ -0,0 +1,120 @@
+"""
+Flux de messages rejoués par le driver: synthétiques ou enregistrés
+
+Un flux est une suite de dictionnaires {"content", "author"} où author vaut
+"member" (membre quelconque) ou "moderator". Le contenu peut utiliser des
+emplacements résolus au moment de l'envoi, pour qu'un même flux fonctionne
+sur n'importe quel serveur factice:
+    {member}     mention d'un membre présent
+    {member_id}  ID d'un membre présent
+    {banned_id}  ID d'un utilisateur banni
+"""
+
+import itertools
+import json
+import random
+
+# Commandes de simple_bot qui répondent toujours dans le salon
+RESPONDING_COMMANDS = frozenset({"ping", "test", "ban", "kick", "unban", "unmute", "commandes"})
+
+CHAT = (
+    "salut ça va tu as vu le match hier soir c'est vraiment incroyable je pense que "
+    "on devrait lancer une partie ce soir quelqu'un est chaud pour jouer mdr lol ok "
+    "merci beaucoup à demain les gars bonne nuit").split()
+
+# (poids, auteur, contenu) des messages synthétiques hors discussion
+SYNTHETIC_MIX = [
+    (3.0, "moderator", "+ping"),
+    (1.0, "moderator", "+commandes"),
+    (1.0, "moderator", "+ban {member} spam répété"),
+    (1.0, "moderator", "+kick {member} flood"),
+    (1.0, "moderator", "+unban {banned_id} appel accepté"),
+    (0.5, "moderator", "+unmute {member}"),
+    (0.5, "member", "+play une musique"),   # commande d'un autre bot
+]
+
+def expects_response(content):
+    """True si le message invoque une commande du bot qui répond dans le salon"""
+    if not content.startswith("+"):
+        return False
+    name = content[1:].split(None, 1)[0].lower() if len(content) > 1 else ""
+    return name in RESPONDING_COMMANDS
+
+def synthetic_stream(command_ratio=0.08, seed=3):
+    """
+    Flux infini: discussion de longueur variable et `command_ratio` de commandes
+
+    Yields:
+        dict: {"content", "author"}
+    """
+
+    rng = random.Random(seed)
+    weights = [weight for weight, _, _ in SYNTHETIC_MIX]
+    while True:
+        if rng.random() < command_ratio:
+            _, author, content = rng.choices(SYNTHETIC_MIX, weights)[0]
+            yield {"content": content, "author": author}
+        else:
+            length = int(rng.expovariate(1 / 12)) + 1
+            yield {"content": ' '.join(rng.choice(CHAT) for _ in range(length)), "author": "member"}
+
+def load_stream(path):
+    """
+    Flux enregistré (JSONL), rejoué en boucle
+
+    Chaque ligne: {"content": "...", "author": "member"|"moderator"}; les
+    champs supplémentaires (ex: horodatage d'origine) sont ignorés.
+    """
+
+    items = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                entry = json.loads(line)
+                items.append({"content": entry["content"], "author": entry.get("author", "member")})
+    if not items:
+        raise ValueError(f"Flux vide: {path}")
+    return itertools.cycle(items)
+
+def write_stream(path, stream, count):
+    """Enregistre `count` messages d'un flux en JSONL"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for item in itertools.islice(stream, count):
+            f.write(json.dumps(item, ensure_ascii=False) + "\n")
+
+class Placeholders:
+    """Résout les emplacements d'un message à partir de l'état courant du serveur"""
+
+    def __init__(self, guild, excluded, seed=5):
+        self.guild = guild
+        self.rng = random.Random(seed)
+        excluded = set(excluded)
+        self._candidates = [user_id for user_id in guild.member_ids if user_id not in excluded]
+
+    def member_id(self):
+        members = self.guild.members
+        for _ in range(20):
+            user_id = self.rng.choice(self._candidates)
+            if user_id in members:
+                return user_id
+        # Beaucoup de membres partis: on reconstruit la liste des candidats
+        self._candidates = [user_id for user_id in self._candidates if user_id in members]
+        return self.rng.choice(self._candidates)
+
+    def banned_id(self):
+        bans = self.guild.bans
+        if not bans:
+            return self.member_id()
+        return self.rng.choice(tuple(bans))
+
+    def resolve(self, content):
+        if "{" not in content:
+            return content
+        if "{member}" in content:
+            content = content.replace("{member}", f"<@{self.member_id()}>")
+        if "{member_id}" in content:
+            content = content.replace("{member_id}", str(self.member_id()))
+        if "{banned_id}" in content:
+            content = content.replace("{banned_id}", str(self.banned_id()))
+        return content
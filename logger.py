@@ -2,55 +2,489 @@
 Système de logging pour le bot de modération
 """
 
+import asyncio
+import atexit
+import gzip
 import logging
 import os
-from datetime import datetime
+import queue
+import shutil
+import threading
+import time
+from datetime import datetime, timedelta
+from logging.handlers import BaseRotatingHandler, QueueHandler
 from pathlib import Path
 
-def setup_logging():
-    """Configure le système de logging"""
+import discord
+
+from utils.cases import ACTION_EMOJIS, case_store
+from utils.guild_settings import guild_settings
+
+# File bornée entre la boucle asyncio et le thread d'écriture
+LOG_QUEUE_SIZE = 10000
+# Écriture sur disque tous les N enregistrements ou toutes les N secondes
+LOG_BATCH_SIZE = 256
+LOG_FLUSH_INTERVAL = 0.5
+
+# Rotation: à minuit et au-delà de cette taille (par fichier actif)
+LOG_MAX_BYTES = 50 * 1024 * 1024
+# Cibles listées au plus dans le salon de logs d'un serveur pour une action en lot
+LOG_CHANNEL_TARGETS = 20
+# Rétention des segments compressés: log de debug / journal de modération
+LOG_RETENTION_DAYS = 14
+LOG_MAX_TOTAL_BYTES = 500 * 1024 * 1024
+MODERATION_RETENTION_DAYS = 365
+MODERATION_MAX_TOTAL_BYTES = 2 * 1024 * 1024 * 1024
+
+_listener = None
+_queue_handler = None
+_maintenance = None
+# Envois en cours vers les salons de logs (référence gardée jusqu'à la fin de l'envoi)
+_log_channel_sends = set()
+
+class BatchFlushMixin:
+    """
+    Reporte le flush du flux à la fin de chaque lot
+
+    Les handlers standards font un flush à chaque enregistrement; dans le
+    thread d'écriture, on préfère un seul flush par lot.
+    """
+
+    def flush(self):
+        # Appelé par emit() à chaque enregistrement: ignoré
+        pass
+
+    def flush_batch(self):
+        super().flush()
+
+class BufferedStreamHandler(BatchFlushMixin, logging.StreamHandler):
+    """Handler console écrit par lots"""
+
+class LogMaintenance:
+    """
+    Thread de fond qui compresse les segments de logs et applique la rétention
+
+    La compression gzip d'un segment de plusieurs dizaines de Mo prend du
+    temps: elle ne doit jamais avoir lieu dans le thread qui écrit les logs
+    (et encore moins dans la boucle asyncio).
+    """
+
+    def __init__(self):
+        self._jobs = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="log-maintenance", daemon=True)
+        self._thread.start()
+
+    def submit(self, segment, handler):
+        """Compresse un segment (optionnel) puis applique la rétention du handler"""
+        self._jobs.put((segment, handler))
+
+    def wait(self, timeout=30.0):
+        """Attend la fin des tâches en cours (arrêt du bot)"""
+        done = threading.Event()
+        self._jobs.put((None, done))
+        done.wait(timeout)
+
+    def _run(self):
+        while True:
+            segment, handler = self._jobs.get()
+            if isinstance(handler, threading.Event):
+                handler.set()
+                continue
+            try:
+                if segment is not None:
+                    self._compress(segment)
+                handler.apply_retention()
+            except Exception as e:
+                logging.getLogger(__name__).error(f"Erreur de maintenance des logs ({segment}): {e}")
+
+    @staticmethod
+    def _compress(segment):
+        target = segment.with_name(segment.name + '.gz')
+        tmp_target = target.with_name(target.name + '.tmp')
+        with open(segment, 'rb') as src, gzip.open(tmp_target, 'wb') as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        os.replace(tmp_target, target)
+        segment.unlink()
+
+def _get_maintenance():
+    global _maintenance
+    if _maintenance is None:
+        _maintenance = LogMaintenance()
+    return _maintenance
+
+class CompressedRotatingFileHandler(BaseRotatingHandler):
+    """
+    Fichier de log actif `<nom>.log`, tourné à minuit et au-delà de max_bytes
+
+    Les segments tournés sont nommés `<nom>_AAAAMMJJ.log` (puis
+    `<nom>_AAAAMMJJ.1.log`, ... en cas de rotation par taille dans la même
+    journée) et compressés en `.log.gz` par le thread de maintenance, qui
+    supprime ensuite les segments plus vieux que retention_days ou dépassant
+    le budget disque max_total_bytes.
+    """
+
+    def __init__(self, directory, stem, max_bytes=LOG_MAX_BYTES, retention_days=LOG_RETENTION_DAYS,
+                 max_total_bytes=LOG_MAX_TOTAL_BYTES, encoding='utf-8'):
+        self.directory = Path(directory)
+        self.stem = stem
+        self.max_bytes = max_bytes
+        self.retention_days = retention_days
+        self.max_total_bytes = max_total_bytes
+
+        path = self.directory / f"{stem}.log"
+        super().__init__(path, 'a', encoding=encoding)
+
+        # Date du contenu du fichier actif (peut dater d'un lancement précédent)
+        if path.exists() and path.stat().st_size > 0:
+            self._segment_date = datetime.fromtimestamp(path.stat().st_mtime).date()
+            self._bytes = path.stat().st_size
+        else:
+            self._segment_date = datetime.now().date()
+            self._bytes = 0
+        self._next_rollover = self._midnight_after(self._segment_date)
+
+        _get_maintenance().submit(None, self)
+
+    @staticmethod
+    def _midnight_after(day):
+        return datetime.combine(day + timedelta(days=1), datetime.min.time()).timestamp()
+
+    def format(self, record):
+        text = super().format(record)
+        # Taille approximative (en caractères) pour la rotation, sans tell() sur le flux
+        self._bytes += len(text) + 1
+        return text
+
+    def shouldRollover(self, record):
+        if record.created >= self._next_rollover:
+            return True
+        return bool(self.max_bytes) and self._bytes >= self.max_bytes
+
+    def doRollover(self):
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+
+        path = Path(self.baseFilename)
+        if path.exists() and path.stat().st_size > 0:
+            segment = self._segment_name(self._segment_date)
+            os.rename(path, segment)
+            _get_maintenance().submit(segment, self)
+
+        self._segment_date = datetime.now().date()
+        self._next_rollover = self._midnight_after(self._segment_date)
+        self._bytes = 0
+        self.stream = self._open()
+
+    def _segment_name(self, day):
+        base = f"{self.stem}_{day.strftime('%Y%m%d')}"
+        index = 0
+        while True:
+            name = base if index == 0 else f"{base}.{index}"
+            candidate = self.directory / f"{name}.log"
+            if not candidate.exists() and not candidate.with_name(candidate.name + '.gz').exists():
+                return candidate
+            index += 1
+
+    def segments(self):
+        """Segments tournés (compressés ou non), du plus récent au plus ancien"""
+        files = [p for p in self.directory.glob(f"{self.stem}_*.log*") if not p.name.endswith('.tmp')]
+        return sorted(files, key=lambda p: p.stat().st_mtime, reverse=True)
+
+    def apply_retention(self):
+        """Supprime les segments trop vieux ou hors budget disque (thread de maintenance)"""
+        cutoff = time.time() - self.retention_days * 86400
+        total = 0
+        for segment in self.segments():
+            try:
+                stat = segment.stat()
+            except FileNotFoundError:
+                continue
+            total += stat.st_size
+            if stat.st_mtime < cutoff or (self.max_total_bytes and total > self.max_total_bytes):
+                segment.unlink(missing_ok=True)
+
+class BufferedRotatingFileHandler(BatchFlushMixin, CompressedRotatingFileHandler):
+    """Handler fichier tourné et compressé, écrit par lots"""
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    QueueHandler avec une file bornée
+
+    En cas de surcharge, soit l'appelant attend un peu (backpressure), soit
+    l'enregistrement est abandonné et compté, mais la boucle asyncio n'est
+    jamais bloquée par une écriture disque.
+    """
+
+    def __init__(self, log_queue, overflow='drop', block_timeout=0.05):
+        super().__init__(log_queue)
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            if self.overflow == 'block':
+                self.queue.put(record, timeout=self.block_timeout)
+            else:
+                self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class BatchingQueueListener:
+    """
+    Thread qui vide la file de logs et écrit les enregistrements par lots
+
+    Chaque handler reçoit les enregistrements de son niveau (et de ses
+    filtres); les flux sont vidés quand le lot atteint batch_size
+    enregistrements ou après flush_interval secondes.
+    """
+
+    _sentinel = None
+
+    def __init__(self, log_queue, handlers, queue_handler, batch_size=LOG_BATCH_SIZE, flush_interval=LOG_FLUSH_INTERVAL):
+        self.queue = log_queue
+        self.handlers = handlers
+        self.queue_handler = queue_handler
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self._reported_drops = 0
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Vide la file, écrit tout et arrête le thread"""
+        if self._thread is None:
+            return
+        self.queue.put(self._sentinel)
+        self._thread.join()
+        self._thread = None
+        for handler in self.handlers:
+            handler.close()
+
+    def _run(self):
+        unflushed = 0
+        last_flush = time.monotonic()
+        running = True
+
+        while running:
+            batch = []
+            try:
+                record = self.queue.get(timeout=self.flush_interval)
+                if record is self._sentinel:
+                    running = False
+                else:
+                    batch.append(record)
+                    # Récupérer ce qui est déjà en attente, sans bloquer
+                    while len(batch) < self.batch_size:
+                        record = self.queue.get_nowait()
+                        if record is self._sentinel:
+                            running = False
+                            break
+                        batch.append(record)
+            except queue.Empty:
+                pass
+
+            for record in batch:
+                self._handle(record)
+            unflushed += len(batch)
+            self.written += len(batch)
+
+            self._report_drops()
+
+            now = time.monotonic()
+            if unflushed and (unflushed >= self.batch_size or now - last_flush >= self.flush_interval or not running):
+                self._flush()
+                unflushed = 0
+                last_flush = now
+
+    def _handle(self, record):
+        for handler in self.handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+    def _flush(self):
+        for handler in self.handlers:
+            try:
+                if isinstance(handler, BatchFlushMixin):
+                    handler.flush_batch()
+                else:
+                    handler.flush()
+            except Exception:
+                # Ne jamais arrêter le thread d'écriture sur une erreur de flux
+                pass
+
+    def _report_drops(self):
+        dropped = self.queue_handler.dropped
+        if dropped > self._reported_drops:
+            lost = dropped - self._reported_drops
+            self._reported_drops = dropped
+            record = logging.LogRecord(
+                __name__, logging.WARNING, __file__, 0,
+                f"⚠️ File de logs saturée: {lost} enregistrement(s) perdu(s) ({dropped} au total)",
+                None, None
+            )
+            self._handle(record)
+
+def setup_logging(queued=None, overflow=None, max_bytes=LOG_MAX_BYTES,
+                  retention_days=LOG_RETENTION_DAYS, max_total_bytes=LOG_MAX_TOTAL_BYTES,
+                  moderation_retention_days=MODERATION_RETENTION_DAYS,
+                  moderation_max_total_bytes=MODERATION_MAX_TOTAL_BYTES):
+    """
+    Configure le système de logging
+    
+    Les fichiers logs/bot.log et logs/moderation.log tournent à minuit et au-delà
+    de max_bytes; les segments sont compressés en arrière-plan puis supprimés
+    selon leur âge et le budget disque (plus long pour le journal de modération).
+    
+    Args:
+        queued: Écrire les logs depuis un thread dédié plutôt que depuis la
+            boucle asyncio (par défaut: variable d'environnement BOT_LOG_QUEUE=1)
+        overflow: En cas de surcharge, "drop" (abandonner et compter) ou
+            "block" (attendre brièvement) (par défaut: BOT_LOG_QUEUE_OVERFLOW ou "drop")
+        max_bytes: Taille maximale d'un fichier avant rotation
+        retention_days: Durée de conservation des segments du log de debug
+        max_total_bytes: Budget disque des segments du log de debug
+        moderation_retention_days: Durée de conservation du journal de modération
+        moderation_max_total_bytes: Budget disque du journal de modération
+    """
+    
+    global _listener, _queue_handler
+    
+    if queued is None:
+        queued = os.getenv("BOT_LOG_QUEUE", "0") == "1"
+    if overflow is None:
+        overflow = os.getenv("BOT_LOG_QUEUE_OVERFLOW", "drop")
     
     # Créer le dossier logs s'il n'existe pas
     logs_dir = Path("logs")
     logs_dir.mkdir(exist_ok=True)
     
-    # Configuration du logger principal
+    stream_class = BufferedStreamHandler if queued else logging.StreamHandler
+    file_class = BufferedRotatingFileHandler if queued else CompressedRotatingFileHandler
+    
+    main_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    handlers = [
+        # Handler pour la console
+        stream_class(),
+        # Handler pour le fichier de log
+        file_class(
+            logs_dir, "bot",
+            max_bytes=max_bytes,
+            retention_days=retention_days,
+            max_total_bytes=max_total_bytes
+        )
+    ]
+    for handler in handlers:
+        handler.setFormatter(main_formatter)
+    
+    # Handler pour les actions de modération
+    moderation_handler = file_class(
+        logs_dir, "moderation",
+        max_bytes=max_bytes,
+        retention_days=moderation_retention_days,
+        max_total_bytes=moderation_max_total_bytes
+    )
+    moderation_handler.setFormatter(
+        logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    )
+    
+    moderation_logger = logging.getLogger('moderation')
+    moderation_logger.setLevel(logging.INFO)
+    
+    if queued:
+        # Tous les handlers sont derrière une file unique vidée par un thread:
+        # le handler de modération ne garde que les enregistrements du logger 'moderation'
+        moderation_handler.addFilter(logging.Filter('moderation'))
+        log_queue = queue.Queue(LOG_QUEUE_SIZE)
+        _queue_handler = BoundedQueueHandler(log_queue, overflow=overflow)
+        # Le message est figé dans la boucle; le format final est appliqué par le thread
+        _queue_handler.setFormatter(logging.Formatter('%(message)s'))
+        _listener = BatchingQueueListener(log_queue, handlers + [moderation_handler], _queue_handler)
+        _listener.start()
+        root_handlers = [_queue_handler]
+    else:
+        moderation_logger.addHandler(moderation_handler)
+        root_handlers = handlers
+    
+    # Configuration du logger principal (force: simple_bot configure déjà le logging à l'import)
     logging.basicConfig(
         level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            # Handler pour la console
-            logging.StreamHandler(),
-            # Handler pour le fichier de log
-            logging.FileHandler(
-                logs_dir / f"bot_{datetime.now().strftime('%Y%m%d')}.log",
-                encoding='utf-8'
-            )
-        ]
+        handlers=root_handlers,
+        force=True
     )
     
+    atexit.register(shutdown_logging)
+    
     # Réduire le niveau de logging pour discord.py
     discord_logger = logging.getLogger('discord')
     discord_logger.setLevel(logging.WARNING)
+
+def shutdown_logging():
+    """Écrit les logs en attente, arrête le thread d'écriture et termine les compressions"""
     
-    # Logger pour les actions de modération
-    moderation_logger = logging.getLogger('moderation')
-    moderation_handler = logging.FileHandler(
-        logs_dir / f"moderation_{datetime.now().strftime('%Y%m%d')}.log",
-        encoding='utf-8'
-    )
-    moderation_handler.setFormatter(
-        logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-    )
-    moderation_logger.addHandler(moderation_handler)
-    moderation_logger.setLevel(logging.INFO)
+    global _listener
+    
+    if _listener is not None:
+        listener, _listener = _listener, None
+        logging.getLogger().removeHandler(_queue_handler)
+        listener.stop()
+    
+    # Laisser le thread de maintenance finir les compressions en cours
+    if _maintenance is not None:
+        _maintenance.wait()
+
+def get_logging_stats():
+    """
+    Statistiques du pipeline de logs asynchrone
+    
+    Returns:
+        dict: Taille de la file, enregistrements écrits et perdus (vide si le mode file est inactif)
+    """
+    
+    if _listener is None:
+        return {}
+    
+    return {
+        "queue_size": _listener.queue.qsize(),
+        "written": _listener.written,
+        "dropped": _queue_handler.dropped,
+    }
+
+def _post_to_log_channel(guild, text):
+    """Recopie une action dans le salon de logs du serveur (+config logs), sans attendre l'envoi"""
+    
+    channel_id = guild_settings.log_channel_id(guild.id)
+    if channel_id is None:
+        return
+    channel = guild.get_channel(channel_id)
+    if channel is None:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    
+    task = loop.create_task(_send_to_log_channel(channel, text[:2000]))
+    _log_channel_sends.add(task)
+    task.add_done_callback(_log_channel_sends.discard)
+
+async def _send_to_log_channel(channel, text):
+    try:
+        await channel.send(text, allowed_mentions=discord.AllowedMentions.none())
+    except discord.HTTPException as e:
+        logging.getLogger(__name__).warning(f"Salon de logs {channel} inaccessible: {e}")
 
 def log_moderation_action(action, moderator, target, reason, guild):
     """
-    Log une action de modération
+    Log une action de modération et l'enregistre dans le casier
     
     Args:
-        action: Type d'action (BAN, UNBAN, KICK)
+        action: Type d'action (BAN, UNBAN, KICK, MUTE, UNMUTE...)
         moderator: Utilisateur qui effectue l'action
         target: Utilisateur cible
         reason: Raison de l'action
@@ -68,11 +502,51 @@ def log_moderation_action(action, moderator, target, reason, guild):
     )
     
     moderation_logger.info(log_message)
+    case_store.record(action, guild, moderator, [target], reason)
+    _post_to_log_channel(
+        guild, f"{ACTION_EMOJIS.get(action, '🔧')} **{action}** · {target} (`{target.id}`) · par {moderator} · {reason}"
+    )
     
     # Log également dans la console pour le développement
     main_logger = logging.getLogger(__name__)
     main_logger.info(f"🔧 {action}: {target} par {moderator} - {reason}")
 
+def log_moderation_batch(action, moderator, targets, reason, guild):
+    """
+    Log une action de modération sur plusieurs cibles en une seule entrée
+    (un cas par cible dans le casier)
+    
+    Args:
+        action: Type d'action (BAN, KICK, UNMUTE...)
+        moderator: Utilisateur qui effectue l'action
+        targets: Utilisateurs cibles
+        reason: Raison de l'action
+        guild: Serveur où l'action a lieu
+    """
+    
+    moderation_logger = logging.getLogger('moderation')
+    
+    log_message = (
+        f"{action} x{len(targets)} | "
+        f"Serveur: {guild.name} ({guild.id}) | "
+        f"Modérateur: {moderator} ({moderator.id}) | "
+        f"Cibles: {', '.join(str(target.id) for target in targets)} | "
+        f"Raison: {reason}"
+    )
+    
+    moderation_logger.info(log_message)
+    case_store.record(action, guild, moderator, targets, reason)
+    shown = ', '.join(f"`{target.id}`" for target in targets[:LOG_CHANNEL_TARGETS])
+    if len(targets) > LOG_CHANNEL_TARGETS:
+        shown += f" ... et {len(targets) - LOG_CHANNEL_TARGETS} autre(s)"
+    _post_to_log_channel(
+        guild, f"{ACTION_EMOJIS.get(action, '🔧')} **{action}** x{len(targets)} · par {moderator} · {reason}\n{shown}"
+    )
+    
+    # Log également dans la console pour le développement
+    main_logger = logging.getLogger(__name__)
+    main_logger.info(f"🔧 {action} x{len(targets)} par {moderator} - {reason}")
+
 def log_error(error_message, exception=None):
     """
     Log une erreur
@@ -0,0 +1,560 @@
+"""
+Statistiques sur les fichiers de logs (logs/bot*.log, logs/moderation*.log)
+
+Lit en flux les formats écrits par setup_logging et log_moderation_action /
+log_moderation_batch, y compris les segments tournés compressés (.log.gz),
+et agrège les actions de modération (par action, modérateur, cible,
+serveur et jour), les erreurs par type et les commandes exécutées.
+
+Les fichiers (et les gros fichiers non compressés, par tranches de
+CHUNK_BYTES) sont analysés en parallèle par un pool de processus. La mémoire
+utilisée ne dépend pas de la taille des fichiers: les lignes sont lues une à
+une et les compteurs à forte cardinalité (cibles, modérateurs, ...) ne
+gardent que les clés les plus fréquentes.
+
+Usage: python -m utils.logstats [logs/ ...] [--since 2025-08-01] [--until 2025-08-31]
+                                [--action BAN] [--moderator ID|nom] [--guild ID]
+                                [--top 10] [--jobs N] [--json]
+"""
+
+import argparse
+import gzip
+import heapq
+import json
+import os
+import re
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from operator import itemgetter
+from pathlib import Path
+
+# Taille des tranches d'un fichier non compressé analysées en parallèle
+CHUNK_BYTES = 32 * 1024 * 1024
+# Clés gardées par compteur à forte cardinalité (le double avant élagage)
+TOP_CAPACITY = 5000
+TOP_DEFAULT = 10
+
+# '%(asctime)s - %(name)s - %(levelname)s - %(message)s' (logs/bot.log)
+_BOT_RECORD = re.compile(r'(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d),\d{3} - (\S+) - ([A-Z]+) - (.*)')
+# '%(asctime)s - %(levelname)s - %(message)s' (logs/moderation.log)
+_MODERATION_RECORD = re.compile(r'(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d),\d{3} - ([A-Z]+) - (.*)')
+# Messages de log_moderation_action et log_moderation_batch
+_MODERATION_ACTION = re.compile(
+    r'(?P<action>\S+)(?: x(?P<count>\d+))? \| '
+    r'Serveur: (?P<guild>.*) \((?P<guild_id>\d+)\) \| '
+    r'Modérateur: (?P<moderator>.*) \((?P<moderator_id>\d+)\) \| '
+    r'(?:Cible: (?P<target>.*) \((?P<target_id>\d+)\)|Cibles: (?P<targets>[\d, ]*)) \| '
+    r'Raison: ')
+# Commandes journalisées par bot.py ("Commande ban exécutée") et simple_bot.py ("COMMANDE BAN EN LOT tentée")
+_COMMAND = re.compile(r'(?:Commande|COMMANDE) (\w+(?: EN LOT)?) (?:exécutée|tentée)')
+# Nom d'exception dans un message ou en dernière ligne d'une trace
+_EXCEPTION_NAME = re.compile(r'\b((?:[A-Z]\w*)?(?:Error|Exception|Forbidden|NotFound|Timeout))\b')
+_TRACEBACK_END = re.compile(r'([A-Za-z_][\w.]*)(?::\s|$)')
+# Début de la partie variable d'un message d'erreur (détail, utilisateur, serveur, ...)
+_ERROR_DETAIL = re.compile(r'[:|(]| (?:pour|par|dans|sur) ')
+_SEGMENT_DATE = re.compile(r'_(\d{8})(?:\.\d+)?\.log(?:\.gz)?$')
+_NUMBER = re.compile(r'\d+')
+
+class TopCounter:
+    """
+    Compteur borné: au-delà de 2 x capacity clés, seules les capacity plus
+    fréquentes sont gardées
+
+    error borne la sous-estimation possible d'un compte (0: comptes exacts).
+    """
+
+    def __init__(self, capacity=TOP_CAPACITY):
+        self.capacity = capacity
+        self.counts = {}
+        self.error = 0
+
+    def __len__(self):
+        return len(self.counts)
+
+    def add(self, key, count=1):
+        counts = self.counts
+        counts[key] = counts.get(key, 0) + count
+        if len(counts) > 2 * self.capacity:
+            self._prune()
+
+    def _prune(self):
+        kept = heapq.nlargest(self.capacity, self.counts.items(), key=itemgetter(1))
+        # Une clé élaguée puis revue a perdu au plus le plus petit compte gardé
+        self.error += kept[-1][1]
+        self.counts = dict(kept)
+
+    def merge(self, other):
+        for key, count in other.counts.items():
+            self.add(key, count)
+        self.error += other.error
+
+    def most_common(self, n):
+        return heapq.nlargest(n, self.counts.items(), key=itemgetter(1))
+
+class Filters:
+    """Filtres appliqués aux enregistrements (None: pas de filtre)"""
+
+    def __init__(self, since=None, until=None, action=None, moderator=None, guild=None):
+        self.since = since
+        self.until = until
+        self.action = action.upper() if action else None
+        self.moderator = moderator.lower() if moderator else None
+        self.guild = guild
+
+    def in_period(self, timestamp):
+        # Horodatages "AAAA-MM-JJ HH:MM:SS": l'ordre des chaînes est l'ordre chronologique,
+        # et --until 2025-08-31 inclut toute la journée (comparaison sur le préfixe)
+        if self.since and timestamp < self.since:
+            return False
+        if self.until and timestamp[:len(self.until)] > self.until:
+            return False
+        return True
+
+    def moderation_only(self):
+        """True si un filtre ne s'applique qu'au journal de modération"""
+        return bool(self.action or self.moderator or self.guild)
+
+    def skip_segment(self, path):
+        """True si un segment tourné ne peut contenir que des enregistrements antérieurs à --since"""
+        match = _SEGMENT_DATE.search(path)
+        if not self.since or match is None:
+            return False
+        day = match.group(1)
+        return f"{day[:4]}-{day[4:6]}-{day[6:]}" < self.since[:10]
+
+class LogStats:
+    """Agrégats d'un ou plusieurs fichiers de logs, fusionnables entre processus"""
+
+    def __init__(self):
+        self.files = 0
+        self.bytes = 0
+        self.lines = 0
+        self.records = 0
+        self.unparsed = 0
+        self.first = None
+        self.last = None
+
+        self.levels = Counter()
+        self.loggers = Counter()
+        self.commands = Counter()
+        self.errors = TopCounter()
+        self.errors_by_day = Counter()
+
+        self.entries = Counter()            # action -> lignes du journal de modération
+        self.actions = Counter()            # action -> cibles
+        self.actions_by_day = Counter()
+        self.moderators = TopCounter()
+        self.targets = TopCounter()
+        self.guilds = TopCounter()
+
+    def _seen(self, timestamp):
+        if self.first is None or timestamp < self.first:
+            self.first = timestamp
+        if self.last is None or timestamp > self.last:
+            self.last = timestamp
+
+    def add_bot_records(self, counts, first, last):
+        """Enregistrements du log de debug comptés par (logger, niveau)"""
+        for (logger, level), count in counts.items():
+            self.records += count
+            self.levels[level] += count
+            self.loggers[logger] += count
+        if first is not None:
+            self._seen(first)
+            self._seen(last)
+
+    def add_error(self, timestamp, message, tail):
+        self.errors.add(error_type(message, tail))
+        self.errors_by_day[timestamp[:10]] += 1
+
+    def add_moderation_record(self, timestamp, level, message, filters):
+        match = _MODERATION_ACTION.match(message)
+        if match is None:
+            self.unparsed += 1
+            return
+
+        action = match.group('action')
+        moderator = f"{match.group('moderator')} ({match.group('moderator_id')})"
+        if filters.action and action.upper() != filters.action:
+            return
+        if filters.guild and match.group('guild_id') != filters.guild:
+            return
+        if filters.moderator and filters.moderator not in (
+                match.group('moderator_id'), match.group('moderator').lower()):
+            return
+
+        self.records += 1
+        self._seen(timestamp)
+        self.levels[level] += 1
+
+        if match.group('target_id') is not None:
+            count = 1
+            # Par ID: les entrées groupées ne donnent pas les noms des cibles
+            self.targets.add(match.group('target_id'))
+        else:
+            targets = [target for target in match.group('targets').split(', ') if target]
+            count = len(targets)
+            for target in targets:
+                self.targets.add(target)
+
+        self.entries[action] += 1
+        self.actions[action] += count
+        self.actions_by_day[timestamp[:10]] += count
+        self.moderators.add(moderator, count)
+        self.guilds.add(f"{match.group('guild')} ({match.group('guild_id')})", count)
+
+    def merge(self, other):
+        self.files += other.files
+        self.bytes += other.bytes
+        self.lines += other.lines
+        self.records += other.records
+        self.unparsed += other.unparsed
+        if other.first is not None:
+            self._seen(other.first)
+            self._seen(other.last)
+        for name in ('levels', 'loggers', 'commands', 'errors_by_day', 'entries', 'actions', 'actions_by_day'):
+            getattr(self, name).update(getattr(other, name))
+        for name in ('errors', 'moderators', 'targets', 'guilds'):
+            getattr(self, name).merge(getattr(other, name))
+
+    def hours(self):
+        """Durée couverte par les enregistrements, en heures (None si moins d'une minute)"""
+        if self.first is None:
+            return None
+        delta = (datetime.fromisoformat(self.last) - datetime.fromisoformat(self.first)).total_seconds()
+        return delta / 3600 if delta >= 60 else None
+
+    def summary(self, top=TOP_DEFAULT):
+        """
+        Résumé sérialisable en JSON
+
+        Args:
+            top: Nombre d'entrées des classements (modérateurs, cibles, serveurs, erreurs)
+
+        Returns:
+            dict: Volumes lus, période, modération, erreurs et commandes
+        """
+
+        hours = self.hours()
+
+        def rate(count):
+            return round(count / hours, 3) if hours else None
+
+        def ranking(counter):
+            return [[key, count] for key, count in counter.most_common(top)]
+
+        errors = sum(self.errors_by_day.values())
+        return {
+            "files": self.files,
+            "bytes": self.bytes,
+            "lines": self.lines,
+            "records": self.records,
+            "unparsed": self.unparsed,
+            "period": {"start": self.first, "end": self.last, "hours": round(hours, 2) if hours else None},
+            "levels": dict(self.levels.most_common()),
+            "moderation": {
+                "entries": sum(self.entries.values()),
+                "targets": sum(self.actions.values()),
+                "per_hour": rate(sum(self.actions.values())),
+                "actions": {
+                    action: {"targets": count, "entries": self.entries[action], "per_hour": rate(count)}
+                    for action, count in self.actions.most_common()
+                },
+                "by_day": dict(sorted(self.actions_by_day.items())),
+                "top_moderators": ranking(self.moderators),
+                "top_targets": ranking(self.targets),
+                "top_guilds": ranking(self.guilds),
+            },
+            "errors": {
+                "total": errors,
+                "per_hour": rate(errors),
+                "by_day": dict(sorted(self.errors_by_day.items())),
+                "top_types": ranking(self.errors),
+            },
+            "commands": dict(self.commands.most_common()),
+            "loggers": dict(self.loggers.most_common(top)),
+            "approximate": any(counter.error for counter in (self.errors, self.moderators, self.targets, self.guilds)),
+        }
+
+def error_type(message, tail=None):
+    """
+    Type d'une erreur journalisée: début fixe du message, suivi du nom de
+    l'exception (dernière ligne de la trace, ou nom cité dans le message)
+
+    Ex: "ERREUR BAN: 403 Forbidden (error code: 50013)" -> "ERREUR BAN / Forbidden"
+    """
+
+    exception = None
+    if tail is not None:
+        match = _TRACEBACK_END.match(tail)
+        if match is not None:
+            exception = match.group(1).rpartition('.')[2]
+    if exception is None:
+        match = _EXCEPTION_NAME.search(message)
+        if match is not None:
+            exception = match.group(1)
+
+    head = _ERROR_DETAIL.split(message.lstrip('❌⚠️🚨 '), 1)[0].strip()
+    head = _NUMBER.sub('#', head)[:60] or '?'
+    return f"{head} / {exception}" if exception else head
+
+def log_kind(path):
+    """'moderation' ou 'bot' selon le nom du fichier"""
+    return 'moderation' if Path(path).name.startswith('moderation') else 'bot'
+
+def find_logs(paths):
+    """Fichiers de logs (actifs et segments tournés) des chemins donnés, triés"""
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(p for p in path.iterdir()
+                         if p.is_file() and (p.name.endswith('.log') or p.name.endswith('.log.gz')))
+        else:
+            files.append(path)
+    return sorted(files)
+
+def plan_tasks(files, chunk_bytes=CHUNK_BYTES):
+    """Découpe en tâches (chemin, début, fin): un fichier compressé entier, ou une tranche d'un fichier texte"""
+    tasks = []
+    for path in files:
+        size = path.stat().st_size
+        if path.name.endswith('.gz') or size <= chunk_bytes:
+            tasks.append((str(path), 0, None))
+            continue
+        for start in range(0, size, chunk_bytes):
+            end = start + chunk_bytes
+            tasks.append((str(path), start, end if end < size else None))
+    return tasks
+
+def _records(stream, pattern, start, end, stats):
+    """
+    Champs (groupes de pattern) et dernière ligne de continuation de chaque
+    enregistrement commençant dans [start, end), le flux étant placé en start
+    (début de ligne)
+
+    Les lignes de continuation (trace d'exception) d'un enregistrement sont
+    lues même au-delà de end, et ignorées en début de tranche suivante.
+    """
+
+    lines = unparsed = 0
+    position = start
+    fields = tail = None
+    head = start > 0   # lignes de continuation d'un enregistrement de la tranche précédente
+
+    for raw in stream:
+        past_end = end is not None and position >= end
+        position += len(raw)
+        line = raw.decode('utf-8', 'replace').rstrip('\r\n')
+        match = pattern.match(line)
+
+        if match is None:
+            if head:
+                continue
+            lines += 1
+            if fields is not None:
+                tail = line
+            else:
+                unparsed += 1
+            continue
+        if past_end:
+            break
+        head = False
+        lines += 1
+        if fields is not None:
+            yield fields, tail
+        fields = match.groups()
+        tail = None
+
+    if fields is not None:
+        yield fields, tail
+    stats.lines += lines
+    stats.unparsed += unparsed
+
+def analyze(path, start=0, end=None, filters=None):
+    """
+    Analyse une tranche [start, end) d'un fichier de logs
+
+    Args:
+        path: Fichier .log ou .log.gz (le type de log est déduit du nom)
+        start: Position de début (début de ligne ou non)
+        end: Position de fin (None: fin du fichier)
+        filters: Filters (par défaut: aucun)
+
+    Returns:
+        LogStats: Agrégats de la tranche
+    """
+
+    filters = filters or Filters()
+    stats = LogStats()
+    if start == 0:
+        stats.files = 1
+        stats.bytes = os.path.getsize(path)
+
+    moderation = log_kind(path) == 'moderation'
+    if filters.skip_segment(path) or (not moderation and filters.moderation_only()):
+        return stats
+
+    pattern = _MODERATION_RECORD if moderation else _BOT_RECORD
+    opener = gzip.open if path.endswith('.gz') else open
+    period = filters.since or filters.until
+
+    with opener(path, 'rb') as stream:
+        if start:
+            # Se placer au début de la première ligne commençant à partir de start
+            stream.seek(start - 1)
+            stream.readline()
+        records = _records(stream, pattern, stream.tell(), end, stats)
+
+        if moderation:
+            for (timestamp, level, message), _ in records:
+                if not period or filters.in_period(timestamp):
+                    stats.add_moderation_record(timestamp, level, message, filters)
+            return stats
+
+        # Boucle chaude: un compteur local par (logger, niveau), fusionné à la fin
+        counts = {}
+        commands = stats.commands
+        first = last = None
+        for (timestamp, logger, level, message), tail in records:
+            if period and not filters.in_period(timestamp):
+                continue
+            if first is None or timestamp < first:
+                first = timestamp
+            if last is None or timestamp > last:
+                last = timestamp
+            key = (logger, level)
+            counts[key] = counts.get(key, 0) + 1
+            if level == 'INFO':
+                match = _COMMAND.match(message)
+                if match is not None:
+                    commands[match.group(1).lower()] += 1
+            elif level == 'ERROR' or level == 'CRITICAL':
+                stats.add_error(timestamp, message, tail)
+        stats.add_bot_records(counts, first, last)
+    return stats
+
+def _analyze_task(task, filters):
+    path, start, end = task
+    return analyze(path, start, end, filters)
+
+def collect(paths, filters=None, jobs=None, chunk_bytes=CHUNK_BYTES):
+    """
+    Agrège tous les fichiers de logs des chemins donnés
+
+    Args:
+        paths: Fichiers ou dossiers (ex: ["logs"])
+        filters: Filters (par défaut: aucun)
+        jobs: Processus en parallèle (par défaut: nombre de cœurs; 1: dans ce processus)
+        chunk_bytes: Taille des tranches des gros fichiers non compressés
+
+    Returns:
+        LogStats: Agrégats fusionnés
+    """
+
+    filters = filters or Filters()
+    tasks = plan_tasks(find_logs(paths), chunk_bytes)
+    jobs = min(jobs or os.cpu_count() or 1, len(tasks)) or 1
+    stats = LogStats()
+
+    if jobs == 1:
+        for task in tasks:
+            stats.merge(_analyze_task(task, filters))
+        return stats
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        # Fusion au fil de l'eau: un seul résultat partiel à la fois en mémoire
+        for partial in pool.map(_analyze_task, tasks, [filters] * len(tasks)):
+            stats.merge(partial)
+    return stats
+
+def _format_size(size):
+    for unit in ('o', 'Kio', 'Mio', 'Gio'):
+        if size < 1024 or unit == 'Gio':
+            return f"{size:.0f} {unit}" if unit == 'o' else f"{size:.1f} {unit}"
+        size /= 1024
+
+def _format_rate(rate):
+    return f"{rate:.2f}/h" if rate is not None else "-"
+
+def _table(title, rows, total=None):
+    """Section: titre puis lignes (libellé, nombre[, détail]) alignées"""
+    lines = [f"\n=== {title}"]
+    if not rows:
+        lines.append("   (aucune)")
+        return lines
+    width = min(max(len(str(row[0])) for row in rows), 60)
+    for row in rows:
+        label, count = str(row[0]), row[1]
+        if len(label) > width:
+            label = label[:width - 1] + '…'
+        detail = row[2] if len(row) > 2 else (f"{count / total * 100:5.1f}%" if total else "")
+        lines.append(f"   {label:<{width}}  {count:>10}  {detail}")
+    return lines
+
+def format_summary(summary):
+    """Résumé (voir LogStats.summary) sous forme de tableaux texte"""
+    period = summary["period"]
+    moderation = summary["moderation"]
+    errors = summary["errors"]
+    lines = [
+        f"📊 {summary['files']} fichier(s), {_format_size(summary['bytes'])}, "
+        f"{summary['lines']} lignes, {summary['records']} enregistrement(s) retenus"
+        + (f", {summary['unparsed']} ligne(s) non reconnues" if summary['unparsed'] else ""),
+        f"🕒 Période: {period['start'] or '-'} → {period['end'] or '-'}"
+        + (f" ({period['hours']:.1f} h)" if period['hours'] else ""),
+    ]
+
+    lines += _table(
+        f"Actions de modération: {moderation['targets']} cible(s) en {moderation['entries']} entrée(s), "
+        f"{_format_rate(moderation['per_hour'])}",
+        [(action, values["targets"], f"{values['entries']} entrée(s), {_format_rate(values['per_hour'])}")
+         for action, values in moderation["actions"].items()])
+    lines += _table("Modérateurs", moderation["top_moderators"], moderation["targets"])
+    lines += _table("Cibles (ID)", moderation["top_targets"], moderation["targets"])
+    lines += _table("Serveurs", moderation["top_guilds"], moderation["targets"])
+    lines += _table("Actions par jour", list(moderation["by_day"].items()))
+
+    lines += _table(f"Erreurs: {errors['total']}, {_format_rate(errors['per_hour'])}",
+                    errors["top_types"], errors["total"])
+    lines += _table("Erreurs par jour", list(errors["by_day"].items()))
+    lines += _table("Commandes", list(summary["commands"].items()), sum(summary["commands"].values()))
+    lines += _table("Niveaux", list(summary["levels"].items()), summary["records"])
+
+    if summary["approximate"]:
+        lines.append("\n⚠️ Classements approximatifs (trop de clés distinctes, comptes minorés)")
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("paths", nargs="*", default=["logs"], help="fichiers ou dossiers de logs (défaut: logs)")
+    parser.add_argument("--since", help="début de période (AAAA-MM-JJ[ HH:MM:SS])")
+    parser.add_argument("--until", help="fin de période incluse (AAAA-MM-JJ[ HH:MM:SS])")
+    parser.add_argument("--action", help="action de modération (BAN, KICK, UNBAN, ...)")
+    parser.add_argument("--moderator", help="ID ou nom du modérateur")
+    parser.add_argument("--guild", help="ID du serveur")
+    parser.add_argument("--top", type=int, default=TOP_DEFAULT, help="taille des classements")
+    parser.add_argument("--jobs", type=int, default=None, help="processus en parallèle (défaut: nombre de cœurs)")
+    parser.add_argument("--json", action="store_true", help="sortie JSON")
+    args = parser.parse_args(argv)
+
+    filters = Filters(since=args.since, until=args.until, action=args.action,
+                      moderator=args.moderator, guild=args.guild)
+    started = time.perf_counter()
+    stats = collect(args.paths, filters, jobs=args.jobs)
+    elapsed = time.perf_counter() - started
+
+    summary = stats.summary(args.top)
+    if args.json:
+        summary["elapsed"] = round(elapsed, 3)
+        json.dump(summary, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        print(format_summary(summary))
+        print(f"\n⏱️ {elapsed:.2f} s ({_format_size(stats.bytes / elapsed if elapsed else 0)}/s)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,13 +4,23 @@ Point d'entrée principal pour le bot Discord de modération
 """
 
 import os
+import argparse
 import asyncio
 import logging
-from simple_bot import bot
+from simple_bot import bot, muted_users_roles
+from utils.scheduler import sanction_scheduler
 from utils.logger import setup_logging
+from utils.profiler import bot_profiler
 
 def main():
     """Fonction principale pour démarrer le bot"""
+    parser = argparse.ArgumentParser(description="Bot Discord de modération")
+    parser.add_argument("--profile", action="store_true",
+                        help="Détecter les blocages de la boucle et rapporter les handlers lents (équivaut à BOT_PROFILE=1)")
+    args = parser.parse_args()
+    if args.profile:
+        bot_profiler.enabled = True
+    
     # Configuration du logging
     setup_logging()
     logger = logging.getLogger(__name__)
@@ -41,6 +51,10 @@ def main():
         logger.info("🛑 Arrêt du bot demandé par l'utilisateur")
     except Exception as e:
         logger.error(f"❌ Erreur lors du démarrage du bot: {e}")
+    finally:
+        # Écrire les rôles sauvegardés et les échéances encore en attente
+        muted_users_roles.close()
+        sanction_scheduler.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,264 @@
+"""
+Résolution des membres à la demande pour les gros serveurs
+
+Par défaut, discord.py découpe ("chunk") chaque serveur au démarrage et garde
+tous les membres en mémoire. En mode membres à la demande
+(BOT_LAZY_MEMBERS=1), le bot ne demande plus la liste des membres au
+démarrage et ne garde que lui-même dans le cache de discord.py; les membres
+réellement utilisés (cibles des commandes) sont récupérés via le gateway
+(query_members) ou l'API (fetch_member) et gardés peu de temps dans un cache
+LRU borné.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+
+import discord
+
+from utils.hierarchy import hierarchy_cache
+
+logger = logging.getLogger(__name__)
+
+# Cache des membres résolus: taille maximale et durée de vie (les mises à jour
+# de rôles des membres hors cache ne sont pas transmises par discord.py)
+MEMBER_CACHE_SIZE = 10000
+MEMBER_CACHE_TTL = 60.0
+# Durée de vie d'un "n'est pas membre"
+NOT_MEMBER_TTL = 30.0
+# IDs par requête REQUEST_GUILD_MEMBERS (limite de Discord)
+QUERY_BATCH_SIZE = 100
+
+def lazy_members_enabled():
+    """True si le mode membres à la demande est activé (variable BOT_LAZY_MEMBERS=1)"""
+    return os.getenv("BOT_LAZY_MEMBERS", "0") == "1"
+
+def configure_member_cache(lazy=None):
+    """
+    Configure le cache des membres et retourne les options de commands.Bot
+
+    En mode membres à la demande, l'instantané de hiérarchie ne mémorise plus
+    les rangs des membres.
+
+    Args:
+        lazy: Forcer le mode (par défaut: lazy_members_enabled())
+
+    Returns:
+        dict: {} en mode normal; sans découpage au démarrage ni cache des membres sinon
+    """
+
+    if lazy is None:
+        lazy = lazy_members_enabled()
+    if not lazy:
+        return {}
+
+    # Les membres récupérés par les commandes ne sont pas non plus gardés par discord.py:
+    # l'instantané de hiérarchie ne peut donc pas mémoriser leurs rangs (pas d'on_member_update)
+    hierarchy_cache.cache_members = False
+    logger.info("👥 Mode membres à la demande: pas de découpage au démarrage, cache des membres borné")
+    return {
+        "chunk_guilds_at_startup": False,
+        "member_cache_flags": discord.MemberCacheFlags.none(),
+    }
+
+class MemberResolver:
+    """
+    Membres par (serveur, ID): cache de discord.py, puis cache LRU à durée de
+    vie courte, puis requête gateway ou REST
+
+    Les requêtes simultanées pour un même membre sont regroupées.
+    """
+
+    def __init__(self, max_size=MEMBER_CACHE_SIZE, ttl=MEMBER_CACHE_TTL, not_member_ttl=NOT_MEMBER_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.not_member_ttl = not_member_ttl
+        self._entries = OrderedDict()   # (guild_id, user_id) -> (membre ou None, expiration)
+        self._inflight = {}             # (guild_id, user_id) -> Future
+
+        # Compteurs exposés via stats()
+        self.hits = 0
+        self.misses = 0
+        self.fetched = 0
+        self.not_found = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _lookup(self, guild, user_id):
+        """(trouvé, membre) depuis les caches, sans requête"""
+        member = guild.get_member(user_id)
+        if member is not None:
+            return True, member
+
+        key = (guild.id, user_id)
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        if entry[1] < time.monotonic():
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, entry[0]
+
+    def get_cached(self, guild, user_id):
+        """Membre en cache (discord.py ou résolu récemment), sans requête; None sinon"""
+        return self._lookup(guild, user_id)[1]
+
+    def add(self, guild_id, user_id, member):
+        """Mémorise un membre résolu (ou None: n'est pas membre)"""
+        ttl = self.ttl if member is not None else self.not_member_ttl
+        key = (guild_id, user_id)
+        self._entries[key] = (member, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def discard(self, guild_id, user_id):
+        """À appeler quand un membre quitte le serveur ou change"""
+        self._entries.pop((guild_id, user_id), None)
+
+    def discard_guild(self, guild_id):
+        for key in [key for key in self._entries if key[0] == guild_id]:
+            del self._entries[key]
+
+    def _complete(self, guild):
+        """True si le cache de discord.py contient tous les membres du serveur"""
+        return guild.chunked and guild._state.member_cache_flags.joined
+
+    async def resolve(self, guild, user_id):
+        """
+        Membre du serveur par ID
+
+        Args:
+            guild: Serveur
+            user_id: ID de l'utilisateur
+
+        Returns:
+            discord.Member: Le membre, ou None si l'utilisateur n'est pas membre
+        """
+
+        found, member = self._lookup(guild, user_id)
+        if found:
+            self.hits += 1
+            return member
+        if self._complete(guild):
+            return None
+
+        self.misses += 1
+        key = (guild.id, user_id)
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        pending = self._inflight[key] = asyncio.get_running_loop().create_future()
+        try:
+            member = await self._fetch(guild, user_id)
+            self.add(guild.id, user_id, member)
+            pending.set_result(member)
+            return member
+        except Exception as e:
+            pending.set_exception(e)
+            pending.exception()  # marquée comme récupérée s'il n'y a pas d'autre attente
+            raise
+        finally:
+            del self._inflight[key]
+
+    async def _fetch(self, guild, user_id):
+        # Comme le MemberConverter de discord.py: gateway si possible, REST sinon
+        self.fetched += 1
+        ws = guild._state._get_websocket(shard_id=guild.shard_id)
+        if ws is not None and not ws.is_ratelimited():
+            members = await guild.query_members(limit=1, user_ids=[user_id], cache=False)
+            member = members[0] if members else None
+        else:
+            try:
+                member = await guild.fetch_member(user_id)
+            except discord.NotFound:
+                member = None
+        if member is None:
+            self.not_found += 1
+        return member
+
+    async def resolve_many(self, guild, user_ids):
+        """
+        Membres d'une liste d'IDs, les manquants récupérés par lots de QUERY_BATCH_SIZE
+
+        Returns:
+            dict: ID -> membre (None pour les non-membres)
+        """
+
+        resolved = {}
+        missing = []
+        for user_id in user_ids:
+            found, member = self._lookup(guild, user_id)
+            if found:
+                self.hits += 1
+                resolved[user_id] = member
+            elif self._complete(guild):
+                resolved[user_id] = None
+            else:
+                missing.append(user_id)
+
+        if missing:
+            self.misses += len(missing)
+            ws = guild._state._get_websocket(shard_id=guild.shard_id)
+            for start in range(0, len(missing), QUERY_BATCH_SIZE):
+                batch = missing[start:start + QUERY_BATCH_SIZE]
+                self.fetched += len(batch)
+                if ws is not None and not ws.is_ratelimited():
+                    members = await guild.query_members(limit=len(batch), user_ids=batch, cache=False)
+                    found = {member.id: member for member in members}
+                else:
+                    found = {}
+                    for user_id in batch:
+                        try:
+                            found[user_id] = await guild.fetch_member(user_id)
+                        except discord.NotFound:
+                            pass
+                for user_id in batch:
+                    member = found.get(user_id)
+                    if member is None:
+                        self.not_found += 1
+                    self.add(guild.id, user_id, member)
+                    resolved[user_id] = member
+        return resolved
+
+    async def members_with_role(self, guild, role):
+        """
+        Tous les membres ayant un rôle, sans les garder en cache
+
+        Sans découpage au démarrage, role.members est vide: la liste complète
+        est demandée au gateway pour l'occasion (action de masse, ex: unmute all).
+        """
+
+        if self._complete(guild):
+            return list(role.members)
+        members = await guild.chunk(cache=False)
+        return [member for member in members if member.get_role(role.id) is not None]
+
+    def stats(self):
+        """
+        Statistiques du résolveur
+
+        Returns:
+            dict: Entrées, hits/misses, membres récupérés, introuvables et évictions
+        """
+
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "fetched": self.fetched,
+            "not_found": self.not_found,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+# Résolveur partagé par les deux bots
+member_resolver = MemberResolver()
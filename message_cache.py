@@ -0,0 +1,172 @@
+"""
+Cache des auteurs de messages récents pour résoudre les réponses sans requête REST
+"""
+
+import logging
+import sys
+import time
+from collections import OrderedDict
+
+import discord
+
+from utils.member_resolver import member_resolver
+
+logger = logging.getLogger(__name__)
+
+# Budget mémoire par défaut du cache et durée de vie des entrées
+MESSAGE_CACHE_MAX_BYTES = 8 * 1024 * 1024
+MESSAGE_CACHE_TTL = 15 * 60
+
+# Taille d'une entrée: clé + tuple (author_id, guild_id, horodatage) + ses
+# éléments + emplacement dans l'OrderedDict (table de hachage et nœud de la
+# liste chaînée). Les snowflakes ont tous la même taille en mémoire.
+_SNOWFLAKE = (1 << 62) + 1
+_SLOT_OVERHEAD = 104
+ENTRY_BYTES = (
+    sys.getsizeof(_SNOWFLAKE) * 3
+    + sys.getsizeof((_SNOWFLAKE, _SNOWFLAKE, 0.0))
+    + sys.getsizeof(0.0)
+    + _SLOT_OVERHEAD
+)
+
+class MessageAuthorCache:
+    """
+    Cache LRU message_id -> (author_id, guild_id) avec expiration
+
+    Alimenté par on_message. La taille est bornée en octets (estimation par
+    entrée), les entrées les moins récemment utilisées sont évincées en
+    premier et celles plus vieilles que le TTL sont ignorées.
+    """
+
+    def __init__(self, max_bytes=MESSAGE_CACHE_MAX_BYTES, ttl=MESSAGE_CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+
+        # Compteurs exposés via stats()
+        self.resolved_hits = 0   # référence déjà résolue par Discord
+        self.hits = 0            # trouvé dans le cache
+        self.misses = 0          # requête REST nécessaire
+        self.expired = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def bytes(self):
+        """Mémoire estimée occupée par les entrées"""
+        return len(self._entries) * ENTRY_BYTES
+
+    def add(self, message):
+        """
+        Mémorise l'auteur d'un message
+
+        Args:
+            message: Message reçu (on_message)
+        """
+
+        if message.guild is None:
+            return
+
+        entries = self._entries
+        entries[message.id] = (message.author.id, message.guild.id, time.monotonic())
+        entries.move_to_end(message.id)
+
+        max_entries = self.max_bytes // ENTRY_BYTES
+        while len(entries) > max_entries:
+            entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, message_id):
+        """
+        Retourne (author_id, guild_id) pour un message, ou None s'il est absent ou expiré
+
+        Args:
+            message_id: ID du message
+        """
+
+        entry = self._entries.get(message_id)
+        if entry is None:
+            return None
+
+        if time.monotonic() - entry[2] > self.ttl:
+            del self._entries[message_id]
+            self.expired += 1
+            return None
+
+        self._entries.move_to_end(message_id)
+        return entry[0], entry[1]
+
+    def stats(self):
+        """
+        Statistiques du cache
+
+        Returns:
+            dict: Compteurs de hits/misses, nombre d'entrées et mémoire estimée
+        """
+
+        lookups = self.resolved_hits + self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "resolved_hits": self.resolved_hits,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "hit_ratio": (self.resolved_hits + self.hits) / lookups if lookups else 0.0,
+        }
+
+# Cache partagé, alimenté par on_message
+message_cache = MessageAuthorCache()
+
+async def resolve_reference_author(ctx, cache=message_cache):
+    """
+    Détermine l'auteur du message auquel la commande répond
+
+    Essaie dans l'ordre: la référence déjà résolue par Discord, le cache des
+    messages récents, puis la récupération du message via l'API.
+
+    Args:
+        ctx: Contexte de la commande
+        cache: Cache des auteurs de messages
+
+    Returns:
+        discord.Member ou discord.User: L'auteur, ou None si la commande n'est pas une réponse
+
+    Raises:
+        discord.NotFound, discord.Forbidden, discord.HTTPException: comme fetch_message
+    """
+
+    reference = ctx.message.reference
+    if reference is None or reference.message_id is None:
+        return None
+
+    # 1. Discord fournit souvent le message référencé avec la commande
+    if isinstance(reference.resolved, discord.Message):
+        cache.resolved_hits += 1
+        return await _as_member(ctx, reference.resolved.author)
+
+    # 2. Message vu récemment dans on_message (membre en cache, ou résolu à la demande)
+    entry = cache.get(reference.message_id)
+    if entry is not None and ctx.guild is not None and entry[1] == ctx.guild.id:
+        member = await member_resolver.resolve(ctx.guild, entry[0])
+        if member is not None:
+            cache.hits += 1
+            return member
+
+    # 3. Requête REST
+    cache.misses += 1
+    referenced_message = await ctx.channel.fetch_message(reference.message_id)
+    cache.add(referenced_message)
+    return await _as_member(ctx, referenced_message.author)
+
+async def _as_member(ctx, author):
+    # Sans cache des membres (BOT_LAZY_MEMBERS=1), discord.py ne donne qu'un
+    # discord.User pour l'auteur d'un message référencé ou récupéré via l'API
+    if isinstance(author, discord.Member) or ctx.guild is None:
+        return author
+    member = await member_resolver.resolve(ctx.guild, author.id)
+    return member if member is not None else author
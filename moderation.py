@@ -0,0 +1,344 @@
+"""
+Actions de modération en lot: ban/kick de plusieurs utilisateurs en une commande
+"""
+
+import logging
+import re
+import time
+from datetime import datetime
+from functools import partial
+
+import discord
+from discord.ext import commands
+
+from utils.bulk import retryable_items
+from utils.logger import log_moderation_batch
+from utils.member_resolver import member_resolver
+from utils.permissions import filter_moderation_targets
+from utils.singleflight import moderation_flights
+
+logger = logging.getLogger(__name__)
+
+# Taille maximale d'un appel au endpoint de bannissement en masse
+BULK_BAN_CHUNK = 200
+# Nombre maximum de cibles par commande
+MAX_BATCH_TARGETS = 1000
+# Taille maximale d'une pièce jointe contenant une liste d'IDs
+MAX_ATTACHMENT_BYTES = 1024 * 1024
+
+_MENTION_OR_ID = re.compile(r'<@!?(\d{15,21})>|(\d{15,21})')
+_ID = re.compile(r'(?<!\d)\d{15,21}(?!\d)')
+
+ACTION_LABELS = {
+    "BAN": ("🔨", "banni(s)", "Bannissement en lot", discord.Color.red()),
+    "KICK": ("👢", "expulsé(s)", "Expulsion en lot", discord.Color.orange()),
+}
+
+def parse_targets(text):
+    """
+    Sépare les cibles (mentions ou IDs en tête de commande) de la raison
+
+    Args:
+        text: Arguments de la commande, ex: "<@1> <@2> 1234... spam"
+
+    Returns:
+        tuple: (liste d'IDs sans doublons, raison ou None)
+    """
+
+    ids = []
+    seen = set()
+    rest = (text or "").strip()
+    while rest:
+        parts = rest.split(None, 1)
+        match = _MENTION_OR_ID.fullmatch(parts[0])
+        if match is None:
+            break
+        user_id = int(match.group(1) or match.group(2))
+        if user_id not in seen:
+            seen.add(user_id)
+            ids.append(user_id)
+        rest = parts[1] if len(parts) > 1 else ""
+
+    return ids, rest or None
+
+async def parse_command_targets(ctx, text):
+    """
+    Cibles d'une commande +ban/+kick et raison
+
+    Comme parse_targets(); sans mention ni ID en tête, le premier mot est
+    cherché parmi les membres du serveur (nom, pseudo ou nom#discriminator)
+    avant d'être considéré comme le début de la raison.
+
+    Returns:
+        tuple: (liste d'IDs sans doublons, raison ou None)
+    """
+
+    ids, rest = parse_targets(text)
+    if ids or not rest:
+        return ids, rest
+
+    parts = rest.split(None, 1)
+    try:
+        member = await commands.MemberConverter().convert(ctx, parts[0])
+    except commands.BadArgument:
+        return ids, rest
+    return [member.id], parts[1] if len(parts) > 1 else None
+
+async def read_attachment_ids(message):
+    """
+    Lit les IDs d'utilisateurs contenus dans les pièces jointes texte d'un message
+
+    Args:
+        message: Message de la commande
+
+    Returns:
+        list: IDs trouvés (dans l'ordre, sans doublons)
+    """
+
+    ids = []
+    seen = set()
+    for attachment in message.attachments:
+        if attachment.size > MAX_ATTACHMENT_BYTES:
+            logger.warning(f"Pièce jointe ignorée (trop volumineuse): {attachment.filename}")
+            continue
+        if attachment.content_type and not attachment.content_type.startswith('text/'):
+            continue
+
+        data = await attachment.read()
+        for raw_id in _ID.findall(data.decode('utf-8', errors='ignore')):
+            user_id = int(raw_id)
+            if user_id not in seen:
+                seen.add(user_id)
+                ids.append(user_id)
+
+    return ids
+
+async def resolve_targets(guild, ids):
+    """
+    Associe chaque ID à un membre du serveur si possible
+
+    Returns:
+        list: discord.Member pour les membres (en cache ou récupérés), discord.Object sinon
+    """
+    members = await member_resolver.resolve_many(guild, ids)
+    return [members.get(user_id) or discord.Object(id=user_id) for user_id in ids]
+
+class BatchOutcome:
+    """Résultat d'une action en lot"""
+
+    def __init__(self, action, targets):
+        self.action = action
+        self.targets = targets
+        self.succeeded = []
+        self.failed = []
+        # IDs en échec à réessayer plus tard (hors cibles disparues)
+        self.retryable = []
+        self.started_at = time.perf_counter()
+        self.elapsed = 0.0
+
+    def _finish(self, failed_ids):
+        for target in self.targets:
+            (self.failed if target.id in failed_ids else self.succeeded).append(target)
+        self.elapsed = time.perf_counter() - self.started_at
+        return self
+
+async def ban_many(guild, targets, reason, executor, channel=None):
+    """
+    Bannit plusieurs utilisateurs via le endpoint de bannissement en masse
+
+    Les cibles sont envoyées par paquets de BULK_BAN_CHUNK. Si le endpoint est
+    refusé (il demande aussi la permission Gérer le serveur), le paquet est
+    banni individuellement via l'exécuteur de masse.
+
+    Args:
+        guild: Serveur
+        targets: Membres ou discord.Object à bannir
+        reason: Raison pour le journal d'audit
+        executor: BulkExecutor pour le repli individuel
+        channel: Salon pour la progression du repli (optionnel)
+
+    Returns:
+        BatchOutcome: Cibles bannies et en échec
+    """
+
+    outcome = BatchOutcome("BAN", targets)
+    failed_ids = set()
+
+    for start in range(0, len(targets), BULK_BAN_CHUNK):
+        chunk = targets[start:start + BULK_BAN_CHUNK]
+        try:
+            result = await guild.bulk_ban(chunk, reason=reason, delete_message_seconds=0)
+            failed_ids.update(user.id for user in result.failed)
+        except discord.HTTPException as e:
+            logger.warning(f"Bannissement en masse refusé ({e}), repli sur des bannissements individuels")
+            ban = partial(guild.ban, reason=reason, delete_message_seconds=0)
+            result = await executor.run(chunk, ban, channel=channel, label="Ban")
+            failed_ids.update(user.id for user in result.failed_items)
+
+    return outcome._finish(failed_ids)
+
+async def kick_many(guild, members, reason, executor, channel=None):
+    """
+    Expulse plusieurs membres en parallèle (concurrence bornée par l'exécuteur)
+
+    Returns:
+        BatchOutcome: Membres expulsés et en échec
+    """
+
+    outcome = BatchOutcome("KICK", members)
+
+    async def kick(member):
+        await guild.kick(member, reason=reason)
+
+    result = await executor.run(members, kick, channel=channel, label="Kick")
+    return outcome._finish({member.id for member in result.failed_items})
+
+async def unban_many(guild, moderator, user_ids, reason, executor, channel=None):
+    """
+    Débannit plusieurs utilisateurs en parallèle et écrit une seule entrée de log
+
+    Les comptes qui ne sont plus bannis comptent comme des échecs, mais pas
+    parmi outcome.retryable (les échecs passagers, à replanifier).
+
+    Returns:
+        BatchOutcome: Utilisateurs débannis et en échec
+    """
+
+    outcome = BatchOutcome("UNBAN", [discord.Object(id=user_id) for user_id in user_ids])
+    unban = partial(guild.unban, reason=reason)
+    result = await executor.run(outcome.targets, unban, channel=channel, label="Unban")
+    outcome._finish({target.id for target in result.failed_items})
+    outcome.retryable = [target.id for target in retryable_items(result)]
+
+    if outcome.succeeded:
+        log_moderation_batch("UNBAN", moderator, outcome.succeeded, reason, guild)
+    logger.info(
+        f"UNBAN EN LOT: {len(outcome.succeeded)}/{len(user_ids)} réussi(s) par {moderator} "
+        f"en {outcome.elapsed:.2f}s"
+    )
+    return outcome
+
+async def execute_batch(guild, moderator, action, targets, reason, executor, channel=None):
+    """
+    Exécute un ban ou un kick en lot et écrit une seule entrée de log
+
+    Args:
+        guild: Serveur
+        moderator: Auteur de l'action (membre ou bot)
+        action: "BAN" ou "KICK"
+        targets: Cibles déjà vérifiées
+        reason: Raison pour le journal d'audit
+        executor: BulkExecutor partagé
+        channel: Salon pour la progression (optionnel)
+
+    Returns:
+        BatchOutcome: Résultat de l'action
+    """
+
+    if action == "BAN":
+        outcome = await ban_many(guild, targets, reason, executor, channel)
+    else:
+        outcome = await kick_many(guild, targets, reason, executor, channel)
+
+    if outcome.succeeded:
+        log_moderation_batch(action, moderator, outcome.succeeded, reason, guild)
+    logger.info(
+        f"{action} EN LOT: {len(outcome.succeeded)}/{len(targets)} réussi(s) par {moderator} "
+        f"en {outcome.elapsed:.2f}s"
+    )
+    return outcome
+
+def _format_target(target):
+    return f"{target} ({target.id})" if isinstance(target, (discord.Member, discord.User)) else f"<@{target.id}> ({target.id})"
+
+def _format_list(lines, limit=10, max_length=1024):
+    # Un champ d'embed est limité à 1024 caractères
+    shown = lines[:limit]
+    while True:
+        text = '\n'.join(shown)
+        if len(lines) > len(shown):
+            text += f"\n... et {len(lines) - len(shown)} autre(s)"
+        if len(text) <= max_length or len(shown) <= 1:
+            return text[:max_length]
+        shown = shown[:-1]
+
+def batch_summary_embed(action, outcome, rejected, moderator, reason):
+    """
+    Embed récapitulatif unique d'une action en lot
+
+    Args:
+        action: "BAN" ou "KICK"
+        outcome: BatchOutcome de l'action (ou None si aucune cible autorisée)
+        rejected: Liste de (cible, message d'erreur) écartées par les vérifications
+        moderator: Auteur de l'action
+        reason: Raison affichée
+    """
+
+    emoji, verb, title, color = ACTION_LABELS[action]
+    succeeded = outcome.succeeded if outcome else []
+    failed = outcome.failed if outcome else []
+    total = len(succeeded) + len(failed) + len(rejected)
+
+    embed = discord.Embed(
+        title=f"{emoji} {title}",
+        description=f"**{len(succeeded)}** utilisateur(s) {verb} sur {total}",
+        color=color,
+        timestamp=datetime.now()
+    )
+    embed.add_field(name="Raison", value=reason, inline=False)
+    embed.add_field(name="Modérateur", value=moderator.mention, inline=True)
+    if failed:
+        embed.add_field(name="Échecs", value=_format_list([f"• {_format_target(t)}" for t in failed]), inline=False)
+    if rejected:
+        lines = [f"• {_format_target(t)}: {message.lstrip('❌⏳ ')}" for t, message in rejected]
+        embed.add_field(name="Refusés", value=_format_list(lines), inline=False)
+    if outcome:
+        embed.set_footer(text=f"Traité en {outcome.elapsed:.1f}s")
+    return embed
+
+async def run_batch_command(ctx, action, ids, reason, executor, before_action=None):
+    """
+    Traite une commande de ban/kick visant plusieurs utilisateurs
+
+    Les vérifications de hiérarchie sont faites une seule fois pour tout le
+    lot, puis un seul embed récapitulatif est envoyé.
+
+    Args:
+        ctx: Contexte de la commande
+        action: "BAN" ou "KICK"
+        ids: IDs des cibles
+        reason: Raison pour le journal d'audit
+        executor: BulkExecutor partagé
+        before_action: Coroutine appelée avec les cibles autorisées avant l'action (ex: MPs)
+
+    Returns:
+        BatchOutcome: Résultat de l'action, ou None si aucune cible n'était autorisée
+    """
+
+    if len(ids) > MAX_BATCH_TARGETS:
+        await ctx.send(f"⚠️ Seules les {MAX_BATCH_TARGETS} premières cibles sur {len(ids)} seront traitées.")
+        ids = ids[:MAX_BATCH_TARGETS]
+
+    # Les non-membres peuvent être bannis (comptes déjà partis), pas expulsés
+    targets = await resolve_targets(ctx.guild, ids)
+    allowed, rejected = filter_moderation_targets(ctx, targets, action.lower(), require_member=action == "KICK")
+
+    # Les cibles déjà visées par la même action (autre commande en cours) sont écartées
+    claimed, busy = moderation_flights.claim([(ctx.guild.id, target.id, action) for target in allowed])
+    if busy:
+        busy_ids = {key[1] for key in busy}
+        rejected += [(target, "⏳ Déjà en cours de traitement par une autre commande")
+                     for target in allowed if target.id in busy_ids]
+        allowed = [target for target in allowed if target.id not in busy_ids]
+
+    outcome = None
+    try:
+        if allowed:
+            if before_action is not None:
+                await before_action(allowed)
+            outcome = await execute_batch(ctx.guild, ctx.author, action, allowed, reason, executor, ctx.channel)
+    finally:
+        moderation_flights.release(claimed, outcome)
+
+    await ctx.send(embed=batch_summary_embed(action, outcome, rejected, ctx.author, reason))
+    return outcome
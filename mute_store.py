@@ -0,0 +1,236 @@
+"""
+Stockage persistant des rôles sauvegardés des utilisateurs mutés
+"""
+
+import asyncio
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Format du journal: une suite d'enregistrements
+#   op (1 octet) | guild_id (8) | user_id (8) | nombre de rôles (2) | role_id (8) * n
+# Les entiers sont en little-endian.
+_HEADER = struct.Struct('<BQQH')
+_OP_SET = 1
+_OP_DELETE = 2
+
+# Au-delà de cette taille, le journal est lu via mmap plutôt que chargé en mémoire
+MMAP_THRESHOLD = 1 << 20
+
+def _encode(op, guild_id, user_id, role_ids=None):
+    roles = role_ids if role_ids is not None else array('Q')
+    if sys.byteorder != 'little':
+        roles = array('Q', roles)
+        roles.byteswap()
+    return _HEADER.pack(op, guild_id, user_id, len(roles)) + roles.tobytes()
+
+class MuteRoleStore:
+    """
+    Rôles sauvegardés avant un mute, par (serveur, utilisateur)
+
+    Les IDs de rôles sont gardés dans des array('Q') (8 octets par rôle)
+    plutôt que dans des listes d'entiers Python. Chaque modification est
+    ajoutée à un journal append-only écrit en arrière-plan (hors de la boucle
+    asyncio); le journal est compacté périodiquement pour que sa taille, et
+    donc le temps de démarrage, reste proportionnelle aux entrées actives.
+    """
+
+    def __init__(self, path, flush_interval=2.0, compact_ratio=4, min_compact_records=1024):
+        self.path = Path(path)
+        self.flush_interval = flush_interval
+        self.compact_ratio = compact_ratio
+        self.min_compact_records = min_compact_records
+
+        self._entries = {}              # (guild_id, user_id) -> array('Q')
+        self._pending = bytearray()     # enregistrements pas encore écrits
+        self._journal_records = 0       # enregistrements présents dans le fichier
+        self._flush_lock = asyncio.Lock()
+        self._io_lock = threading.Lock()
+        self._flush_task = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, guild_id, user_id):
+        """
+        Retourne les IDs de rôles sauvegardés
+
+        Args:
+            guild_id: ID du serveur
+            user_id: ID de l'utilisateur
+
+        Returns:
+            array: IDs des rôles sauvegardés, ou None si aucune sauvegarde
+        """
+        return self._entries.get((guild_id, user_id))
+
+    def set(self, guild_id, user_id, role_ids):
+        """
+        Sauvegarde les rôles d'un utilisateur
+
+        Args:
+            guild_id: ID du serveur
+            user_id: ID de l'utilisateur
+            role_ids: IDs des rôles à restaurer au unmute
+        """
+
+        roles = array('Q', role_ids)
+        self._entries[(guild_id, user_id)] = roles
+        self._pending += _encode(_OP_SET, guild_id, user_id, roles)
+
+    def pop(self, guild_id, user_id):
+        """
+        Supprime la sauvegarde d'un utilisateur
+
+        Returns:
+            array: IDs des rôles qui étaient sauvegardés, ou None
+        """
+
+        roles = self._entries.pop((guild_id, user_id), None)
+        if roles is not None:
+            self._pending += _encode(_OP_DELETE, guild_id, user_id)
+        return roles
+
+    def load(self):
+        """Charge le journal depuis le disque (une seule lecture séquentielle)"""
+
+        if not self.path.exists():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            return
+
+        size = self.path.stat().st_size
+        if size == 0:
+            return
+
+        with open(self.path, 'rb') as f:
+            if size >= MMAP_THRESHOLD:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    valid = self._replay(memoryview(data))
+            else:
+                valid = self._replay(memoryview(f.read()))
+
+        if valid < size:
+            # Enregistrement incomplet en fin de fichier (arrêt brutal): on le coupe
+            logger.warning(f"Journal {self.path} tronqué: {size - valid} octet(s) ignoré(s)")
+            os.truncate(self.path, valid)
+
+        logger.info(
+            f"Rôles sauvegardés chargés: {len(self._entries)} utilisateur(s) "
+            f"({self._journal_records} enregistrement(s) dans le journal)"
+        )
+
+    def _replay(self, data):
+        entries = self._entries
+        offset = 0
+        records = 0
+        end = len(data)
+        header_size = _HEADER.size
+
+        try:
+            while offset + header_size <= end:
+                op, guild_id, user_id, count = _HEADER.unpack_from(data, offset)
+                record_end = offset + header_size + count * 8
+                if record_end > end or op not in (_OP_SET, _OP_DELETE):
+                    break
+
+                if op == _OP_SET:
+                    roles = array('Q')
+                    roles.frombytes(data[offset + header_size:record_end])
+                    if sys.byteorder != 'little':
+                        roles.byteswap()
+                    entries[(guild_id, user_id)] = roles
+                else:
+                    entries.pop((guild_id, user_id), None)
+
+                offset = record_end
+                records += 1
+        finally:
+            # Ne garder aucune vue sur le mmap avant sa fermeture
+            data.release()
+
+        self._journal_records = records
+        return offset
+
+    def start(self):
+        """Démarre l'écriture périodique en arrière-plan (à appeler dans la boucle asyncio)"""
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Erreur lors de l'écriture du journal des rôles: {e}", exc_info=True)
+
+    async def flush(self):
+        """Écrit les modifications en attente, et compacte le journal si nécessaire"""
+
+        async with self._flush_lock:
+            if self._needs_compaction():
+                # L'instantané contient déjà les modifications en attente
+                snapshot = dict(self._entries)
+                self._pending = bytearray()
+                await asyncio.to_thread(self._compact, snapshot)
+            elif self._pending:
+                data, self._pending = self._pending, bytearray()
+                records = await asyncio.to_thread(self._append, data)
+                self._journal_records += records
+
+    def close(self):
+        """Écrit de façon synchrone ce qui reste en attente (arrêt du bot)"""
+
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+
+        if self._pending:
+            data, self._pending = self._pending, bytearray()
+            self._journal_records += self._append(data)
+
+    def _needs_compaction(self):
+        pending_records = 1 if self._pending else 0
+        records = self._journal_records + pending_records
+        return records >= self.min_compact_records and records > self.compact_ratio * max(len(self._entries), 1)
+
+    def _append(self, data):
+        with self._io_lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'ab') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+
+        # Nombre d'enregistrements écrits (pour décider de la compaction)
+        records = 0
+        offset = 0
+        while offset < len(data):
+            count = _HEADER.unpack_from(data, offset)[3]
+            offset += _HEADER.size + count * 8
+            records += 1
+        return records
+
+    def _compact(self, snapshot):
+        tmp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+        with self._io_lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                for (guild_id, user_id), roles in snapshot.items():
+                    f.write(_encode(_OP_SET, guild_id, user_id, roles))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+
+        self._journal_records = len(snapshot)
+        logger.info(f"Journal des rôles compacté: {len(snapshot)} entrée(s)")
@@ -0,0 +1,141 @@
+"""
+Mute et unmute par rôle, partagés par les commandes, l'anti-spam et les
+sanctions temporaires
+
+Au mute, les rôles du membre sont sauvegardés dans un MuteRoleStore et
+remplacés par le rôle "Muted"; à l'unmute ils sont restaurés (ou, sans
+sauvegarde, remplacés par le rôle de base). Les deux rôles sont ceux des
+paramètres du serveur, résolus par ID.
+"""
+
+import logging
+from datetime import timedelta
+
+from utils.bulk import retryable_items
+from utils.guild_settings import guild_settings
+from utils.logger import log_moderation_batch
+from utils.member_resolver import member_resolver
+from utils.scheduler import sanction_scheduler
+
+logger = logging.getLogger(__name__)
+
+# Durée maximale d'une exclusion temporaire de Discord
+MAX_TIMEOUT = 28 * 86400
+
+# Résultats de mute_member() et unmute_member()
+ROLE = "role"
+TIMEOUT = "timeout"
+RESTORED = "restored"
+BASE = "base"
+REMOVED = "removed"
+
+def mute_roles(guild):
+    """
+    Rôles utilisés par le mute, lus par ID dans les paramètres du serveur
+
+    Returns:
+        tuple: (rôle "Muted" ou None, rôle de base ou None)
+    """
+    settings = guild_settings.get(guild)
+    return settings.muted_role(guild), settings.base_role(guild)
+
+async def mute_member(member, muted_role, mute_store, reason, timeout=None):
+    """
+    Mute un membre par le rôle "Muted", ou par une exclusion temporaire de Discord
+
+    Args:
+        member: Membre à muter
+        muted_role: Rôle "Muted" (None: exclusion temporaire)
+        mute_store: MuteRoleStore où sauvegarder les rôles (None: exclusion temporaire)
+        reason: Raison pour le journal d'audit
+        timeout: Durée de l'exclusion temporaire (secondes, MAX_TIMEOUT au plus)
+
+    Returns:
+        str: ROLE, TIMEOUT, ou None si le membre avait déjà le rôle "Muted"
+    """
+
+    guild = member.guild
+    if muted_role is not None and mute_store is not None:
+        if member.get_role(muted_role.id) is not None:
+            return None
+        # Rôles restaurés à l'unmute; les rôles gérés (boost, intégrations) ne peuvent pas être retirés
+        mute_store.set(guild.id, member.id, [role.id for role in member.roles if not role.is_default()])
+        kept = [role for role in member.roles if role.managed]
+        await member.edit(roles=kept + [muted_role], reason=reason)
+        return ROLE
+
+    await member.timeout(timedelta(seconds=min(timeout, MAX_TIMEOUT)), reason=reason)
+    return TIMEOUT
+
+async def unmute_member(member, muted_role, base_role, mute_store, reason):
+    """
+    Restaure les rôles sauvegardés d'un membre muté
+
+    Sans sauvegarde (ou si aucun rôle sauvegardé n'existe encore), le membre
+    reçoit le rôle de base, ou perd seulement le rôle "Muted". Une levée
+    planifiée est annulée.
+
+    Returns:
+        tuple: (RESTORED, BASE ou REMOVED, nombre de rôles restaurés)
+    """
+
+    guild = member.guild
+    saved_role_ids = mute_store.get(guild.id, member.id)
+    old_roles = []
+    if saved_role_ids is not None:
+        for role_id in saved_role_ids:
+            role = guild.get_role(role_id)
+            if role:
+                old_roles.append(role)
+
+    if old_roles:
+        await member.edit(roles=old_roles, reason=reason)
+        result = RESTORED
+    elif base_role:
+        await member.edit(roles=[base_role], reason=reason)
+        result = BASE
+    else:
+        await member.remove_roles(muted_role, reason=reason)
+        result = REMOVED
+
+    # Supprimer de la sauvegarde
+    if saved_role_ids is not None:
+        mute_store.pop(guild.id, member.id)
+    sanction_scheduler.cancel("UNMUTE", guild.id, member.id)
+    return result, len(old_roles)
+
+async def expire_mutes(guild, user_ids, mute_store, executor):
+    """
+    Lève des mutes temporaires arrivés à échéance, en un seul lot
+
+    Les membres partis, ou qui n'ont plus le rôle "Muted", sont seulement
+    retirés de la sauvegarde. Les membres dont l'unmute a échoué gardent leur
+    sauvegarde.
+
+    Returns:
+        list: IDs des membres en échec passager (à replanifier)
+    """
+
+    muted_role, base_role = mute_roles(guild)
+    members = await member_resolver.resolve_many(guild, user_ids)
+    targets = []
+    for user_id in user_ids:
+        member = members.get(user_id)
+        if muted_role is not None and member is not None and member.get_role(muted_role.id) is not None:
+            targets.append(member)
+        else:
+            mute_store.pop(guild.id, user_id)
+    if muted_role is None or not targets:
+        return []
+
+    reason = "Fin du mute temporaire"
+
+    async def unmute(member):
+        await unmute_member(member, muted_role, base_role, mute_store, reason)
+
+    result = await executor.run(targets, unmute, label="Unmute temporaire")
+    failed_ids = {member.id for member in result.failed_items}
+    unmuted = [member for member in targets if member.id not in failed_ids]
+    if unmuted:
+        log_moderation_batch("UNMUTE", guild.me, unmuted, reason, guild)
+    return [member.id for member in retryable_items(result)]
@@ -0,0 +1,153 @@
+"""
+Envoi des messages privés de modération en arrière-plan
+"""
+
+import asyncio
+import logging
+import time
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+# Temps maximum pendant lequel une action de modération attend le MP avant de s'exécuter
+DM_DEADLINE = 2.0
+
+class DMNotifier:
+    """
+    File bornée de messages privés envoyés par un petit pool de workers
+
+    L'envoi d'un MP (ouverture du salon privé + message) est lent et échoue
+    souvent; il ne doit pas retarder le ban/kick lui-même. Les commandes
+    déposent le MP dans la file puis attendent au plus DM_DEADLINE avant
+    d'agir: le MP part avant l'action dans le cas normal (après un ban,
+    l'utilisateur ne partage plus de serveur avec le bot et ne peut plus
+    recevoir de MP), sans que l'action ne dépende de sa réussite.
+    """
+
+    def __init__(self, max_queue=1000, workers=4, send_timeout=10.0):
+        self.workers = workers
+        self.send_timeout = send_timeout
+        self._queue = asyncio.Queue(maxsize=max_queue)
+        self._tasks = []
+        self._pending = 0       # MPs en file ou en cours d'envoi
+
+        # Métriques
+        self.sent = 0
+        self.failed = 0
+        self.forbidden = 0      # MPs fermés
+        self.dropped = 0        # file pleine
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def start(self):
+        """Démarre les workers (à appeler dans la boucle asyncio)"""
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"dm-worker-{index}")
+            for index in range(self.workers)
+        ]
+
+    def notify(self, user, embed):
+        """
+        Dépose un MP dans la file
+
+        Args:
+            user: Destinataire
+            embed: Embed à envoyer
+
+        Returns:
+            asyncio.Future: Résolue à True si le MP a été délivré, False sinon
+        """
+
+        delivery = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((user, embed, delivery, time.perf_counter()))
+            self._pending += 1
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning(f"File des MPs pleine, MP abandonné pour {user}")
+            delivery.set_result(False)
+        return delivery
+
+    async def wait(self, deliveries, timeout=DM_DEADLINE):
+        """
+        Attend la livraison d'un ou plusieurs MPs, au plus `timeout` secondes
+
+        Args:
+            deliveries: Future (ou liste de futures) retournée(s) par notify()
+            timeout: Délai maximum
+
+        Returns:
+            int: Nombre de MPs délivrés dans le délai
+        """
+
+        if isinstance(deliveries, asyncio.Future):
+            deliveries = [deliveries]
+        if not deliveries:
+            return 0
+
+        done, _ = await asyncio.wait(deliveries, timeout=timeout)
+        return sum(1 for delivery in done if delivery.result())
+
+    async def _worker(self):
+        while True:
+            user, embed, delivery, queued_at = await self._queue.get()
+            try:
+                await asyncio.wait_for(user.send(embed=embed), timeout=self.send_timeout)
+                self.sent += 1
+                delivered = True
+            except discord.Forbidden:
+                self.forbidden += 1  # L'utilisateur n'accepte pas les MPs
+                delivered = False
+            except Exception as e:
+                self.failed += 1
+                delivered = False
+                logger.warning(f"Échec de l'envoi du MP à {user}: {e}")
+            finally:
+                self._pending -= 1
+                self._queue.task_done()
+
+            latency = time.perf_counter() - queued_at
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+            if not delivery.done():
+                delivery.set_result(delivered)
+
+    async def close(self, timeout=10.0):
+        """Attend que la file soit vidée (au plus `timeout` secondes) puis arrête les workers"""
+
+        if self._tasks:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout=timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Arrêt: {self._pending} MP(s) non envoyé(s)")
+
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        logger.info(f"Notifications MP: {self.stats()}")
+
+    def stats(self):
+        """
+        Métriques des notifications
+
+        Returns:
+            dict: Profondeur de file, envois réussis/échoués/refusés/abandonnés et latences
+        """
+
+        processed = self.sent + self.failed + self.forbidden
+        return {
+            "queue_depth": self.queue_depth,
+            "sent": self.sent,
+            "failed": self.failed,
+            "forbidden": self.forbidden,
+            "dropped": self.dropped,
+            "latency_avg": self.latency_total / processed if processed else 0.0,
+            "latency_max": self.latency_max,
+        }
@@ -4,9 +4,22 @@ Utilitaires pour la gestion des permissions de modération
 
 import discord
 import logging
+from utils.message_cache import resolve_reference_author
+from utils import hierarchy
+from utils.hierarchy import hierarchy_cache
 
 logger = logging.getLogger(__name__)
 
+# Messages d'erreur par raison de refus
+REJECTION_MESSAGES = {
+    hierarchy.NOT_MEMBER: "❌ L'utilisateur spécifié n'est pas membre de ce serveur!",
+    hierarchy.SELF: "❌ Vous ne pouvez pas utiliser cette commande sur vous-même!",
+    hierarchy.BOT: "❌ Je ne peux pas utiliser cette commande sur moi-même!",
+    hierarchy.AUTHOR_RANK: "❌ Vous ne pouvez pas modérer un utilisateur ayant un rôle supérieur ou égal au vôtre!",
+    hierarchy.BOT_RANK: "❌ Je ne peux pas modérer un utilisateur ayant un rôle supérieur ou égal au mien!",
+    hierarchy.OWNER: "❌ Je ne peux pas modérer le propriétaire du serveur!",
+}
+
 async def check_moderation_permissions(ctx, target_user, action_type):
     """
     Vérifie les permissions pour une action de modération
@@ -20,39 +33,41 @@ async def check_moderation_permissions(ctx, target_user, action_type):
         bool: True si l'action est autorisée, False sinon
     """
     
-    # Vérifier que l'utilisateur cible est bien un membre du serveur (pour ban/kick)
-    if action_type in ["ban", "kick"] and not isinstance(target_user, discord.Member):
-        await ctx.send("❌ L'utilisateur spécifié n'est pas membre de ce serveur!")
+    # Vérifications (membre, auto-modération, bot, hiérarchie, propriétaire) sur l'instantané du serveur
+    reason = hierarchy_cache.check(
+        ctx.guild, ctx.author, target_user, ctx.bot.user.id,
+        require_member=action_type in ["ban", "kick"]
+    )
+    if reason:
+        await ctx.send(REJECTION_MESSAGES[reason])
         return False
     
-    # Empêcher l'auto-modération
-    if target_user.id == ctx.author.id:
-        await ctx.send("❌ Vous ne pouvez pas utiliser cette commande sur vous-même!")
-        return False
+    return True
+
+def filter_moderation_targets(ctx, targets, action_type, require_member=None):
+    """
+    Vérifie les permissions pour une action de modération sur plusieurs cibles
     
-    # Empêcher la modération du bot
-    if target_user.id == ctx.bot.user.id:
-        await ctx.send("❌ Je ne peux pas utiliser cette commande sur moi-même!")
-        return False
+    Les vérifications sont faites en une seule passe, sans envoyer de message.
     
-    # Vérifier la hiérarchie des rôles pour les membres du serveur
-    if isinstance(target_user, discord.Member):
-        # L'auteur de la commande ne peut pas modérer quelqu'un de rang supérieur ou égal
-        if target_user.top_role >= ctx.author.top_role:
-            await ctx.send("❌ Vous ne pouvez pas modérer un utilisateur ayant un rôle supérieur ou égal au vôtre!")
-            return False
-        
-        # Le bot ne peut pas modérer quelqu'un de rang supérieur ou égal
-        if target_user.top_role >= ctx.guild.me.top_role:
-            await ctx.send("❌ Je ne peux pas modérer un utilisateur ayant un rôle supérieur ou égal au mien!")
-            return False
-        
-        # Vérifier si l'utilisateur cible est propriétaire du serveur
-        if target_user.id == ctx.guild.owner_id:
-            await ctx.send("❌ Je ne peux pas modérer le propriétaire du serveur!")
-            return False
+    Args:
+        ctx: Contexte de la commande
+        targets: Utilisateurs cibles
+        action_type: Type d'action ("ban", "kick", etc.)
+        require_member: Refuser les cibles non membres (par défaut: pour ban et kick)
     
-    return True
+    Returns:
+        tuple: (cibles autorisées, liste de (cible, message d'erreur))
+    """
+    
+    if require_member is None:
+        require_member = action_type in ["ban", "kick"]
+    
+    allowed, rejected = hierarchy_cache.filter_targets(
+        ctx.guild, ctx.author, targets, ctx.bot.user.id,
+        require_member=require_member
+    )
+    return allowed, [(target, REJECTION_MESSAGES[reason]) for target, reason in rejected]
 
 async def get_target_user(ctx, mentioned_member):
     """
@@ -73,9 +88,8 @@ async def get_target_user(ctx, mentioned_member):
     # Si la commande est une réponse à un message
     if ctx.message.reference and ctx.message.reference.message_id:
         try:
-            # Récupérer le message original
-            referenced_message = await ctx.channel.fetch_message(ctx.message.reference.message_id)
-            return referenced_message.author
+            # Auteur du message original: référence résolue, cache, sinon requête REST
+            return await resolve_reference_author(ctx)
         except discord.NotFound:
             logger.warning("Message de référence non trouvé")
         except discord.Forbidden:
@@ -101,10 +115,5 @@ def has_moderation_role(member, required_permission):
         bool: True si le membre a la permission, False sinon
     """
     
-    # Le propriétaire du serveur a toutes les permissions
-    if member.id == member.guild.owner_id:
-        return True
-    
-    # Vérifier les permissions du membre
-    permissions = member.guild_permissions
-    return getattr(permissions, required_permission, False)
+    # Permissions précalculées (le propriétaire et les administrateurs ont toutes les permissions)
+    return hierarchy_cache.has_permission(member, required_permission)
@@ -0,0 +1,386 @@
+"""
+Profilage du bot: blocages de la boucle asyncio et handlers lents
+
+Mode optionnel (BOT_PROFILE=1 ou `python main.py --profile`):
+- détection des callbacks lents d'asyncio (mode debug, slow_callback_duration);
+- un thread de surveillance échantillonne la pile du thread de la boucle dès
+  qu'elle ne répond plus depuis STALL_THRESHOLD, et attribue le blocage à la
+  tâche en cours (handler d'event ou commande);
+- rapports périodiques des commandes/events les plus lents avec le temps
+  passé à bloquer la boucle et les piles capturées.
+
+Indépendamment du mode, un profil par échantillonnage peut être enregistré à
+la demande (commande `+profile` réservée au propriétaire, ou signal SIGUSR1)
+au format "piles repliées" (flamegraph.pl, speedscope, inferno).
+"""
+
+import asyncio
+import heapq
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from pathlib import Path
+
+from utils.metrics import bot_metrics
+
+logger = logging.getLogger(__name__)
+
+# Dossier des rapports et des flame graphs
+PROFILE_DIR = Path("logs") / "profiles"
+# Boucle considérée comme bloquée au-delà de ce délai sans réveil
+STALL_THRESHOLD = 0.25
+# Callback asyncio signalé comme lent (mode debug)
+SLOW_CALLBACK_DURATION = 0.1
+# Commande/event rapporté comme lent au-delà de cette durée totale
+SLOW_HANDLER_THRESHOLD = 1.0
+# Période des rapports et nombre d'invocations lentes par rapport
+REPORT_INTERVAL = 300.0
+REPORT_TOP = 10
+# Échantillonnage: battement de la boucle, pile pendant un blocage, profil à la demande
+HEARTBEAT_INTERVAL = 0.05
+STALL_SAMPLE_INTERVAL = 0.01
+PROFILE_SAMPLE_INTERVAL = 0.005
+PROFILE_SECONDS = 30.0
+# Profondeur maximale des piles capturées
+MAX_STACK_DEPTH = 64
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def fold_stack(frame, depth=MAX_STACK_DEPTH):
+    """
+    Pile d'un thread au format replié (racine en premier, séparateur `;`)
+
+    Args:
+        frame: Frame courante du thread (sys._current_frames())
+
+    Returns:
+        str: Pile repliée, ex: "run (main.py:12);on_message (simple_bot.py:101)"
+    """
+
+    labels = []
+    while frame is not None and len(labels) < depth:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    labels.reverse()
+    return ";".join(labels)
+
+def format_stack(folded, indent="    "):
+    """Pile repliée en lignes lisibles, la frame la plus récente en dernier"""
+    return "\n".join(indent + label for label in folded.split(";"))
+
+class Stall:
+    """Un blocage de la boucle et les piles échantillonnées pendant sa durée"""
+
+    __slots__ = ('start', 'end', 'task', 'task_name', 'stacks')
+
+    def __init__(self, start, task):
+        self.start = start
+        self.end = start
+        self.task = task
+        self.task_name = task.get_name() if task is not None else "hors tâche"
+        self.stacks = Counter()
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+    def top_stack(self):
+        if not self.stacks:
+            return None
+        return self.stacks.most_common(1)[0][0]
+
+class SlowInvocation:
+    """Commande ou event plus lent que SLOW_HANDLER_THRESHOLD"""
+
+    __slots__ = ('kind', 'name', 'at', 'elapsed', 'blocked', 'stacks')
+
+    def __init__(self, kind, name, elapsed, stalls):
+        self.kind = kind
+        self.name = name
+        self.at = datetime.now()
+        self.elapsed = elapsed
+        self.blocked = sum(stall.duration for stall in stalls)
+        self.stacks = Counter()
+        for stall in stalls:
+            self.stacks.update(stall.stacks)
+
+    def __lt__(self, other):
+        return self.elapsed < other.elapsed
+
+class SamplerThread(threading.Thread):
+    """
+    Thread de surveillance de la boucle asyncio
+
+    La boucle met à jour un battement toutes les HEARTBEAT_INTERVAL
+    secondes; si le battement a plus de STALL_THRESHOLD de retard, la pile du
+    thread de la boucle est échantillonnée jusqu'à la reprise. Pendant un
+    profil à la demande, la pile est échantillonnée en continu.
+    """
+
+    def __init__(self, profiler, loop, loop_thread_id):
+        super().__init__(name="bot-profiler", daemon=True)
+        self.profiler = profiler
+        self.loop = loop
+        self.loop_thread_id = loop_thread_id
+        self.last_beat = time.perf_counter()
+        self.current = None   # blocage en cours
+        self._stop_event = threading.Event()
+
+    def beat(self):
+        """Battement, appelé depuis la boucle"""
+        self.last_beat = time.perf_counter()
+        if not self._stop_event.is_set():
+            self.loop.call_later(HEARTBEAT_INTERVAL, self.beat)
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _loop_stack(self):
+        frame = sys._current_frames().get(self.loop_thread_id)
+        return fold_stack(frame) if frame is not None else None
+
+    def run(self):
+        profiler = self.profiler
+        while not self._stop_event.is_set():
+            profile = profiler._profile
+            interval = PROFILE_SAMPLE_INTERVAL if profile is not None else STALL_SAMPLE_INTERVAL
+            time.sleep(interval)
+            now = time.perf_counter()
+
+            stack = None
+            if profile is not None:
+                stack = self._loop_stack()
+                if stack:
+                    # Le profil a pu être clos pendant le sommeil: seul le profil en cours est complété
+                    with profiler._samples_lock:
+                        if profiler._profile is profile:
+                            profile[stack] += 1
+
+            if not profiler.enabled:
+                continue
+            stall = self.current
+            if now - self.last_beat > profiler.stall_threshold:
+                if stall is None:
+                    stall = self.current = Stall(self.last_beat, asyncio.current_task(self.loop))
+                stack = stack or self._loop_stack()
+                if stack:
+                    stall.stacks[stack] += 1
+                stall.end = now
+            elif stall is not None:
+                self.current = None
+                profiler._record_stall(stall)
+
+class BotProfiler:
+    """Profilage optionnel d'un bot (voir la docstring du module)"""
+
+    def __init__(self, directory=PROFILE_DIR):
+        self.directory = Path(directory)
+        self.enabled = os.getenv("BOT_PROFILE", "0") == "1"
+        self.stall_threshold = float(os.getenv("BOT_PROFILE_STALL", STALL_THRESHOLD))
+        self.slow_threshold = float(os.getenv("BOT_PROFILE_SLOW", SLOW_HANDLER_THRESHOLD))
+        self.report_interval = float(os.getenv("BOT_PROFILE_REPORT_INTERVAL", REPORT_INTERVAL))
+
+        self._thread = None
+        self._report_task = None
+        self._profile = None          # Counter des piles pendant un profil à la demande
+        self._profile_lock = None
+        self._samples_lock = threading.Lock()   # passage du profil entre la boucle et le thread
+        self._signal_tasks = set()    # profils lancés par SIGUSR1 (référence gardée jusqu'à la fin)
+        self._stalls = deque(maxlen=256)
+        self._slowest = []            # tas des invocations lentes de la période
+        self.stall_count = 0
+        self.stall_seconds = 0.0
+
+    def install(self, bot):
+        """
+        Installe le profilage sur un bot (à appeler dans setup_hook, après
+        bot_metrics.instrument qui chronomètre handlers et commandes)
+
+        Le signal SIGUSR1 et `+profile` sont toujours disponibles; la détection
+        des blocages et les rapports ne tournent qu'en mode profilage.
+        """
+
+        loop = asyncio.get_running_loop()
+        self._profile_lock = asyncio.Lock()
+        try:
+            loop.add_signal_handler(signal.SIGUSR1, self._on_signal)
+        except (NotImplementedError, AttributeError, RuntimeError):
+            pass  # Windows ou boucle hors du thread principal
+
+        if not self.enabled:
+            return
+
+        loop.set_debug(True)
+        loop.slow_callback_duration = SLOW_CALLBACK_DURATION
+        bot_metrics.slow_threshold = self.slow_threshold
+        bot_metrics.on_slow = self._record_slow
+
+        bot_metrics.registry.add_stats("bot_profiler", self.stats)
+
+        self._ensure_thread()
+        self._report_task = asyncio.create_task(self._report_loop(), name="profiler-reports")
+        logger.info(f"🔬 Profilage actif: blocages > {self.stall_threshold * 1000:.0f} ms, "
+                    f"handlers > {self.slow_threshold:.1f} s, rapports dans {self.directory}")
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            loop = asyncio.get_running_loop()
+            self._thread = SamplerThread(self, loop, threading.get_ident())
+            self._thread.beat()
+            self._thread.start()
+
+    # --- Blocages et invocations lentes ---
+
+    def _record_stall(self, stall):
+        """Appelé depuis le thread de surveillance à la fin d'un blocage"""
+        self._stalls.append(stall)
+        self.stall_count += 1
+        self.stall_seconds += stall.duration
+        top = stall.top_stack()
+        logger.warning(
+            f"🐢 Boucle bloquée {stall.duration * 1000:.0f} ms (tâche {stall.task_name})"
+            + (f"\n{format_stack(top)}" if top else "")
+        )
+
+    def _record_slow(self, kind, name, start, elapsed):
+        """Observateur des wrappers de bot_metrics (dans la tâche de l'invocation)"""
+        task = asyncio.current_task()
+        stalls = list(self._stalls)
+        # Le blocage qui vient de se terminer n'est pas encore forcément enregistré par le thread
+        if self._thread is not None and self._thread.current is not None:
+            stalls.append(self._thread.current)
+        stalls = [stall for stall in stalls if stall.task is task and stall.end >= start]
+        slow = SlowInvocation(kind, name, elapsed, stalls)
+        if len(self._slowest) < REPORT_TOP:
+            heapq.heappush(self._slowest, slow)
+        elif slow.elapsed > self._slowest[0].elapsed:
+            heapq.heapreplace(self._slowest, slow)
+
+    async def _report_loop(self):
+        while True:
+            await asyncio.sleep(self.report_interval)
+            try:
+                await self.write_report()
+            except Exception as e:
+                logger.error(f"❌ Erreur lors de l'écriture du rapport de profilage: {e}")
+
+    async def write_report(self):
+        """
+        Écrit le rapport de la période écoulée et le réinitialise
+
+        Returns:
+            Path: Fichier écrit, None si rien de lent n'a été observé
+        """
+
+        slowest = sorted(self._slowest, reverse=True)
+        stalls = sorted(self._stalls, key=lambda stall: stall.duration, reverse=True)[:REPORT_TOP]
+        self._slowest = []
+        self._stalls.clear()
+        if not slowest and not stalls:
+            return None
+
+        lines = [f"Rapport de profilage du {datetime.now():%Y-%m-%d %H:%M:%S}", ""]
+        lines.append(f"== {len(slowest)} invocation(s) les plus lentes (> {self.slow_threshold:.1f} s)")
+        for slow in slowest:
+            lines.append(f"- {slow.kind} {slow.name} à {slow.at:%H:%M:%S}: {slow.elapsed * 1000:.0f} ms "
+                         f"dont {slow.blocked * 1000:.0f} ms de boucle bloquée")
+            for stack, count in slow.stacks.most_common(3):
+                lines.append(f"  pile ({count} échantillon(s)):")
+                lines.append(format_stack(stack))
+        lines.append("")
+        lines.append(f"== {len(stalls)} blocage(s) les plus longs de la boucle (> {self.stall_threshold * 1000:.0f} ms)")
+        for stall in stalls:
+            lines.append(f"- {stall.duration * 1000:.0f} ms, tâche {stall.task_name}")
+            for stack, count in stall.stacks.most_common(3):
+                lines.append(f"  pile ({count} échantillon(s)):")
+                lines.append(format_stack(stack))
+        lines.append("")
+
+        path = self.directory / f"report_{datetime.now():%Y%m%d_%H%M%S}.txt"
+        await asyncio.to_thread(self._write, path, "\n".join(lines))
+        if slowest:
+            worst = slowest[0]
+            logger.info(f"🔬 Rapport de profilage: {path} (plus lent: {worst.kind} {worst.name} "
+                        f"{worst.elapsed * 1000:.0f} ms, {len(stalls)} blocage(s))")
+        else:
+            logger.info(f"🔬 Rapport de profilage: {path} ({len(stalls)} blocage(s))")
+        return path
+
+    def _write(self, path, text):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding='utf-8')
+
+    # --- Profil à la demande ---
+
+    async def sample(self, seconds=PROFILE_SECONDS):
+        """
+        Échantillonne la pile du thread de la boucle pendant `seconds` secondes
+
+        Returns:
+            Path: Fichier de piles repliées (une ligne "pile nombre" par pile),
+            à ouvrir avec speedscope ou à passer à flamegraph.pl
+        """
+
+        if self._profile_lock is None:
+            self._profile_lock = asyncio.Lock()
+        async with self._profile_lock:
+            self._ensure_thread()
+            profile = Counter()
+            self._profile = profile
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                # Après ce point, le thread n'écrit plus dans le profil
+                with self._samples_lock:
+                    self._profile = None
+                # Hors mode profilage, le thread ne sert qu'au profil à la demande
+                if not self.enabled and self._thread is not None:
+                    self._thread.stop()
+                    self._thread = None
+
+        path = self.directory / f"flame_{datetime.now():%Y%m%d_%H%M%S}.folded"
+        text = "".join(f"{stack} {count}\n" for stack, count in profile.most_common())
+        await asyncio.to_thread(self._write, path, text)
+        logger.info(f"🔥 Profil écrit: {path} ({sum(profile.values())} échantillons sur {seconds:g} s)")
+        return path
+
+    def _on_signal(self):
+        if self._profile_lock is not None and self._profile_lock.locked():
+            logger.warning("🔥 Profil déjà en cours, signal ignoré")
+            return
+        logger.info(f"🔥 SIGUSR1 reçu: profil de {PROFILE_SECONDS:.0f} s")
+        task = asyncio.create_task(self.sample(PROFILE_SECONDS), name="profiler-sample")
+        self._signal_tasks.add(task)
+        task.add_done_callback(self._signal_tasks.discard)
+
+    def stats(self):
+        """
+        Statistiques du profilage
+
+        Returns:
+            dict: Nombre et durée cumulée des blocages de la boucle, profil en cours
+        """
+
+        return {
+            "stalls": self.stall_count,
+            "stall_seconds": self.stall_seconds,
+            "sampling": self._profile is not None,
+        }
+
+    async def close(self):
+        if self._report_task is not None:
+            self._report_task.cancel()
+            self._report_task = None
+            await self.write_report()
+        if self._thread is not None:
+            self._thread.stop()
+            self._thread = None
+
+# Profileur du processus, partagé par les bots
+bot_profiler = BotProfiler()
@@ -0,0 +1,329 @@
+"""
+Détection des raids à l'arrivée des membres (on_member_join)
+
+Chaque serveur garde une fenêtre glissante des dernières arrivées, bornée en
+taille, avec pour chaque compte quelques caractéristiques peu coûteuses:
+âge du compte (déduit de l'ID), avatar par défaut, nom proche d'autres
+arrivées récentes. Quand trop d'arrivées (ou trop d'arrivées suspectes)
+tombent dans la fenêtre, le serveur passe en mode raid: les comptes suspects
+de la fenêtre et ceux qui arrivent ensuite sont regroupés, puis sanctionnés
+par lots (un seul ban ou kick en masse via execute_batch toutes les
+BATCH_DELAY secondes) plutôt qu'un par un.
+"""
+
+import asyncio
+import logging
+import os
+import re
+import time
+from collections import deque
+
+import discord
+
+from utils.guild_settings import guild_settings
+from utils.hierarchy import hierarchy_cache
+from utils.moderation import execute_batch
+
+logger = logging.getLogger(__name__)
+
+# Fenêtre glissante des arrivées (secondes) et nombre maximal d'arrivées gardées
+JOIN_WINDOW = 10.0
+HISTORY_SIZE = 256
+# Déclenchement: arrivées dans la fenêtre, ou arrivées suspectes dans la fenêtre
+JOIN_LIMIT = 20
+SUSPICIOUS_LIMIT = 6
+# Score à partir duquel une arrivée est suspecte (sanctionnée pendant un raid);
+# un avatar par défaut seul ne suffit pas
+SUSPICIOUS_SCORE = 2
+# Caractéristiques: compte récent, très récent, noms similaires dans la fenêtre
+NEW_ACCOUNT_AGE = 7 * 86400
+FRESH_ACCOUNT_AGE = 86400
+SIMILAR_NAMES = 3
+# Fin du mode raid après ce délai sans arrivée dans la cohorte (secondes)
+RAID_QUIET = 60.0
+# Délai de regroupement avant chaque sanction en lot (secondes)
+BATCH_DELAY = 2.0
+
+ACTIONS = ("kick", "ban", "log")
+
+# Epoch des snowflakes Discord (ms)
+DISCORD_EPOCH = 1420070400000
+
+# Squelette d'un nom: minuscules, sans chiffres ni séparateurs ("Raider_042" -> "raider")
+_NAME_NOISE = re.compile(r'[\W\d_]+')
+
+def name_skeleton(name):
+    return _NAME_NOISE.sub('', name.lower())[:16]
+
+def account_age(user_id, now):
+    """Âge du compte en secondes, déduit de son ID (sans créer de datetime)"""
+    return now - ((user_id >> 22) + DISCORD_EPOCH) / 1000
+
+class _Join:
+    __slots__ = ('at', 'member', 'skeleton', 'score', 'suspicious', 'flagged')
+
+    def __init__(self, at, member, skeleton, score):
+        self.at = at
+        self.member = member
+        self.skeleton = skeleton
+        self.score = score
+        self.suspicious = score >= SUSPICIOUS_SCORE
+        self.flagged = False
+
+class GuildRaidDetector:
+    """
+    Fenêtre glissante des arrivées d'un serveur
+
+    Les arrivées sont dans une deque bornée à HISTORY_SIZE; les compteurs
+    (arrivées suspectes, squelettes de noms) sont mis à jour à l'entrée et à
+    la sortie de la fenêtre, donc chaque arrivée coûte O(1).
+    """
+
+    def __init__(self, window=JOIN_WINDOW, join_limit=JOIN_LIMIT, suspicious_limit=SUSPICIOUS_LIMIT,
+                 history_size=HISTORY_SIZE, quiet=RAID_QUIET):
+        self.window = window
+        self.join_limit = join_limit
+        self.suspicious_limit = suspicious_limit
+        self.history_size = history_size
+        self.quiet = quiet
+
+        self._joins = deque()
+        self._names = {}            # squelette -> arrivées dans la fenêtre
+        self._suspicious = 0
+        self.raid_since = None      # début du raid en cours
+        self._last_cohort = 0.0
+        self.cohort = []            # membres à sanctionner au prochain lot
+
+        # Compteurs exposés via stats()
+        self.joins = 0
+        self.raids = 0
+        self.flagged = 0
+
+    def __len__(self):
+        return len(self._joins)
+
+    @property
+    def raiding(self):
+        return self.raid_since is not None
+
+    def _expire(self, now):
+        joins = self._joins
+        limit = now - self.window
+        while joins and (joins[0].at < limit or len(joins) >= self.history_size):
+            old = joins.popleft()
+            count = self._names[old.skeleton] - 1
+            if count:
+                self._names[old.skeleton] = count
+            else:
+                del self._names[old.skeleton]
+            if old.suspicious:
+                self._suspicious -= 1
+
+    def _score(self, member, skeleton, wall):
+        age = account_age(member.id, wall)
+        score = 0
+        if age < NEW_ACCOUNT_AGE:
+            score += 1
+            if age < FRESH_ACCOUNT_AGE:
+                score += 1
+        if member.avatar is None:
+            score += 1
+        if skeleton and self._names.get(skeleton, 0) >= SIMILAR_NAMES - 1:
+            score += 1
+        return score
+
+    def join(self, member, now, wall):
+        """
+        Enregistre une arrivée
+
+        Args:
+            member: Membre arrivé
+            now: Horloge monotone (fenêtre)
+            wall: Heure Unix (âge du compte)
+
+        Returns:
+            bool: True si le membre rejoint la cohorte à sanctionner
+        """
+
+        self.joins += 1
+        self._expire(now)
+        skeleton = name_skeleton(member.name)
+        entry = _Join(now, member, skeleton, self._score(member, skeleton, wall))
+        self._joins.append(entry)
+        self._names[skeleton] = self._names.get(skeleton, 0) + 1
+        if entry.suspicious:
+            self._suspicious += 1
+
+        if self.raid_since is not None and now - self._last_cohort > self.quiet:
+            logger.info(f"✅ Fin du raid sur le serveur {member.guild} ({len(self.cohort)} en attente)")
+            self.raid_since = None
+
+        if self.raid_since is None:
+            if len(self._joins) < self.join_limit and self._suspicious < self.suspicious_limit:
+                return False
+            # Déclenchement: la cohorte reprend les arrivées suspectes de la fenêtre
+            self.raid_since = self._last_cohort = now
+            self.raids += 1
+            for earlier in self._joins:
+                if earlier.suspicious and not earlier.member.bot and not earlier.flagged:
+                    earlier.flagged = True
+                    self.cohort.append(earlier.member)
+                    self.flagged += 1
+            logger.warning(f"🚨 RAID détecté sur le serveur {member.guild}: {len(self._joins)} arrivée(s) "
+                           f"dont {self._suspicious} suspecte(s) en {self.window:.0f}s")
+            return True
+
+        if not entry.suspicious or member.bot:
+            return False
+        entry.flagged = True
+        self._last_cohort = now
+        self.cohort.append(member)
+        self.flagged += 1
+        return True
+
+    def take_cohort(self):
+        cohort = self.cohort
+        self.cohort = []
+        return cohort
+
+class AntiRaid:
+    """
+    Détecteurs de raid par serveur et sanctions en lot
+
+    Args:
+        enabled: Activer la détection (par défaut: variable BOT_ANTIRAID=1)
+        action: "kick", "ban" ou "log" (par défaut: BOT_ANTIRAID_ACTION ou "kick")
+        batch_delay: Délai de regroupement avant chaque lot (secondes)
+        limits: Paramètres passés aux GuildRaidDetector
+    """
+
+    def __init__(self, enabled=None, action=None, batch_delay=BATCH_DELAY, **limits):
+        if enabled is None:
+            enabled = os.getenv("BOT_ANTIRAID", "0") == "1"
+        action = (action or os.getenv("BOT_ANTIRAID_ACTION", "kick")).lower()
+        if action not in ACTIONS:
+            logger.warning(f"⚠️ Action anti-raid inconnue: {action}, les raids seront seulement journalisés")
+            action = "log"
+
+        self.enabled = enabled
+        self.action = action
+        self.batch_delay = batch_delay
+        self.limits = limits
+        self._guilds = {}
+        self._flushes = {}      # guild_id -> tâche du prochain lot
+        self.clock = time.monotonic
+        self.wall_clock = time.time
+
+        # Compteurs exposés via stats()
+        self.batches = 0
+        self.sanctioned = 0
+        self.skipped = 0
+        self.errors = 0
+
+    def detector(self, guild_id):
+        """Détecteur d'un serveur (créé à la première arrivée)"""
+        detector = self._guilds.get(guild_id)
+        if detector is None:
+            # Seuils du serveur (+config seuil) par-dessus les limites globales
+            detector = self._guilds[guild_id] = GuildRaidDetector(
+                **{**self.limits, **guild_settings.limits(guild_id, "antiraid")})
+        return detector
+
+    def reload_limits(self, guild_id):
+        """Applique les seuils modifiés par +config sans perdre un raid en cours"""
+        detector = self._guilds.get(guild_id)
+        if detector is None:
+            return
+        limits = {"join_limit": JOIN_LIMIT, "suspicious_limit": SUSPICIOUS_LIMIT, **self.limits,
+                  **guild_settings.limits(guild_id, "antiraid")}
+        detector.join_limit = limits["join_limit"]
+        detector.suspicious_limit = limits["suspicious_limit"]
+
+    def discard_guild(self, guild_id):
+        self._guilds.pop(guild_id, None)
+        flush = self._flushes.pop(guild_id, None)
+        if flush is not None:
+            flush.cancel()
+
+    def member_joined(self, member, executor):
+        """
+        Enregistre une arrivée (à appeler depuis on_member_join) et planifie le
+        prochain lot si le membre fait partie d'une cohorte de raid
+
+        Args:
+            member: Membre arrivé
+            executor: BulkExecutor du bot (sanctions via execute_batch)
+        """
+
+        if not self.enabled:
+            return
+        guild = member.guild
+        if not self.detector(guild.id).join(member, self.clock(), self.wall_clock()):
+            return
+        if guild.id not in self._flushes:
+            self._flushes[guild.id] = asyncio.create_task(self._flush(guild, executor))
+
+    async def _flush(self, guild, executor):
+        try:
+            await asyncio.sleep(self.batch_delay)
+        finally:
+            self._flushes.pop(guild.id, None)
+        detector = self._guilds.get(guild.id)
+        if detector is None:
+            return
+        await self.enforce(guild, detector.take_cohort(), executor)
+
+    async def enforce(self, guild, cohort, executor):
+        """
+        Sanctionne une cohorte en un seul lot
+
+        Les membres que le bot ne peut pas modérer (hiérarchie, propriétaire)
+        sont écartés.
+        """
+
+        targets = []
+        for member in cohort:
+            if hierarchy_cache.check(guild, guild.me, member, guild.me.id, require_member=True) is not None:
+                self.skipped += 1
+                continue
+            targets.append(member)
+        if not targets:
+            return
+
+        logger.warning(f"🚨 Anti-raid: {len(targets)} compte(s) sur le serveur {guild} - action: {self.action}")
+        if self.action == "log":
+            return
+
+        reason = f"Anti-raid: {len(targets)} arrivées suspectes"
+        try:
+            outcome = await execute_batch(guild, guild.me, self.action.upper(), targets, reason, executor)
+            self.batches += 1
+            self.sanctioned += len(outcome.succeeded)
+        except discord.HTTPException as e:
+            self.errors += 1
+            logger.error(f"ERREUR ANTI-RAID: {e}")
+
+    def stats(self):
+        """
+        Statistiques de l'anti-raid
+
+        Returns:
+            dict: Serveurs, arrivées, raids, comptes signalés, lots et sanctions
+        """
+
+        detectors = self._guilds.values()
+        return {
+            "guilds": len(self._guilds),
+            "joins": sum(detector.joins for detector in detectors),
+            "raids": sum(detector.raids for detector in detectors),
+            "raiding": sum(1 for detector in detectors if detector.raiding),
+            "flagged": sum(detector.flagged for detector in detectors),
+            "batches": self.batches,
+            "sanctioned": self.sanctioned,
+            "skipped": self.skipped,
+            "errors": self.errors,
+        }
+
+# Anti-raid partagé par les deux bots
+antiraid = AntiRaid()
+guild_settings.add_threshold_listener(antiraid.reload_limits)
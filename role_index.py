@@ -0,0 +1,108 @@
+"""
+Index en mémoire des membres par rôle pour les actions de masse
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Rôles suivis dès la connexion du bot
+TRACKED_ROLE_NAMES = ("Muted", "Membre")
+
+class RoleMemberIndex:
+    """
+    Index rôle -> IDs des membres, par serveur
+
+    Construit une fois quand le serveur est prêt, puis tenu à jour par les
+    events on_member_update / on_member_join / on_member_remove. Les actions
+    de masse (ex: +unmute all) ne parcourent ainsi que les membres concernés
+    au lieu de tous les membres du serveur.
+    """
+
+    def __init__(self, role_names=TRACKED_ROLE_NAMES):
+        self.role_names = frozenset(role_names)
+        self._guilds = {}  # guild_id -> {role_id: set(member_id)}
+
+    def build(self, guild):
+        """
+        (Re)construit l'index des rôles suivis d'un serveur
+
+        Args:
+            guild: Serveur à indexer
+        """
+
+        roles = {}
+        for role in guild.roles:
+            if role.name in self.role_names:
+                roles[role.id] = {member.id for member in role.members}
+
+        self._guilds[guild.id] = roles
+        logger.info(
+            f"Index des rôles construit pour {guild}: "
+            + ", ".join(f"{guild.get_role(role_id)}={len(ids)}" for role_id, ids in roles.items())
+        )
+
+    def member_ids(self, guild, role):
+        """
+        Retourne les IDs des membres ayant un rôle
+
+        Un rôle qui n'est pas encore indexé (créé après la connexion, ou utilisé
+        pour la première fois par une action de masse) est indexé à la demande
+        puis tenu à jour comme les autres.
+
+        Args:
+            guild: Serveur du rôle
+            role: Rôle recherché
+
+        Returns:
+            set: IDs des membres ayant le rôle (ne pas modifier)
+        """
+
+        roles = self._guilds.setdefault(guild.id, {})
+        ids = roles.get(role.id)
+        if ids is None:
+            ids = roles[role.id] = {member.id for member in role.members}
+        return ids
+
+    def update_member(self, member):
+        """
+        Met à jour l'index pour un membre (arrivée ou changement de rôles)
+
+        Args:
+            member: Membre dans son état actuel
+        """
+
+        roles = self._guilds.get(member.guild.id)
+        if not roles:
+            return
+
+        for role_id, ids in roles.items():
+            if member.get_role(role_id) is not None:
+                ids.add(member.id)
+            else:
+                ids.discard(member.id)
+
+    def remove_member(self, member):
+        """
+        Retire un membre de l'index (départ, kick, ban)
+
+        Args:
+            member: Membre qui a quitté le serveur
+        """
+
+        roles = self._guilds.get(member.guild.id)
+        if not roles:
+            return
+
+        for ids in roles.values():
+            ids.discard(member.id)
+
+    def remove_role(self, role):
+        """Oublie un rôle supprimé"""
+        roles = self._guilds.get(role.guild.id)
+        if roles:
+            roles.pop(role.id, None)
+
+    def discard_guild(self, guild_id):
+        """Oublie l'index d'un serveur (ex: le bot a quitté le serveur)"""
+        self._guilds.pop(guild_id, None)
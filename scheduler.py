@@ -0,0 +1,442 @@
+"""
+Planificateur des sanctions temporaires (+ban 7d, mutes temporaires)
+
+Toutes les échéances sont dans un seul tas binaire (la plus proche en tête)
+servi par une seule tâche: elle dort jusqu'à la prochaine échéance (plus
+EXPIRE_WINDOW), puis retire d'un coup toutes celles qui sont passées et
+les regroupe par (action, serveur) pour un seul appel de handler par
+groupe. Le tas est reconstruit au démarrage depuis un journal append-only,
+écrit en arrière-plan comme celui des rôles sauvegardés: les échéances
+manquées pendant un arrêt du bot sont traitées dès qu'il est prêt.
+"""
+
+import asyncio
+import heapq
+import logging
+import os
+import re
+import struct
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+SCHEDULE_PATH = Path("data") / "sanctions.journal"
+
+# Format du journal: une suite d'enregistrements de taille fixe
+#   op (1 octet) | action (1) | guild_id (8) | user_id (8) | échéance Unix (8, double)
+# Les entiers sont en little-endian.
+_RECORD = struct.Struct('<BBQQd')
+_OP_SET = 1
+_OP_DELETE = 2
+
+# Actions planifiables et leur code dans le journal
+ACTION_CODES = {"UNBAN": 1, "UNMUTE": 2}
+_ACTION_NAMES = {code: action for action, code in ACTION_CODES.items()}
+
+# Nombre maximal d'échéances traitées par réveil (les suivantes au tour d'après)
+EXPIRE_BATCH = 1000
+# Le répartiteur attend ce délai après la première échéance pour lever d'un coup
+# celles qui la suivent de près (une levée n'est jamais anticipée)
+EXPIRE_WINDOW = 1.0
+# Sommeil maximal: l'horloge murale peut être corrigée pendant l'attente
+MAX_SLEEP = 300.0
+# Nouvel essai d'un groupe dont le handler a échoué (secondes)
+RETRY_DELAY = 60.0
+# Une échéance traitée avec plus de retard a été manquée (bot arrêté)
+LATE_THRESHOLD = 60.0
+
+# Durées: "30s", "10min", "12h", "7j" (ou "7d"), "2sem" (ou "2w"), combinables ("1j12h")
+_DURATION_UNITS = {"s": 1, "m": 60, "min": 60, "h": 3600, "j": 86400, "d": 86400, "sem": 604800, "w": 604800}
+_DURATION_PART = re.compile(r'(\d{1,6})(sem|min|[smhjdw])', re.IGNORECASE)
+_DURATION = re.compile(r'(?:\d{1,6}(?:sem|min|[smhjdw]))+', re.IGNORECASE)
+
+def parse_duration(text):
+    """
+    Sépare une durée en tête de texte ("7d spam" -> 7 jours, "spam")
+
+    Returns:
+        tuple: (durée en secondes ou None, reste du texte ou None)
+    """
+
+    if not text:
+        return None, text
+    parts = text.split(None, 1)
+    if not _DURATION.fullmatch(parts[0]):
+        return None, text
+    seconds = sum(int(count) * _DURATION_UNITS[unit.lower()] for count, unit in _DURATION_PART.findall(parts[0]))
+    if seconds <= 0:
+        return None, text
+    return seconds, parts[1] if len(parts) > 1 else None
+
+def format_duration(seconds):
+    """Durée lisible, deux unités au plus ("7j", "1j 12h", "30min")"""
+    parts = []
+    for unit, size in (("j", 86400), ("h", 3600), ("min", 60), ("s", 1)):
+        count, seconds = divmod(int(seconds), size)
+        if count:
+            parts.append(f"{count}{unit}")
+    return ' '.join(parts[:2]) or "0s"
+
+class SanctionScheduler:
+    """
+    Échéances des sanctions temporaires, par (action, serveur, utilisateur)
+
+    Une seule échéance par clé: replanifier remplace l'ancienne, qui reste
+    dans le tas et est ignorée au dépilement (comme une entrée annulée). Le
+    tas est reconstruit quand ces entrées périmées deviennent majoritaires.
+
+    Les handlers sont enregistrés par action avec register(); ils reçoivent
+    (guild_id, liste d'IDs) et traitent le groupe en un seul lot.
+    """
+
+    def __init__(self, path=SCHEDULE_PATH, flush_interval=2.0, compact_ratio=4, min_compact_records=1024,
+                 batch_size=EXPIRE_BATCH, window=EXPIRE_WINDOW):
+        self.path = Path(path)
+        self.flush_interval = flush_interval
+        self.compact_ratio = compact_ratio
+        self.min_compact_records = min_compact_records
+        self.batch_size = batch_size
+        self.window = window
+        self.clock = time.time
+
+        self._entries = {}              # (action, guild_id, user_id) -> échéance
+        self._heap = []                 # (échéance, action, guild_id, user_id)
+        self._handlers = {}             # action -> coroutine(guild_id, user_ids)
+        self._wake = asyncio.Event()
+        self._pending = bytearray()     # enregistrements pas encore écrits
+        self._journal_records = 0       # enregistrements présents dans le fichier
+        self._flush_lock = asyncio.Lock()
+        self._io_lock = threading.Lock()
+        self._flush_task = None
+        self._dispatch_task = None
+
+        # Compteurs exposés via stats()
+        self.scheduled = 0
+        self.cancelled = 0
+        self.expired = 0
+        self.late = 0
+        self.batches = 0
+        self.retries = 0
+        self.errors = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def register(self, action, handler):
+        """
+        Associe un handler à une action
+
+        Args:
+            action: "UNBAN" ou "UNMUTE"
+            handler: Fonction async appelée avec (guild_id, liste d'IDs d'utilisateurs),
+                qui renvoie les IDs dont la levée a échoué et doit être réessayée (ou None)
+        """
+        if action not in ACTION_CODES:
+            raise ValueError(f"Action non planifiable: {action}")
+        self._handlers[action] = handler
+
+    def get(self, action, guild_id, user_id):
+        """Échéance (heure Unix) d'une sanction, ou None"""
+        return self._entries.get((action, guild_id, user_id))
+
+    def schedule(self, action, guild_id, user_ids, expires_at):
+        """
+        Planifie la levée d'une sanction pour un ou plusieurs utilisateurs
+
+        Args:
+            action: "UNBAN" ou "UNMUTE"
+            guild_id: ID du serveur
+            user_ids: ID ou liste d'IDs d'utilisateurs
+            expires_at: Heure Unix de la levée
+        """
+
+        if isinstance(user_ids, int):
+            user_ids = (user_ids,)
+        code = ACTION_CODES[action]
+        head = self._heap[0][0] if self._heap else None
+        for user_id in user_ids:
+            self._entries[(action, guild_id, user_id)] = expires_at
+            self._pending += _RECORD.pack(_OP_SET, code, guild_id, user_id, expires_at)
+            heapq.heappush(self._heap, (expires_at, action, guild_id, user_id))
+            self.scheduled += 1
+        self._prune()
+        # Réveiller le répartiteur si la prochaine échéance est avancée
+        if head is None or expires_at < head:
+            self._wake.set()
+
+    def cancel(self, action, guild_id, user_id):
+        """
+        Annule la levée planifiée d'une sanction (levée manuelle, sanction devenue définitive)
+
+        Returns:
+            bool: True si une échéance était planifiée
+        """
+
+        if self._entries.pop((action, guild_id, user_id), None) is None:
+            return False
+        self._pending += _RECORD.pack(_OP_DELETE, ACTION_CODES[action], guild_id, user_id, 0.0)
+        self.cancelled += 1
+        self._prune()
+        return True
+
+    def plan(self, action, guild_id, user_ids, duration):
+        """
+        Planifie la levée d'une sanction qui vient d'être appliquée
+
+        Sans durée, la sanction est définitive: une levée déjà planifiée pour
+        ces utilisateurs (sanction temporaire précédente) est annulée.
+        """
+
+        if duration:
+            self.schedule(action, guild_id, user_ids, self.clock() + duration)
+        else:
+            for user_id in user_ids:
+                self.cancel(action, guild_id, user_id)
+
+    def _prune(self):
+        # Les entrées périmées (annulées, replanifiées) restent dans le tas jusqu'à leur échéance
+        if len(self._heap) > 2 * len(self._entries) + 1024:
+            self._rebuild_heap()
+
+    def _rebuild_heap(self):
+        self._heap = [(expires_at, *key) for key, expires_at in self._entries.items()]
+        heapq.heapify(self._heap)
+
+    # --- Journal ----------------------------------------------------------------
+
+    def load(self):
+        """Charge le journal depuis le disque et reconstruit le tas (à appeler hors de la boucle)"""
+
+        if not self.path.exists():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            return
+
+        with open(self.path, 'rb') as f:
+            data = f.read()
+
+        entries = self._entries
+        size = _RECORD.size
+        valid = 0
+        records = 0
+        for op, code, guild_id, user_id, expires_at in _RECORD.iter_unpack(data[:len(data) - len(data) % size]):
+            action = _ACTION_NAMES.get(code)
+            if action is None or op not in (_OP_SET, _OP_DELETE):
+                break
+            if op == _OP_SET:
+                entries[(action, guild_id, user_id)] = expires_at
+            else:
+                entries.pop((action, guild_id, user_id), None)
+            valid += size
+            records += 1
+
+        if valid < len(data):
+            # Enregistrement incomplet en fin de fichier (arrêt brutal): on le coupe
+            logger.warning(f"Journal {self.path} tronqué: {len(data) - valid} octet(s) ignoré(s)")
+            os.truncate(self.path, valid)
+
+        self._journal_records = records
+        self._rebuild_heap()
+        overdue = sum(1 for expires_at in entries.values() if expires_at <= self.clock())
+        logger.info(
+            f"Sanctions temporaires chargées: {len(entries)} échéance(s) dont {overdue} déjà passée(s) "
+            f"({records} enregistrement(s) dans le journal)"
+        )
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Erreur lors de l'écriture du journal des sanctions: {e}", exc_info=True)
+
+    async def flush(self):
+        """Écrit les modifications en attente, et compacte le journal si nécessaire"""
+
+        async with self._flush_lock:
+            if self._needs_compaction():
+                # L'instantané contient déjà les modifications en attente
+                snapshot = dict(self._entries)
+                self._pending = bytearray()
+                await asyncio.to_thread(self._compact, snapshot)
+            elif self._pending:
+                data, self._pending = self._pending, bytearray()
+                await asyncio.to_thread(self._append, data)
+                self._journal_records += len(data) // _RECORD.size
+
+    def close(self):
+        """Arrête le répartiteur et écrit de façon synchrone ce qui reste en attente (arrêt du bot)"""
+
+        for task in (self._flush_task, self._dispatch_task):
+            if task is not None:
+                task.cancel()
+        self._flush_task = self._dispatch_task = None
+
+        if self._pending:
+            data, self._pending = self._pending, bytearray()
+            self._append(data)
+            self._journal_records += len(data) // _RECORD.size
+
+    def _needs_compaction(self):
+        records = self._journal_records + len(self._pending) // _RECORD.size
+        return records >= self.min_compact_records and records > self.compact_ratio * max(len(self._entries), 1)
+
+    def _append(self, data):
+        with self._io_lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'ab') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _compact(self, snapshot):
+        tmp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+        with self._io_lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                f.write(b''.join(
+                    _RECORD.pack(_OP_SET, ACTION_CODES[action], guild_id, user_id, expires_at)
+                    for (action, guild_id, user_id), expires_at in snapshot.items()
+                ))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+
+        self._journal_records = len(snapshot)
+        logger.info(f"Journal des sanctions compacté: {len(snapshot)} échéance(s)")
+
+    # --- Répartiteur ------------------------------------------------------------
+
+    def start(self, ready=None):
+        """
+        Démarre l'écriture du journal et le répartiteur (à appeler dans la boucle asyncio)
+
+        Args:
+            ready: Fonction async attendue avant la première levée (ex: bot.wait_until_ready),
+                pour que les serveurs soient en cache quand les échéances manquées sont traitées
+        """
+
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+        if self._dispatch_task is None or self._dispatch_task.done():
+            self._dispatch_task = asyncio.create_task(self._dispatch_loop(ready))
+
+    def _next_expiry(self):
+        # Retire les entrées périmées en tête du tas
+        heap = self._heap
+        entries = self._entries
+        while heap:
+            expires_at, action, guild_id, user_id = heap[0]
+            if entries.get((action, guild_id, user_id)) == expires_at:
+                return expires_at
+            heapq.heappop(heap)
+        return None
+
+    async def _dispatch_loop(self, ready):
+        if ready is not None:
+            await ready()
+        while True:
+            self._wake.clear()
+            expires_at = self._next_expiry()
+            delay = None if expires_at is None else expires_at + self.window - self.clock()
+            if delay is None or delay > 0:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), MAX_SLEEP if delay is None else min(delay, MAX_SLEEP))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self.expire_due()
+            except Exception as e:
+                logger.error(f"Erreur du planificateur de sanctions: {e}", exc_info=True)
+
+    def _take_due(self, now):
+        """Retire du tas au plus batch_size échéances passées, regroupées par (action, serveur)"""
+
+        groups = defaultdict(list)
+        heap = self._heap
+        entries = self._entries
+        taken = 0
+        while heap and heap[0][0] <= now and taken < self.batch_size:
+            expires_at, action, guild_id, user_id = heapq.heappop(heap)
+            key = (action, guild_id, user_id)
+            if entries.get(key) != expires_at:
+                continue
+            del entries[key]
+            self._pending += _RECORD.pack(_OP_DELETE, ACTION_CODES[action], guild_id, user_id, 0.0)
+            if now - expires_at > LATE_THRESHOLD:
+                self.late += 1
+            groups[(action, guild_id)].append(user_id)
+            taken += 1
+        self.expired += taken
+        return groups
+
+    async def expire_due(self):
+        """
+        Lève toutes les sanctions arrivées à échéance (au plus batch_size)
+
+        Returns:
+            int: Nombre d'échéances traitées
+        """
+
+        groups = self._take_due(self.clock())
+        if groups:
+            await asyncio.gather(*(
+                self._run_handler(action, guild_id, user_ids)
+                for (action, guild_id), user_ids in groups.items()
+            ))
+        return sum(len(user_ids) for user_ids in groups.values())
+
+    async def _run_handler(self, action, guild_id, user_ids):
+        handler = self._handlers.get(action)
+        if handler is None:
+            logger.warning(f"⚠️ Aucun handler pour {action}: {len(user_ids)} échéance(s) ignorée(s)")
+            return
+        try:
+            failed_ids = await handler(guild_id, user_ids)
+            self.batches += 1
+        except Exception as e:
+            # Le groupe entier est replanifié (ex: Discord indisponible)
+            self.errors += 1
+            self.retries += len(user_ids)
+            logger.error(f"ERREUR {action} PLANIFIÉ ({len(user_ids)} utilisateur(s), serveur {guild_id}): {e} "
+                         f"- nouvel essai dans {RETRY_DELAY:.0f}s")
+            self.schedule(action, guild_id, user_ids, self.clock() + RETRY_DELAY)
+            return
+        if failed_ids:
+            # Échecs individuels (ex: 5xx pendant un incident Discord): seuls ceux-là sont replanifiés
+            self.retries += len(failed_ids)
+            logger.warning(f"⚠️ {action} PLANIFIÉ: {len(failed_ids)} échec(s) sur {len(user_ids)} (serveur {guild_id}) "
+                           f"- nouvel essai dans {RETRY_DELAY:.0f}s")
+            self.schedule(action, guild_id, list(failed_ids), self.clock() + RETRY_DELAY)
+
+    def stats(self):
+        """
+        Statistiques du planificateur
+
+        Returns:
+            dict: Échéances en attente, taille du tas, levées (dont en retard), lots et erreurs
+        """
+
+        expires_at = self._next_expiry()
+        return {
+            "pending": len(self._entries),
+            "heap": len(self._heap),
+            "next_in": max(expires_at - self.clock(), 0.0) if expires_at is not None else -1.0,
+            "scheduled": self.scheduled,
+            "cancelled": self.cancelled,
+            "expired": self.expired,
+            "late": self.late,
+            "batches": self.batches,
+            "retries": self.retries,
+            "errors": self.errors,
+        }
+
+# Planificateur partagé par les deux bots (les handlers sont enregistrés dans setup_hook)
+sanction_scheduler = SanctionScheduler()
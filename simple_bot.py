@@ -4,6 +4,29 @@ import os
 import logging
 import datetime
 import json
+import asyncio
+from pathlib import Path
+from utils.role_index import RoleMemberIndex
+from utils.bulk import BulkExecutor
+from utils.mute_store import MuteRoleStore
+from utils.dispatch import CommandDispatcher
+from utils.message_cache import message_cache, resolve_reference_author
+from utils.hierarchy import hierarchy_cache
+from utils.permissions import REJECTION_MESSAGES
+from utils.moderation import parse_command_targets, read_attachment_ids, run_batch_command, unban_many
+from utils.embeds import help_embed
+from utils.metrics import bot_metrics
+from utils.profiler import bot_profiler, PROFILE_SECONDS
+from utils.member_resolver import member_resolver, configure_member_cache
+from utils.antispam import antispam
+from utils.wordfilter import wordfilter, run_filter_command
+from utils.raid import antiraid
+from utils.logger import log_moderation_action, log_moderation_batch
+from utils.cases import run_case_command
+from utils.singleflight import moderation_flights
+from utils.scheduler import sanction_scheduler, parse_duration, format_duration
+from utils.guild_settings import guild_settings, run_config_command
+from utils.mutes import mute_roles, mute_member, unmute_member, expire_mutes, ROLE, RESTORED, BASE, MAX_TIMEOUT
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
@@ -15,16 +38,139 @@ intents.message_content = True
 intents.members = True
 intents.guilds = True
 
-# Créer le bot
-bot = commands.Bot(command_prefix='+', intents=intents)
+# Créer le bot (préfixe propre à chaque serveur, requêtes REST comptées par route
+# pour /metrics; membres à la demande plutôt que découpage complet au démarrage
+# si BOT_LAZY_MEMBERS=1)
+bot = commands.Bot(command_prefix=guild_settings.command_prefix, intents=intents, http_trace=bot_metrics.http_trace(), **configure_member_cache())
 
-# Dictionnaire pour stocker les rôles sauvegardés des utilisateurs mutés
-muted_users_roles = {}
+# Rôles sauvegardés des utilisateurs mutés, par (serveur, utilisateur), persistés sur disque
+muted_users_roles = MuteRoleStore(Path("data") / "muted_roles.journal")
+
+# Index rôle -> membres pour les rôles "Muted" et "Membre"
+role_index = RoleMemberIndex()
+
+# Filtre des messages de commande (compilé au démarrage à partir des commandes enregistrées)
+dispatcher = CommandDispatcher('+')
+
+# Exécuteur partagé des actions de masse (unmute all, ban/kick/unban en lot)
+bulk_executor = BulkExecutor()
+
+@bot.event
+async def setup_hook():
+    # Paramètres des serveurs (préfixe, rôles du mute, salon de logs, seuils)
+    await asyncio.to_thread(guild_settings.load)
+    
+    # Charger les rôles sauvegardés avant de traiter la moindre commande
+    await asyncio.to_thread(muted_users_roles.load)
+    muted_users_roles.start()
+    
+    # Listes de termes interdits, compilées hors de la boucle
+    await wordfilter.load()
+    
+    # Bans et mutes temporaires: échéances rechargées, celles manquées pendant l'arrêt levées une fois prêt
+    await asyncio.to_thread(sanction_scheduler.load)
+    sanction_scheduler.register("UNBAN", expire_bans)
+    sanction_scheduler.register("UNMUTE", expire_timed_mutes)
+    sanction_scheduler.start(ready=bot.wait_until_ready)
+    
+    # Toutes les commandes sont enregistrées à ce stade
+    dispatcher.sync(bot)
+    
+    # Chronométrer handlers et commandes, puis exposer /metrics
+    bot_metrics.instrument(bot)
+    await bot_metrics.start()
+    
+    # Profilage (blocages de la boucle, handlers lents) si activé, profil à la demande sinon
+    bot_profiler.install(bot)
+
+async def expire_bans(guild_id, user_ids):
+    # Bans temporaires arrivés à échéance, levés en un seul lot par serveur;
+    # les échecs passagers sont rendus au planificateur pour un nouvel essai
+    guild = bot.get_guild(guild_id)
+    if guild is None:
+        logger.warning(f"Bans temporaires ignorés: serveur {guild_id} introuvable ({len(user_ids)})")
+        return None
+    outcome = await unban_many(guild, guild.me, user_ids, "Fin du bannissement temporaire", bulk_executor)
+    return outcome.retryable
+
+async def expire_timed_mutes(guild_id, user_ids):
+    # Mutes temporaires arrivés à échéance, même restauration des rôles que +unmute
+    guild = bot.get_guild(guild_id)
+    if guild is None:
+        logger.warning(f"Mutes temporaires ignorés: serveur {guild_id} introuvable ({len(user_ids)})")
+        return None
+    return await expire_mutes(guild, user_ids, muted_users_roles, bulk_executor)
 
 @bot.event
 async def on_ready():
     logger.info(f'Bot connecté en tant que {bot.user}!')
     logger.info(f'Connecté à {len(bot.guilds)} serveur(s)')
+    
+    # Construire l'index des rôles une fois les serveurs prêts
+    for guild in bot.guilds:
+        role_index.build(guild)
+
+@bot.event
+async def on_guild_join(guild):
+    role_index.build(guild)
+
+@bot.event
+async def on_guild_remove(guild):
+    role_index.discard_guild(guild.id)
+    hierarchy_cache.invalidate_guild(guild.id)
+    member_resolver.discard_guild(guild.id)
+    antispam.discard_guild(guild.id)
+    antiraid.discard_guild(guild.id)
+    guild_settings.discard_guild(guild.id)
+
+@bot.event
+async def on_guild_update(before, after):
+    hierarchy_cache.invalidate_guild(after.id)
+
+@bot.event
+async def on_member_join(member):
+    role_index.update_member(member)
+    # Anti-raid: les arrivées suspectes d'un raid sont sanctionnées par lots
+    antiraid.member_joined(member, bulk_executor)
+
+@bot.event
+async def on_member_unban(guild, user):
+    # Débanni avant l'échéance (commande ou interface de Discord)
+    sanction_scheduler.cancel("UNBAN", guild.id, user.id)
+
+@bot.event
+async def on_member_update(before, after):
+    role_index.update_member(after)
+    hierarchy_cache.invalidate_member(after.guild.id, after.id)
+
+@bot.event
+async def on_member_remove(member):
+    role_index.remove_member(member)
+    hierarchy_cache.invalidate_member(member.guild.id, member.id)
+
+@bot.event
+async def on_raw_member_remove(payload):
+    # Aussi pour les membres hors du cache de discord.py (mode membres à la demande)
+    member_resolver.discard(payload.guild_id, payload.user.id)
+
+@bot.event
+async def on_guild_role_create(role):
+    hierarchy_cache.invalidate_guild(role.guild.id)
+    # Un rôle "Muted" ou "Membre" peut maintenant exister
+    guild_settings.invalidate(role.guild.id)
+
+@bot.event
+async def on_guild_role_update(before, after):
+    hierarchy_cache.invalidate_guild(after.guild.id)
+    # Les rôles par défaut sont trouvés par leur nom: seul un renommage change la résolution
+    if before.name != after.name:
+        guild_settings.invalidate(after.guild.id)
+
+@bot.event
+async def on_guild_role_delete(role):
+    role_index.remove_role(role)
+    hierarchy_cache.invalidate_guild(role.guild.id)
+    guild_settings.invalidate(role.guild.id)
 
 @bot.event
 async def on_message(message):
@@ -32,21 +178,27 @@ async def on_message(message):
     if message.author == bot.user:
         return
     
-    # Liste des commandes valides du bot
-    valid_commands = ['ping', 'test', 'ban', 'unban', 'kick', 'unmute', 'commandes']
+    # Mémoriser l'auteur pour les commandes en réponse à ce message
+    message_cache.add(message)
     
-    # Si le message commence par +, vérifier si c'est une commande valide
-    if message.content.startswith('+'):
-        command_name = message.content[1:].split()[0].lower()  # Extraire le nom de la commande
-        
-        # Si c'est une commande valide, logger et traiter
-        if command_name in valid_commands:
-            logger.info(f"MESSAGE REÇU: '{message.content}' de {message.author} dans #{message.channel}")
-            await bot.process_commands(message)
-        # Sinon, ignorer complètement (pas de log, pas de traitement)
+    # Anti-spam (flood, messages répétés, mentions), avant le filtre des commandes
+    detection = antispam.check(message)
+    if detection is not None:
+        await antispam.enforce(detection, bulk_executor, muted_users_roles)
+        return
+    
+    # Termes interdits du serveur (automate compilé une fois par liste)
+    matches = wordfilter.check(message)
+    if matches and await wordfilter.enforce(message, matches):
+        return
+    
+    # Filtre précompilé: les messages sans le préfixe du serveur ou avec une
+    # commande inconnue (ex: commande d'un autre bot) sont ignorés sans log ni parsing
+    command_name = dispatcher.match(message.content, guild_settings.prefix(message.guild))
+    if command_name is None:
         return
     
-    # Pour les messages sans +, traiter normalement (au cas où il y aurait d'autres événements)
+    logger.info(f"MESSAGE REÇU: '{message.content}' de {message.author} dans #{message.channel}")
     await bot.process_commands(message)
 
 @bot.event
@@ -76,16 +228,33 @@ async def test(ctx):
 
 @bot.command(name='ban')
 @commands.has_permissions(ban_members=True)
-async def ban(ctx, member: discord.Member = None, *, reason="Aucune raison spécifiée"):
+async def ban(ctx, *, args=None):
+    # Cibles en tête de commande (mentions/IDs, ou nom d'un membre) et en pièce jointe, puis la durée (ex: 7d) et la raison
+    ids, reason = await parse_command_targets(ctx, args)
+    duration, reason = parse_duration(reason)
+    ids += [user_id for user_id in await read_attachment_ids(ctx.message) if user_id not in ids]
+    reason = reason or "Aucune raison spécifiée"
+    if duration:
+        reason = f"{reason} (durée: {format_duration(duration)})"
+    member = await member_resolver.resolve(ctx.guild, ids[0]) if len(ids) == 1 else None
+    
+    # Plusieurs cibles (ou un compte qui n'est plus membre): bannissement en lot
+    if len(ids) > 1 or (ids and member is None):
+        logger.info(f"COMMANDE BAN EN LOT tentée par {ctx.author} sur {len(ids)} cible(s)")
+        outcome = await run_batch_command(ctx, "BAN", ids, f"{reason} - Par {ctx.author}", bulk_executor)
+        if outcome is not None:
+            sanction_scheduler.plan("UNBAN", ctx.guild.id, [target.id for target in outcome.succeeded], duration)
+        return
+    
     # Si pas de mention, vérifier si c'est une réponse à un message
     if member is None:
         if ctx.message.reference and ctx.message.reference.message_id:
             try:
-                # Récupérer le message original
-                referenced_message = await ctx.channel.fetch_message(ctx.message.reference.message_id)
+                # Auteur du message: référence résolue, cache, sinon requête REST
+                author = await resolve_reference_author(ctx)
                 # Vérifier que l'auteur du message est un membre du serveur
-                if isinstance(referenced_message.author, discord.Member):
-                    member = referenced_message.author
+                if isinstance(author, discord.Member):
+                    member = author
                 else:
                     await ctx.send("❌ L'auteur du message n'est pas un membre de ce serveur!")
                     return
@@ -101,26 +270,46 @@ async def ban(ctx, member: discord.Member = None, *, reason="Aucune raison spéc
     
     logger.info(f"COMMANDE BAN tentée par {ctx.author} sur {member}")
     
-    try:
-        await member.ban(reason=f"{reason} - Par {ctx.author}")
-        await ctx.send(f"🔨 {member} a été banni! Raison: {reason}")
-        logger.info(f"BAN RÉUSSI: {member} banni par {ctx.author}")
-    except Exception as e:
-        await ctx.send(f"❌ Erreur lors du ban: {e}")
-        logger.error(f"ERREUR BAN: {e}")
+    async def do_ban():
+        try:
+            await member.ban(reason=f"{reason} - Par {ctx.author}")
+            # Ban temporaire: levée planifiée; ban définitif: levée déjà planifiée annulée
+            sanction_scheduler.plan("UNBAN", ctx.guild.id, [member.id], duration)
+            await ctx.send(f"🔨 {member} a été banni! Raison: {reason}")
+            logger.info(f"BAN RÉUSSI: {member} banni par {ctx.author}")
+            log_moderation_action("BAN", ctx.author, member, reason, ctx.guild)
+        except Exception as e:
+            await ctx.send(f"❌ Erreur lors du ban: {e}")
+            logger.error(f"ERREUR BAN: {e}")
+    
+    # Un seul ban par cible: les commandes simultanées attendent le premier
+    await moderation_flights.run((ctx.guild.id, member.id, "BAN"), do_ban,
+                                 on_duplicate=lambda: ctx.send(f"⏳ Le ban de {member} est déjà en cours."))
 
 @bot.command(name='kick')
 @commands.has_permissions(kick_members=True)
-async def kick(ctx, member: discord.Member = None, *, reason="Aucune raison spécifiée"):
+async def kick(ctx, *, args=None):
+    # Cibles en tête de commande (mentions/IDs, ou nom d'un membre) et en pièce jointe, puis la raison
+    ids, reason = await parse_command_targets(ctx, args)
+    ids += [user_id for user_id in await read_attachment_ids(ctx.message) if user_id not in ids]
+    reason = reason or "Aucune raison spécifiée"
+    member = await member_resolver.resolve(ctx.guild, ids[0]) if len(ids) == 1 else None
+    
+    # Plusieurs cibles (ou un compte qui n'est plus membre): expulsion en lot
+    if len(ids) > 1 or (ids and member is None):
+        logger.info(f"COMMANDE KICK EN LOT tentée par {ctx.author} sur {len(ids)} cible(s)")
+        await run_batch_command(ctx, "KICK", ids, f"{reason} - Par {ctx.author}", bulk_executor)
+        return
+    
     # Si pas de mention, vérifier si c'est une réponse à un message
     if member is None:
         if ctx.message.reference and ctx.message.reference.message_id:
             try:
-                # Récupérer le message original
-                referenced_message = await ctx.channel.fetch_message(ctx.message.reference.message_id)
+                # Auteur du message: référence résolue, cache, sinon requête REST
+                author = await resolve_reference_author(ctx)
                 # Vérifier que l'auteur du message est un membre du serveur
-                if isinstance(referenced_message.author, discord.Member):
-                    member = referenced_message.author
+                if isinstance(author, discord.Member):
+                    member = author
                 else:
                     await ctx.send("❌ L'auteur du message n'est pas un membre de ce serveur!")
                     return
@@ -136,26 +325,38 @@ async def kick(ctx, member: discord.Member = None, *, reason="Aucune raison spé
     
     logger.info(f"COMMANDE KICK tentée par {ctx.author} sur {member}")
     
-    try:
-        await member.kick(reason=f"{reason} - Par {ctx.author}")
-        await ctx.send(f"👢 {member} a été expulsé! Raison: {reason}")
-        logger.info(f"KICK RÉUSSI: {member} expulsé par {ctx.author}")
-    except Exception as e:
-        await ctx.send(f"❌ Erreur lors du kick: {e}")
-        logger.error(f"ERREUR KICK: {e}")
+    async def do_kick():
+        try:
+            await member.kick(reason=f"{reason} - Par {ctx.author}")
+            await ctx.send(f"👢 {member} a été expulsé! Raison: {reason}")
+            logger.info(f"KICK RÉUSSI: {member} expulsé par {ctx.author}")
+            log_moderation_action("KICK", ctx.author, member, reason, ctx.guild)
+        except Exception as e:
+            await ctx.send(f"❌ Erreur lors du kick: {e}")
+            logger.error(f"ERREUR KICK: {e}")
+    
+    # Un seul kick par cible: les commandes simultanées attendent le premier
+    await moderation_flights.run((ctx.guild.id, member.id, "KICK"), do_kick,
+                                 on_duplicate=lambda: ctx.send(f"⏳ Le kick de {member} est déjà en cours."))
 
 @bot.command(name='unban')
 @commands.has_permissions(ban_members=True)
 async def unban(ctx, user_id: int, *, reason="Aucune raison spécifiée"):
     logger.info(f"COMMANDE UNBAN tentée par {ctx.author} pour l'ID {user_id}")
     
-    try:
+    async def do_unban():
         # Récupérer l'utilisateur par son ID
         user = await bot.fetch_user(user_id)
         # Débannir l'utilisateur
         await ctx.guild.unban(user, reason=f"{reason} - Par {ctx.author}")
         await ctx.send(f"✅ {user} a été débanni! Raison: {reason}")
         logger.info(f"UNBAN RÉUSSI: {user} débanni par {ctx.author}")
+        log_moderation_action("UNBAN", ctx.author, user, reason, ctx.guild)
+    
+    try:
+        # Un seul unban par cible (les erreurs sont signalées par la première commande)
+        await moderation_flights.run((ctx.guild.id, user_id, "UNBAN"), do_unban,
+                                     on_duplicate=lambda: ctx.send(f"⏳ L'unban de l'ID {user_id} est déjà en cours."))
     except discord.NotFound:
         await ctx.send(f"❌ Aucun utilisateur banni trouvé avec l'ID: {user_id}")
         logger.error(f"ERREUR UNBAN: Utilisateur ID {user_id} non trouvé dans les bannissements")
@@ -166,55 +367,109 @@ async def unban(ctx, user_id: int, *, reason="Aucune raison spécifiée"):
 
 
 
+@bot.command(name='mute')
+@commands.has_permissions(manage_roles=True)
+async def mute(ctx, target=None, *, args=None):
+    logger.info(f"COMMANDE MUTE tentée par {ctx.author}")
+    
+    # Cible: mention, ou auteur du message auquel la commande répond
+    if ctx.message.mentions:
+        member = ctx.message.mentions[0]
+    elif ctx.message.reference and ctx.message.reference.message_id:
+        # Sans mention, le premier argument fait partie de la durée/raison
+        args = f"{target} {args or ''}" if target else args
+        try:
+            member = await resolve_reference_author(ctx)
+        except discord.NotFound:
+            await ctx.send("❌ Message de référence non trouvé!")
+            return
+        except Exception as e:
+            await ctx.send(f"❌ Erreur lors de la récupération du message: {e}")
+            return
+    else:
+        await ctx.send("❌ Veuillez mentionner un utilisateur ou répondre à un message! Usage: `+mute @utilisateur [durée] [raison]`")
+        return
+    if not isinstance(member, discord.Member):
+        await ctx.send("❌ Cet utilisateur n'est pas un membre de ce serveur!")
+        return
+    
+    refusal = hierarchy_cache.check(ctx.guild, ctx.author, member, ctx.bot.user.id, require_member=True)
+    if refusal is not None:
+        await ctx.send(REJECTION_MESSAGES[refusal])
+        logger.info(f"MUTE REFUSÉ: {member} ({refusal}) par {ctx.author}")
+        return
+    
+    duration, reason = parse_duration(args)
+    reason = reason or "Aucune raison spécifiée"
+    muted_role, _ = mute_roles(ctx.guild)
+    if muted_role is None and not (duration and duration <= MAX_TIMEOUT):
+        # Sans rôle "Muted", seule l'exclusion temporaire de Discord est possible
+        await ctx.send("❌ Aucun rôle 'Muted' trouvé sur ce serveur! Précisez une durée de 28 jours au plus (ex: `+mute @utilisateur 1h`).")
+        return
+    
+    try:
+        result = await mute_member(member, muted_role, muted_users_roles, f"{reason} - Par {ctx.author}", timeout=duration)
+        if result is None:
+            await ctx.send(f"❌ {member} est déjà mute!")
+            return
+        if result == ROLE:
+            # Mute temporaire: levée planifiée; mute définitif: levée déjà planifiée annulée
+            sanction_scheduler.plan("UNMUTE", ctx.guild.id, [member.id], duration)
+        length = f" pour {format_duration(duration)}" if duration else ""
+        await ctx.send(f"🔇 {member} a été mute{length}! Raison: {reason}")
+        logger.info(f"MUTE RÉUSSI: {member} mute{length} par {ctx.author}")
+        if duration:
+            reason = f"{reason} (durée: {format_duration(duration)})"
+        log_moderation_action("MUTE", ctx.author, member, reason, ctx.guild)
+    except Exception as e:
+        await ctx.send(f"❌ Erreur lors du mute: {e}")
+        logger.error(f"ERREUR MUTE: {e}")
+
 @bot.command(name='unmute')
 @commands.has_permissions(manage_roles=True)
 async def unmute(ctx, target=None, *, reason="Aucune raison spécifiée"):
     logger.info(f"COMMANDE UNMUTE tentée par {ctx.author}")
     
+    # Rôles "Muted" et "Membre" cherchés une seule fois pour toute la commande
+    muted_role, base_role = mute_roles(ctx.guild)
+    
     # Si "all" est spécifié, démute tous les membres avec le rôle Muted
     if target and target.lower() == "all":
-        count = 0
         try:
-            muted_role = discord.utils.get(ctx.guild.roles, name="Muted")
             if not muted_role:
                 await ctx.send("❌ Aucun rôle 'Muted' trouvé sur ce serveur!")
                 return
             
-            for member in ctx.guild.members:
-                if muted_role in member.roles:
-                    # Restaurer les anciens rôles si disponibles
-                    if member.id in muted_users_roles:
-                        old_roles = []
-                        for role_id in muted_users_roles[member.id]:
-                            role = ctx.guild.get_role(role_id)
-                            if role:
-                                old_roles.append(role)
-                        
-                        if old_roles:
-                            await member.edit(roles=old_roles, reason=f"Unmute all - {reason} - Par {ctx.author}")
-                        else:
-                            # Si pas de rôles sauvegardés, chercher un rôle de base comme "Membre" ou "@everyone"
-                            base_role = discord.utils.get(ctx.guild.roles, name="Membre")
-                            if base_role:
-                                await member.edit(roles=[base_role], reason=f"Unmute all - {reason} - Par {ctx.author}")
-                            else:
-                                await member.remove_roles(muted_role, reason=f"Unmute all - {reason} - Par {ctx.author}")
-                        
-                        # Supprimer de la sauvegarde
-                        del muted_users_roles[member.id]
-                    else:
-                        # Chercher un rôle de base pour les utilisateurs sans sauvegarde
-                        base_role = discord.utils.get(ctx.guild.roles, name="Membre")
-                        if base_role:
-                            await member.edit(roles=[base_role], reason=f"Unmute all - {reason} - Par {ctx.author}")
-                        else:
-                            await member.remove_roles(muted_role, reason=f"Unmute all - {reason} - Par {ctx.author}")
-                    
-                    count += 1
-                    logger.info(f"UNMUTE: {member} démute par {ctx.author}")
+            # Ne parcourir que les membres ayant le rôle Muted (index des rôles, ou
+            # liste demandée au gateway en mode membres à la demande)
+            if ctx.guild.chunked:
+                members = []
+                for member_id in role_index.member_ids(ctx.guild, muted_role):
+                    member = ctx.guild.get_member(member_id)
+                    if member is not None and member.get_role(muted_role.id) is not None:
+                        members.append(member)
+            else:
+                members = await member_resolver.members_with_role(ctx.guild, muted_role)
             
-            await ctx.send(f"🔊 {count} utilisateur(s) ont été démutés et leurs rôles restaurés! Raison: {reason}")
-            logger.info(f"UNMUTE ALL RÉUSSI: {count} utilisateurs démutés par {ctx.author}")
+            async def unmute_one(member):
+                # Restaurer les anciens rôles si disponibles (sinon rôle de base)
+                await unmute_member(member, muted_role, base_role, muted_users_roles,
+                                    f"Unmute all - {reason} - Par {ctx.author}")
+                logger.info(f"UNMUTE: {member} démute par {ctx.author}")
+            
+            # Modifications en parallèle (concurrence bornée, réessai des 429, progression)
+            result = await bulk_executor.run(members, unmute_one, channel=ctx.channel, label="Unmute all")
+            count = result.succeeded
+            
+            message = f"🔊 {count} utilisateur(s) ont été démutés et leurs rôles restaurés! Raison: {reason}"
+            if result.failed:
+                message += f"\n⚠️ {result.failed} échec(s)"
+            await ctx.send(message)
+            logger.info(f"UNMUTE ALL RÉUSSI: {count} utilisateurs démutés par {ctx.author} ({result.failed} échec(s))")
+            failed_ids = {member.id for member in result.failed_items}
+            unmuted = [member for member in members if member.id not in failed_ids]
+            if unmuted:
+                log_moderation_batch("UNMUTE", ctx.author, unmuted, reason, ctx.guild)
         except Exception as e:
             await ctx.send(f"❌ Erreur lors du unmute all: {e}")
             logger.error(f"ERREUR UNMUTE ALL: {e}")
@@ -229,9 +484,9 @@ async def unmute(ctx, target=None, *, reason="Aucune raison spécifiée"):
     # Vérifier si c'est une réponse à un message
     elif ctx.message.reference and ctx.message.reference.message_id:
         try:
-            referenced_message = await ctx.channel.fetch_message(ctx.message.reference.message_id)
-            if isinstance(referenced_message.author, discord.Member):
-                member = referenced_message.author
+            author = await resolve_reference_author(ctx)
+            if isinstance(author, discord.Member):
+                member = author
             else:
                 await ctx.send("❌ L'auteur du message n'est pas un membre de ce serveur!")
                 return
@@ -246,68 +501,73 @@ async def unmute(ctx, target=None, *, reason="Aucune raison spécifiée"):
         return
     
     try:
-        muted_role = discord.utils.get(ctx.guild.roles, name="Muted")
+        # Mute par exclusion temporaire (+mute ou anti-spam sans rôle "Muted")
+        if member.is_timed_out():
+            await member.timeout(None, reason=f"Unmute - {reason} - Par {ctx.author}")
+            sanction_scheduler.cancel("UNMUTE", ctx.guild.id, member.id)
+            if muted_role is None or muted_role not in member.roles:
+                await ctx.send(f"🔊 {member} a été démute (fin de l'exclusion temporaire)! Raison: {reason}")
+                logger.info(f"UNMUTE RÉUSSI: exclusion temporaire de {member} levée par {ctx.author}")
+                log_moderation_action("UNMUTE", ctx.author, member, reason, ctx.guild)
+                return
+
         if not muted_role:
             await ctx.send("❌ Aucun rôle 'Muted' trouvé sur ce serveur!")
             return
-        
+
         if muted_role not in member.roles:
             await ctx.send(f"❌ {member} n'est pas mute!")
             return
         
-        # Restaurer les anciens rôles si disponibles
-        if member.id in muted_users_roles:
-            old_roles = []
-            for role_id in muted_users_roles[member.id]:
-                role = ctx.guild.get_role(role_id)
-                if role:
-                    old_roles.append(role)
-            
-            if old_roles:
-                await member.edit(roles=old_roles, reason=f"Unmute - {reason} - Par {ctx.author}")
-                await ctx.send(f"🔊 {member} a été démute et ses {len(old_roles)} rôles ont été restaurés! Raison: {reason}")
-            else:
-                # Si pas de rôles sauvegardés, chercher un rôle de base comme "Membre"
-                base_role = discord.utils.get(ctx.guild.roles, name="Membre")
-                if base_role:
-                    await member.edit(roles=[base_role], reason=f"Unmute - {reason} - Par {ctx.author}")
-                    await ctx.send(f"🔊 {member} a été démute et a reçu le rôle de base! Raison: {reason}")
-                else:
-                    await member.remove_roles(muted_role, reason=f"Unmute - {reason} - Par {ctx.author}")
-                    await ctx.send(f"🔊 {member} a été démute! Raison: {reason}")
-            
-            # Supprimer de la sauvegarde
-            del muted_users_roles[member.id]
+        # Restaurer les anciens rôles si disponibles, sinon donner le rôle de base
+        result, restored = await unmute_member(member, muted_role, base_role, muted_users_roles,
+                                               f"Unmute - {reason} - Par {ctx.author}")
+        if result == RESTORED:
+            await ctx.send(f"🔊 {member} a été démute et ses {restored} rôles ont été restaurés! Raison: {reason}")
+        elif result == BASE:
+            await ctx.send(f"🔊 {member} a été démute et a reçu le rôle de base! Raison: {reason}")
         else:
-            # Pour les utilisateurs sans sauvegarde, donner le rôle de base
-            base_role = discord.utils.get(ctx.guild.roles, name="Membre")
-            if base_role:
-                await member.edit(roles=[base_role], reason=f"Unmute - {reason} - Par {ctx.author}")
-                await ctx.send(f"🔊 {member} a été démute et a reçu le rôle de base! Raison: {reason}")
-            else:
-                await member.remove_roles(muted_role, reason=f"Unmute - {reason} - Par {ctx.author}")
-                await ctx.send(f"🔊 {member} a été démute! Raison: {reason}")
+            await ctx.send(f"🔊 {member} a été démute! Raison: {reason}")
         
         logger.info(f"UNMUTE RÉUSSI: {member} démute par {ctx.author}")
+        log_moderation_action("UNMUTE", ctx.author, member, reason, ctx.guild)
         
     except Exception as e:
         await ctx.send(f"❌ Erreur lors du unmute: {e}")
         logger.error(f"ERREUR UNMUTE: {e}")
 
+@bot.command(name='filtre')
+@commands.has_permissions(manage_messages=True)
+async def filtre(ctx, action=None, *, text=None):
+    logger.info(f"COMMANDE FILTRE exécutée par {ctx.author} ({action})")
+    await run_filter_command(ctx, action, text)
+
+@bot.command(name='config')
+@commands.has_permissions(manage_guild=True)
+async def config(ctx, key=None, *, value=None):
+    logger.info(f"COMMANDE CONFIG exécutée par {ctx.author}: {key} {value or ''}")
+    await run_config_command(ctx, key, value)
+
+@bot.command(name='casier')
+@commands.has_permissions(kick_members=True)
+async def casier(ctx, *, args=None):
+    logger.info(f"COMMANDE CASIER exécutée par {ctx.author}: {args}")
+    await run_case_command(ctx, args)
+
+@bot.command(name='profile')
+@commands.is_owner()
+async def profile(ctx, seconds: float = PROFILE_SECONDS):
+    logger.info(f"COMMANDE PROFILE exécutée par {ctx.author} ({seconds:.0f} s)")
+    seconds = min(max(seconds, 1.0), 300.0)
+    await ctx.send(f"🔥 Profilage pendant {seconds:.0f} secondes...")
+    path = await bot_profiler.sample(seconds)
+    await ctx.send("🔥 Flame graph (piles repliées, à ouvrir avec speedscope ou flamegraph.pl)", file=discord.File(path))
+
 @bot.command(name='commandes')
 async def commandes_command(ctx):
     logger.info(f"COMMANDE COMMANDES exécutée par {ctx.author}")
-    embed = discord.Embed(title="🛡️ Commandes de Modération", color=0x00ff00)
-    embed.add_field(name="+ping", value="Teste la connexion", inline=False)
-    embed.add_field(name="+test", value="Test général du bot", inline=False)
-    embed.add_field(name="+ban @utilisateur [raison]", value="Bannir un utilisateur (mention ou réponse)", inline=False)
-    embed.add_field(name="+unban <ID_utilisateur> [raison]", value="Débannir un utilisateur avec son ID", inline=False)
-    embed.add_field(name="+kick @utilisateur [raison]", value="Expulser un utilisateur (mention ou réponse)", inline=False)
-
-
-    embed.add_field(name="+unmute @utilisateur [raison]", value="Démute et restaure rôles ou attribue rôle de base", inline=False)
-    embed.add_field(name="+commandes", value="Affiche cette liste de commandes", inline=False)
-    await ctx.send(embed=embed)
+    # Embed construit une seule fois puis réutilisé
+    await ctx.send(embed=help_embed("simple"))
 
 if __name__ == "__main__":
     token = os.getenv("DISCORD_TOKEN")
@@ -315,4 +575,8 @@ if __name__ == "__main__":
         logger.error("❌ DISCORD_TOKEN non trouvé!")
     else:
         logger.info("🚀 Démarrage du bot...")
-        bot.run(token)
\ No newline at end of file
+        try:
+            bot.run(token)
+        finally:
+            muted_users_roles.close()
+            sanction_scheduler.close()
\ No newline at end of file
@@ -0,0 +1,126 @@
+"""
+Regroupement des actions de modération simultanées sur une même cible
+
+Quand plusieurs modérateurs réagissent en même temps au même membre, seule
+la première commande fait le travail (MP, requête REST, embed, log); les
+commandes identiques arrivées pendant ce temps reçoivent une réponse courte
+et attendent le même résultat. Les clés sont des tuples
+(guild_id, target_id, action).
+"""
+
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+class SingleFlight:
+    """
+    Exécutions en cours par clé
+
+    Une clé est enregistrée dès l'appel de run() ou claim(), avant le premier
+    await: deux commandes ne peuvent donc pas démarrer la même action.
+    """
+
+    def __init__(self):
+        self._inflight = {}     # clé -> Future du résultat
+
+        # Compteurs exposés via stats()
+        self.leaders = 0
+        self.coalesced = 0
+
+    def __contains__(self, key):
+        return key in self._inflight
+
+    def __len__(self):
+        return len(self._inflight)
+
+    async def run(self, key, function, on_duplicate=None):
+        """
+        Exécute function() sauf si la même clé est déjà en cours
+
+        Args:
+            key: (guild_id, target_id, action)
+            function: Fonction async sans argument qui fait le travail
+            on_duplicate: Fonction async appelée (sans argument) par les doublons avant d'attendre
+
+        Returns:
+            Le résultat de function(); pour un doublon, celui de la première
+            exécution, ou None si elle a échoué ou a été annulée (c'est elle
+            qui signale l'erreur)
+        """
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            if on_duplicate is not None:
+                await on_duplicate()
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # Première exécution annulée: le doublon n'est pas annulé pour autant
+                if pending.cancelled():
+                    return None
+                raise
+            except Exception:
+                return None
+
+        pending = self._inflight[key] = asyncio.get_running_loop().create_future()
+        self.leaders += 1
+        try:
+            result = await function()
+            pending.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            pending.cancel()
+            raise
+        except BaseException as e:
+            pending.set_exception(e)
+            pending.exception()  # marquée comme récupérée s'il n'y a pas de doublon
+            raise
+        finally:
+            del self._inflight[key]
+
+    def claim(self, keys):
+        """
+        Réserve plusieurs clés pour une action en lot
+
+        Returns:
+            tuple: (clés réservées, clés déjà en cours ailleurs)
+        """
+
+        loop = asyncio.get_running_loop()
+        claimed = []
+        busy = []
+        for key in keys:
+            if key in self._inflight:
+                self.coalesced += 1
+                busy.append(key)
+            else:
+                self._inflight[key] = loop.create_future()
+                claimed.append(key)
+        self.leaders += len(claimed)
+        return claimed, busy
+
+    def release(self, keys, result=None):
+        """Libère des clés réservées par claim() et transmet le résultat aux doublons"""
+        for key in keys:
+            pending = self._inflight.pop(key, None)
+            if pending is not None and not pending.done():
+                pending.set_result(result)
+
+    def stats(self):
+        """
+        Statistiques du regroupement
+
+        Returns:
+            dict: Actions en cours, exécutées et regroupées
+        """
+
+        return {
+            "inflight": len(self._inflight),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+        }
+
+# Actions de modération en cours, partagées par les deux bots
+moderation_flights = SingleFlight()
@@ -0,0 +1,61 @@
+"""
+Tests de l'anti-spam (utils.antispam)
+
+Les modérateurs ne sont pas comptés: une commande visant beaucoup de
+membres (+ban @a @b ...) ou une série de commandes n'est pas une détection.
+"""
+
+import pytest
+
+from benchmarks.fakes import BASE_ID, FakeMessage, make_guild
+from utils.antispam import DUPLICATE, FLOOD, MENTION_LIMIT, MENTIONS, AntiSpam
+from utils.hierarchy import hierarchy_cache
+
+@pytest.fixture
+def guild():
+    guild = make_guild(members=100, bans=0)
+    hierarchy_cache.invalidate_guild(guild.id)
+    return guild
+
+def make_antispam():
+    antispam = AntiSpam(enabled=True, action="log")
+    antispam.clock = lambda: 1000.0
+    return antispam
+
+def message(guild, author, content, index=0, mentions=()):
+    return FakeMessage.create(BASE_ID + 10 ** 12 + index, author, guild.channels[0], content, mentions=mentions)
+
+def regular_member(guild):
+    return next(member for member in guild.members[10:] if not member.bot)
+
+def targets(guild, count):
+    return guild.members[-count:]
+
+def test_mentions_detected_for_regular_member(guild):
+    antispam = make_antispam()
+    author = regular_member(guild)
+    detection = antispam.check(message(guild, author, "coucou", mentions=targets(guild, MENTION_LIMIT + 1)))
+    assert detection is not None and detection.rule == MENTIONS
+
+def test_moderator_multi_target_ban_is_not_detected(guild):
+    antispam = make_antispam()
+    content = "+ban " + " ".join(member.mention for member in targets(guild, MENTION_LIMIT + 1)) + " raid"
+    mod_message = message(guild, guild.moderator, content, mentions=targets(guild, MENTION_LIMIT + 1))
+    assert antispam.check(mod_message) is None
+    assert antispam.detections[MENTIONS] == 0
+    # Aucun état gardé pour le modérateur
+    assert antispam.detector(guild.id).checked == 0
+
+@pytest.mark.parametrize("same_content, rule", [(False, FLOOD), (True, DUPLICATE)])
+def test_moderator_command_bursts_are_not_detected(guild, same_content, rule):
+    antispam = make_antispam()
+    author = regular_member(guild)
+    rules = set()
+    for index in range(20):
+        content = "+kick quelqu'un pour spam" if same_content else f"+kick cible numéro {index}"
+        assert antispam.check(message(guild, guild.moderator, content, index)) is None
+        detection = antispam.check(message(guild, author, content, index))
+        if detection is not None:
+            rules.add(detection.rule)
+    assert rule in rules
+    assert antispam.detections[rule] >= 1
@@ -0,0 +1,46 @@
+"""
+Tests de la résolution de l'auteur d'une réponse (utils.message_cache)
+
+Sans cache des membres (BOT_LAZY_MEMBERS=1), discord.py donne un
+discord.User pour l'auteur du message référencé: il doit être résolu en
+membre du serveur.
+"""
+
+import asyncio
+
+from benchmarks.fakes import BASE_ID, FakeMessage, FakeReference, FakeUser, make_context, make_guild
+from utils.member_resolver import member_resolver
+from utils.message_cache import MessageAuthorCache, resolve_reference_author
+
+def reply_context(guild, author, resolved=True):
+    channel = guild.channels[0]
+    referenced = FakeMessage.create(BASE_ID + 10 ** 11, author, channel, "spam")
+    channel.messages[referenced.id] = referenced
+    reference = FakeReference(referenced.id, referenced if resolved else None)
+    return make_context(guild, "+ban", reference=reference)
+
+def resolve(ctx):
+    member_resolver.discard_guild(ctx.guild.id)
+    return asyncio.run(resolve_reference_author(ctx, MessageAuthorCache()))
+
+def test_resolved_reference_with_user_author_returns_member():
+    guild = make_guild(members=50, bans=0)
+    member = guild.members[10]
+    author = resolve(reply_context(guild, FakeUser(member.id, member.name)))
+    assert author is member
+
+def test_fetched_reference_with_user_author_returns_member():
+    guild = make_guild(members=50, bans=0)
+    member = guild.members[10]
+    author = resolve(reply_context(guild, FakeUser(member.id, member.name), resolved=False))
+    assert author is member
+
+def test_reference_author_not_member_stays_user():
+    guild = make_guild(members=50, bans=0)
+    user = FakeUser(BASE_ID + 10 ** 9, "parti")
+    assert resolve(reply_context(guild, user)) is user
+
+def test_resolved_reference_with_member_author():
+    guild = make_guild(members=50, bans=0)
+    member = guild.members[10]
+    assert resolve(reply_context(guild, member)) is member
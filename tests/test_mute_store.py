@@ -0,0 +1,104 @@
+"""
+Tests du journal des rôles sauvegardés au mute (utils.mute_store)
+"""
+
+import asyncio
+from array import array
+
+import pytest
+
+from utils import mute_store
+from utils.mute_store import MuteRoleStore, _HEADER, _OP_SET, _encode
+
+GUILD = 10 ** 17
+ROLES = [GUILD + 1001, GUILD + 1002, 2 ** 63 + 5]
+
+@pytest.fixture
+def path(tmp_path):
+    return tmp_path / "muted_roles.journal"
+
+def reload(path):
+    store = MuteRoleStore(path)
+    store.load()
+    return store
+
+def as_dict(store):
+    return {key: list(roles) for key, roles in store._entries.items()}
+
+def test_journal_round_trip(path):
+    store = MuteRoleStore(path)
+    store.set(GUILD, 1, ROLES)
+    store.set(GUILD, 2, [])
+    store.set(GUILD + 1, 1, ROLES[:1])
+    store.set(GUILD, 1, ROLES[1:])      # remplace la sauvegarde
+    assert list(store.pop(GUILD + 1, 1)) == ROLES[:1]
+    assert store.pop(GUILD + 1, 1) is None
+    store.close()
+
+    loaded = reload(path)
+    assert as_dict(loaded) == {(GUILD, 1): ROLES[1:], (GUILD, 2): []}
+    assert loaded._journal_records == 5
+    assert list(loaded.get(GUILD, 1)) == ROLES[1:]
+
+def test_missing_or_empty_journal(path):
+    assert len(reload(path)) == 0
+    path.write_bytes(b'')
+    assert len(reload(path)) == 0
+
+@pytest.mark.parametrize("cut", [3, _HEADER.size, _HEADER.size + 8])
+def test_journal_torn_tail_is_truncated(path, cut):
+    store = MuteRoleStore(path)
+    store.set(GUILD, 1, ROLES)
+    store.close()
+    size = path.stat().st_size
+    # Arrêt brutal au milieu de l'en-tête ou des rôles d'un enregistrement
+    with open(path, 'ab') as f:
+        f.write(_encode(_OP_SET, GUILD, 2, array('Q', ROLES))[:cut])
+
+    loaded = reload(path)
+    assert as_dict(loaded) == {(GUILD, 1): ROLES}
+    assert path.stat().st_size == size
+
+    loaded.set(GUILD, 2, ROLES[:2])
+    loaded.close()
+    assert as_dict(reload(path)) == {(GUILD, 1): ROLES, (GUILD, 2): ROLES[:2]}
+
+def test_load_through_mmap(path, monkeypatch):
+    store = MuteRoleStore(path)
+    for user_id in range(50):
+        store.set(GUILD, user_id, ROLES)
+    store.pop(GUILD, 7)
+    store.close()
+    with open(path, 'ab') as f:
+        f.write(b'\x01\x02')
+
+    monkeypatch.setattr(mute_store, "MMAP_THRESHOLD", 1)
+    loaded = reload(path)
+    assert len(loaded) == 49
+    assert (GUILD, 7) not in loaded
+    assert list(loaded.get(GUILD, 49)) == ROLES
+
+def test_flush_compacts_journal(path):
+    store = MuteRoleStore(path, compact_ratio=2, min_compact_records=8)
+    store.set(GUILD, 2, ROLES[:1])
+    asyncio.run(store.flush())
+    store.pop(GUILD, 2)
+    # Au 6e passage, le journal atteint min_compact_records (et 2x les entrées actives)
+    for _ in range(6):
+        store.set(GUILD, 1, ROLES)
+        asyncio.run(store.flush())
+
+    assert path.stat().st_size == len(_encode(_OP_SET, GUILD, 1, array('Q', ROLES)))
+    assert not path.with_suffix(path.suffix + '.tmp').exists()
+    assert as_dict(reload(path)) == {(GUILD, 1): ROLES}
+
+def test_flush_appends_below_compaction_threshold(path):
+    store = MuteRoleStore(path)
+    store.set(GUILD, 1, ROLES)
+    store.set(GUILD, 2, ROLES[:1])
+    asyncio.run(store.flush())
+    store.pop(GUILD, 1)
+    asyncio.run(store.flush())
+
+    assert store._journal_records == 3
+    assert as_dict(reload(path)) == {(GUILD, 2): ROLES[:1]}
@@ -0,0 +1,227 @@
+"""
+Tests du planificateur des sanctions temporaires (utils.scheduler)
+
+Journal (rechargement, fin tronquée, compactage), entrées remplacées ou
+annulées restées dans le tas, regroupement des levées et nouvel essai des
+échecs, analyse des durées.
+"""
+
+import asyncio
+
+import pytest
+
+from utils.scheduler import RETRY_DELAY, SanctionScheduler, _RECORD, format_duration, parse_duration
+
+GUILD = 10 ** 17
+OTHER_GUILD = GUILD + 1
+
+@pytest.fixture
+def path(tmp_path):
+    return tmp_path / "sanctions.journal"
+
+def make_scheduler(path, now=1000.0, **kwargs):
+    scheduler = SanctionScheduler(path, **kwargs)
+    scheduler.clock = lambda: now
+    return scheduler
+
+def reload(path):
+    scheduler = SanctionScheduler(path)
+    scheduler.load()
+    return scheduler
+
+# --- Durées ---------------------------------------------------------------------
+
+@pytest.mark.parametrize("text, expected", [
+    ("7d spam", (7 * 86400, "spam")),
+    ("7j", (7 * 86400, None)),
+    ("1j12h raid de bots", (36 * 3600, "raid de bots")),
+    ("10min", (600, None)),
+    ("2sem insultes", (14 * 86400, "insultes")),
+    ("30S flood", (30, "flood")),
+])
+def test_parse_duration(text, expected):
+    assert parse_duration(text) == expected
+
+@pytest.mark.parametrize("text", ["spam", "7 jours", "0s spam", "12x", "", None])
+def test_parse_duration_without_duration(text):
+    assert parse_duration(text) == (None, text)
+
+def test_format_duration():
+    assert format_duration(7 * 86400) == "7j"
+    assert format_duration(36 * 3600 + 59) == "1j 12h"
+    assert format_duration(600) == "10min"
+    assert format_duration(0) == "0s"
+
+# --- Journal --------------------------------------------------------------------
+
+def test_journal_round_trip(path):
+    scheduler = make_scheduler(path)
+    scheduler.schedule("UNBAN", GUILD, [1, 2, 3], 2000.0)
+    scheduler.schedule("UNMUTE", OTHER_GUILD, 1, 1500.0)
+    scheduler.schedule("UNBAN", GUILD, 2, 3000.0)      # remplace l'échéance
+    assert scheduler.cancel("UNBAN", GUILD, 3)
+    assert not scheduler.cancel("UNBAN", GUILD, 3)
+    scheduler.close()
+
+    loaded = reload(path)
+    assert loaded._entries == {
+        ("UNBAN", GUILD, 1): 2000.0,
+        ("UNBAN", GUILD, 2): 3000.0,
+        ("UNMUTE", OTHER_GUILD, 1): 1500.0,
+    }
+    assert loaded._journal_records == 6
+    assert loaded._next_expiry() == 1500.0
+
+def test_journal_torn_tail_is_truncated(path):
+    scheduler = make_scheduler(path)
+    scheduler.schedule("UNBAN", GUILD, [1, 2], 2000.0)
+    scheduler.close()
+    # Arrêt brutal au milieu d'un enregistrement
+    with open(path, 'ab') as f:
+        f.write(_RECORD.pack(1, 1, GUILD, 3, 2000.0)[:10])
+
+    loaded = reload(path)
+    assert set(loaded._entries) == {("UNBAN", GUILD, 1), ("UNBAN", GUILD, 2)}
+    assert path.stat().st_size == 2 * _RECORD.size
+
+    # Les écritures suivantes repartent d'un enregistrement complet
+    loaded.schedule("UNBAN", GUILD, 3, 2500.0)
+    loaded.close()
+    assert reload(path).get("UNBAN", GUILD, 3) == 2500.0
+
+def test_journal_stops_at_corrupt_record(path):
+    scheduler = make_scheduler(path)
+    scheduler.schedule("UNBAN", GUILD, 1, 2000.0)
+    scheduler.close()
+    with open(path, 'ab') as f:
+        f.write(_RECORD.pack(9, 1, GUILD, 2, 2000.0))
+
+    loaded = reload(path)
+    assert list(loaded._entries) == [("UNBAN", GUILD, 1)]
+    assert path.stat().st_size == _RECORD.size
+
+def test_flush_compacts_journal(path):
+    scheduler = make_scheduler(path, compact_ratio=2, min_compact_records=8)
+    for expires_at in range(10):
+        scheduler.schedule("UNBAN", GUILD, [1, 2], 2000.0 + expires_at)
+    scheduler.cancel("UNBAN", GUILD, 2)
+    asyncio.run(scheduler.flush())
+
+    assert path.stat().st_size == _RECORD.size
+    assert not path.with_suffix(path.suffix + '.tmp').exists()
+    assert reload(path)._entries == {("UNBAN", GUILD, 1): 2009.0}
+
+def test_flush_appends_below_compaction_threshold(path):
+    scheduler = make_scheduler(path)
+    scheduler.schedule("UNBAN", GUILD, [1, 2], 2000.0)
+    asyncio.run(scheduler.flush())
+    scheduler.cancel("UNBAN", GUILD, 1)
+    asyncio.run(scheduler.flush())
+
+    assert path.stat().st_size == 3 * _RECORD.size
+    assert reload(path)._entries == {("UNBAN", GUILD, 2): 2000.0}
+
+# --- Levées ---------------------------------------------------------------------
+
+def test_expire_due_groups_by_action_and_guild(path):
+    scheduler = make_scheduler(path)
+    calls = []
+
+    async def handler(guild_id, user_ids):
+        calls.append((guild_id, sorted(user_ids)))
+
+    scheduler.register("UNBAN", handler)
+    scheduler.schedule("UNBAN", GUILD, [1, 2, 3], 900.0)
+    scheduler.schedule("UNBAN", OTHER_GUILD, 4, 950.0)
+    scheduler.schedule("UNBAN", GUILD, 5, 1100.0)       # pas encore échue
+
+    assert asyncio.run(scheduler.expire_due()) == 4
+    assert sorted(calls) == [(GUILD, [1, 2, 3]), (OTHER_GUILD, [4])]
+    assert list(scheduler._entries) == [("UNBAN", GUILD, 5)]
+
+    scheduler.close()
+    assert list(reload(path)._entries) == [("UNBAN", GUILD, 5)]
+
+def test_stale_heap_entries_are_skipped(path):
+    scheduler = make_scheduler(path)
+    calls = []
+
+    async def handler(guild_id, user_ids):
+        calls.extend(user_ids)
+
+    scheduler.register("UNMUTE", handler)
+    scheduler.schedule("UNMUTE", GUILD, [1, 2], 900.0)
+    scheduler.schedule("UNMUTE", GUILD, 1, 5000.0)      # replanifié plus tard
+    scheduler.cancel("UNMUTE", GUILD, 2)                # annulé
+
+    assert len(scheduler._heap) == 3
+    assert scheduler._next_expiry() == 5000.0
+    assert asyncio.run(scheduler.expire_due()) == 0
+    assert calls == []
+    assert scheduler.get("UNMUTE", GUILD, 1) == 5000.0
+
+def test_heap_is_rebuilt_when_mostly_stale(path):
+    scheduler = make_scheduler(path)
+    for expires_at in range(3000):
+        scheduler.schedule("UNBAN", GUILD, 1, 2000.0 + expires_at)
+    assert len(scheduler) == 1
+    assert len(scheduler._heap) <= 2 * len(scheduler) + 1024
+
+def test_failing_handler_reschedules_group(path):
+    scheduler = make_scheduler(path)
+
+    async def handler(guild_id, user_ids):
+        raise RuntimeError("Discord indisponible")
+
+    scheduler.register("UNBAN", handler)
+    scheduler.schedule("UNBAN", GUILD, [1, 2], 900.0)
+    asyncio.run(scheduler.expire_due())
+
+    assert scheduler.get("UNBAN", GUILD, 1) == 1000.0 + RETRY_DELAY
+    assert scheduler.get("UNBAN", GUILD, 2) == 1000.0 + RETRY_DELAY
+    stats = scheduler.stats()
+    assert (stats["errors"], stats["retries"], stats["pending"]) == (1, 2, 2)
+
+    # La replanification est journalisée
+    scheduler.close()
+    assert reload(path).get("UNBAN", GUILD, 1) == 1000.0 + RETRY_DELAY
+
+def test_handler_failed_ids_are_rescheduled(path):
+    scheduler = make_scheduler(path)
+
+    async def handler(guild_id, user_ids):
+        return [2]
+
+    scheduler.register("UNMUTE", handler)
+    scheduler.schedule("UNMUTE", GUILD, [1, 2, 3], 900.0)
+    asyncio.run(scheduler.expire_due())
+
+    assert list(scheduler._entries) == [("UNMUTE", GUILD, 2)]
+    assert scheduler.get("UNMUTE", GUILD, 2) == 1000.0 + RETRY_DELAY
+    stats = scheduler.stats()
+    assert (stats["batches"], stats["errors"], stats["retries"]) == (1, 0, 1)
+
+def test_expire_due_respects_batch_size(path):
+    scheduler = make_scheduler(path, batch_size=2)
+    calls = []
+
+    async def handler(guild_id, user_ids):
+        calls.append(len(user_ids))
+
+    scheduler.register("UNBAN", handler)
+    scheduler.schedule("UNBAN", GUILD, [1, 2, 3], 900.0)
+    assert asyncio.run(scheduler.expire_due()) == 2
+    assert asyncio.run(scheduler.expire_due()) == 1
+    assert calls == [2, 1]
+
+def test_plan_without_duration_cancels(path):
+    scheduler = make_scheduler(path)
+    scheduler.plan("UNBAN", GUILD, [1, 2], 3600)
+    assert scheduler.get("UNBAN", GUILD, 1) == 1000.0 + 3600
+    scheduler.plan("UNBAN", GUILD, [1], None)
+    assert scheduler.get("UNBAN", GUILD, 1) is None
+    assert scheduler.get("UNBAN", GUILD, 2) is not None
+
+def test_register_rejects_unknown_action(path):
+    with pytest.raises(ValueError):
+        SanctionScheduler(path).register("KICK", None)
@@ -0,0 +1,197 @@
+"""
+Tests du filtre de termes interdits (utils.wordfilter)
+
+Automate Aho-Corasick (liens d'échec, sorties héritées), bornes de mot,
+normalisation et positions dans le texte original, automate d'appoint et
+termes retirés pendant une reconstruction.
+"""
+
+import asyncio
+
+import pytest
+
+from utils import wordfilter
+from utils.wordfilter import ANYWHERE, GuildWordFilter, TermAutomaton, WordFilter, normalize, parse_term
+
+def automaton(*patterns):
+    return TermAutomaton({pattern: (pattern, ANYWHERE) for pattern in patterns})
+
+def found(guild_filter, content):
+    return [(match.term, match.text) for match in guild_filter.find(content)]
+
+# --- Automate -------------------------------------------------------------------
+
+def test_automaton_inherited_outputs():
+    # "she" mène à l'état de "he" par son lien d'échec, "hers" partage le préfixe "he"
+    matches = automaton("he", "she", "his", "hers").search("ushers")
+    assert sorted(matches) == [
+        (1, 4, "she", ANYWHERE),
+        (2, 4, "he", ANYWHERE),
+        (2, 6, "hers", ANYWHERE),
+    ]
+
+def test_automaton_follows_failure_links():
+    # Après "abc" sans "d", la recherche repart de l'état "bc"
+    assert automaton("abcd", "bce").search("abce") == [(1, 4, "bce", ANYWHERE)]
+    assert automaton("aab").search("aaab") == [(1, 4, "aab", ANYWHERE)]
+
+def test_automaton_overlapping_and_repeated():
+    matches = automaton("aa").search("aaaa")
+    assert [(start, end) for start, end, *_ in matches] == [(0, 2), (1, 3), (2, 4)]
+    assert automaton("x").search("") == []
+    assert automaton().search("texte") == []
+
+# --- Termes et bornes de mot ------------------------------------------------------
+
+def test_parse_term_modes():
+    assert parse_term("Con") == ("con", (True, True))
+    assert parse_term("con*") == ("con", (True, False))
+    assert parse_term("*con") == ("con", (False, True))
+    assert parse_term("*con*") == ("con", (False, False))
+    assert parse_term("  mot   interdit ") == ("mot interdit", (True, True))
+    assert parse_term("*") is None
+    assert parse_term("\u200b") is None
+
+@pytest.mark.parametrize("term, content, expected", [
+    ("con", "espèce de con!", "con"),
+    ("con", "un conte", None),
+    ("con", "rascon", None),
+    ("con*", "quel connard", "connard"),
+    ("con*", "rascon", None),
+    ("*con", "sale rascon.", "rascon"),
+    ("*con", "un conte", None),
+    ("*con*", "ça deconne", "con"),
+])
+def test_word_boundaries(term, content, expected):
+    matches = found(GuildWordFilter([term]), content)
+    assert matches == ([(term, expected)] if expected else [])
+
+def test_matches_are_in_text_order():
+    guild_filter = GuildWordFilter(["b", "a"])
+    assert found(guild_filter, "b a b") == [("b", "b"), ("a", "a"), ("b", "b")]
+
+# --- Normalisation et positions ----------------------------------------------------
+
+@pytest.mark.parametrize("content, quoted", [
+    ("c0n", "c0n"),
+    ("ｃｏｎ", "ｃｏｎ"),
+    ("c\u200bo\u200dn", "c\u200bo\u200dn"),
+    ("CÔN", "CÔN"),
+    ("𝐜𝐨𝐧", "𝐜𝐨𝐧"),
+])
+def test_normalized_match_quotes_original_text(content, quoted):
+    matches = GuildWordFilter(["con"]).find(f"espèce de {content} !")
+    assert [match.text for match in matches] == [quoted]
+    match = matches[0]
+    assert f"espèce de {content} !"[match.start:match.end] == quoted
+
+def test_offsets_after_expanding_character():
+    # "ﬁ" devient "fi": deux caractères normalisés pour un caractère original
+    matches = GuildWordFilter(["fin"]).find("la ﬁn ! ")
+    assert [(match.start, match.end, match.text) for match in matches] == [(3, 5, "ﬁn")]
+
+@pytest.mark.parametrize("content", [
+    "un mot interdit",
+    "un mot  interdit",
+    "un mot\n\tinterdit",
+    "un mot \u200b interdit",
+    "un MOT\u3000\u3000interdit",
+])
+def test_whitespace_runs_match_multiword_terms(content):
+    matches = GuildWordFilter(["mot interdit"]).find(content)
+    assert [match.text for match in matches] == [content[3:]]
+
+def test_normalize_collapses_spaces():
+    assert normalize("a  \t b\u200b  c") == "a b c"
+    assert normalize("déjà Vu") == "deja vu"
+
+# --- Ajouts, retraits et reconstruction ----------------------------------------------
+
+def test_delta_and_removed_terms_before_rebuild():
+    guild_filter = GuildWordFilter(["alpha", "beta"])
+    assert not guild_filter.stale
+
+    added, removed = guild_filter.update(add=["gamma"], remove=["alpha"])
+    assert (added, removed) == (["gamma"], ["alpha"])
+    assert guild_filter.stale
+    # Ajout servi par l'automate d'appoint, retrait masqué à la sortie
+    assert found(guild_filter, "alpha beta gamma") == [("beta", "beta"), ("gamma", "gamma")]
+
+    terms = guild_filter.snapshot()
+    guild_filter.install(TermAutomaton(terms), terms)
+    assert not guild_filter.stale
+    assert guild_filter._delta is None
+    assert found(guild_filter, "alpha beta gamma") == [("beta", "beta"), ("gamma", "gamma")]
+
+def test_readding_removed_term():
+    guild_filter = GuildWordFilter(["alpha"])
+    guild_filter.update(remove=["alpha"])
+    assert found(guild_filter, "alpha") == []
+    guild_filter.update(add=["alpha"])
+    assert not guild_filter.stale
+    assert found(guild_filter, "alpha") == [("alpha", "alpha")]
+
+def test_changes_during_rebuild_are_kept():
+    guild_filter = GuildWordFilter(["alpha", "beta"])
+    guild_filter.update(add=["gamma"])
+    # Compilation en cours sur cet instantané...
+    terms = guild_filter.snapshot()
+    compiled = TermAutomaton(terms)
+    # ... pendant que la liste change encore
+    guild_filter.update(add=["delta"], remove=["beta", "gamma"])
+    guild_filter.install(compiled, terms)
+
+    assert guild_filter.stale
+    assert found(guild_filter, "alpha beta gamma delta") == [("alpha", "alpha"), ("delta", "delta")]
+
+def test_massive_additions_wait_for_rebuild(monkeypatch):
+    monkeypatch.setattr(wordfilter, "DELTA_MAX", 2)
+    guild_filter = GuildWordFilter(["alpha"])
+    guild_filter.update(add=["beta", "gamma", "delta"])
+    assert guild_filter._delta is None
+    assert found(guild_filter, "beta") == []
+
+    terms = guild_filter.snapshot()
+    guild_filter.install(TermAutomaton(terms), terms)
+    assert found(guild_filter, "beta") == [("beta", "beta")]
+
+def test_background_rebuild_and_reload(tmp_path, monkeypatch):
+    monkeypatch.setattr(wordfilter, "INLINE_BUILD_TERMS", 1)
+    guild_id = 10 ** 17
+
+    async def scenario():
+        filters = WordFilter(tmp_path)
+        await filters.update(guild_id, add=["alpha", "beta*"])
+        assert guild_id in filters._builds
+        # Modifié pendant la reconstruction: visible tout de suite, puis recompilé
+        await filters.update(guild_id, add=["gamma"], remove=["alpha"])
+        assert found(filters.get(guild_id), "alpha gamma") == [("gamma", "gamma")]
+        while guild_id in filters._builds:
+            await filters._builds[guild_id]
+
+        guild_filter = filters.get(guild_id)
+        assert not guild_filter.stale
+        assert found(guild_filter, "alpha betas gamma") == [("beta*", "betas"), ("gamma", "gamma")]
+
+        reloaded = WordFilter(tmp_path)
+        await reloaded.load()
+        assert set(reloaded.get(guild_id).terms) == {"beta*", "gamma"}
+
+        await filters.update(guild_id, remove=["beta*", "gamma"])
+        assert filters.get(guild_id) is None
+        assert not (tmp_path / f"{guild_id}.txt").exists()
+
+    asyncio.run(scenario())
+
+def test_concurrent_updates_save_latest_terms(tmp_path):
+    guild_id = 10 ** 17
+
+    async def scenario():
+        filters = WordFilter(tmp_path)
+        await asyncio.gather(*(filters.update(guild_id, add=[f"terme{index}"]) for index in range(20)))
+        saved = (tmp_path / f"{guild_id}.txt").read_text(encoding='utf-8').split()
+        assert sorted(saved) == sorted(filters.get(guild_id).terms)
+        assert len(saved) == 20
+        assert not (tmp_path / f"{guild_id}.tmp").exists()
+
+    asyncio.run(scenario())
@@ -0,0 +1,630 @@
+"""
+Filtre de termes interdits par serveur (automate Aho-Corasick)
+
+Chaque serveur a sa liste de termes (mots ou expressions), compilée une fois
+en un automate Aho-Corasick: le coût d'un message est proportionnel à sa
+longueur, pas au nombre de termes. Le texte est normalisé en une passe
+(str.translate) avant la recherche: casse, accents, caractères de largeur
+pleine ou "mathématiques", leetspeak et caractères invisibles.
+
+Syntaxe des termes:
+    mot       mot entier (pas "motus")
+    mot*      mots commençant par "mot"
+    *mot      mots finissant par "mot"
+    *mot*     n'importe où dans le texte
+"""
+
+import asyncio
+import io
+import logging
+import os
+import re
+import unicodedata
+from pathlib import Path
+
+import discord
+
+from utils.hierarchy import hierarchy_cache
+from utils.logger import log_moderation_action
+from utils.moderation import MAX_ATTACHMENT_BYTES
+
+logger = logging.getLogger(__name__)
+
+# Listes de termes: un fichier texte par serveur, un terme par ligne
+DATA_DIR = Path("data") / "wordfilter"
+# Nombre maximal de termes par serveur
+MAX_TERMS = 200000
+# Termes ajoutés en une fois au-delà desquels on attend la reconstruction
+# (en arrière-plan) au lieu de compiler un automate intermédiaire sur la boucle
+DELTA_MAX = 2000
+# En dessous de ce nombre de termes, l'automate est reconstruit directement
+INLINE_BUILD_TERMS = 500
+# Durée d'affichage de l'avertissement dans le salon (secondes)
+NOTICE_DELETE_AFTER = 10
+# Termes affichés dans le message de +filtre liste (au-delà: fichier joint)
+LIST_INLINE_TERMS = 50
+# Les membres ayant une de ces permissions ne sont pas filtrés
+EXEMPT_PERMISSIONS = ("administrator", "manage_messages")
+
+# Modes de correspondance (bornes de mot exigées au début, à la fin)
+WORD = (True, True)
+PREFIX = (True, False)
+SUFFIX = (False, True)
+ANYWHERE = (False, False)
+
+# Substitutions "leetspeak" (appliquées aussi aux termes, donc cohérentes)
+LEET = {'0': 'o', '1': 'i', '3': 'e', '4': 'a', '5': 's', '7': 't', '@': 'a', '$': 's', '€': 'e'}
+# Invisibles qui ne sont pas de catégorie Cf
+INVISIBLE = {'ᅟ', 'ᅠ', 'ㅤ', 'ﾠ', '͏'}
+
+def _fold(char):
+    """Forme normalisée d'un caractère: chaîne (éventuellement vide) ou None pour le supprimer"""
+    if char in INVISIBLE or unicodedata.category(char) in ('Cf', 'Mn', 'Me'):
+        return None
+    if char.isspace():
+        return ' '
+    folded = []
+    for part in unicodedata.normalize('NFKD', char):
+        if unicodedata.combining(part):
+            continue
+        for lower in part.casefold():
+            folded.append(LEET.get(lower, lower))
+    return ''.join(folded) or None
+
+class _FoldTable(dict):
+    """Table de str.translate remplie à la demande (un calcul par caractère rencontré)"""
+
+    def __missing__(self, codepoint):
+        value = _fold(chr(codepoint))
+        if value == chr(codepoint):
+            value = codepoint
+        self[codepoint] = value
+        return value
+
+_TABLE = _FoldTable()
+# Espaces consécutifs (après suppression des invisibles), fusionnés comme dans les termes
+_SPACES = re.compile(' {2,}')
+
+def normalize(text):
+    """
+    Normalise un texte en une passe (casse, accents, leetspeak, invisibles),
+    puis fusionne les suites d'espaces
+
+    Returns:
+        str: Texte normalisé (sa longueur peut différer de l'original)
+    """
+    text = text.translate(_TABLE)
+    if '  ' in text:
+        text = _SPACES.sub(' ', text)
+    return text
+
+def parse_term(raw):
+    """
+    Terme configuré -> (motif normalisé, mode)
+
+    Returns:
+        tuple: (motif, mode), ou None si le terme est vide une fois normalisé
+    """
+
+    raw = raw.strip()
+    starts = raw.startswith('*')
+    ends = raw.endswith('*') and len(raw) > 1
+    pattern = ' '.join(normalize(raw.strip('*')).split())
+    if not pattern:
+        return None
+    return pattern, (not starts, not ends)
+
+_LEAF = {}
+
+# Séparateurs des termes dans +filtre ajouter/retirer (virgules ou lignes)
+_TERM_SEPARATOR = re.compile(r'[,\n]')
+
+def split_terms(text):
+    """Termes d'une liste séparée par des virgules ou des retours à la ligne"""
+    return [term.strip() for term in _TERM_SEPARATOR.split(text or '') if term.strip()]
+
+class TermMatch:
+    """Terme trouvé dans un message, avec sa position dans le texte original"""
+
+    __slots__ = ('term', 'start', 'end', 'text')
+
+    def __init__(self, term, start, end, text):
+        self.term = term
+        self.start = start
+        self.end = end
+        self.text = text
+
+    def quote(self):
+        return f"«{self.text}» ({self.start}-{self.end})"
+
+    def __repr__(self):
+        return f"TermMatch({self.term!r}, {self.start}, {self.end}, {self.text!r})"
+
+class TermAutomaton:
+    """
+    Automate Aho-Corasick sur des termes normalisés
+
+    Les noeuds sont des indices dans des listes parallèles (transitions,
+    liens d'échec, sorties) plutôt que des objets; les sorties d'un noeud
+    incluent celles de ses suffixes, calculées à la construction.
+    """
+
+    def __init__(self, terms):
+        """
+        Args:
+            terms: dict terme configuré -> (motif normalisé, mode)
+        """
+
+        goto = [{}]
+        own = [None]
+        entries = []
+        for term, (pattern, mode) in terms.items():
+            state = 0
+            for char in pattern:
+                following = goto[state].get(char)
+                if following is None:
+                    following = goto[state][char] = len(goto)
+                    goto.append({})
+                    own.append(None)
+                state = following
+            entry = (term, len(pattern), mode)
+            own[state] = (own[state] or ()) + (entry,)
+            entries.append(entry)
+
+        # Liens d'échec en largeur d'abord; sorties héritées du lien d'échec
+        fail = [0] * len(goto)
+        out = own
+        queue = list(goto[0].values())
+        for state in queue:
+            for char, following in goto[state].items():
+                queue.append(following)
+                target = fail[state]
+                while target and char not in goto[target]:
+                    target = fail[target]
+                link = goto[target].get(char, 0)
+                if link == following:
+                    link = 0
+                fail[following] = link
+                if out[link]:
+                    out[following] = (out[following] or ()) + out[link]
+
+        # Les feuilles partagent un même dict vide (l'automate n'est plus modifié)
+        for state, transitions in enumerate(goto):
+            if not transitions:
+                goto[state] = _LEAF
+
+        self._goto = goto
+        self._fail = fail
+        self._out = out
+        self.terms = len(entries)
+
+    def __len__(self):
+        return len(self._goto)
+
+    def search(self, text):
+        """
+        Positions des termes dans un texte normalisé
+
+        Returns:
+            list: (début, fin, terme, mode) par occurrence (bornes de mot non vérifiées)
+        """
+
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+        found = []
+        state = 0
+        for index, char in enumerate(text):
+            following = goto[state].get(char)
+            while following is None and state:
+                state = fail[state]
+                following = goto[state].get(char)
+            if following is None:
+                state = 0
+                continue
+            state = following
+            if out[state] is not None:
+                for term, length, mode in out[state]:
+                    found.append((index + 1 - length, index + 1, term, mode))
+        return found
+
+def _word_bounded(text, start, end, mode):
+    before, after = mode
+    if before and start > 0 and text[start - 1].isalnum():
+        return False
+    if after and end < len(text) and text[end].isalnum():
+        return False
+    return True
+
+def _original_offsets(text):
+    """Position dans le texte original de chaque caractère du texte normalisé (et de la fin)"""
+    offsets = []
+    previous = None
+    for index, char in enumerate(text):
+        value = _TABLE[ord(char)]
+        if value is None:
+            continue
+        for folded in (chr(value) if isinstance(value, int) else value):
+            # Espaces consécutifs fusionnés comme dans normalize()
+            if folded == ' ' and previous == ' ':
+                continue
+            offsets.append(index)
+            previous = folded
+    offsets.append(len(text))
+    return offsets
+
+class GuildWordFilter:
+    """
+    Termes interdits d'un serveur
+
+    L'automate principal couvre la liste telle qu'elle était à sa dernière
+    compilation; les termes ajoutés depuis sont dans un petit automate
+    d'appoint et les termes retirés sont ignorés à la sortie, jusqu'à la
+    reconstruction suivante (voir WordFilter.update).
+    """
+
+    def __init__(self, terms=()):
+        self.terms = {}         # terme configuré -> (motif normalisé, mode)
+        for raw in terms:
+            parsed = parse_term(raw)
+            if parsed is not None:
+                self.terms[raw.strip()] = parsed
+        self._main = TermAutomaton(self.terms)
+        self._compiled = set(self.terms)
+        self._delta = None      # automate d'appoint des termes ajoutés
+        self._added = set()     # ajoutés depuis la compilation
+        self._removed = set()   # retirés depuis la compilation
+        self.checked = 0
+        self.matched = 0
+
+    def __len__(self):
+        return len(self.terms)
+
+    def __contains__(self, term):
+        return term.strip() in self.terms
+
+    @property
+    def stale(self):
+        """True si l'automate principal ne correspond plus à la liste"""
+        return bool(self._added) or bool(self._removed)
+
+    def update(self, add=(), remove=()):
+        """
+        Ajoute et retire des termes, pris en compte immédiatement (sauf ajouts massifs)
+
+        Returns:
+            tuple: (termes ajoutés, termes retirés)
+        """
+
+        added = []
+        removed = []
+        for raw in remove:
+            term = raw.strip()
+            if self.terms.pop(term, None) is None:
+                continue
+            removed.append(term)
+            if term in self._compiled:
+                self._removed.add(term)
+            else:
+                self._added.discard(term)
+        for raw in add:
+            term = raw.strip()
+            if term in self.terms or len(self.terms) >= MAX_TERMS:
+                continue
+            parsed = parse_term(term)
+            if parsed is None:
+                continue
+            self.terms[term] = parsed
+            added.append(term)
+            if term in self._removed:
+                self._removed.discard(term)
+            else:
+                self._added.add(term)
+
+        if added or removed:
+            self._compile_delta()
+        return added, removed
+
+    def _compile_delta(self):
+        # Au-delà de DELTA_MAX, les ajouts ne sont filtrés qu'après la reconstruction
+        if self._added and len(self._added) <= DELTA_MAX:
+            self._delta = TermAutomaton({term: self.terms[term] for term in self._added})
+        else:
+            self._delta = None
+
+    def snapshot(self):
+        """Copie de la liste à compiler (hors de la boucle)"""
+        return dict(self.terms)
+
+    def install(self, automaton, terms):
+        """Remplace l'automate principal par celui compilé à partir de snapshot()"""
+        self._main = automaton
+        self._compiled = set(terms)
+        self._added = self.terms.keys() - self._compiled
+        self._removed = self._compiled - self.terms.keys()
+        self._compile_delta()
+
+    def find(self, content):
+        """
+        Termes présents dans un message
+
+        Returns:
+            list: TermMatch dans l'ordre du texte (vide si aucun)
+        """
+
+        self.checked += 1
+        text = normalize(content)
+        found = self._main.search(text)
+        if self._delta is not None:
+            found.extend(self._delta.search(text))
+        if not found:
+            return []
+
+        matches = []
+        offsets = None
+        for start, end, term, mode in sorted(found):
+            if term in self._removed or not _word_bounded(text, start, end, mode):
+                continue
+            # Citer le mot entier pour les termes "mot*" et "*mot"
+            if mode == PREFIX:
+                while end < len(text) and text[end].isalnum():
+                    end += 1
+            elif mode == SUFFIX:
+                while start > 0 and text[start - 1].isalnum():
+                    start -= 1
+            if offsets is None:
+                offsets = _original_offsets(content)
+            begin = offsets[start]
+            finish = offsets[end - 1] + 1
+            matches.append(TermMatch(term, begin, finish, content[begin:finish]))
+        if matches:
+            self.matched += 1
+        return matches
+
+    def memory(self):
+        """Nombre de noeuds des automates"""
+        return len(self._main) + (len(self._delta) if self._delta is not None else 0)
+
+class WordFilter:
+    """
+    Filtres de termes des serveurs, persistés dans DATA_DIR, et action sur les messages
+
+    Args:
+        data_dir: Dossier des listes (un fichier <guild_id>.txt par serveur)
+    """
+
+    def __init__(self, data_dir=DATA_DIR):
+        self.data_dir = Path(data_dir)
+        self._guilds = {}
+        self._builds = {}       # guild_id -> tâche de reconstruction en cours
+        self._save_lock = asyncio.Lock()    # un seul <id>.tmp écrit à la fois
+
+        # Compteurs exposés via stats()
+        self.deleted = 0
+        self.skipped = 0
+        self.errors = 0
+
+    def get(self, guild_id):
+        """Filtre d'un serveur, ou None s'il n'a aucun terme"""
+        return self._guilds.get(guild_id)
+
+    def _path(self, guild_id):
+        return self.data_dir / f"{guild_id}.txt"
+
+    def _load_all(self):
+        filters = {}
+        if not self.data_dir.is_dir():
+            return filters
+        for path in self.data_dir.glob("*.txt"):
+            if not path.stem.isdigit():
+                continue
+            terms = [line for line in path.read_text(encoding='utf-8').splitlines() if line.strip()]
+            if terms:
+                filters[int(path.stem)] = GuildWordFilter(terms)
+        return filters
+
+    async def load(self):
+        """Charge et compile les listes de tous les serveurs (hors de la boucle)"""
+        self._guilds = await asyncio.to_thread(self._load_all)
+        if self._guilds:
+            total = sum(len(guild_filter) for guild_filter in self._guilds.values())
+            logger.info(f"🚫 Filtre de termes: {total} terme(s) sur {len(self._guilds)} serveur(s)")
+
+    def _save(self, guild_id, terms):
+        path = self._path(guild_id)
+        if not terms:
+            path.unlink(missing_ok=True)
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_suffix('.tmp')
+        temporary.write_text(''.join(f"{term}\n" for term in terms), encoding='utf-8')
+        os.replace(temporary, path)
+
+    async def update(self, guild_id, add=(), remove=()):
+        """
+        Modifie la liste d'un serveur, l'enregistre et relance la compilation si besoin
+
+        Les petites listes sont recompilées directement; au-delà de
+        INLINE_BUILD_TERMS, l'automate est reconstruit dans un thread et les
+        changements restent visibles entre-temps via l'automate d'appoint.
+
+        Returns:
+            tuple: (termes ajoutés, termes retirés)
+        """
+
+        guild_filter = self._guilds.get(guild_id)
+        if guild_filter is None:
+            guild_filter = GuildWordFilter()
+        added, removed = guild_filter.update(add, remove)
+        if not added and not removed:
+            return added, removed
+
+        if guild_filter.terms:
+            self._guilds[guild_id] = guild_filter
+        else:
+            self._guilds.pop(guild_id, None)
+        async with self._save_lock:
+            # Instantané pris sous le verrou: la dernière écriture porte la liste à jour
+            current = self._guilds.get(guild_id)
+            terms = list(current.terms) if current is not None else []
+            await asyncio.to_thread(self._save, guild_id, terms)
+
+        if len(guild_filter) <= INLINE_BUILD_TERMS:
+            terms = guild_filter.snapshot()
+            guild_filter.install(TermAutomaton(terms), terms)
+        elif guild_id not in self._builds:
+            self._builds[guild_id] = asyncio.create_task(self._rebuild(guild_id, guild_filter))
+        return added, removed
+
+    async def _rebuild(self, guild_id, guild_filter):
+        try:
+            # Tant que la liste change pendant la compilation, on recommence
+            while guild_filter.stale:
+                terms = guild_filter.snapshot()
+                automaton = await asyncio.to_thread(TermAutomaton, terms)
+                guild_filter.install(automaton, terms)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"ERREUR FILTRE: compilation des termes du serveur {guild_id}: {e}")
+        finally:
+            del self._builds[guild_id]
+
+    def discard_guild(self, guild_id):
+        self._guilds.pop(guild_id, None)
+
+    def check(self, message):
+        """
+        Cherche les termes interdits dans un message (à appeler depuis on_message)
+
+        Returns:
+            list: TermMatch trouvés (vide pour les messages privés, les bots et les serveurs sans liste)
+        """
+
+        if message.guild is None or message.author.bot:
+            return []
+        guild_filter = self._guilds.get(message.guild.id)
+        if guild_filter is None or not message.content:
+            return []
+        return guild_filter.find(message.content)
+
+    async def enforce(self, message, matches):
+        """
+        Supprime un message contenant des termes interdits et journalise les termes cités
+
+        Les membres ayant une des EXEMPT_PERMISSIONS ne sont pas filtrés.
+
+        Returns:
+            bool: True si le message a été supprimé
+        """
+
+        member = message.author
+        if isinstance(member, discord.Member) and any(
+                hierarchy_cache.has_permission(member, permission) for permission in EXEMPT_PERMISSIONS):
+            self.skipped += 1
+            return False
+
+        quoted = ', '.join(match.quote() for match in matches[:5])
+        try:
+            await message.delete()
+            await message.channel.send(
+                f"🚫 {member.mention}, votre message contenait un terme interdit.",
+                delete_after=NOTICE_DELETE_AFTER)
+        except discord.NotFound:
+            pass
+        except discord.HTTPException as e:
+            self.errors += 1
+            logger.error(f"ERREUR FILTRE: {e}")
+            return False
+
+        self.deleted += 1
+        guild = message.guild
+        log_moderation_action("FILTRE", guild.me, member, f"Termes interdits dans #{message.channel}: {quoted}", guild)
+        return True
+
+    def stats(self):
+        """
+        Statistiques du filtre
+
+        Returns:
+            dict: Serveurs, termes, noeuds, messages vérifiés et filtrés, suppressions
+        """
+
+        filters = self._guilds.values()
+        return {
+            "guilds": len(self._guilds),
+            "terms": sum(len(guild_filter) for guild_filter in filters),
+            "nodes": sum(guild_filter.memory() for guild_filter in filters),
+            "checked": sum(guild_filter.checked for guild_filter in filters),
+            "matched": sum(guild_filter.matched for guild_filter in filters),
+            "deleted": self.deleted,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "rebuilding": len(self._builds),
+        }
+
+async def read_attachment_terms(message):
+    """Termes des pièces jointes texte d'un message (un par ligne)"""
+    terms = []
+    for attachment in message.attachments:
+        if attachment.size > MAX_ATTACHMENT_BYTES:
+            logger.warning(f"Pièce jointe ignorée (trop volumineuse): {attachment.filename}")
+            continue
+        if attachment.content_type and not attachment.content_type.startswith('text/'):
+            continue
+        data = await attachment.read()
+        terms.extend(split_terms(data.decode('utf-8', errors='ignore')))
+    return terms
+
+async def run_filter_command(ctx, action, text):
+    """
+    Traite la commande +filtre
+
+    Args:
+        ctx: Contexte de la commande
+        action: "ajouter", "retirer", "liste" ou "test"
+        text: Termes séparés par des virgules (ajouter/retirer) ou message à tester
+    """
+
+    action = (action or "liste").lower()
+    guild_id = ctx.guild.id
+
+    if action in ("ajouter", "retirer"):
+        terms = split_terms(text) + await read_attachment_terms(ctx.message)
+        if not terms:
+            await ctx.send("❌ Indiquez des termes séparés par des virgules, ou joignez un fichier .txt (un terme par ligne).")
+            return
+        if action == "ajouter":
+            added, _ = await wordfilter.update(guild_id, add=terms)
+            await ctx.send(f"🚫 {len(added)} terme(s) ajouté(s) ({len(terms) - len(added)} déjà présent(s) ou invalide(s)).")
+        else:
+            _, removed = await wordfilter.update(guild_id, remove=terms)
+            await ctx.send(f"🚫 {len(removed)} terme(s) retiré(s).")
+        guild_filter = wordfilter.get(guild_id)
+        logger.info(f"FILTRE MODIFIÉ par {ctx.author} dans {ctx.guild}: {action} {len(terms)} terme(s), "
+                    f"{len(guild_filter) if guild_filter else 0} au total")
+
+    elif action == "liste":
+        guild_filter = wordfilter.get(guild_id)
+        if guild_filter is None:
+            await ctx.send("🚫 Aucun terme interdit sur ce serveur.")
+            return
+        terms = sorted(guild_filter.terms)
+        if len(terms) <= LIST_INLINE_TERMS:
+            await ctx.send(f"🚫 {len(terms)} terme(s) interdit(s): " + ', '.join(f"`{term}`" for term in terms))
+        else:
+            listing = io.BytesIO(''.join(f"{term}\n" for term in terms).encode('utf-8'))
+            await ctx.send(f"🚫 {len(terms)} terme(s) interdit(s)", file=discord.File(listing, filename="filtre.txt"))
+
+    elif action == "test":
+        guild_filter = wordfilter.get(guild_id)
+        matches = guild_filter.find(text) if guild_filter is not None and text else []
+        if matches:
+            await ctx.send("🚫 Termes trouvés: " + ', '.join(f"`{match.term}` {match.quote()}" for match in matches[:10]))
+        else:
+            await ctx.send("✅ Aucun terme interdit trouvé.")
+
+    else:
+        await ctx.send("❌ Usage: `+filtre ajouter|retirer <termes>`, `+filtre liste` ou `+filtre test <message>`")
+
+# Filtre partagé par les deux bots
+wordfilter = WordFilter()